@@ -42,7 +42,7 @@ if __name__ == '__main__':
                                 'coadd_2dspec', 'coadd_datacube', 'compare_sky', 'find_objects',
                                 'flux_calib', 'flux_setup', 'identify', 'lowrdx_pixflat', 
                                 'lowrdx_skyspec', 'qa_html', 'ql_keck_mosfire', 'ql_keck_nires',
-                                'ql_mos', 'sensfunc', 'setup', 'show_1dspec', 'show_2dspec',
+                                'ql_mos', 'ql_server', 'sensfunc', 'setup', 'show_1dspec', 'show_2dspec',
                                 'show_arxiv', 'show_wvcalib', 'skysub_regions', 'tellfit',
                                 'trace_edges', 'view_fits', 'run_pypeit']}
     scr_mod['run_pypeit'] = False
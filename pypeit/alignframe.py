@@ -6,7 +6,6 @@ Module for generating an Alignment image to map constant spatial locations
 """
 import inspect
 import numpy as np
-from IPython import embed
 
 from pypeit.display import display
 from pypeit.core import extract
@@ -14,7 +14,6 @@ Class usage examples
 .. include:: ../include/links.rst
 
 """
-from IPython import embed
 import numpy
 import os
 import textwrap
@@ -96,6 +95,8 @@ class BitMask:
         self.bits = { k:i for i,k in enumerate(_keys) }
         self.max_value = (1 << self.nbits)-1
         self.descr = _descr
+        # Cache with the combined bit values for each set of flags
+        self._bit_patterns = {}
         
     def _prep_flags(self, flag):
         """Prep the flags for use."""
@@ -114,6 +115,66 @@ class BitMask:
 #            raise TypeError('Provided bit names must be strings!')
         return _flag
 
+    def _patterns(self, flag):
+        """
+        Return the combined bit values for a set of flags.
+
+        The result is cached, such that the flags are only validated
+        the first time they are used.
+
+        Args:
+            flag (:obj:`str`, array-like):
+                One or more bit names.  If None, all bits are used.
+
+        Returns:
+            :obj:`tuple`: Two integers with (1) the bitwise OR of all
+            the bit values, used to check or set the bits, and (2) the
+            bitwise XOR of the bit values, used to toggle the bits.
+        """
+        key = None if flag is None else (flag if isinstance(flag, str)
+                                          else tuple(numpy.atleast_1d(flag).ravel()))
+        if key not in self._bit_patterns:
+            pattern = 0
+            toggle = 0
+            for f in self._prep_flags(flag):
+                pattern |= 1 << self.bits[f]
+                toggle ^= 1 << self.bits[f]
+            self._bit_patterns[key] = (pattern, toggle)
+        return self._bit_patterns[key]
+
+    @staticmethod
+    def _apply(ufunc, value, pattern, inplace, where):
+        """
+        Apply a bitwise operation to a set of bitmask values.
+
+        Args:
+            ufunc (`numpy.ufunc`_):
+                The bitwise operation.
+            value (:obj:`int`, `numpy.ndarray`_):
+                Bitmask value(s).
+            pattern (:obj:`int`):
+                The second operand.
+            inplace (:obj:`bool`):
+                Modify ``value`` in place.
+            where (`numpy.ndarray`_):
+                Boolean array selecting the elements of ``value`` to
+                modify.  If None, all elements are modified.
+
+        Returns:
+            :obj:`int`, `numpy.ndarray`_: The new bitmask value(s).
+        """
+        if not inplace and where is None:
+            return ufunc(value, pattern).astype(value.dtype)
+        if not isinstance(value, numpy.ndarray):
+            raise TypeError('Bitmask values must be an array to modify them in place or to '
+                            'select the values to modify.')
+        out = value if inplace else value.copy()
+        # Operate in the data type of the bitmask values to avoid any
+        # temporary arrays
+        ufunc(out, numpy.asarray(pattern).astype(out.dtype), out=out,
+              where=True if where is None else where)
+        return out
+
     @staticmethod
     def _fill_sequence(keys, vals, descr=None):
         r"""
@@ -227,6 +288,9 @@ class BitMask:
         function can be used to determine if any individual bit is on or
         any one of many bits is on.
 
+        The bit values of all the flags are combined such that the
+        bitmask values are only checked once.
+
         Args:
             value (int, array-like):
                 Bitmask value.  It should be less than or equal to
@@ -246,16 +310,7 @@ class BitMask:
             TypeError: Raised if the provided *flag* does not contain
                 one or more strings.
         """
-        _flag = self._prep_flags(flag)
-
-        out = value & (1 << self.bits[_flag[0]]) != 0
-        if len(_flag) == 1:
-            return out
-
-        nn = len(_flag)
-        for i in range(1,nn):
-            out |= (value & (1 << self.bits[_flag[i]]) != 0)
-        return out
+        return value & self._patterns(flag)[0] != 0
 
     def flagged_bits(self, value):
         """
@@ -285,7 +340,7 @@ class BitMask:
         indx = numpy.array([1<<self.bits[k] & value != 0 for k in keys])
         return (keys[indx]).tolist()
 
-    def toggle(self, value, flag):
+    def toggle(self, value, flag, inplace=False, where=None):
         """
         Toggle a bit in the provided bitmask value.
 
@@ -295,6 +350,15 @@ class BitMask:
                 :attr:`max_value`; however, that is not checked.
             flag (str, array-like):
                 Bit name(s) to toggle.
+            inplace (:obj:`bool`, optional):
+                Modify ``value`` in place, instead of returning a
+                modified copy.  ``value`` must be a `numpy.ndarray`_.
+            where (`numpy.ndarray`_, optional):
+                Boolean array selecting the elements of ``value`` to
+                modify; the other elements are unchanged.  ``value``
+                must be a `numpy.ndarray`_.  This is equivalent to,
+                but faster than, ``value[where] = bm.toggle(value[where],
+                flag)``.
 
         Returns:
             array-like: New bitmask value after toggling the selected
@@ -306,19 +370,9 @@ class BitMask:
         """ 
         if flag is None:
             raise ValueError('Provided bit name cannot be None.')
+        return self._apply(numpy.bitwise_xor, value, self._patterns(flag)[1], inplace, where)
 
-        _flag = self._prep_flags(flag)
-
-        out = value ^ (1 << self.bits[_flag[0]])
-        if len(_flag) == 1:
-            return out.astype(value.dtype)
-
-        nn = len(_flag)
-        for i in range(1,nn):
-            out ^= (1 << self.bits[_flag[i]])
-        return out.astype(value.dtype)
-
-    def turn_on(self, value, flag):
+    def turn_on(self, value, flag, inplace=False, where=None):
         """
         Ensure that a bit is turned on in the provided bitmask value.
 
@@ -328,6 +382,15 @@ class BitMask:
                 :attr:`max_value`; however, that is not checked.
             flag (:obj:`list`, `numpy.ndarray`, :obj:`str`):
                 Bit name(s) to turn on.
+            inplace (:obj:`bool`, optional):
+                Modify ``value`` in place, instead of returning a
+                modified copy.  ``value`` must be a `numpy.ndarray`_.
+            where (`numpy.ndarray`_, optional):
+                Boolean array selecting the elements of ``value`` to
+                modify; the other elements are unchanged.  ``value``
+                must be a `numpy.ndarray`_.  This is equivalent to,
+                but faster than, ``value[where] = bm.turn_on(value[where],
+                flag)``.
         
         Returns:
             :obj:`int`: New bitmask value after turning on the
@@ -340,19 +403,9 @@ class BitMask:
         """
         if flag is None:
             raise ValueError('Provided bit name cannot be None.')
+        return self._apply(numpy.bitwise_or, value, self._patterns(flag)[0], inplace, where)
 
-        _flag = self._prep_flags(flag)
-
-        out = value | (1 << self.bits[_flag[0]])
-        if len(_flag) == 1:
-            return out.astype(value.dtype)
-
-        nn = len(_flag)
-        for i in range(1,nn):
-            out |= (1 << self.bits[_flag[i]])
-        return out.astype(value.dtype)
-
-    def turn_off(self, value, flag):
+    def turn_off(self, value, flag, inplace=False, where=None):
         """
         Ensure that a bit is turned off in the provided bitmask value.
 
@@ -362,6 +415,15 @@ class BitMask:
                 :attr:`max_value`; however, that is not checked.
             flag (str, array-like):
                 Bit name(s) to turn off.
+            inplace (:obj:`bool`, optional):
+                Modify ``value`` in place, instead of returning a
+                modified copy.  ``value`` must be a `numpy.ndarray`_.
+            where (`numpy.ndarray`_, optional):
+                Boolean array selecting the elements of ``value`` to
+                modify; the other elements are unchanged.  ``value``
+                must be a `numpy.ndarray`_.  This is equivalent to,
+                but faster than, ``value[where] = bm.turn_off(value[where],
+                flag)``.
         
         Returns:
             int: New bitmask value after turning off the selected bit.
@@ -373,17 +435,7 @@ class BitMask:
         """
         if flag is None:
             raise ValueError('Provided bit name cannot be None.')
-
-        _flag = self._prep_flags(flag)
-
-        out = value & ~(1 << self.bits[_flag[0]])
-        if len(_flag) == 1:
-            return out.astype(value.dtype)
-
-        nn = len(_flag)
-        for i in range(1,nn):
-            out &= ~(1 << self.bits[_flag[i]])
-        return out.astype(value.dtype)
+        return self._apply(numpy.bitwise_and, value, ~self._patterns(flag)[0], inplace, where)
 
     def consolidate(self, value, flag_set, consolidated_flag):
         """
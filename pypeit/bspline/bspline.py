@@ -12,8 +12,6 @@ Implements the bspline class
 import copy
 import warnings
 
-from IPython import embed
-
 import numpy as np
 
 from pypeit.core import basis
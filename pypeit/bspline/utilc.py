@@ -11,8 +11,6 @@ import os
 import warnings
 import ctypes
 
-from IPython import embed
-
 import numpy as np
 
 # Mimics astropy convention
@@ -169,6 +167,11 @@ def solution_arrays(nn, npoly, nord, ydata, action, ivar, upper, lower):
     beta = np.empty((nfull+bw,), dtype=float)
     upper = np.array(upper, dtype=np.int64)
     lower = np.array(lower, dtype=np.int64)
+    # NOTE: The data may be provided in single precision (see the
+    # `image_dtype` reduction parameter); the sums are always accumulated
+    # in double precision.
+    ydata = np.ascontiguousarray(ydata, dtype=float)
+    ivar = np.ascontiguousarray(ivar, dtype=float)
     # NOTE: Beware of the integer types for upper and lower. They must
     # match the argtypes above and in bspline.c explicitly!! np.int32
     # for int and np.int64 for long.
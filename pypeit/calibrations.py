@@ -9,11 +9,10 @@ import os
 from abc import ABCMeta
 from collections import Counter
 
-from IPython import embed
-
 import numpy as np
 
 from pypeit import msgs
+from pypeit.profiler import profiler
 from pypeit import alignframe
 from pypeit import flatfield
 from pypeit import edgetrace
@@ -750,7 +749,8 @@ class Calibrations(object):
 
         """
         for step in self.steps:
-            getattr(self, 'get_{:s}'.format(step))()
+            with profiler.step(step, det=self.det):
+                getattr(self, 'get_{:s}'.format(step))()
         msgs.info("Calibration complete!")
         msgs.info("#######################################################################")
 
@@ -1,20 +1,32 @@
 """
 Version checking.
 """
+import os
 
-import pkg_resources
+from packaging.version import parse
 
-requirements_file = pkg_resources.resource_filename('pypeit', 'requirements.txt')
+try:
+    from importlib.metadata import version, PackageNotFoundError
+except ImportError:
+    # Python 3.7; pkg_resources is slow to import, so only use it if we
+    # have to
+    import pkg_resources
+
+    PackageNotFoundError = pkg_resources.DistributionNotFound
+
+    def version(pkg):
+        return pkg_resources.get_distribution(pkg).version
+
+requirements_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'requirements.txt')
 install_requires = [line.strip().replace('==', '>=') for line in open(requirements_file)
                     if not line.strip().startswith('#') and line.strip() != '']
 for requirement in install_requires:
-    pkg, version = requirement.split('>=')
+    pkg, req_version = requirement.split('>=')
     try:
-        pv = pkg_resources.get_distribution(pkg).version
-    except pkg_resources.DistributionNotFound:
+        pv = version(pkg)
+    except PackageNotFoundError:
         raise ImportError("Package: {:s} not installed!".format(pkg))
     else:
-        if pkg_resources.parse_version(pv) < pkg_resources.parse_version(version):
+        if parse(pv) < parse(req_version):
             raise ImportError('Your version of {0} is incompatible with PypeIt.  '.format(pkg)
-                                + 'Please update to version >= {0}'.format(version))
-
+                                + 'Please update to version >= {0}'.format(req_version))
@@ -0,0 +1,270 @@
+"""
+Module for checkpointing the intermediate products of the reduction of
+an exposure, such that an interrupted reduction can resume from the
+last completed stage.
+
+Each (exposure, detector) pair has its own checkpoint directory.  The
+results of each completed stage are written to the directory, and a
+manifest file (``manifest.json``) records the completed stages and
+the key identifying the input data and parameters.  Checkpoints
+written with a different key are discarded.
+
+Usage::
+
+    from pypeit.checkpoint import CheckpointStore
+
+    store = CheckpointStore('Checkpoints/b27_DET01', key)
+    if store.has('global_sky'):
+        arrays, meta, sobjs = store.load('global_sky')
+    else:
+        ...
+        store.save('global_sky', arrays=dict(initial_sky=initial_sky),
+                   meta=dict(nobj=nobj), sobjs=sobjs_obj)
+
+.. include common links, assuming primary doc root is up one directory
+.. include:: ../include/links.rst
+
+"""
+import os
+import copy
+import json
+import time
+import shutil
+import hashlib
+
+import numpy as np
+
+from pypeit import msgs
+from pypeit import specobjs
+
+
+def checkpoint_key(*args):
+    """
+    Construct the key that identifies the inputs of a checkpointed
+    reduction.
+
+    Args:
+        *args:
+            Any JSON-serializable objects (e.g., file names, the
+            detector number, the parameter lines) that define the
+            reduction.
+
+    Returns:
+        :obj:`str`: The hash of the input objects.
+    """
+    txt = json.dumps(args, default=str)
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Persist the results of the stages of a reduction to disk.
+
+    The results of each stage are written as:
+
+        - ``<stage>.npz``: The `numpy.ndarray`_ objects.
+        - ``<stage>_sobjs.fits``: The :class:`~pypeit.specobjs.SpecObjs`
+          object, if any.
+        - ``<stage>_sobjs.npz``: The arrays among the internal
+          attributes of each :class:`~pypeit.specobj.SpecObj` (e.g.,
+          ``trace_spec``), which are not part of its datamodel and
+          therefore not written to the FITS file.
+
+    Scalar results (e.g., the number of objects) and the scalar
+    attributes of the objects are kept in the manifest; the latter
+    are restored from the manifest because the FITS header cards do
+    not preserve their full precision.
+    Files are written under a temporary name and then renamed, and
+    the manifest is only updated after all the files of a stage are
+    written, such that an interruption while saving a stage leaves
+    the previous stages intact.
+
+    Args:
+        path (:obj:`str`):
+            Directory for the checkpoint files.
+        key (:obj:`str`):
+            Key identifying the inputs of the reduction; see
+            :func:`checkpoint_key`.  If the existing manifest has a
+            different key, the existing checkpoints are removed.
+        overwrite (:obj:`bool`, optional):
+            Remove any existing checkpoints.
+
+    Attributes:
+        manifest (:obj:`dict`):
+            The key and the list of completed stages, in the order
+            they were saved.  Each stage is a :obj:`dict` with the
+            stage name, the time it was saved, the names of the
+            array and object files, and the scalar results.
+    """
+    manifest_file = 'manifest.json'
+    """
+    Name of the manifest file in the checkpoint directory.
+    """
+
+    def __init__(self, path, key, overwrite=False):
+        self.path = path
+        self.key = key
+        self.manifest = self._read_manifest()
+        if self.manifest is not None and (overwrite or self.manifest['key'] != key):
+            if not overwrite:
+                msgs.warn('Checkpoints in {0} are for a different reduction and '
+                          'will be removed.'.format(self.path))
+            self.clear()
+        if self.manifest is None:
+            self.manifest = dict(key=key, stages=[])
+
+    def _read_manifest(self):
+        """
+        Read the manifest file, if it exists.
+        """
+        ofile = os.path.join(self.path, self.manifest_file)
+        if not os.path.isfile(ofile):
+            return None
+        try:
+            with open(ofile, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            msgs.warn('Could not read checkpoint manifest {0}.'.format(ofile))
+            return dict(key=None, stages=[])
+
+    def _write_manifest(self):
+        """
+        Write the manifest file.
+        """
+        ofile = os.path.join(self.path, self.manifest_file)
+        with open(ofile + '.tmp', 'w') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(ofile + '.tmp', ofile)
+
+    @property
+    def stages(self):
+        """
+        The names of the completed stages, in the order they were
+        saved.
+        """
+        return [s['stage'] for s in self.manifest['stages']]
+
+    def has(self, stage):
+        """
+        Check if a stage has been completed.
+
+        Args:
+            stage (:obj:`str`):
+                The name of the stage.
+
+        Returns:
+            :obj:`bool`: True if the results of the stage are
+            available.
+        """
+        return stage in self.stages
+
+    def save(self, stage, arrays=None, meta=None, sobjs=None):
+        """
+        Save the results of a stage.
+
+        Any stage saved after this one is removed from the manifest.
+
+        Args:
+            stage (:obj:`str`):
+                The name of the stage.
+            arrays (:obj:`dict`, optional):
+                The `numpy.ndarray`_ objects to save.  Items that are
+                None are restored as None.
+            meta (:obj:`dict`, optional):
+                The JSON-serializable scalar results to save.
+            sobjs (:class:`~pypeit.specobjs.SpecObjs`, optional):
+                The objects to save.
+        """
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        # Drop this stage and any that followed it
+        if self.has(stage):
+            self.manifest['stages'] = self.manifest['stages'][:self.stages.index(stage)]
+            self._write_manifest()
+
+        entry = dict(stage=stage, time=time.strftime('%Y-%m-%dT%H:%M:%S'),
+                     meta={} if meta is None else dict(meta), none=[], arrays=None, sobjs=None,
+                     internals=None)
+        if arrays is not None:
+            entry['none'] = [k for k, v in arrays.items() if v is None]
+            entry['arrays'] = '{0}.npz'.format(stage)
+            self._write_npz(entry['arrays'], {k: v for k, v in arrays.items() if v is not None})
+        if sobjs is not None:
+            entry['sobjs'] = '{0}_sobjs.fits'.format(stage)
+            ofile = os.path.join(self.path, entry['sobjs'])
+            sobjs.write_to_fits({}, ofile + '.tmp')
+            os.replace(ofile + '.tmp', ofile)
+            # Internal attributes of each object
+            entry['internals'] = []
+            internal_arrays = {}
+            for i, sobj in enumerate(sobjs):
+                internals = {}
+                for key, value in sobj.__dict__.items():
+                    if key.startswith('_'):
+                        continue
+                    if isinstance(value, np.ndarray):
+                        if key not in sobj.datamodel.keys():
+                            internal_arrays['{0}/{1}'.format(i, key)] = value
+                    elif isinstance(value, np.generic):
+                        internals[key] = value.item()
+                    elif value is None or isinstance(value, (bool, int, float, str)):
+                        internals[key] = value
+                entry['internals'] += [internals]
+            self._write_npz('{0}_sobjs.npz'.format(stage), internal_arrays)
+
+        self.manifest['stages'] += [entry]
+        self._write_manifest()
+        msgs.info('Checkpoint saved for stage {0} in {1}'.format(stage, self.path))
+
+    def load(self, stage):
+        """
+        Load the results of a stage.
+
+        Args:
+            stage (:obj:`str`):
+                The name of the stage.
+
+        Returns:
+            :obj:`tuple`: A :obj:`dict` with the arrays, a
+            :obj:`dict` with the scalar results, and the
+            :class:`~pypeit.specobjs.SpecObjs` object (None if no
+            objects were saved).
+        """
+        if not self.has(stage):
+            msgs.error('No checkpoint for stage {0} in {1}.'.format(stage, self.path))
+        entry = self.manifest['stages'][self.stages.index(stage)]
+        arrays = dict.fromkeys(entry['none'])
+        if entry['arrays'] is not None:
+            with np.load(os.path.join(self.path, entry['arrays'])) as f:
+                arrays.update({k: f[k] for k in f.files})
+        if entry['sobjs'] is None:
+            sobjs = None
+        else:
+            sobjs = specobjs.SpecObjs.from_fitsfile(os.path.join(self.path, entry['sobjs']),
+                                                    chk_version=False)
+            for sobj, internals in zip(sobjs, entry['internals']):
+                for key, value in internals.items():
+                    setattr(sobj, key, value)
+            with np.load(os.path.join(self.path, '{0}_sobjs.npz'.format(stage))) as f:
+                for key in f.files:
+                    i, attr = key.split('/')
+                    setattr(sobjs[int(i)], attr, f[key])
+        msgs.info('Checkpoint loaded for stage {0} from {1}'.format(stage, self.path))
+        return arrays, copy.deepcopy(entry['meta']), sobjs
+
+    def _write_npz(self, filename, arrays):
+        """
+        Write a set of arrays to a file in the checkpoint directory.
+        """
+        ofile = os.path.join(self.path, filename)
+        with open(ofile + '.tmp', 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(ofile + '.tmp', ofile)
+
+    def clear(self):
+        """
+        Remove all the checkpoint files.
+        """
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        self.manifest = dict(key=self.key, stages=[])
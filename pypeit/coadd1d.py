@@ -8,8 +8,6 @@ Coadding module.
 import inspect
 import os
 
-from IPython import embed
-
 import numpy as np
 
 from astropy.io import fits
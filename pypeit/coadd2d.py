@@ -7,8 +7,6 @@ Module for performing two-dimensional coaddition of spectra.
 import os
 import copy
 
-from IPython import embed
-
 import numpy as np
 from scipy import ndimage
 from matplotlib import pyplot as plt
@@ -125,6 +123,10 @@ class CoAdd2D:
         self.show_peaks = show_peaks
         self.debug_offsets = debug_offsets
         self.debug = debug
+        self.stream = self.par['coadd2d']['stream']
+        # Decompressed images of compact spec2d files read when
+        # streaming; see read_image
+        self.image_cache = [dict() for _ in spec2d] if self.stream else None
         self.stack_dict = None
         self.pseudo_dict = None
 
@@ -134,7 +136,7 @@ class CoAdd2D:
 
 
         # Load the stack_dict
-        self.stack_dict = self.load_coadd2d_stacks(self.spec2d)
+        self.stack_dict = self.load_coadd2d_stacks(self.spec2d, stream=self.stream)
         self.pypeline = self.spectrograph.pypeline
 
         # Check that there are the same number of slits on every exposure
@@ -223,15 +225,19 @@ class CoAdd2D:
                 slits.mask, flag=slits.bitmask.exclude_for_reducing)))
             good_slits = np.where(np.invert(reduce_bpm))[0]
         else:
+            from IPython import embed
             embed(header='DEAL WITH bitmask')
 
         coadd_list = []
         for slit_idx in good_slits:
             slitord_id = self.stack_dict['slits_list'][0].slitord_id[slit_idx]
             msgs.info('Performing 2d coadd for slit: {:d}/{:d}'.format(slit_idx, self.nslits - 1))
+            # Stack the images of this slit
+            section, slit_stack = self.load_slit_stack(slit_idx)
+            # Reference traces in the coordinates of the stacked section
             ref_trace_stack = self.reference_trace_stack(slit_idx, offsets=self.offsets,
-                                                         objid=self.objid_bri)
-            thismask_stack = self.stack_dict['slitmask_stack'] == self.stack_dict['slits_list'][0].spat_id[slit_idx]
+                                                         objid=self.objid_bri)[section[0]] \
+                                    - section[1].start
             # TODO Can we get rid of this one line simply making the weights returned by parse_weights an
             # (nslit, nexp) array?
             # This one line deals with the different weighting strategies between MultiSlit echelle. Otherwise, we
@@ -240,17 +246,25 @@ class CoAdd2D:
                 rms_sn, weights = self.optimal_weights(slitord_id, self.objid_bri)
             else:
                 weights = self.use_weights
+            if isinstance(weights, np.ndarray) and weights.ndim == 2:
+                # Wavelength dependent weights
+                weights = weights[:, section[0]]
             # Perform the 2d coadd
-            coadd_dict = coadd.compute_coadd2d(ref_trace_stack, self.stack_dict['sciimg_stack'],
-                                           self.stack_dict['sciivar_stack'],
-                                           self.stack_dict['skymodel_stack'],
-                                           self.stack_dict['mask_stack'] == 0,
-                                           self.stack_dict['tilts_stack'],
-                                               thismask_stack,
-                                           self.stack_dict['waveimg_stack'],
-                                           self.wave_grid, weights=weights, interp_dspat=interp_dspat)
+            coadd_dict = coadd.compute_coadd2d(ref_trace_stack, slit_stack['sciimg_stack'],
+                                               slit_stack['sciivar_stack'],
+                                               slit_stack['skymodel_stack'],
+                                               slit_stack['mask_stack'] == 0,
+                                               slit_stack['tilts_stack'],
+                                               slit_stack['thismask_stack'],
+                                               slit_stack['waveimg_stack'],
+                                               self.wave_grid, weights=weights,
+                                               interp_dspat=interp_dspat)
             coadd_list.append(coadd_dict)
 
+        if self.stream:
+            # Release the decompressed images
+            for cache in self.image_cache:
+                cache.clear()
         return coadd_list
 
 
@@ -576,9 +590,14 @@ class CoAdd2D:
             box_radius = 3.
             indx = 0
             # Loop on the exposures
-            for waveimg, slitmask, slits in zip(self.stack_dict['waveimg_stack'],
-                                                self.stack_dict['slitmask_stack'],
-                                                self.stack_dict['slits_list']):
+            for iexp, slits in enumerate(self.stack_dict['slits_list']):
+                if self.stream:
+                    # Only hold the images of one exposure in memory
+                    waveimg = self.read_image(iexp, 'waveimg')
+                    slitmask = slits.slit_img(flexure=self.stack_dict['spat_flexure_list'][iexp])
+                else:
+                    waveimg = self.stack_dict['waveimg_stack'][iexp]
+                    slitmask = self.stack_dict['slitmask_stack'][iexp]
                 slits_left, slits_righ, _ = slits.select_edges()
                 row = np.arange(slits_left.shape[0])
                 # Loop on the slits
@@ -608,19 +627,23 @@ class CoAdd2D:
         wave_grid, wave_grid_mid, dsamp = coadd.get_wave_grid(waves, masks=gpm, **kwargs_wave)
         return wave_grid, wave_grid_mid, dsamp
 
-    def load_coadd2d_stacks(self, spec2d):
+    def load_coadd2d_stacks(self, spec2d, stream=False):
         """
         Routine to read in required images for 2d coadds given a list of spec2d files.
 
         Args:
             spec2d_files: list
                List of spec2d filenames
-            det: int
-               detector in question
+            stream (:obj:`bool`, optional):
+               Do not read the images into stacks.  Instead, only
+               the slits, detectors, and spatial flexure of each
+               exposure are read; the images are read one slit at a
+               time by :func:`load_slit_stack`.
 
         Returns:
             dict: Dictionary containing all the images and keys required
-            for perfomring 2d coadds.
+            for perfomring 2d coadds.  If ``stream`` is True, the image
+            stacks are None.
         """
 
         # Get the detector string
@@ -636,13 +659,17 @@ class CoAdd2D:
         slits_list = []
         nfiles =len(spec2d)
         detectors_list = []
+        spec2d_list = []
+        spat_flexure_list = []
+        sciimg_stack = waveimg_stack = tilts_stack = skymodel_stack = sciivar_stack \
+                = mask_stack = slitmask_stack = None
         for ifile, f in enumerate(spec2d):
             if isinstance(f, spec2dobj.Spec2DObj):
                 # If spec2d is a list of objects
                 s2dobj = f
             else:
                 # If spec2d is a list of files, option to also use spec1ds
-                s2dobj = spec2dobj.Spec2DObj.from_file(f, self.det)
+                s2dobj = spec2dobj.Spec2DObj.from_file(f, self.det, load_images=not stream)
                 spec1d_file = f.replace('spec2d', 'spec1d')
                 if os.path.isfile(spec1d_file):
                     sobjs = specobjs.SpecObjs.from_fitsfile(spec1d_file)
@@ -651,6 +678,12 @@ class CoAdd2D:
             # TODO the code should run without a spec1d file, but we need to implement that
             slits_list.append(s2dobj.slits)
             detectors_list.append(s2dobj.detector)
+            spat_flexure_list.append(s2dobj.sci_spat_flexure)
+            if stream:
+                # Keep the object (without images if read from a file)
+                # to read the images of each slit later
+                spec2d_list.append(s2dobj)
+                continue
             if ifile == 0:
                 sciimg_stack = np.zeros((nfiles,) + s2dobj.sciimg.shape, dtype=float)
                 waveimg_stack = np.zeros_like(sciimg_stack, dtype=float)
@@ -678,11 +711,131 @@ class CoAdd2D:
                     sciimg_stack=sciimg_stack, sciivar_stack=sciivar_stack,
                     skymodel_stack=skymodel_stack, mask_stack=mask_stack,
                     tilts_stack=tilts_stack, waveimg_stack=waveimg_stack,
+                    spec2d_list=spec2d_list, spat_flexure_list=spat_flexure_list,
                     redux_path=redux_path,
                     detectors=detectors_list,
                     spectrograph=self.spectrograph.name,
                     pypeline=self.spectrograph.pypeline)
 
+    def read_image(self, iexp, key, section=None):
+        """
+        Read an image, or a section of it, for one exposure when
+        streaming the images; see :func:`load_coadd2d_stacks`.
+
+        Tile-compressed images in compact spec2d files are decompressed
+        only once and kept in :attr:`image_cache` until the end of
+        :func:`coadd`; see :func:`~pypeit.spec2dobj.read_section`.
+
+        Args:
+            iexp (:obj:`int`):
+                Index of the exposure.
+            key (:obj:`str`):
+                The :class:`~pypeit.spec2dobj.Spec2DObj` image to read
+                (e.g., ``'sciimg'``).
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices selecting the spectral and spatial
+                section of the image.  If None, the full image is read.
+
+        Returns:
+            `numpy.ndarray`_: The image section.
+        """
+        s2dobj = self.stack_dict['spec2d_list'][iexp]
+        if key in ['tilts', 'waveimg'] and s2dobj[key] is None and s2dobj.wavetilts is not None:
+            # Regenerate the section from the stored fits
+            return s2dobj.build_tilts(section=section) if key == 'tilts' \
+                        else s2dobj.build_waveimg(section=section)
+        if s2dobj[key] is None:
+            # Read only the section from the file
+            return spec2dobj.read_section(self.spec2d[iexp], self.det, key, section=section,
+                                          cache=self.image_cache[iexp])
+        return s2dobj[key] if section is None else s2dobj[key][section]
+
+    def slit_section(self, spat_id):
+        """
+        Determine the section of the images that includes all the
+        pixels of a slit in all the exposures.
+
+        The section is the union of the spectral range and the
+        (padded and flexure-shifted) spatial extent of the slit in
+        each exposure; see
+        :func:`~pypeit.slittrace.SlitTraceSet.slit_img`.
+
+        Args:
+            spat_id (:obj:`int`):
+                The spatial ID of the slit.
+
+        Returns:
+            :obj:`tuple`: A 2-tuple of slices selecting the spectral
+            and spatial section of the images.
+        """
+        nspec, nspat = self.nspec, self.stack_dict['slits_list'][0].nspat
+        spec_lo, spec_hi, spat_lo, spat_hi = nspec, 0, nspat, 0
+        for slits, flexure in zip(self.stack_dict['slits_list'],
+                                  self.stack_dict['spat_flexure_list']):
+            indx = slits.spat_id == spat_id
+            if not np.any(indx):
+                continue
+            left, right, _ = slits.select_edges(flexure=flexure)
+            pad = slits.pad if isinstance(slits.pad, tuple) else (slits.pad, slits.pad)
+            # Pixels on the slit are *between* the edges and the
+            # spectral limits
+            spec_lo = min(spec_lo, int(np.floor(np.amin(slits.specmin[indx]))))
+            spec_hi = max(spec_hi, int(np.ceil(np.amax(slits.specmax[indx]))))
+            spat_lo = min(spat_lo, int(np.floor(np.amin(left[:,indx]) - pad[0])))
+            spat_hi = max(spat_hi, int(np.ceil(np.amax(right[:,indx]) + pad[1])))
+        spec_lo, spat_lo = max(spec_lo, 0), max(spat_lo, 0)
+        spec_hi, spat_hi = max(min(spec_hi, nspec), spec_lo), max(min(spat_hi, nspat), spat_lo)
+        return slice(spec_lo, spec_hi), slice(spat_lo, spat_hi)
+
+    def load_slit_stack(self, slit_idx):
+        """
+        Construct the image stacks used to coadd one slit.
+
+        If the images are streamed (see :func:`load_coadd2d_stacks`),
+        only the section of the images that covers the slit in all
+        exposures (see :func:`slit_section`) is read from each
+        exposure.  Otherwise, the full image stacks are returned.
+
+        Args:
+            slit_idx (:obj:`int`):
+                The 0-based index of the slit.
+
+        Returns:
+            :obj:`tuple`: A 2-tuple of slices with the spectral and
+            spatial section of the images in the stacks, and a
+            dictionary with the stacks of the science, inverse
+            variance, sky, mask, tilts, and wavelength images and the
+            boolean stack selecting the pixels on the slit
+            (``thismask_stack``).  Each stack has shape ``(nexp,
+            nspec_section, nspat_section)``.
+        """
+        spat_id = self.stack_dict['slits_list'][0].spat_id[slit_idx]
+        if not self.stream:
+            section = tuple([slice(0, n) for n in self.stack_dict['sciimg_stack'].shape[1:]])
+            return section, dict(sciimg_stack=self.stack_dict['sciimg_stack'],
+                                 sciivar_stack=self.stack_dict['sciivar_stack'],
+                                 skymodel_stack=self.stack_dict['skymodel_stack'],
+                                 mask_stack=self.stack_dict['mask_stack'],
+                                 tilts_stack=self.stack_dict['tilts_stack'],
+                                 waveimg_stack=self.stack_dict['waveimg_stack'],
+                                 thismask_stack=self.stack_dict['slitmask_stack'] == spat_id)
+
+        section = self.slit_section(spat_id)
+        nexp = len(self.stack_dict['slits_list'])
+        shape = (nexp, section[0].stop - section[0].start, section[1].stop - section[1].start)
+        slit_stack = {}
+        for key, ext in zip(['sciimg_stack', 'sciivar_stack', 'skymodel_stack', 'mask_stack',
+                             'tilts_stack', 'waveimg_stack'],
+                            ['sciimg', 'ivarmodel', 'skymodel', 'bpmmask', 'tilts', 'waveimg']):
+            slit_stack[key] = np.zeros(shape, dtype=float)
+            for iexp in range(nexp):
+                slit_stack[key][iexp] = self.read_image(iexp, ext, section=section)
+        slit_stack['thismask_stack'] = np.zeros(shape, dtype=bool)
+        for iexp, slits in enumerate(self.stack_dict['slits_list']):
+            slit_stack['thismask_stack'][iexp] = slits.slit_img(
+                    flexure=self.stack_dict['spat_flexure_list'][iexp], section=section) == spat_id
+        return section, slit_stack
+
 # Multislit can coadd with:
 # 1) input offsets or if offsets is None, it will find the brightest trace and compute them
 # 2) specified weights, or if weights is None and auto_weights=True, it will compute weights using the brightest object
@@ -745,24 +898,27 @@ class MultiSlitCoAdd2D(CoAdd2D):
         objid_bri, slitidx_bri, spatid_bri, snr_bar_bri = self.get_brightest_obj(self.stack_dict['specobjs_list'],
                                                                     self.spat_ids)
         msgs.info('Determining offsets using brightest object on slit: {:d} with avg SNR={:5.2f}'.format(spatid_bri,np.mean(snr_bar_bri)))
-        thismask_stack = self.stack_dict['slitmask_stack'] == spatid_bri
+        section, slit_stack = self.load_slit_stack(slitidx_bri)
+        thismask_stack = slit_stack['thismask_stack']
         trace_stack_bri = np.zeros((self.nspec, self.nexp))
         # TODO Need to think abbout whether we have multiple tslits_dict for each exposure or a single one
         for iexp in range(self.nexp):
             trace_stack_bri[:,iexp] = self.stack_dict['slits_list'][iexp].center[:,slitidx_bri]
 #            trace_stack_bri[:,iexp] = (self.stack_dict['tslits_dict_list'][iexp]['slit_left'][:,slitid_bri] +
 #                                       self.stack_dict['tslits_dict_list'][iexp]['slit_righ'][:,slitid_bri])/2.0
+        # Put the traces in the coordinates of the stacked section
+        trace_stack_bri = trace_stack_bri[section[0]] - section[1].start
         # Determine the wavelength grid that we will use for the current slit/order
-        wave_bins = coadd.get_wave_bins(thismask_stack, self.stack_dict['waveimg_stack'], self.wave_grid)
+        wave_bins = coadd.get_wave_bins(thismask_stack, slit_stack['waveimg_stack'], self.wave_grid)
         dspat_bins, dspat_stack = coadd.get_spat_bins(thismask_stack, trace_stack_bri)
 
-        sci_list = [self.stack_dict['sciimg_stack'] - self.stack_dict['skymodel_stack']]
+        sci_list = [slit_stack['sciimg_stack'] - slit_stack['skymodel_stack']]
         var_list = []
 
         msgs.info('Rebinning Images')
         sci_list_rebin, var_list_rebin, norm_rebin_stack, nsmp_rebin_stack = coadd.rebin2d(
-            wave_bins, dspat_bins, self.stack_dict['waveimg_stack'], dspat_stack, thismask_stack,
-            (self.stack_dict['mask_stack'] == 0), sci_list, var_list)
+            wave_bins, dspat_bins, slit_stack['waveimg_stack'], dspat_stack, thismask_stack,
+            (slit_stack['mask_stack'] == 0), sci_list, var_list)
         thismask = np.ones_like(sci_list_rebin[0][0,:,:],dtype=bool)
         nspec_pseudo, nspat_pseudo = thismask.shape
         slit_left = np.full(nspec_pseudo, 0.0)
@@ -7,7 +7,6 @@ Module implements a set of basis functions for fitting.
 .. include:: ../include/links.rst
 
 """
-from IPython import embed
 
 import numpy as np
 from scipy import special
@@ -9,8 +9,6 @@ Coadding module.
 import os
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 import scipy
 
@@ -1306,10 +1304,99 @@ def scale_spec(wave, flux, ivar, sn, wave_ref, flux_ref, ivar_ref, mask=None, ma
     return flux_scale, ivar_scale, scale, method_used
 
 
+def histogram_bin_indices(sample, bins):
+    """
+    Determine the (flattened) histogram bin occupied by each sample.
+
+    The binning follows the conventions of `numpy.histogramdd`_: all
+    bins are half-open except the last bin along each dimension, which
+    includes its right edge, and samples that fall outside the bin
+    edges are excluded. The bin membership is computed only once, such
+    that any number of weighted sums can subsequently be accumulated
+    with :func:`histogram_sums` without repeatedly binning the data.
+
+    Args:
+        sample (`numpy.ndarray`_, :obj:`list`):
+            The coordinates of the samples to bin. For a 1D histogram,
+            this can be a single array with shape :math:`(N,)`. For an
+            N-dimensional histogram, this should be a list of D arrays
+            with shape :math:`(N,)` or a single array with shape
+            :math:`(N,D)`, as for `numpy.histogramdd`_.
+        bins (`numpy.ndarray`_, :obj:`list`):
+            The monotonically increasing bin edges. For a 1D
+            histogram, this is a single array; otherwise it must be a
+            list with the bin edges for each of the D dimensions.
+
+    Returns:
+        `numpy.ndarray`_: Integer array with shape :math:`(N,)` with the
+        index of the bin in the flattened histogram array (C-ordering)
+        occupied by each sample. Samples that do not fall in any bin
+        have an index of -1.
+    """
+    if isinstance(bins, np.ndarray) and bins.ndim == 1:
+        # 1D histogram
+        sample = [np.asarray(sample).ravel()]
+        bins = [bins]
+    elif isinstance(sample, np.ndarray) and sample.ndim == 2:
+        sample = [sample[:,i] for i in range(sample.shape[1])]
+    if len(sample) != len(bins):
+        msgs.error('Number of sample dimensions and bin edge arrays must match.')
+
+    indx = np.zeros(sample[0].size, dtype=int)
+    good = np.ones(sample[0].size, dtype=bool)
+    for coo, edges in zip(sample, bins):
+        nbin = edges.size - 1
+        _indx = np.searchsorted(edges, coo, side='right') - 1
+        # Values on the last edge are included in the last bin
+        _indx[coo == edges[-1]] = nbin - 1
+        good &= (_indx >= 0) & (_indx < nbin)
+        indx = indx*nbin + _indx
+    indx[np.logical_not(good)] = -1
+    return indx
+
+
+def histogram_sums(indx, shape, weights=None):
+    """
+    Accumulate one or more weighted histograms given precomputed bin
+    indices.
+
+    This is the companion to :func:`histogram_bin_indices`. All sums are
+    computed with `numpy.bincount`_, which requires a single pass through
+    the data for each set of weights.
+
+    Args:
+        indx (`numpy.ndarray`_):
+            Flattened bin index for each sample, as returned by
+            :func:`histogram_bin_indices`. Samples with negative indices
+            are ignored.
+        shape (:obj:`int`, :obj:`tuple`):
+            The shape of the output histogram, i.e. the number of bins
+            along each dimension.
+        weights (`numpy.ndarray`_, :obj:`list`, optional):
+            The weights for each sample. Can be a single array or a list
+            of arrays, where each element yields a separate histogram.
+            If None, or if any element in the list is None, the
+            histogram simply counts the number of samples in each bin.
+
+    Returns:
+        `numpy.ndarray`_, :obj:`list`: The histogram(s) with the
+        provided shape. If ``weights`` is a list, the returned object is
+        a list of histograms, one per element of ``weights``.
+    """
+    _shape = (shape,) if isinstance(shape, (int, np.integer)) else tuple(shape)
+    nbins = int(np.prod(_shape))
+    gpm = indx >= 0
+    _indx = indx[gpm]
+    _weights = weights if isinstance(weights, list) else [weights]
+    hist = [np.bincount(_indx, weights=None if w is None else np.asarray(w).ravel()[gpm],
+                        minlength=nbins).astype(float).reshape(_shape) for w in _weights]
+    return hist if isinstance(weights, list) else hist[0]
+
+
 def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights, min_weight=1e-8):
     '''
     Compute a stacked spectrum from a set of exposures on the specified wave_grid with proper treatment of
-    weights and masking. This code uses np.histogram to combine the data using NGP and does not perform any
+    weights and masking. This code uses a histogram to combine the data using NGP and does not perform any
     interpolations and thus does not correlate errors. It uses wave_grid to determine the set of wavelength bins that
     the data are averaged on. The final spectrum will be on an ouptut wavelength grid which is not the same as wave_grid.
     The ouput wavelength grid is the weighted average of the individual wavelengths used for each exposure that fell into
@@ -1373,24 +1460,26 @@ def compute_stack(wave_grid, waves, fluxes, ivars, masks, weights, min_weight=1e
     vars_flat = utils.inverse(ivars_flat)
     weights_flat = weights[ubermask].flatten()
 
-    # Counts how many pixels in each wavelength bin
-    nused, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False)
-
-    # Calculate the summed weights for the denominator
-    weights_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=weights_flat)
-
-    # Calculate the stacked wavelength
+    # Determine the wavelength bin of each pixel once, and then accumulate
+    # all the weighted sums in a single pass each.
+    bin_indx = histogram_bin_indices(waves_flat, wave_grid)
+    # nused counts how many pixels in each wavelength bin, weights_total
+    # gives the summed weights for the denominator
     ## TODO: JFH Made the minimum weight 1e-8 from 1e-4. I'm not sure what this min_weight is necessary for, or
     # is achieving FW.
-    wave_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=waves_flat*weights_flat)
+    nused, weights_total, wave_stack_total, flux_stack_total, var_stack_total \
+            = histogram_sums(bin_indx, wave_grid.size-1,
+                             weights=[None, weights_flat, waves_flat*weights_flat,
+                                      fluxes_flat*weights_flat, vars_flat*weights_flat**2])
+    nused = nused.astype(int)
+
+    # Calculate the stacked wavelength
     wave_stack = (weights_total > min_weight)*wave_stack_total/(weights_total+(weights_total==0.))
 
     # Calculate the stacked flux
-    flux_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=fluxes_flat*weights_flat)
     flux_stack = (weights_total > min_weight)*flux_stack_total/(weights_total+(weights_total==0.))
 
     # Calculate the stacked ivar
-    var_stack_total, wave_edges = np.histogram(waves_flat,bins=wave_grid,density=False,weights=vars_flat*weights_flat**2)
     var_stack = (weights_total > min_weight)*var_stack_total/(weights_total+(weights_total==0.))**2
     ivar_stack = utils.inverse(var_stack)
 
@@ -3002,8 +3091,9 @@ def compute_coadd2d(ref_trace_stack, sciimg_stack, sciivar_stack, skymodel_stack
 def rebin2d(spec_bins, spat_bins, waveimg_stack, spatimg_stack, thismask_stack, inmask_stack, sci_list, var_list):
     """
     Rebin a set of images and propagate variance onto a new spectral and spatial grid. This routine effectively
-    "recitifies" images using np.histogram2d which is extremely fast and effectiveluy performs
-    nearest grid point interpolation.
+    "recitifies" images using a 2D histogram which is extremely fast and effectiveluy performs
+    nearest grid point interpolation. The bin of each pixel is computed only once per image (see
+    :func:`histogram_bin_indices`) and shared by all the rebinned images.
 
     Args:
         spec_bins: float ndarray, shape = (nspec_rebin)
@@ -3068,37 +3158,31 @@ def rebin2d(spec_bins, spat_bins, waveimg_stack, spatimg_stack, thismask_stack,
     for jj in range(len(var_list)):
         var_list_out.append(np.zeros(shape_out))
 
+    bins = [spec_bins, spat_bins]
     for img in range(nimgs):
-        # This fist image is purely for bookeeping purposes to determine the number of times each pixel
-        # could have been sampled
+        # Determine the bin of every pixel on the slit once. The first
+        # image is purely for bookeeping purposes to determine the number
+        # of times each pixel could have been sampled
         thismask = thismask_stack[img, :, :]
-        spec_rebin_this = waveimg_stack[img, :, :][thismask]
-        spat_rebin_this = spatimg_stack[img, :, :][thismask]
-
-        nsmp_rebin_stack[img, :, :], spec_edges, spat_edges = np.histogram2d(spec_rebin_this, spat_rebin_this,
-                                                               bins=[spec_bins, spat_bins], density=False)
-
-        finmask = thismask & inmask_stack[img,:,:]
-        spec_rebin = waveimg_stack[img, :, :][finmask]
-        spat_rebin = spatimg_stack[img, :, :][finmask]
-        norm_img, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                          bins=[spec_bins, spat_bins], density=False)
+        indx = histogram_bin_indices([waveimg_stack[img, :, :][thismask],
+                                      spatimg_stack[img, :, :][thismask]], bins)
+        nsmp_rebin_stack[img, :, :] = histogram_sums(indx, shape_out[1:])
+
+        # Only use the unmasked pixels for the remaining images
+        indx[np.logical_not(inmask_stack[img,:,:][thismask])] = -1
+        rebin = histogram_sums(indx, shape_out[1:],
+                               weights=[None] + [sci[img,:,:][thismask] for sci in sci_list]
+                                        + [var[img,:,:][thismask] for var in var_list])
+        norm_img = rebin[0]
         norm_rebin_stack[img, :, :] = norm_img
 
         # Rebin the science images
-        for indx, sci in enumerate(sci_list):
-            weigh_sci, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                               bins=[spec_bins, spat_bins], density=False,
-                                                               weights=sci[img,:,:][finmask])
-            sci_list_out[indx][img, :, :] = (norm_img > 0.0) * weigh_sci/(norm_img + (norm_img == 0.0))
+        for ii, weigh_sci in enumerate(rebin[1:len(sci_list)+1]):
+            sci_list_out[ii][img, :, :] = (norm_img > 0.0) * weigh_sci/(norm_img + (norm_img == 0.0))
 
         # Rebin the variance images, note the norm_img**2 factor for correct error propagation
-        for indx, var in enumerate(var_list):
-            weigh_var, spec_edges, spat_edges = np.histogram2d(spec_rebin, spat_rebin,
-                                                               bins=[spec_bins, spat_bins], density=False,
-                                                               weights=var[img, :, :][finmask])
-            var_list_out[indx][img, :, :] = (norm_img > 0.0)*weigh_var/(norm_img + (norm_img == 0.0))**2
-
+        for ii, weigh_var in enumerate(rebin[len(sci_list)+1:]):
+            var_list_out[ii][img, :, :] = (norm_img > 0.0)*weigh_var/(norm_img + (norm_img == 0.0))**2
 
     return sci_list_out, var_list_out, norm_rebin_stack.astype(int), nsmp_rebin_stack.astype(int)
 
@@ -3253,6 +3337,7 @@ def sync_pair(spec1_file, spec2_file, det, sync_dict=None, sync_toler=3, debug=F
             done2[idx] = True
 
         else:
+            from IPython import embed
             embed(header="70 Should not get here")
         # Update
         update_sync_dict(sync_dict, indx1, files, names)
@@ -7,8 +7,6 @@ from astropy import stats
 from pypeit import msgs
 from pypeit import utils
 
-from IPython import embed
-
 
 def masked_weightmean(a, maskvalue):
     """
@@ -13,6 +13,7 @@ from astropy.io import fits
 import scipy.optimize as opt
 from scipy.interpolate import interp1d
 import numpy as np
+import numba as nb
 
 from pypeit import msgs
 from pypeit.core.procimg import grow_masked
@@ -297,16 +298,9 @@ def make_whitelight_fromref(all_ra, all_dec, all_wave, all_sci, all_wghts, all_i
         where N and M are the spatial dimensions of the combined white light images. The third is
         the WCS of the white light image.
     """
-    refhdu = fits.open(ref_filename)
-    reference_image = refhdu[0].data.T[:, :, 0]
-    refwcs = wcs.WCS(refhdu[0].header)
+    # Load the reference image and generate the white light WCS
+    reference_image, wlwcs = load_reference_whitelight(ref_filename, np.min(all_wave), np.max(all_wave))
     numra, numdec = reference_image.shape
-    # Generate coordinate system (i.e. update wavelength range to include all values)
-    coord_min = refwcs.wcs.crval
-    coord_dlt = refwcs.wcs.cdelt
-    coord_min[2] = np.min(all_wave)
-    coord_dlt[2] = np.max(all_wave) - np.min(all_wave)  # For white light, we want to bin all wavelength pixels
-    wlwcs = generate_masterWCS(coord_min, coord_dlt)
 
     # Generate white light images
     whitelight_imgs, _, _ = make_whitelight(all_ra, all_dec, all_wave, all_sci, all_wghts, all_idx, dspat,
@@ -315,6 +309,35 @@ def make_whitelight_fromref(all_ra, all_dec, all_wave, all_sci, all_wghts, all_i
     return reference_image, whitelight_imgs, wlwcs
 
 
+def load_reference_whitelight(ref_filename, wave_min, wave_max):
+    """ Load a reference white light image and generate the WCS of
+    the white light images that will be registered to it.
+
+    Args:
+        ref_filename (str):
+            A fits filename of a reference image to be used when generating white light
+            images. Note, the fits file must have a valid 3D WCS.
+        wave_min (float):
+            Minimum wavelength of all pixels to be included in the white light images
+        wave_max (float):
+            Maximum wavelength of all pixels to be included in the white light images
+
+    Returns:
+        tuple : A 2D `numpy.ndarray`_ with the reference image loaded from
+        ref_filename, and the `astropy.wcs.wcs.WCS`_ of the white light images.
+    """
+    refhdu = fits.open(ref_filename)
+    reference_image = refhdu[0].data.T[:, :, 0]
+    refwcs = wcs.WCS(refhdu[0].header)
+    # Generate coordinate system (i.e. update wavelength range to include all values)
+    coord_min = refwcs.wcs.crval
+    coord_dlt = refwcs.wcs.cdelt
+    coord_min[2] = wave_min
+    coord_dlt[2] = wave_max - wave_min  # For white light, we want to bin all wavelength pixels
+    wlwcs = generate_masterWCS(coord_min, coord_dlt)
+    return reference_image, wlwcs
+
+
 def make_whitelight(all_ra, all_dec, all_wave, all_sci, all_wghts, all_idx, dspat,
                     all_ivar=None, whitelightWCS=None, numra=None, numdec=None):
     """ Generate a whitelight image of every input frame
@@ -359,58 +382,157 @@ def make_whitelight(all_ra, all_dec, all_wave, all_sci, all_wghts, all_idx, dspa
 
     if whitelightWCS is None:
         # Generate a master 2D WCS to register all frames
-        coord_min = [np.min(all_ra), np.min(all_dec), np.min(all_wave)]
-        coord_dlt = [dspat, dspat, np.max(all_wave) - np.min(all_wave)]
-        whitelightWCS = generate_masterWCS(coord_min, coord_dlt)
-
-        # Generate coordinates
         cosdec = np.cos(np.mean(all_dec) * np.pi / 180.0)
-        numra = int((np.max(all_ra) - np.min(all_ra)) * cosdec / dspat)
-        numdec = int((np.max(all_dec) - np.min(all_dec)) / dspat)
+        whitelightWCS, numra, numdec = generate_whitelightWCS(np.min(all_ra), np.max(all_ra), np.min(all_dec),
+                                                              np.max(all_dec), np.min(all_wave),
+                                                              np.max(all_wave), dspat, cosdec)
     else:
         # If a WCS is supplied, the numra and numdec must be specified
         if (numra is None) or (numdec is None):
             msgs.error("A WCS has been supplied to make_whitelight." + msgs.newline() +
                        "numra and numdec must also be specified")
 
-    xbins = np.arange(1 + numra) - 1
-    ybins = np.arange(1 + numdec) - 1
-    spec_bins = np.arange(2) - 1
-    bins = (xbins, ybins, spec_bins)
-
     whitelight_Imgs = np.zeros((numra, numdec, numfiles))
     whitelight_ivar = np.zeros((numra, numdec, numfiles))
-    trim = 3
-    #from IPython import embed
-    #embed()
     for ff in range(numfiles):
         msgs.info("Generating white light image of frame {0:d}/{1:d}".format(ff + 1, numfiles))
         ww = (all_idx == ff)
         # Make the cube
-        pix_coord = whitelightWCS.wcs_world2pix(np.vstack((all_ra[ww], all_dec[ww], all_wave[ww] * 1.0E-10)).T, 0)
-        wlcube, edges = np.histogramdd(pix_coord, bins=bins, weights=all_sci[ww] * all_wghts[ww])
-        norm, edges = np.histogramdd(pix_coord, bins=bins, weights=all_wghts[ww])
-        nrmCube = (norm > 0) / (norm + (norm == 0))
-        whtlght = (wlcube * nrmCube)[:, :, 0]
-        # Create a mask of good pixels (trim the edges)
-        gpm = grow_masked(whtlght == 0, trim, 1) == 0  # A good pixel = 1
-        whtlght *= gpm
-        # Set the masked regions to the minimum value
-        minval = np.min(whtlght[gpm == 1])
-        whtlght[gpm == 0] = minval
+        wlsums = accumulate_whitelight(all_ra[ww], all_dec[ww], all_wave[ww], all_sci[ww], all_wghts[ww],
+                                       whitelightWCS, numra, numdec,
+                                       ivar=None if all_ivar is None else all_ivar[ww])
         # Store the white light image
-        whitelight_Imgs[:, :, ff] = whtlght.copy()
+        whitelight_Imgs[:, :, ff], ivar_img = finalize_whitelight(*wlsums)
         # Now operate on the inverse variance image
         if all_ivar is not None:
-            ivar_img, _ = np.histogramdd(pix_coord, bins=bins, weights=all_ivar[ww])
-            ivar_img = ivar_img[:, :, 0]
-            ivar_img *= gpm
-            minval = np.min(ivar_img[gpm == 1])
-            ivar_img[gpm == 0] = minval
-            whitelight_ivar[:, :, ff] = ivar_img.copy()
+            whitelight_ivar[:, :, ff] = ivar_img
     return whitelight_Imgs, whitelight_ivar, whitelightWCS
 
 
+def generate_whitelightWCS(ra_min, ra_max, dec_min, dec_max, wave_min, wave_max, dspat, cosdec):
+    """ Generate the WCS and size of a white light image that covers
+    all input pixels
+
+    Args:
+        ra_min (float):
+            Minimum RA of all pixels
+        ra_max (float):
+            Maximum RA of all pixels
+        dec_min (float):
+            Minimum DEC of all pixels
+        dec_max (float):
+            Maximum DEC of all pixels
+        wave_min (float):
+            Minimum wavelength of all pixels
+        wave_max (float):
+            Maximum wavelength of all pixels
+        dspat (float):
+            The size of each spaxel on the sky (in degrees)
+        cosdec (float):
+            Cosine of the mean declination of all pixels
+
+    Returns:
+        tuple : The `astropy.wcs.wcs.WCS`_ of the white light image, and
+        the number of RA and DEC spaxels.
+    """
+    coord_min = [ra_min, dec_min, wave_min]
+    coord_dlt = [dspat, dspat, wave_max - wave_min]
+    whitelightWCS = generate_masterWCS(coord_min, coord_dlt)
+    numra = int((ra_max - ra_min) * cosdec / dspat)
+    numdec = int((dec_max - dec_min) / dspat)
+    return whitelightWCS, numra, numdec
+
+
+def accumulate_whitelight(ra, dec, wave, sci, wghts, whitelightWCS, numra, numdec, ivar=None,
+                          wlsums=None):
+    """ Accumulate the weighted sums required to build a white light image
+
+    The sums can be accumulated over an arbitrary number of calls (e.g.
+    one per input spec2d file), such that a white light image of many
+    frames can be built without holding all the pixels in memory. Use
+    :func:`finalize_whitelight` to construct the white light image from
+    the accumulated sums.
+
+    Args:
+        ra (`numpy.ndarray`_):
+            1D flattened array containing the RA values of each pixel
+        dec (`numpy.ndarray`_):
+            1D flattened array containing the DEC values of each pixel
+        wave (`numpy.ndarray`_):
+            1D flattened array containing the wavelength values of each pixel
+        sci (`numpy.ndarray`_):
+            1D flattened array containing the counts of each pixel
+        wghts (`numpy.ndarray`_):
+            1D flattened array containing the weights attributed to each pixel
+        whitelightWCS (`astropy.wcs.wcs.WCS`_):
+            The WCS of the white light image.
+        numra (int):
+            Number of RA spaxels in the white light image
+        numdec (int):
+            Number of DEC spaxels in the white light image
+        ivar (`numpy.ndarray`_, optional):
+            Inverse variance of each pixel. If provided, the inverse variance
+            is also accumulated.
+        wlsums (tuple, optional):
+            The sums returned by a previous call to this function. The sums
+            of the provided pixels are added to these arrays in place. If
+            None, new arrays are instantiated.
+
+    Returns:
+        tuple : Three 2D arrays of shape [numra, numdec] with the
+        weighted sum of the counts, the sum of the weights, and the sum
+        of the inverse variance (None if ivar is not provided).
+    """
+    if wlsums is None:
+        wlsums = (np.zeros((numra, numdec)), np.zeros((numra, numdec)),
+                  None if ivar is None else np.zeros((numra, numdec)))
+    xbins = np.arange(1 + numra) - 1
+    ybins = np.arange(1 + numdec) - 1
+    spec_bins = np.arange(2) - 1
+    bins = (xbins, ybins, spec_bins)
+    pix_coord = whitelightWCS.wcs_world2pix(np.vstack((ra, dec, wave * 1.0E-10)).T, 0)
+    indx = coadd.histogram_bin_indices(pix_coord, bins)
+    _weights = [sci * wghts, wghts] + ([] if ivar is None else [ivar])
+    for _sum, _hist in zip(wlsums, coadd.histogram_sums(indx, (numra, numdec), weights=_weights)):
+        _sum += _hist
+    return wlsums
+
+
+def finalize_whitelight(wlsum, norm, ivarsum=None, trim=3):
+    """ Construct a white light image from the sums accumulated by
+    :func:`accumulate_whitelight`
+
+    Args:
+        wlsum (`numpy.ndarray`_):
+            The weighted sum of the counts in each spaxel
+        norm (`numpy.ndarray`_):
+            The sum of the weights in each spaxel
+        ivarsum (`numpy.ndarray`_, optional):
+            The sum of the inverse variance in each spaxel
+        trim (int, optional):
+            Number of pixels to grow the masked regions (i.e. trim the edges)
+
+    Returns:
+        tuple : The 2D white light image and the corresponding inverse
+        variance image. The latter is None if ivarsum is None.
+    """
+    nrmCube = (norm > 0) / (norm + (norm == 0))
+    whtlght = wlsum * nrmCube
+    # Create a mask of good pixels (trim the edges)
+    gpm = grow_masked(whtlght == 0, trim, 1) == 0  # A good pixel = 1
+    whtlght *= gpm
+    # Set the masked regions to the minimum value
+    minval = np.min(whtlght[gpm == 1])
+    whtlght[gpm == 0] = minval
+    if ivarsum is None:
+        return whtlght, None
+    # Now operate on the inverse variance image
+    ivar_img = ivarsum * gpm
+    minval = np.min(ivar_img[gpm == 1])
+    ivar_img[gpm == 0] = minval
+    return whtlght, ivar_img
+
+
 def generate_masterWCS(crval, cdelt, equinox=2000.0, name="Instrument Unknown"):
     """
     Generate a WCS that will cover all input spec2D files
@@ -488,39 +610,132 @@ def compute_weights(all_ra, all_dec, all_wave, all_sci, all_ivar, all_idx, white
     # Determine number of files
     numfiles = np.unique(all_idx).size
 
+    # Setup the WCS and the bins used to extract the spectrum of the brightest object
+    whitelightWCS, bins = get_weights_wcs(whitelight_img, np.min(all_ra), np.min(all_dec), np.min(all_wave),
+                                          np.max(all_wave), dspat, dwv)
+
+    # Extract the spectrum of the highest S/N object
+    numwav = bins[2].size - 1
+    flux_stack = np.zeros((numwav, numfiles))
+    ivar_stack = np.zeros((numwav, numfiles))
+    for ff in range(numfiles):
+        msgs.info("Extracting spectrum of highest S/N detection from frame {0:d}/{1:d}".format(ff + 1, numfiles))
+        ww = (all_idx == ff)
+        flux_stack[:, ff], ivar_stack[:, ff] \
+                = extract_weights_spectrum(all_ra[ww], all_dec[ww], all_wave[ww], all_sci[ww], all_ivar[ww],
+                                           whitelightWCS, bins)
+
+    wave_spec, weights = spectral_weights(whitelightWCS, flux_stack, ivar_stack,
+                                          sn_smooth_npix=sn_smooth_npix, relative_weights=relative_weights)
+
+    # Because we pass back a weights array, we need to interpolate to assign each detector pixel a weight
+    all_wghts = np.ones(all_idx.size)
+    for ff in range(numfiles):
+        ww = (all_idx == ff)
+        all_wghts[ww] = interp_weights(wave_spec, weights[:, ff], all_wave[ww])
+
+    msgs.info("Optimal weighting complete")
+    return all_wghts
+
+
+def get_weights_wcs(whitelight_img, ra_min, dec_min, wave_min, wave_max, dspat, dwv):
+    """ Generate the WCS and bins used to extract the spectrum of the
+    highest S/N object in the field, which is used to calculate the
+    relative weights of the input frames
+
+    Args:
+        whitelight_img (`numpy.ndarray`_):
+            A 2D array containing a whitelight image of all input frames.
+        ra_min (float):
+            Minimum RA of all pixels
+        dec_min (float):
+            Minimum DEC of all pixels
+        wave_min (float):
+            Minimum wavelength of all pixels
+        wave_max (float):
+            Maximum wavelength of all pixels
+        dspat (float):
+            The size of each spaxel on the sky (in degrees)
+        dwv (float):
+            The size of each wavelength pixel (in Angstroms)
+
+    Returns:
+        tuple : The `astropy.wcs.wcs.WCS`_ and a tuple with the three arrays
+        of bin edges to be used with this WCS.
+    """
     # Find the location of the object with the highest S/N in the combined white light image
     idx_max = np.unravel_index(np.argmax(whitelight_img), whitelight_img.shape)
     msgs.info("Highest S/N object located at spaxel (x, y) = {0:d}, {1:d}".format(idx_max[0], idx_max[1]))
 
     # Generate a master 2D WCS to register all frames
-    coord_min = [np.min(all_ra), np.min(all_dec), np.min(all_wave)]
+    coord_min = [ra_min, dec_min, wave_min]
     coord_dlt = [dspat, dspat, dwv]
     whitelightWCS = generate_masterWCS(coord_min, coord_dlt)
     # Make the bin edges to be at +/- 1 pixels around the maximum (i.e. summing 9 pixels total)
-    numwav = int((np.max(all_wave) - np.min(all_wave)) / dwv)
+    numwav = int((wave_max - wave_min) / dwv)
     xbins = np.array([idx_max[0]-1, idx_max[0]+2]) - 0.5
     ybins = np.array([idx_max[1]-1, idx_max[1]+2]) - 0.5
     spec_bins = np.arange(1 + numwav) - 0.5
-    bins = (xbins, ybins, spec_bins)
+    return whitelightWCS, (xbins, ybins, spec_bins)
 
-    # Extract the spectrum of the highest S/N object
-    flux_stack = np.zeros((numwav, numfiles))
-    ivar_stack = np.zeros((numwav, numfiles))
-    for ff in range(numfiles):
-        msgs.info("Extracting spectrum of highest S/N detection from frame {0:d}/{1:d}".format(ff + 1, numfiles))
-        ww = (all_idx == ff)
-        # Extract the spectrum
-        pix_coord = whitelightWCS.wcs_world2pix(np.vstack((all_ra[ww], all_dec[ww], all_wave[ww] * 1.0E-10)).T, 0)
-        spec, edges = np.histogramdd(pix_coord, bins=bins, weights=all_sci[ww])
-        var, edges = np.histogramdd(pix_coord, bins=bins, weights=1/all_ivar[ww])
-        norm, edges = np.histogramdd(pix_coord, bins=bins)
-        normspec = (norm > 0) / (norm + (norm == 0))
-        var_spec = var[0, 0, :]
-        ivar_spec = (var_spec > 0) / (var_spec + (var_spec == 0))
-        # Calculate the S/N in a given spectral bin
-        flux_stack[:, ff] = spec[0, 0, :] * np.sqrt(normspec)  # Note: sqrt(nrmspec), is because we want the S/N in a _single_ pixel (i.e. not spectral bin)
-        ivar_stack[:, ff] = ivar_spec
 
+def extract_weights_spectrum(ra, dec, wave, sci, ivar, whitelightWCS, bins):
+    """ Extract the spectrum of the highest S/N object from a single frame
+
+    Args:
+        ra (`numpy.ndarray`_):
+            1D flattened array containing the RA values of each pixel
+        dec (`numpy.ndarray`_):
+            1D flattened array containing the DEC values of each pixel
+        wave (`numpy.ndarray`_):
+            1D flattened array containing the wavelength values of each pixel
+        sci (`numpy.ndarray`_):
+            1D flattened array containing the counts of each pixel
+        ivar (`numpy.ndarray`_):
+            1D flattened array containing the inverse variance of each pixel
+        whitelightWCS (`astropy.wcs.wcs.WCS`_):
+            WCS returned by :func:`get_weights_wcs`
+        bins (tuple):
+            Bin edges returned by :func:`get_weights_wcs`
+
+    Returns:
+        tuple : Two 1D arrays with the flux and inverse variance of the
+        extracted spectrum.
+    """
+    # Extract the spectrum
+    pix_coord = whitelightWCS.wcs_world2pix(np.vstack((ra, dec, wave * 1.0E-10)).T, 0)
+    indx = coadd.histogram_bin_indices(pix_coord, bins)
+    shape = tuple(b.size - 1 for b in bins)
+    spec, var, norm = coadd.histogram_sums(indx, shape, weights=[sci, 1/ivar, None])
+    normspec = (norm > 0) / (norm + (norm == 0))
+    var_spec = var[0, 0, :]
+    ivar_spec = (var_spec > 0) / (var_spec + (var_spec == 0))
+    # Calculate the S/N in a given spectral bin
+    # Note: sqrt(nrmspec), is because we want the S/N in a _single_ pixel (i.e. not spectral bin)
+    return spec[0, 0, :] * np.sqrt(normspec[0, 0, :]), ivar_spec
+
+
+def spectral_weights(whitelightWCS, flux_stack, ivar_stack, sn_smooth_npix=None, relative_weights=False):
+    """ Calculate the wavelength dependent weights of each frame from
+    the spectra extracted by :func:`extract_weights_spectrum`
+
+    Args:
+        whitelightWCS (`astropy.wcs.wcs.WCS`_):
+            WCS returned by :func:`get_weights_wcs`
+        flux_stack (`numpy.ndarray`_):
+            Extracted spectra of all frames, shape (numwav, numfiles)
+        ivar_stack (`numpy.ndarray`_):
+            Inverse variance of the extracted spectra, shape (numwav, numfiles)
+        sn_smooth_npix (float, optional):
+            Number of pixels used for determining smoothly varying S/N ratio weights.
+        relative_weights (bool, optional):
+            Calculate weights by fitting to the ratio of spectra?
+
+    Returns:
+        tuple : The 1D wavelength array of the spectra and the 2D array of
+        weights with shape (numwav, numfiles).
+    """
+    numwav = flux_stack.shape[0]
     mask_stack = (flux_stack != 0.0) & (ivar_stack != 0.0)
     # Obtain a wavelength of each pixel
     wcs_res = whitelightWCS.wcs_pix2world(np.vstack((np.zeros(numwav), np.zeros(numwav), np.arange(numwav))).T, 0)
@@ -530,14 +745,303 @@ def compute_weights(all_ra, all_dec, all_wave, all_sci, all_ivar, all_idx, white
         sn_smooth_npix = int(np.round(0.1 * wave_spec.size))
     rms_sn, weights = coadd.sn_weights(wave_spec, flux_stack, ivar_stack, mask_stack, sn_smooth_npix,
                                        relative_weights=relative_weights)
+    return wave_spec, weights
 
-    # Because we pass back a weights array, we need to interpolate to assign each detector pixel a weight
-    all_wghts = np.ones(all_idx.size)
-    for ff in range(numfiles):
-        ww = (all_idx == ff)
-        all_wghts[ww] = interp1d(wave_spec, weights[:, ff], kind='cubic',
-                                 bounds_error=False, fill_value="extrapolate")(all_wave[ww])
 
-    msgs.info("Optimal weighting complete")
-    return all_wghts
+def interp_weights(wave_spec, weights, wave):
+    """ Interpolate the wavelength dependent weights of a frame onto its pixels
+
+    Args:
+        wave_spec (`numpy.ndarray`_):
+            Wavelengths of the weights spectrum
+        weights (`numpy.ndarray`_):
+            Weights of the frame at wave_spec
+        wave (`numpy.ndarray`_):
+            Wavelength of each pixel in the frame
+
+    Returns:
+        `numpy.ndarray`_ : The weight of each pixel
+    """
+    return interp1d(wave_spec, weights, kind='cubic', bounds_error=False, fill_value="extrapolate")(wave)
+
+
+def pixel_footprints(slits, wcs, waveimg, onslit_gpm, initial=True, flexure=None):
+    """ Determine the on-sky and spectral footprint of each pixel on the slits
+
+    The footprint of each pixel is described by two vectors in (RA, DEC),
+    one across the width of the slit (or slice) and one along the spatial
+    direction of the slit covering the size of one pixel, and the
+    wavelength extent of the pixel. The latter is determined from the
+    gradient of the wavelength image along the spectral direction, which
+    includes the tilt of the spectral lines.
+
+    Args:
+        slits (:class:`~pypeit.slittrace.SlitTraceSet`):
+            The slit traces
+        wcs (`astropy.wcs.wcs.WCS`_):
+            The WCS of the frame (see
+            :func:`~pypeit.spectrographs.spectrograph.Spectrograph.get_wcs`)
+        waveimg (`numpy.ndarray`_):
+            The wavelength image
+        onslit_gpm (`numpy.ndarray`_):
+            Boolean image selecting the pixels for which to compute the
+            footprint.
+        initial (bool, optional):
+            Use the initial slit edges?
+        flexure (float, optional):
+            Spatial flexure of the slits
+
+    Returns:
+        `numpy.ndarray`_: Array of shape (N, 5), where N is the number of
+        selected pixels. The columns are the RA and DEC components (in
+        degrees) of the vector across the slit, the RA and DEC components of
+        the vector along the slit, and the wavelength extent of each pixel
+        (in Angstroms).
+    """
+    raimg, decimg, _ = slits.get_radec_image(wcs, initial=initial, flexure=flexure)
+    ra_slice, dec_slice, _ = slits.get_radec_image(wcs, initial=initial, flexure=flexure, slice_offset=0.5)
+    ra_spat, dec_spat, _ = slits.get_radec_image(wcs, initial=initial, flexure=flexure, spat_offset=0.5)
+    dwave = np.absolute(np.gradient(waveimg, axis=0))
+    # Handle the wrapping of RA
+    dra_slice = (ra_slice - raimg + 180.0) % 360.0 - 180.0
+    dra_spat = (ra_spat - raimg + 180.0) % 360.0 - 180.0
+    return np.column_stack((2*dra_slice[onslit_gpm], 2*(dec_slice - decimg)[onslit_gpm],
+                            2*dra_spat[onslit_gpm], 2*(dec_spat - decimg)[onslit_gpm],
+                            dwave[onslit_gpm]))
+
+
+def drizzle_sums(cubewcs, bins, ra, dec, wave, footprint, sci, var, wghts, cubes=None):
+    """ Accumulate the flux-conserving (drizzled) sums of a set of pixels
+    onto a datacube
+
+    Rather than assigning each detector pixel to its nearest voxel, the
+    flux of each pixel is distributed over all voxels that overlap with
+    its footprint, in proportion to the overlapping area (spatially) and
+    wavelength range (spectrally). The weight of each pixel in a given
+    voxel is the product of its weight and the overlapping fraction.
+    Use :func:`finalize_cube` to construct the datacube from the
+    accumulated sums.
 
+    Args:
+        cubewcs (`astropy.wcs.wcs.WCS`_):
+            The WCS of the output datacube
+        bins (tuple):
+            The bin edges of the output datacube along each dimension (in
+            pixel coordinates of cubewcs)
+        ra (`numpy.ndarray`_):
+            1D flattened array containing the RA values of each pixel
+        dec (`numpy.ndarray`_):
+            1D flattened array containing the DEC values of each pixel
+        wave (`numpy.ndarray`_):
+            1D flattened array containing the wavelength values of each pixel
+        footprint (`numpy.ndarray`_):
+            The footprint of each pixel (see :func:`pixel_footprints`)
+        sci (`numpy.ndarray`_):
+            1D flattened array containing the counts of each pixel
+        var (`numpy.ndarray`_):
+            1D flattened array containing the variance of each pixel
+        wghts (`numpy.ndarray`_):
+            1D flattened array containing the weight of each pixel
+        cubes (`numpy.ndarray`_, optional):
+            The sums returned by a previous call to this function. The sums
+            of the provided pixels are added to this array in place. If
+            None, a new array is instantiated.
+
+    Returns:
+        `numpy.ndarray`_: Array with shape (nx, ny, nz, 3) with the
+        weighted sum of the counts, the sum of the weights, and the
+        weighted sum of the variance in each voxel. The three sums are
+        interleaved such that all the sums of a voxel are stored
+        contiguously in memory.
+    """
+    shape = tuple(b.size - 1 for b in bins)
+    if cubes is None:
+        cubes = np.zeros(shape + (3,))
+    # Project the centre and the edges of the footprint of each pixel
+    _wave = wave * 1.0E-10
+    _dwave = 0.5 * footprint[:, 4] * 1.0E-10
+    cen = cubewcs.wcs_world2pix(np.column_stack((ra, dec, _wave)), 0)
+    uvec = cubewcs.wcs_world2pix(np.column_stack((ra + footprint[:, 0], dec + footprint[:, 1], _wave)), 0) - cen
+    vvec = cubewcs.wcs_world2pix(np.column_stack((ra + footprint[:, 2], dec + footprint[:, 3], _wave)), 0) - cen
+    zlo = cubewcs.wcs_world2pix(np.column_stack((ra, dec, _wave - _dwave)), 0)[:, 2]
+    zhi = cubewcs.wcs_world2pix(np.column_stack((ra, dec, _wave + _dwave)), 0)[:, 2]
+    _drizzle_sums(cen[:, 0], cen[:, 1], uvec[:, 0], uvec[:, 1], vvec[:, 0], vvec[:, 1],
+                  np.minimum(zlo, zhi), np.maximum(zlo, zhi), sci.astype(float), var.astype(float),
+                  wghts.astype(float), bins[0].astype(float), bins[1].astype(float), bins[2].astype(float),
+                  cubes)
+    return cubes
+
+
+def finalize_cube(flxsum, wghtsum, varsum):
+    """ Construct the datacube and its variance from the accumulated sums
+
+    The input arrays are modified in place.
+
+    Args:
+        flxsum (`numpy.ndarray`_):
+            The weighted sum of the counts in each voxel
+        wghtsum (`numpy.ndarray`_):
+            The sum of the weights in each voxel
+        varsum (`numpy.ndarray`_):
+            The weighted sum of the variance in each voxel
+
+    Returns:
+        tuple: The datacube and variance cube.
+    """
+    norm_cube = (wghtsum > 0) / (wghtsum + (wghtsum == 0))
+    flxsum *= norm_cube
+    varsum *= norm_cube**2
+    return flxsum, varsum
+
+
+@nb.jit(nopython=True, cache=True)
+def _clip_polygon(inx, iny, nin, outx, outy, axis, limit, upper):
+    """ Clip a convex polygon by a half-plane (one step of the
+    Sutherland-Hodgman algorithm).
+
+    Args:
+        inx, iny (`numpy.ndarray`_):
+            Coordinates of the polygon vertices
+        nin (int):
+            Number of polygon vertices
+        outx, outy (`numpy.ndarray`_):
+            Output arrays for the coordinates of the clipped polygon. These
+            must have at least nin+1 elements.
+        axis (int):
+            Clip along x (0) or y (1)
+        limit (float):
+            The location of the clipping line
+        upper (bool):
+            If True, the part of the polygon below the limit is kept;
+            otherwise the part above the limit is kept.
+
+    Returns:
+        int: Number of vertices of the clipped polygon
+    """
+    nout = 0
+    if nin == 0:
+        return nout
+    x0, y0 = inx[nin-1], iny[nin-1]
+    d0 = (x0 if axis == 0 else y0) - limit
+    if upper:
+        d0 = -d0
+    for i in range(nin):
+        x1, y1 = inx[i], iny[i]
+        d1 = (x1 if axis == 0 else y1) - limit
+        if upper:
+            d1 = -d1
+        if d1 >= 0:
+            if d0 < 0:
+                t = d0 / (d0 - d1)
+                outx[nout] = x0 + t * (x1 - x0)
+                outy[nout] = y0 + t * (y1 - y0)
+                nout += 1
+            outx[nout] = x1
+            outy[nout] = y1
+            nout += 1
+        elif d0 >= 0:
+            t = d0 / (d0 - d1)
+            outx[nout] = x0 + t * (x1 - x0)
+            outy[nout] = y0 + t * (y1 - y0)
+            nout += 1
+        x0, y0, d0 = x1, y1, d1
+    return nout
+
+
+@nb.jit(nopython=True, cache=True)
+def _polygon_area(px, py, npt):
+    """ Area of a polygon using the shoelace formula """
+    area = 0.0
+    for i in range(npt):
+        j = (i + 1) % npt
+        area += px[i] * py[j] - px[j] * py[i]
+    return 0.5 * abs(area)
+
+
+@nb.jit(nopython=True, cache=True)
+def _drizzle_sums(xc, yc, ux, uy, vx, vy, zlo, zhi, sci, var, wghts, xbins, ybins, zbins, cubes):
+    """ Compiled kernel of :func:`drizzle_sums`
+
+    The spatial footprint of each pixel is the parallelogram centred on
+    (xc, yc) with edges (ux, uy) and (vx, vy); its spectral footprint
+    ranges from zlo to zhi. All coordinates are in the pixel coordinates
+    of the output cube, and the sums are accumulated in place.
+    """
+    nx = xbins.size - 1
+    ny = ybins.size - 1
+    nz = zbins.size - 1
+    # Work arrays for the polygon clipping
+    px = np.empty(4)
+    py = np.empty(4)
+    ax = np.empty(8)
+    ay = np.empty(8)
+    bx = np.empty(8)
+    by = np.empty(8)
+    cx = np.empty(8)
+    cy = np.empty(8)
+    for i in range(xc.size):
+        # Vertices of the parallelogram
+        px[0] = xc[i] - 0.5*ux[i] - 0.5*vx[i]
+        py[0] = yc[i] - 0.5*uy[i] - 0.5*vy[i]
+        px[1] = px[0] + ux[i]
+        py[1] = py[0] + uy[i]
+        px[2] = px[1] + vx[i]
+        py[2] = py[1] + vy[i]
+        px[3] = px[0] + vx[i]
+        py[3] = py[0] + vy[i]
+        area = abs(ux[i]*vy[i] - uy[i]*vx[i])
+        # Spectral range of voxels that overlap
+        kmin = max(np.searchsorted(zbins, zlo[i], side='right') - 1, 0)
+        kmax = min(np.searchsorted(zbins, zhi[i], side='right') - 1, nz - 1)
+        if kmax < kmin:
+            continue
+        # Spatial range of voxels that may overlap
+        xmin = min(px[0], px[1], px[2], px[3])
+        xmax = max(px[0], px[1], px[2], px[3])
+        ymin = min(py[0], py[1], py[2], py[3])
+        ymax = max(py[0], py[1], py[2], py[3])
+        imin = np.searchsorted(xbins, xmin, side='right') - 1
+        imax = np.searchsorted(xbins, xmax, side='right') - 1
+        jmin = np.searchsorted(ybins, ymin, side='right') - 1
+        jmax = np.searchsorted(ybins, ymax, side='right') - 1
+        # The footprint is entirely contained in a single voxel (spatially)
+        single = imin == imax and jmin == jmax and imin >= 0 and imin < nx and jmin >= 0 and jmin < ny
+        # The footprint is a rectangle aligned with the output grid
+        aligned = abs(uy[i]) + abs(vx[i]) < 1e-8 * (abs(ux[i]) + abs(vy[i])) \
+                    or abs(ux[i]) + abs(vy[i]) < 1e-8 * (abs(uy[i]) + abs(vx[i]))
+        imin, imax = max(imin, 0), min(imax, nx - 1)
+        jmin, jmax = max(jmin, 0), min(jmax, ny - 1)
+        if imax < imin or jmax < jmin:
+            continue
+        dz = zhi[i] - zlo[i]
+        for ii in range(imin, imax + 1):
+            # Clip the footprint to this column of voxels
+            if area > 0 and not single and not aligned:
+                na = _clip_polygon(px, py, 4, bx, by, 0, xbins[ii], False)
+                na = _clip_polygon(bx, by, na, ax, ay, 0, xbins[ii+1], True)
+                if na == 0:
+                    continue
+            for jj in range(jmin, jmax + 1):
+                if single:
+                    fxy = 1.0
+                elif area == 0:
+                    # A point-like footprint only contributes to a single voxel
+                    fxy = 1.0 if (imin == imax and jmin == jmax) else 0.0
+                elif aligned:
+                    fxy = max(min(xmax, xbins[ii+1]) - max(xmin, xbins[ii]), 0.0) \
+                            * max(min(ymax, ybins[jj+1]) - max(ymin, ybins[jj]), 0.0) / area
+                else:
+                    # Clip the column to this voxel
+                    nc = _clip_polygon(ax, ay, na, bx, by, 1, ybins[jj], False)
+                    nc = _clip_polygon(bx, by, nc, cx, cy, 1, ybins[jj+1], True)
+                    fxy = _polygon_area(cx, cy, nc) / area
+                if fxy <= 0:
+                    continue
+                for k in range(kmin, kmax + 1):
+                    fz = (min(zhi[i], zbins[k+1]) - max(zlo[i], zbins[k])) / dz if dz > 0 else 1.0
+                    if fz <= 0:
+                        continue
+                    w = wghts[i] * fz * fxy
+                    cubes[ii, jj, k, 0] += w * sci[i]
+                    cubes[ii, jj, k, 1] += w
+                    cubes[ii, jj, k, 2] += w * w * var[i]
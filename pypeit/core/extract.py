@@ -10,8 +10,6 @@ import numpy as np
 import scipy
 from matplotlib import pyplot as plt
 
-from IPython import embed
-
 from astropy import stats
 
 from pypeit import msgs
@@ -28,16 +26,102 @@ from pypeit.core import fitting
 from pypeit.core.trace import fit_trace
 from pypeit.core.moment import moment1d
 
-from IPython import embed
+
+def spat_cutout(trace_spat, radius, nspat, spat_range=None):
+    """
+    Determine the range of image columns needed to extract an object.
+
+    The range includes all the pixels used by
+    :func:`~pypeit.core.moment.moment1d` to integrate an aperture of
+    width ``2*radius`` centered on the trace, plus a margin, such that
+    extracting the object from the spatial cutout of the image with
+    this range of columns gives the same result as extracting it from
+    the full image.  The range is limited to the image; if the
+    aperture falls entirely off the image, the range includes the
+    column at the image edge.
+
+    Args:
+        trace_spat (`numpy.ndarray`_):
+            Spatial position of the trace in each spectral row.
+        radius (:obj:`float`):
+            Half-width of the aperture in pixels.
+        nspat (:obj:`int`):
+            Number of spatial pixels in the image.
+        spat_range (:obj:`tuple`, optional):
+            Range of columns (end exclusive) that must also be
+            included in the cutout; e.g., the columns where the
+            object profile is non-zero.
+
+    Returns:
+        :obj:`tuple`: The first and last+1 column of the cutout.
+    """
+    lo = int(np.floor(np.amin(trace_spat) - radius)) - 2
+    hi = int(np.ceil(np.amax(trace_spat) + radius)) + 3
+    if spat_range is not None:
+        lo = min(lo, int(spat_range[0]))
+        hi = max(hi, int(spat_range[1]))
+    lo = min(max(lo, 0), nspat-1)
+    return lo, max(min(hi, nspat), lo+1)
+
+
+class WaveImageInterpolator:
+    """
+    Interpolate a wavelength image at arbitrary spectral and spatial
+    positions.
+
+    Used to fill in the extracted wavelengths where they are not
+    defined by the pixels in the extraction aperture.  The
+    `scipy.interpolate.RectBivariateSpline`_ of the full image is only
+    constructed when first needed and then reused, such that it is
+    constructed at most once for all the objects extracted from the
+    same image.
+
+    Args:
+        waveimg (`numpy.ndarray`_):
+            Wavelength image.
+        thismask (`numpy.ndarray`_, optional):
+            Boolean image selecting the pixels in the slit.  If
+            provided, the interpolated image is ``waveimg*thismask``.
+    """
+    def __init__(self, waveimg, thismask=None):
+        self.waveimg = waveimg
+        self.thismask = thismask
+        self.spline = None
+
+    def __call__(self, spec_pos, spat_pos):
+        """
+        Interpolate the wavelength image.
+
+        Args:
+            spec_pos (`numpy.ndarray`_):
+                Spectral positions.
+            spat_pos (`numpy.ndarray`_):
+                Spatial positions.
+
+        Returns:
+            `numpy.ndarray`_: Wavelengths at the provided positions.
+        """
+        if self.spline is None:
+            img = self.waveimg if self.thismask is None else self.waveimg*self.thismask
+            nspec, nspat = img.shape
+            self.spline = scipy.interpolate.RectBivariateSpline(np.arange(nspec),
+                                                                np.arange(nspat), img)
+        return self.spline(spec_pos, spat_pos, grid=False)
+
 
 def extract_optimal(sciimg,ivar, mask, waveimg, skyimg, rn2_img, thismask, oprof, box_radius, spec,
-                    min_frac_use = 0.05):
+                    min_frac_use = 0.05, spat_range=None, spat_offset=0, wave_interp=None):
 
     """ Calculate the spatial FWHM from an object profile. Utility routine for fit_profile
 
     Return value is None. The specobj object is changed in place with the boxcar and optimal dictionaries being filled
     with the extraction parameters.
 
+    All calculations are performed using the spatial cutout of the images
+    that includes the pixels with a positive object profile.  The input
+    images can themselves be cutouts of the full image (see ``spat_offset``),
+    which avoids constructing full-image masks for each object.
+
     Args:
         sciimg (np.ndarray): float ndarray shape (nspec, nspat)
            Science frame
@@ -63,39 +147,41 @@ def extract_optimal(sciimg,ivar, mask, waveimg, skyimg, rn2_img, thismask, oprof
         min_frac_use (float, optional): default = 0.05. If the sum of object profile arcoss the spatial direction
                are less than this value, the optimal extraction of this spectral pixel is masked because the majority of the
                object profile has been masked
+        spat_range (tuple, optional): Range of columns (end exclusive) in the input images that contain
+               all the pixels with a positive object profile.  Used to limit the search for these pixels.
+               If None, the full images are searched.
+        spat_offset (int, optional): If the input images are spatial cutouts of the full image, this is the
+               full-image column of the first column of the cutouts.  The trace in ``spec`` is always in
+               full-image coordinates.
+        wave_interp (:class:`WaveImageInterpolator`, optional): Interpolator for the full-image
+               ``waveimg*thismask`` used for spectral pixels without any valid wavelengths in the
+               object profile.  Providing it allows the interpolator to be shared by all objects in the
+               slit.  If None, it is constructed from the input images when needed.
 
     """
-    # Setup
-    imgminsky = sciimg - skyimg
-    nspat = imgminsky.shape[1]
-    nspec = imgminsky.shape[0]
-
-    spec_vec = np.arange(nspec)
-    spat_vec = np.arange(nspat)
-
-    # TODO This makes no sense for difference imaging? Not sure we need NIVAR anyway
-    var_no = np.abs(skyimg - np.sqrt(2.0) * np.sqrt(rn2_img)) + rn2_img
-
-    ispec, ispat = np.where(oprof > 0.0)
+    # Find the columns with a positive object profile
+    lo, hi = (0, oprof.shape[1]) if spat_range is None else spat_range
+    ispat, = np.where(np.any(oprof[:,lo:hi] > 0.0, axis=0))
 
     # Exit gracefully if we have no positive object profiles, since that means something was wrong with object fitting
-    if not np.any(oprof > 0.0):
+    if ispat.size == 0:
         msgs.warn('Object profile is zero everywhere. This aperture is junk.')
         return None
 
-    mincol = np.min(ispat)
-    maxcol = np.max(ispat) + 1
+    mincol = lo + np.min(ispat)
+    maxcol = lo + np.max(ispat) + 1
     nsub = maxcol - mincol
 
     mask_sub = mask[:,mincol:maxcol]
     thismask_sub = thismask[:, mincol:maxcol]
     wave_sub = waveimg[:,mincol:maxcol]
     ivar_sub = np.fmax(ivar[:,mincol:maxcol],0.0) # enforce positivity since these are used as weights
-    vno_sub = np.fmax(var_no[:,mincol:maxcol],0.0)
-
-    rn2_sub = rn2_img[:,mincol:maxcol]
-    img_sub = imgminsky[:,mincol:maxcol]
     sky_sub = skyimg[:,mincol:maxcol]
+    rn2_sub = rn2_img[:,mincol:maxcol]
+    # TODO This makes no sense for difference imaging? Not sure we need NIVAR anyway
+    vno_sub = np.fmax(np.abs(sky_sub - np.sqrt(2.0) * np.sqrt(rn2_sub)) + rn2_sub, 0.0)
+
+    img_sub = sciimg[:,mincol:maxcol] - sky_sub
     oprof_sub = oprof[:,mincol:maxcol]
     # enforce normalization and positivity of object profiles
     norm = np.nansum(oprof_sub,axis = 1)
@@ -145,9 +231,11 @@ def extract_optimal(sciimg,ivar, mask, waveimg, skyimg, rn2_img, thismask, oprof
         oprof_bad = badwvs & ((oprof_smash <= 0.0) | (np.isfinite(oprof_smash) == False) | (wave_opt <= 0.0) | (np.isfinite(wave_opt) == False))
         if oprof_bad.any():
             # For pixels with completely bad profile values, interpolate from trace.
-            f_wave = scipy.interpolate.RectBivariateSpline(spec_vec,spat_vec, waveimg*thismask)
-            wave_opt[oprof_bad] = f_wave(spec.trace_spec[oprof_bad], spec.TRACE_SPAT[oprof_bad],
-                                         grid=False)
+            wave_opt[oprof_bad] = WaveImageInterpolator(waveimg, thismask=thismask)(
+                                        spec.trace_spec[oprof_bad],
+                                        spec.TRACE_SPAT[oprof_bad] - spat_offset) \
+                                    if wave_interp is None else \
+                                    wave_interp(spec.trace_spec[oprof_bad], spec.TRACE_SPAT[oprof_bad])
 
     flux_model = np.outer(flux_opt,np.ones(nsub))*oprof_sub
     chi2_num = np.nansum((img_sub - flux_model)**2*ivar_sub*mask_sub,axis=1)
@@ -169,12 +257,19 @@ def extract_optimal(sciimg,ivar, mask, waveimg, skyimg, rn2_img, thismask, oprof
     return
 
 
-def extract_boxcar(sciimg, ivar, mask, waveimg, skyimg, rn2_img, box_radius, spec):
+def extract_boxcar(sciimg, ivar, mask, waveimg, skyimg, rn2_img, box_radius, spec, spat_offset=0,
+                   wave_interp=None):
     """
     Perform boxcar extraction for a single SpecObj
 
     SpecObj is filled in place
 
+    All calculations are performed using the spatial cutout of the
+    images that covers the boxcar aperture (see :func:`spat_cutout`),
+    reusing a single work array for the images integrated over the
+    aperture.  The input images can themselves be cutouts of the full
+    image (see ``spat_offset``).
+
     Args:
         sciimg (np.ndarray):
             Science image
@@ -194,44 +289,66 @@ def extract_boxcar(sciimg, ivar, mask, waveimg, skyimg, rn2_img, box_radius, spe
             This is the container that holds object, trace,
             and extraction information for the object in question.
             This routine operates one object at a time.
+        spat_offset (int, optional):
+            If the input images are spatial cutouts of the full
+            image, this is the full-image column of the first column
+            of the cutouts.  The trace in ``spec`` is always in
+            full-image coordinates.
+        wave_interp (:class:`WaveImageInterpolator`, optional):
+            Interpolator for the full-image ``waveimg`` used for
+            spectral pixels without any valid wavelengths in the
+            aperture.  Providing it allows the interpolator to be
+            shared by all objects in the image.  If None, it is
+            constructed from the input images when needed.
     """
     # Setup
-    imgminsky = sciimg - skyimg
-    nspat = imgminsky.shape[1]
-    nspec = imgminsky.shape[0]
-
-    spec_vec = np.arange(nspec)
-    spat_vec = np.arange(nspat)
+    nspec, nspat = sciimg.shape
     if spec.trace_spec is None:
-        spec.trace_spec = spec_vec
+        spec.trace_spec = np.arange(nspec)
 
-    # TODO This makes no sense for difference imaging? Not sure we need NIVAR anyway
-    var_no = np.abs(skyimg - np.sqrt(2.0) * np.sqrt(rn2_img)) + rn2_img
+    # Cut out the columns covered by the aperture
+    trace = spec.TRACE_SPAT - spat_offset
+    lo, hi = spat_cutout(trace, box_radius, nspat)
+    trace = trace - lo
+    sl = np.s_[:,lo:hi]
+    mask_sub = mask[sl]
+    ivar_sub = ivar[sl]
+    wave_sub = waveimg[sl]
+    sky_sub = skyimg[sl]
+    rn2_sub = rn2_img[sl]
+
+    # Work array for the images integrated over the aperture
+    work = np.empty(mask_sub.shape, dtype=float)
+
+    def _box(img):
+        return moment1d(img, trace, 2*box_radius, row=spec.trace_spec)[0]
 
     # Fill in the boxcar extraction tags
-    flux_box = moment1d(imgminsky*mask, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
+    flux_box = _box(np.multiply(np.subtract(sciimg[sl], sky_sub, out=work), mask_sub, out=work))
     # Denom is computed in case the trace goes off the edge of the image
-    box_denom = moment1d(waveimg*mask > 0.0, spec.TRACE_SPAT, 2*box_radius,
-                         row=spec.trace_spec)[0]
-    wave_box = moment1d(waveimg*mask, spec.TRACE_SPAT, 2*box_radius,
-                        row=spec.trace_spec)[0] / (box_denom + (box_denom == 0.0))
-    varimg = 1.0/(ivar + (ivar == 0.0))
-    var_box = moment1d(varimg*mask, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
-    nvar_box = moment1d(var_no*mask, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
-    sky_box = moment1d(skyimg*mask, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
-    rn2_box = moment1d(rn2_img*mask, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
+    box_denom = _box(np.multiply(wave_sub, mask_sub, out=work) > 0.0)
+    wave_box = _box(work) / (box_denom + (box_denom == 0.0))
+    var_box = _box(np.multiply(1.0/(ivar_sub + (ivar_sub == 0.0)), mask_sub, out=work))
+    # TODO This makes no sense for difference imaging? Not sure we need NIVAR anyway
+    np.multiply(np.sqrt(2.0), np.sqrt(rn2_sub, out=work), out=work)
+    np.add(np.abs(np.subtract(sky_sub, work, out=work), out=work), rn2_sub, out=work)
+    nvar_box = _box(np.multiply(work, mask_sub, out=work))
+    sky_box = _box(np.multiply(sky_sub, mask_sub, out=work))
+    rn2_box = _box(np.multiply(rn2_sub, mask_sub, out=work))
     rn_posind = (rn2_box > 0.0)
     rn_box = np.zeros(rn2_box.shape,dtype=float)
     rn_box[rn_posind] = np.sqrt(rn2_box[rn_posind])
-    pixtot = moment1d(ivar*0 + 1.0, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
-    pixmsk = moment1d(ivar*mask == 0.0, spec.TRACE_SPAT, 2*box_radius, row=spec.trace_spec)[0]
+    pixtot = _box(np.add(np.multiply(ivar_sub, 0, out=work), 1.0, out=work))
+    pixmsk = _box(np.multiply(ivar_sub, mask_sub, out=work) == 0.0)
     # If every pixel is masked then mask the boxcar extraction
     mask_box = (pixmsk != pixtot) & np.isfinite(wave_box) & (wave_box > 0.0)
     bad_box = (wave_box <= 0.0) | np.invert(np.isfinite(wave_box)) | (box_denom == 0.0)
     # interpolate bad wavelengths over masked pixels
     if bad_box.any():
-        f_wave = scipy.interpolate.RectBivariateSpline(spec_vec, spat_vec, waveimg)
-        wave_box[bad_box] = f_wave(spec.trace_spec[bad_box], spec.TRACE_SPAT[bad_box], grid=False)
+        wave_box[bad_box] = WaveImageInterpolator(waveimg)(spec.trace_spec[bad_box],
+                                                           spec.TRACE_SPAT[bad_box] - spat_offset) \
+                                if wave_interp is None else \
+                                wave_interp(spec.trace_spec[bad_box], spec.TRACE_SPAT[bad_box])
 
     ivar_box = 1.0/(var_box + (var_box == 0.0))
     nivar_box = 1.0/(nvar_box + (nvar_box == 0.0))
@@ -556,6 +673,7 @@ def fit_profile(image, ivar, waveimg, thismask, spat_img, trace_in, wave, flux,
     try:
         cont_flux, _ = c_answer.value(wave[indsp])
     except:
+        from IPython import embed
         embed()
 
     sn2 = (np.fmax(spline_flux*(np.sqrt(np.fmax(fluxivar_sm[indsp], 0))*bmask2),0))**2
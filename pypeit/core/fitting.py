@@ -4,8 +4,11 @@
 .. include:: ../include/links.rst
 
 """
-import numpy as np
 import inspect
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
 from matplotlib import pyplot as plt
 
 
@@ -16,8 +19,6 @@ from pypeit import bspline
 from pypeit import msgs
 from pypeit.datamodel import DataContainer
 
-from IPython import embed
-
 class PypeItFit(DataContainer):
     # Set the version of this class
     version = '1.0.0'
@@ -166,21 +167,43 @@ class PypeItFit(DataContainer):
         self.success = 1
         return self.success
 
-    def eval(self, x, x2=None):
+    def eval(self, x, x2=None, dtype=None):
         """
         Return the evaluated fit
 
         Args:
             x (`numpy.ndarray`_, optional):
-            x2 (`numpy.ndarray`_, optional):
+            x2 (`numpy.ndarray`_, :obj:`float`, optional):
                 For 2D fits
+            dtype (`numpy.dtype`_, optional):
+                Data type of the returned array; see
+                :func:`evaluate_fit`.
 
         Returns:
             `numpy.ndarray`_:
 
         """
         return evaluate_fit(self.fitc, self.func, x, x2=x2, minx=self.minx,
-                            maxx=self.maxx, minx2=self.minx2, maxx2=self.maxx2)
+                            maxx=self.maxx, minx2=self.minx2, maxx2=self.maxx2, dtype=dtype)
+
+    def eval_grid(self, x, x2, dtype=None):
+        """
+        Evaluate a 2D fit on the grid of all (x, x2) pairs.
+
+        Args:
+            x (`numpy.ndarray`_):
+                1D vector with the first coordinate.
+            x2 (`numpy.ndarray`_):
+                1D vector with the second coordinate.
+            dtype (`numpy.dtype`_, optional):
+                Data type of the returned array; see
+                :func:`evaluate_fit_grid`.
+
+        Returns:
+            `numpy.ndarray`_: Array with shape ``(x.size, x2.size)``.
+        """
+        return evaluate_fit_grid(self.fitc, self.func, x, x2, minx=self.minx, maxx=self.maxx,
+                                 minx2=self.minx2, maxx2=self.maxx2, dtype=dtype)
 
     def calc_fit_rms(self, apply_mask=True, x2=None):
         """ Simple RMS calculation
@@ -217,14 +240,94 @@ class PypeItFit(DataContainer):
         return np.sqrt(np.sum(weights * (yval - values) ** 2))
 
 
-def evaluate_fit(fitc, func, x, x2=None, minx=None, maxx=None, minx2=None, maxx2=None):
+vander_functions = {'polynomial': np.polynomial.polynomial.polyvander,
+                    'legendre': np.polynomial.legendre.legvander,
+                    'chebyshev': np.polynomial.chebyshev.chebvander}
+"""
+Functions that construct the 1D basis (pseudo-Vandermonde) matrix for
+each function type that can be evaluated in 2D.
+"""
+
+_basis_cache = OrderedDict()
+_basis_cache_size = 16
+
+
+def fit_basis(func, x, ncoeff, minx=None, maxx=None, cache=False):
+    """
+    Construct the 1D basis matrix for a polynomial fit.
+
+    Element ``[i,j]`` of the matrix is the ``j``-th basis function
+    (e.g., the Legendre polynomial of order ``j``) evaluated at
+    ``x[i]``, after scaling ``x`` for Legendre and Chebyshev
+    polynomials (see :func:`scale_minmax`).  A fit evaluated at ``x``
+    is then the product of this matrix with the fit coefficients.
+
+    Args:
+        func (:obj:`str`):
+            Function type: 'polynomial', 'legendre', or 'chebyshev'.
+        x (`numpy.ndarray`_):
+            1D vector of coordinates.
+        ncoeff (:obj:`int`):
+            Number of coefficients (the polynomial order plus one).
+        minx (:obj:`float`, optional):
+            Minimum value for the scaling; see :func:`scale_minmax`.
+        maxx (:obj:`float`, optional):
+            Maximum value for the scaling; see :func:`scale_minmax`.
+        cache (:obj:`bool`, optional):
+            Keep the matrix in a small cache of recently constructed
+            matrices, and return the cached matrix if one exists for
+            the same input.  This is intended for coordinate grids
+            that are evaluated repeatedly (e.g., the spectral and
+            spatial pixel vectors of an image).  Cached matrices are
+            returned as read-only arrays.
+
+    Returns:
+        `numpy.ndarray`_: The basis matrix with shape ``(x.size, ncoeff)``.
+    """
+    if func not in vander_functions.keys():
+        msgs.error('Cannot construct basis for function {0}.  Options are: {1}'.format(
+                   func, ', '.join(vander_functions.keys())))
+    x = np.ascontiguousarray(x, dtype=float).ravel()
+    if cache:
+        key = (func, ncoeff, minx, maxx, x.size, hashlib.sha1(x.view(np.uint8)).hexdigest())
+        if key in _basis_cache:
+            _basis_cache.move_to_end(key)
+            return _basis_cache[key]
+    xv = x if func == 'polynomial' else scale_minmax(x, minx=minx, maxx=maxx)[0]
+    basis = vander_functions[func](xv, ncoeff-1)
+    if cache:
+        basis.flags.writeable = False
+        _basis_cache[key] = basis
+        if len(_basis_cache) > _basis_cache_size:
+            _basis_cache.popitem(last=False)
+    return basis
+
+
+def evaluate_fit(fitc, func, x, x2=None, minx=None, maxx=None, minx2=None, maxx2=None,
+                 dtype=None, chunk=65536):
     """
     Return the evaluated fit
 
+    2D fits are evaluated in chunks of ``chunk`` points: the basis
+    matrices for both coordinates are constructed for each chunk (see
+    :func:`fit_basis`), and the fit is the row-wise product of the
+    basis of ``x2`` with the product of the basis of ``x`` and the
+    coefficients.  If ``x2`` is a scalar (e.g., the order number of
+    an echelle order), the 2D fit is collapsed to a 1D fit in ``x``.
+    To evaluate a 2D fit over a full image, see
+    :func:`evaluate_fit_grid`.
+
     Args:
         x (`numpy.ndarray`_, optional):
-        x2 (`numpy.ndarray`_, optional):
+        x2 (`numpy.ndarray`_, :obj:`float`, optional):
             For 2D fits
+        dtype (`numpy.dtype`_, optional):
+            Data type of the returned array.  The fit is always
+            evaluated in double precision; use, e.g., ``np.float32``
+            to halve the memory of the returned array.  If None, the
+            result is returned in double precision.
+        chunk (:obj:`int`, optional):
+            Number of points evaluated at once for 2D fits.
 
     Returns:
         `numpy.ndarray`_:
@@ -233,27 +336,108 @@ def evaluate_fit(fitc, func, x, x2=None, minx=None, maxx=None, minx2=None, maxx2
     # For two-d fits x = x, y = x2, y = z
     if ('2d' in func) and (x2 is not None):
         # Is this a 2d fit?
-        if func[:-2] == "polynomial":
-            return np.polynomial.polynomial.polyval2d(x, x2, fitc)
-        elif func[:-2] in ["legendre", "chebyshev"]:
-            # Scale x-direction
-            xv, _, _ = scale_minmax(x, minx=minx, maxx=maxx)
-            # Scale x2-direction
-            x2v, _, _ = scale_minmax(x2, minx=minx2, maxx=maxx2)
-            return (np.polynomial.legendre.legval2d(xv, x2v, fitc) if func[:-2] == "legendre"
-                    else np.polynomial.chebyshev.chebval2d(xv, x2v, fitc))
-        else:
+        if func[:-2] not in vander_functions.keys():
             msgs.error("Function {0:s} has not yet been implemented for 2d fits".format(func))
-        return None
+        _func = func[:-2]
+        if np.ndim(x2) == 0:
+            # Collapse to a 1D fit in x
+            _fitc = np.dot(fitc, fit_basis(_func, x2, fitc.shape[1], minx=minx2, maxx=maxx2)[0])
+            return evaluate_fit(_fitc, _func, x, minx=minx, maxx=maxx, dtype=dtype)
+        _x, _x2 = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(x2, dtype=float))
+        shape = _x.shape
+        # Get the scaling of each coordinate using all points
+        if _func != 'polynomial':
+            _, minx, maxx = scale_minmax(_x, minx=minx, maxx=maxx)
+            _, minx2, maxx2 = scale_minmax(_x2, minx=minx2, maxx=maxx2)
+        _x = _x.ravel()
+        _x2 = _x2.ravel()
+        result = np.empty(_x.size, dtype=float if dtype is None else dtype)
+        for s in range(0, _x.size, chunk):
+            e = s + chunk
+            result[s:e] = np.sum(_basis_dot(fit_basis(_func, _x[s:e], fitc.shape[0], minx=minx,
+                                                      maxx=maxx), fitc)
+                                 * fit_basis(_func, _x2[s:e], fitc.shape[1], minx=minx2,
+                                             maxx=maxx2), axis=1)
+        return result.reshape(shape)
     elif func == "polynomial":
-        return np.polynomial.polynomial.polyval(x, fitc)
+        result = np.polynomial.polynomial.polyval(x, fitc)
     elif func == "legendre" or func == "chebyshev":
         xv, _, _ = scale_minmax(x, minx=minx, maxx=maxx)
-        return (np.polynomial.legendre.legval(xv, fitc) if func == "legendre"
-                else np.polynomial.chebyshev.chebval(xv, fitc))
+        result = (np.polynomial.legendre.legval(xv, fitc) if func == "legendre"
+                  else np.polynomial.chebyshev.chebval(xv, fitc))
     else:
         msgs.error("Fitting function '{0:s}' is not implemented yet" + msgs.newline() +
                    "Please choose from 'polynomial', 'legendre', 'chebyshev', 'polynomial2d', 'legendre2d', 'chebyshev2d'")
+    return result if dtype is None else np.asarray(result).astype(dtype, copy=False)
+
+
+def evaluate_fit_grid(fitc, func, x, x2, minx=None, maxx=None, minx2=None, maxx2=None,
+                      dtype=None):
+    """
+    Evaluate a 2D fit on the grid of all (x, x2) pairs.
+
+    The result is identical to calling :func:`evaluate_fit` with the
+    coordinates of each grid point, but the fit is evaluated as the
+    product of the (cached) 1D basis matrices of each coordinate (see
+    :func:`fit_basis`) with the coefficients; i.e., its cost scales
+    with the number of grid points times the number of coefficients
+    along ``x2``, instead of the product of the numbers of
+    coefficients along both coordinates.
+
+    Args:
+        fitc (`numpy.ndarray`_):
+            2D array with the fit coefficients.
+        func (:obj:`str`):
+            Function type: 'polynomial2d', 'legendre2d', or
+            'chebyshev2d'.
+        x (`numpy.ndarray`_):
+            1D vector with the first coordinate.
+        x2 (`numpy.ndarray`_):
+            1D vector with the second coordinate.
+        minx, maxx, minx2, maxx2 (:obj:`float`, optional):
+            Scaling for Legendre and Chebyshev polynomials; see
+            :func:`scale_minmax`.  If None, the limits of each vector
+            are used.
+        dtype (`numpy.dtype`_, optional):
+            Data type of the returned array; see
+            :func:`evaluate_fit`.
+
+    Returns:
+        `numpy.ndarray`_: Array with shape ``(x.size, x2.size)``.
+    """
+    if '2d' not in func or func[:-2] not in vander_functions.keys():
+        msgs.error("Function {0:s} cannot be evaluated on a 2d grid".format(func))
+    basis = _basis_dot(fit_basis(func[:-2], x, fitc.shape[0], minx=minx, maxx=maxx, cache=True),
+                       fitc)
+    basis2 = fit_basis(func[:-2], x2, fitc.shape[1], minx=minx2, maxx=maxx2, cache=True)
+    result = np.multiply.outer(basis[:,0], basis2[:,0])
+    for j in range(1, fitc.shape[1]):
+        result += np.multiply.outer(basis[:,j], basis2[:,j])
+    return result if dtype is None else result.astype(dtype, copy=False)
+
+
+def _basis_dot(basis, fitc):
+    """
+    Compute the product of a basis matrix and the fit coefficients.
+
+    The sum over the coefficients is done explicitly, instead of
+    using ``numpy.dot``, such that the result for each point does not
+    depend on the number of points evaluated (e.g., the size of an
+    image section); the number of coefficients is always small.
+
+    Args:
+        basis (`numpy.ndarray`_):
+            Basis matrix; see :func:`fit_basis`.
+        fitc (`numpy.ndarray`_):
+            Fit coefficients.
+
+    Returns:
+        `numpy.ndarray`_: The product of the two arrays.
+    """
+    result = np.multiply.outer(basis[:,0], fitc[0])
+    for i in range(1, fitc.shape[0]):
+        result += np.multiply.outer(basis[:,i], fitc[i])
+    return result
 
 
 def robust_fit(xarray, yarray, order, x2=None, function='polynomial',
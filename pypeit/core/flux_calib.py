@@ -4,8 +4,6 @@ import os
 import glob
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 
 from scipy import interpolate
@@ -421,6 +419,7 @@ def find_standard(specobj_list):
     try:
         mxix = np.argmax(np.array(medfx))
     except:
+        from IPython import embed
         embed()
     msgs.info("Putative standard star {} has a median boxcar count of {}".format(specobj_list[mxix],
                                                                                  np.max(medfx)))
@@ -16,7 +16,6 @@ import linetools.utils
 
 from pypeit import msgs
 from pypeit import io
-from IPython import embed
 from pypeit.core import parse
 
 
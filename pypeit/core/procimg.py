@@ -6,7 +6,6 @@
 import numpy as np
 from scipy import signal, ndimage
 from scipy.optimize import curve_fit
-from IPython import embed
 
 from pypeit import msgs
 from pypeit import utils
@@ -529,6 +528,7 @@ def subtract_pattern(rawframe, datasec_img, oscansec_img, frequency=None, axis=1
 
     debug = False
     if debug:
+        from IPython import embed
         embed()
         import astropy.io.fits as fits
         hdu = fits.PrimaryHDU(rawframe)
@@ -999,6 +999,7 @@ def variance_frame(datasec_img, sciframe, gain, ronoise, darkcurr=None,
     _objframe = np.zeros_like(skyframe) if objframe is None else objframe
     var = np.abs(skyframe + _objframe - np.sqrt(2.0)*np.sqrt(rnoise)) + rnoise
     var = var + adderr ** 2 * (np.abs(sciframe)) ** 2
+    from IPython import embed
     embed(header='this appears to be broken!')
     return
 
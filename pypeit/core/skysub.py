@@ -10,8 +10,6 @@ from scipy.special import ndtr
 
 from matplotlib import pyplot as plt
 
-from IPython import embed
-
 from pypeit.images import imagebitmask
 from pypeit.core import basis, pixels, extract
 from pypeit.core import fitting
@@ -465,6 +463,53 @@ def optimal_bkpts(bkpts_optimal, bsp_min, piximg, sampmask, samp_frac=0.80,
     return fullbkpt
 
 
+def _extract_cutout(sciimg, ivar, mask, waveimg, skyimage, rn2_img, thismask, oprof, box_rad, sobj,
+                    spat_range, wave_interp, slit_wave_interp, slit_ivar=False):
+    """
+    Perform the boxcar and optimal extraction of an object in
+    :func:`local_skysub_extract` using a spatial cutout of the images.
+
+    Only the pixels within ``2*box_rad`` of the object trace are used in
+    the extraction.  The cutout includes these pixels and the columns
+    with a non-zero object profile (``spat_range``), such that the
+    result is identical to extracting the object from the full images.
+
+    Args:
+        sciimg, ivar, mask, waveimg, skyimage, rn2_img, thismask (`numpy.ndarray`_):
+            Full images passed to :func:`~pypeit.core.extract.extract_boxcar`
+            and :func:`~pypeit.core.extract.extract_optimal`.
+        oprof (`numpy.ndarray`_):
+            Full image with the object profile.
+        box_rad (:obj:`float`):
+            Boxcar radius in pixels.
+        sobj (:class:`~pypeit.specobj.SpecObj`):
+            Object to extract; the extraction results are added in
+            place.
+        spat_range (:obj:`tuple`):
+            Range of columns (end exclusive) with a non-zero object
+            profile.
+        wave_interp, slit_wave_interp (:class:`~pypeit.core.extract.WaveImageInterpolator`):
+            Interpolators for the full wavelength image and the
+            wavelength image in the slit, respectively.
+        slit_ivar (:obj:`bool`, optional):
+            Set the inverse variance outside the slit to 0.
+    """
+    lo, hi = extract.spat_cutout(sobj.TRACE_SPAT, 2.0 * box_rad, sciimg.shape[1],
+                                 spat_range=spat_range)
+    sl = np.s_[:,lo:hi]
+    spat = np.arange(lo, hi, dtype=float)[None,:]
+    trace = sobj.TRACE_SPAT[:,None]
+    objmask = (spat >= (trace - 2.0 * box_rad)) & (spat <= (trace + 2.0 * box_rad))
+    _ivar = ivar[sl] * thismask[sl] if slit_ivar else ivar[sl]
+    _mask = mask[sl] & objmask
+    extract.extract_boxcar(sciimg[sl], _ivar, _mask, waveimg[sl], skyimage[sl], rn2_img[sl],
+                           box_rad, sobj, spat_offset=lo, wave_interp=wave_interp)
+    extract.extract_optimal(sciimg[sl], _ivar, _mask, waveimg[sl], skyimage[sl], rn2_img[sl],
+                            thismask[sl], oprof[sl], box_rad, sobj,
+                            spat_range=(spat_range[0] - lo, spat_range[1] - lo), spat_offset=lo,
+                            wave_interp=slit_wave_interp)
+
+
 def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img,
                          thismask, slit_left, slit_righ, sobjs, ingpm=None,
                          spat_pix=None, adderr=0.01, bsp=0.6, extract_maskwidth=4.0, trim_edg=(3,3),
@@ -665,6 +710,11 @@ def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img,
     # TODO Can this be simply replaced with spat_img above (but not spat_pix since that could have holes)
     spatial_img = thismask * ximg * (np.outer(xsize, np.ones(nspat)))
 
+    # Interpolators used to fill in undefined extracted wavelengths;
+    # these are shared by all objects in the slit
+    wave_interp = extract.WaveImageInterpolator(waveimg)
+    slit_wave_interp = extract.WaveImageInterpolator(waveimg, thismask=thismask)
+
     # Loop over objects and group them
     i1 = 0
     while i1 < nobj:
@@ -718,22 +768,18 @@ def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img,
 
                     # TODO -- Use extract_specobj_boxcar to avoid code duplication
                     extract.extract_boxcar(sciimg, modelivar, outmask, waveimg,
-                                           skyimage, rn2_img, box_rad, sobjs[iobj])
+                                           skyimage, rn2_img, box_rad, sobjs[iobj],
+                                           wave_interp=wave_interp)
                     flux = sobjs[iobj].BOX_COUNTS
                     fluxivar = sobjs[iobj].BOX_COUNTS_IVAR * sobjs[iobj].BOX_MASK
                     wave = sobjs[iobj].BOX_WAVE
                 else:
                     # For later iterations, profile fitting is based on an optimal extraction
                     last_profile = obj_profiles[:, :, ii]
-                    trace = np.outer(sobjs[iobj].TRACE_SPAT, np.ones(nspat))
-                    objmask = ((spat_img >= (trace - 2.0 * box_rad)) & (spat_img <= (trace + 2.0 * box_rad)))
-                    # Boxcar
-                    extract.extract_boxcar(sciimg, modelivar, (outmask & objmask),
-                                                   waveimg, skyimage, rn2_img, box_rad,
-                                                   sobjs[iobj])
-                    # Optimal
-                    extract.extract_optimal(sciimg, modelivar, (outmask & objmask), waveimg, skyimage, rn2_img, thismask,
-                                            last_profile, box_rad, sobjs[iobj])
+                    # Boxcar and optimal
+                    _extract_cutout(sciimg, modelivar, outmask, waveimg, skyimage, rn2_img, thismask,
+                                    last_profile, box_rad, sobjs[iobj], (int(min_spat), int(min_spat) + nc),
+                                    wave_interp, slit_wave_interp)
                     # If the extraction is bad do not update
                     if sobjs[iobj].OPT_MASK is not None:
                         if sobjs[iobj].OPT_MASK.any():
@@ -851,14 +897,10 @@ def local_skysub_extract(sciimg, sciivar, tilts, waveimg, global_sky, rn2_img,
                       ' with objid = {:d}'.format(sobjs[iobj].OBJID) + ' on slit # {:d}'.format(sobjs[iobj].slit_order) +
                       ' at x = {:5.2f}'.format(sobjs[iobj].SPAT_PIXPOS))
             this_profile = obj_profiles[:, :, ii]
-            trace = np.outer(sobjs[iobj].TRACE_SPAT, np.ones(nspat))
-            # Optimal
-            objmask = ((spat_img >= (trace - 2.0 * box_rad)) & (spat_img <= (trace + 2.0 * box_rad)))
-            extract.extract_optimal(sciimg, modelivar * thismask, (outmask_extract & objmask), waveimg, skyimage, rn2_img, thismask, this_profile,
-                            box_rad, sobjs[iobj])
-            # Boxcar
-            extract.extract_boxcar(sciimg, modelivar*thismask, (outmask_extract & objmask),
-                                           waveimg, skyimage, rn2_img, box_rad, sobjs[iobj])
+            # Boxcar and optimal
+            _extract_cutout(sciimg, modelivar, outmask_extract, waveimg, skyimage, rn2_img, thismask,
+                            this_profile, box_rad, sobjs[iobj], (int(min_spat), int(min_spat) + nc),
+                            wave_interp, slit_wave_interp, slit_ivar=True)
             sobjs[iobj].min_spat = min_spat
             sobjs[iobj].max_spat = max_spat
 
@@ -13,9 +13,8 @@ accessible by the docstring of all modules?
 """
 from collections import Counter
 
-from IPython import embed
-
 import numpy as np
+import numba as nb
 from scipy import ndimage, signal, interpolate
 from matplotlib import pyplot as plt
 
@@ -514,7 +513,7 @@ def prepare_sobel_for_trace(sobel_sig, bpm=None, boxcar=5, side='left'):
 
 def follow_centroid(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None, width=6.0,
                     maxshift_start=0.5, maxshift_follow=0.15, maxerror=0.2, continuous=True,
-                    bitmask=None):
+                    bitmask=None, use_numba=False):
     """
     Follow the centroid of features in an image along the first axis.
 
@@ -597,6 +596,11 @@ def follow_centroid(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None,
             interpret the correct flag names defined. In addition to
             flags used by :func:`_recenter_trace_row`, this function
             uses the DISCONTINUOUS flag.
+        use_numba (:obj:`bool`, optional):
+            Follow all the features in a single compiled pass over
+            the image rows (see :func:`_follow_centroid`), instead of
+            calling :func:`masked_centroid` for each row. The results
+            are the same to within numerical precision.
 
     Returns:
         Three numpy arrays are returned: the optimized center, an
@@ -634,25 +638,53 @@ def follow_centroid(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None,
 
     # NOTE: This is effectively the old trace_crude_init
 
-    # Recenter the starting row
-    i = start_row
-    xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i,:], width, ivar=_ivar, bpm=_bpm,
-                                                fwgt=_fwgt, row=i, maxshift=maxshift_start,
-                                                maxerror=maxerror, bitmask=bitmask, fill='bound')
-
-    # Go to higher indices using the result from the previous row
-    for i in range(start_row+1,nr):
-        xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i-1,:], width, ivar=_ivar, bpm=_bpm,
-                                                    fwgt=_fwgt, row=i, maxshift=maxshift_follow,
+    if use_numba:
+        radius = np.atleast_1d(width/2).astype(float)
+        if radius.size == 1:
+            radius = np.full(nt, radius[0], dtype=float)
+        if radius.shape != (nt,):
+            raise ValueError('width must either be a single value or have the same shape as '
+                             'start_cen.')
+        flags = np.zeros(xc.shape, dtype=np.int16)
+        _follow_centroid(flux.astype(float), _ivar.astype(float), _bpm.astype(bool),
+                         _fwgt.astype(float), start_row, radius, maxshift_start, maxshift_follow,
+                         -1. if maxerror is None else maxerror, -1., xc, xe, flags)
+        # Convert the flags to the output mask; see masked_centroid
+        if bitmask is None:
+            xm = (flags & (_CEN_MATHERROR | _CEN_OUTSIDEAPERTURE | _CEN_EDGEBUFFER
+                           | _CEN_MOMENTERROR)) > 0
+        else:
+            for bit, flag in zip([_CEN_MATHERROR, _CEN_OUTSIDEAPERTURE, _CEN_EDGEBUFFER,
+                                  _CEN_MOMENTERROR, _CEN_LARGESHIFT],
+                                 ['MATHERROR', 'OUTSIDEAPERTURE', 'EDGEBUFFER', 'MOMENTERROR',
+                                  'LARGESHIFT']):
+                if bit == _CEN_MOMENTERROR and maxerror is None:
+                    continue
+                indx = (flags & bit) > 0
+                xm[indx] = bitmask.turn_on(xm[indx], flag)
+    else:
+        # Recenter the starting row
+        i = start_row
+        xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i,:], width, ivar=_ivar, bpm=_bpm,
+                                                    fwgt=_fwgt, row=i, maxshift=maxshift_start,
                                                     maxerror=maxerror, bitmask=bitmask,
                                                     fill='bound')
 
-    # Go to lower indices using the result from the previous row
-    for i in range(start_row-1,-1,-1):
-        xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i+1,:], width, ivar=_ivar, bpm=_bpm,
-                                                    fwgt=_fwgt, row=i, maxshift=maxshift_follow,
-                                                    maxerror=maxerror, bitmask=bitmask,
-                                                    fill='bound')
+        # Go to higher indices using the result from the previous row
+        for i in range(start_row+1,nr):
+            xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i-1,:], width, ivar=_ivar,
+                                                        bpm=_bpm, fwgt=_fwgt, row=i,
+                                                        maxshift=maxshift_follow,
+                                                        maxerror=maxerror, bitmask=bitmask,
+                                                        fill='bound')
+
+        # Go to lower indices using the result from the previous row
+        for i in range(start_row-1,-1,-1):
+            xc[i,:], xe[i,:], xm[i,:] = masked_centroid(flux, xc[i+1,:], width, ivar=_ivar,
+                                                        bpm=_bpm, fwgt=_fwgt, row=i,
+                                                        maxshift=maxshift_follow,
+                                                        maxerror=maxerror, bitmask=bitmask,
+                                                        fill='bound')
 
     # NOTE: In edgearr_tcrude, skip_bad (roughly opposite of continuous
     # here) was True by default, meaning continuous would be False by
@@ -683,9 +715,147 @@ def follow_centroid(flux, start_row, start_cen, ivar=None, bpm=None, fwgt=None,
     return xc, xe, xm
 
 
+# Flags set by _follow_centroid; see the bitmask flags in masked_centroid
+_CEN_MATHERROR = 1
+_CEN_OUTSIDEAPERTURE = 2
+_CEN_EDGEBUFFER = 4
+_CEN_MOMENTERROR = 8
+_CEN_LARGESHIFT = 16
+
+
+@nb.jit(nopython=True, cache=True)
+def _centroid_row(flux, ivar, bpm, fwgt, row, cen, radius, maxshift, maxerror, fill_error,
+                  xc, xe, flags):
+    """
+    Compiled equivalent of :func:`masked_centroid` for a single row,
+    with uniform weighting and ``fill='bound'``.
+
+    The first moments are calculated as in
+    :func:`pypeit.core.moment.moment1d`, including the masking of
+    undefined divisions by `numpy.ma.divide`_.
+
+    Args:
+        flux, ivar, bpm, fwgt (`numpy.ndarray`_):
+            Image, inverse variance, bad-pixel mask, and pixel weights.
+        row (:obj:`int`):
+            Image row.
+        cen (`numpy.ndarray`_):
+            Input centers for each trace.
+        radius (`numpy.ndarray`_):
+            Half-width of the integration window for each trace.
+        maxshift (:obj:`float`):
+            Maximum shift allowed from ``cen``.
+        maxerror (:obj:`float`):
+            Maximum allowed error; ignored if negative.
+        fill_error (:obj:`float`):
+            Error for flagged centroids.
+        xc, xe, flags (`numpy.ndarray`_):
+            Vectors for the centroids, errors, and flags, filled in
+            place.
+    """
+    ncol = flux.shape[1]
+    nt = cen.size
+    tiny = np.finfo(np.float64).tiny
+    # The integration window has the same length for all traces
+    minw = 0
+    for t in range(nt):
+        w = int(np.floor(cen[t] + radius[t] + 0.5)) - int(np.floor(cen[t] - radius[t] + 0.5))
+        if t == 0 or w < minw:
+            minw = w
+    nwin = max(minw + 3, 0)
+
+    for t in range(nt):
+        i1 = int(np.floor(cen[t] - radius[t] + 0.5))
+        # Zeroth and first moment
+        mu0 = 0.
+        mu1 = 0.
+        for k in range(nwin):
+            c = i1 - 1 + k
+            ih = min(max(c, 0), ncol-1)
+            wt = 0.
+            if c >= 0 and c < ncol and not bpm[row,ih] and ivar[row,ih] > 0:
+                wt = min(max(radius[t] - abs(c - cen[t]) + 0.5, 0.), 1.)
+            integ = flux[row,ih] * wt * fwgt[row,ih]
+            mu0 += integ
+            mu1 += integ * c
+        flg = 0
+        if not abs(mu1) * tiny < abs(mu0) or not np.isfinite(mu1 / mu0):
+            flg |= _CEN_MATHERROR
+            xfit = cen[t]
+            xerr = fill_error
+        else:
+            xfit = mu1 / mu0
+            # Error
+            var = 0.
+            nvar = 0
+            for k in range(nwin):
+                c = i1 - 1 + k
+                ih = min(max(c, 0), ncol-1)
+                wt = 0.
+                if c >= 0 and c < ncol and not bpm[row,ih] and ivar[row,ih] > 0:
+                    wt = min(max(radius[t] - abs(c - cen[t]) + 0.5, 0.), 1.)
+                v = (wt * (c - xfit))**2
+                if not abs(v) * tiny < abs(ivar[row,ih]) or not np.isfinite(v / ivar[row,ih]):
+                    continue
+                var += v / ivar[row,ih]
+                nvar += 1
+            xerr = fill_error
+            if nvar > 0:
+                var = np.sqrt(var)
+                if abs(var) * tiny < abs(mu0) and np.isfinite(var / abs(mu0)):
+                    xerr = var / abs(mu0)
+
+        # Flag centroids outside the aperture and too close to the edge
+        if abs(xfit - cen[t]) > radius[t] + 0.5:
+            flg |= _CEN_OUTSIDEAPERTURE
+        if xfit < radius[t] - 0.5 or xfit > ncol - 0.5 - radius[t]:
+            flg |= _CEN_EDGEBUFFER
+        bad = flg > 0
+        if bad:
+            xfit = cen[t]
+            xerr = fill_error
+        # Limit the shift
+        if abs(xfit - cen[t]) > maxshift:
+            flg |= _CEN_LARGESHIFT
+        xfit = min(max(xfit - cen[t], -maxshift), maxshift) + cen[t]
+        # Flag large errors
+        if maxerror >= 0 and xerr > maxerror:
+            flg |= _CEN_MOMENTERROR
+            bad = True
+        if bad:
+            xfit = cen[t]
+            xerr = fill_error
+        xc[t] = xfit
+        xe[t] = xerr
+        flags[t] = flg
+
+
+@nb.jit(nopython=True, cache=True)
+def _follow_centroid(flux, ivar, bpm, fwgt, start_row, radius, maxshift_start, maxshift_follow,
+                     maxerror, fill_error, xc, xe, flags):
+    """
+    Compiled kernel for :func:`follow_centroid`.
+
+    Follows all traces from ``start_row`` to higher and then lower
+    rows, using :func:`_centroid_row` for each row.  On input, ``xc``
+    must have the starting centers in ``start_row``; ``xc``, ``xe``,
+    and ``flags`` are filled in place.
+    """
+    nr = flux.shape[0]
+    cen = xc[start_row].copy()
+    _centroid_row(flux, ivar, bpm, fwgt, start_row, cen, radius, maxshift_start, maxerror,
+                  fill_error, xc[start_row], xe[start_row], flags[start_row])
+    for i in range(start_row+1, nr):
+        _centroid_row(flux, ivar, bpm, fwgt, i, xc[i-1], radius, maxshift_follow, maxerror,
+                      fill_error, xc[i], xe[i], flags[i])
+    for i in range(start_row-1, -1, -1):
+        _centroid_row(flux, ivar, bpm, fwgt, i, xc[i+1], radius, maxshift_follow, maxerror,
+                      fill_error, xc[i], xe[i], flags[i])
+
+
 def masked_centroid(flux, cen, width, ivar=None, bpm=None, fwgt=None, row=None,
                     weighting='uniform', maxshift=None, maxerror=None, bitmask=None, fill='input',
-                    fill_error=-1):
+                    fill_error=-1, use_numba=False):
     """
     Measure the centroid within 1D apertures and flag and fill bad
     results.
@@ -770,6 +940,11 @@ def masked_centroid(flux, cen, width, ivar=None, bpm=None, fwgt=None, row=None,
         fill_error (:obj:`float`, optional):
             For flagged centroids, this error is replaced with this
             dummy value.
+        use_numba (:obj:`bool`, optional):
+            Calculate the moments using the compiled
+            :func:`pypeit.core.moment.moment1d_batch`, instead of
+            :func:`pypeit.core.moment.moment1d`. The results are the
+            same to within numerical precision.
 
     Returns:
         Returns three `numpy.ndarray`_ objects: the new centers, the
@@ -778,9 +953,10 @@ def masked_centroid(flux, cen, width, ivar=None, bpm=None, fwgt=None, row=None,
     """
     # Calculate the moments
     radius = width/2
-    xfit, xerr, matherr = moment.moment1d(flux, cen, width, ivar=ivar, bpm=bpm, fwgt=fwgt,
-                                          row=row, weighting=weighting, order=1,
-                                          fill_error=fill_error)
+    moment_func = moment.moment1d_batch if use_numba else moment.moment1d
+    xfit, xerr, matherr = moment_func(flux, cen, width, ivar=ivar, bpm=bpm, fwgt=fwgt, row=row,
+                                      weighting=weighting, order=1, fill_error=fill_error,
+                                      mesh=False)
 
     # Flag centroids outide the aperture and too close to the image edge
     outside_ap = (np.absolute(xfit - cen) > radius + 0.5)
@@ -828,7 +1004,7 @@ def masked_centroid(flux, cen, width, ivar=None, bpm=None, fwgt=None, row=None,
 def fit_trace(flux, trace_cen, order, ivar=None, bpm=None, trace_bpm=None, weighting='uniform',
               fwhm=3.0, maxshift=None, maxerror=None, function='legendre', maxdev=2.0, maxiter=25,
               niter=9, bitmask=None, debug=False, idx=None, xmin=None, xmax=None,
-              flavor='trace'):
+              flavor='trace', use_numba=False):
     """
     Iteratively fit the trace of a feature in the provided image.
 
@@ -927,6 +1103,10 @@ def fit_trace(flux, trace_cen, order, ivar=None, bpm=None, trace_bpm=None, weigh
             Default is to use the image size in nspec direction
         flavor (:obj:`str`, optional):
             Defines the type of fit performed. Only used by QA
+        use_numba (:obj:`bool`, optional):
+            Measure the centroids of all traces in all spectral rows
+            with the compiled :func:`pypeit.core.moment.moment1d_batch`;
+            see :func:`masked_centroid`.
 
     Returns:
         :obj:`tuple`: Returns four `numpy.ndarray`_ objects all with
@@ -1005,7 +1185,7 @@ def fit_trace(flux, trace_cen, order, ivar=None, bpm=None, trace_bpm=None, weigh
         # boolean.
         cen, err, msk = masked_centroid(flux, trace_fit, width[i], ivar=ivar, bpm=bpm, fwgt=fwgt,
                                         weighting=weighting, maxshift=maxshift, maxerror=maxerror,
-                                        bitmask=bitmask)
+                                        bitmask=bitmask, use_numba=use_numba)
 
         ################################################################
         # NOTE: keck_run_july changes: Now always replace the masked
@@ -8,8 +8,6 @@ from scipy import interpolate, ndimage
 from matplotlib import pyplot as plt
 from matplotlib import cm, lines
 
-from IPython import embed
-
 from astropy.stats import sigma_clipped_stats
 
 from pypeit import msgs
@@ -789,7 +787,7 @@ def fit_tilts(trc_tilt_dict, thismask, slit_cen, spat_order=3, spec_order=4, max
     # msgs.info("RMS/FWHM: {}".format(rms_real/fwhm))
 
 
-def fit2tilts(shape, coeff2, func2d, spat_shift=None):
+def fit2tilts(shape, coeff2, func2d, spat_shift=None, section=None, dtype=None):
     """
     Evaluate the wavelength tilt model over the full image.
 
@@ -805,6 +803,17 @@ def fit2tilts(shape, coeff2, func2d, spat_shift=None):
         Spatial shift to be added to image pixels before evaluation
         If you are accounting for flexure, then you probably wish to
         input -1*flexure_shift into this parameter.
+    section : tuple, optional
+        A 2-tuple of slices selecting the spectral and spatial section
+        of the image to evaluate.  The model is normalized by the full
+        image shape, such that the result is identical to the same
+        section of the full tilts image.  If None, the tilts are
+        evaluated over the full image.
+    dtype : numpy.dtype, optional
+        Data type of the returned image; e.g., ``np.float32`` halves
+        its memory.  The model is always evaluated in double
+        precision.  If None, the image is returned in double
+        precision.
 
     Returns
     -------
@@ -821,14 +830,20 @@ def fit2tilts(shape, coeff2, func2d, spat_shift=None):
     xnspatmin1 = float(nspat - 1)
     spec_vec = np.arange(nspec)
     spat_vec = np.arange(nspat) - _spat_shift
-    spat_img, spec_img = np.meshgrid(spat_vec, spec_vec)
+    if section is not None:
+        spec_vec = spec_vec[section[0]]
+        spat_vec = spat_vec[section[1]]
     #
     pypeitFit = fitting.PypeItFit(fitc=coeff2, minx=0.0, maxx=1.0,
                                   minx2=0.0, maxx2=1.0, func=func2d)
-    tilts = pypeitFit.eval(spec_img / xnspecmin1, x2=spat_img / xnspatmin1)
+    # The model is separable in the two coordinates, so evaluate it
+    # on the grid of the spectral and spatial vectors
+    tilts = pypeitFit.eval_grid(spec_vec / xnspecmin1, spat_vec / xnspatmin1, dtype=dtype)
     # Added this to ensure that tilts are never crazy values due to extrapolation of fits which can break
     # wavelength solution fitting
-    return np.fmax(np.fmin(tilts, 1.2), -0.2)
+    np.fmin(tilts, 1.2, out=tilts)
+    np.fmax(tilts, -0.2, out=tilts)
+    return tilts
 
 
 # This method needs to match the name in pypeit.core.qa.set_qa_filename()
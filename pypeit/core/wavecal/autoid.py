@@ -2,14 +2,17 @@
 """
 from scipy.ndimage.filters import gaussian_filter
 from scipy.spatial import cKDTree
+import os
 import itertools
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
 import scipy
+import scipy.fft
 from linetools import utils as ltu
 from astropy import table
 import copy
 import numba as nb
 import numpy as np
-from IPython import embed
 
 from astropy.table import Table
 
@@ -510,9 +513,156 @@ def match_qa(arc_spec, tcent, line_list, IDs, scores, outfile = None, title=None
 #    return best_dict, final_fit
 
 
+# Cache of arxiv spectra prepared for reidentify; see get_arxiv
+_arxiv_cache = OrderedDict()
+_arxiv_cache_size = 8
+
+
+def prepare_arxiv(spec_arxiv, wave_soln_arxiv, nspec, sigdetect=5.0, fwhm=4.0,
+                  nonlinear_counts=1e10, debug_peaks=False):
+    """
+    Precompute the quantities used by :func:`reidentify` for a set of
+    archived arc spectra.
+
+    These quantities only depend on the archived spectra and the
+    line-detection parameters, so they can be computed once and used
+    to reidentify all slits (see :func:`get_arxiv`).
+
+    Args:
+        spec_arxiv (`numpy.ndarray`_):
+            Archived arc spectra with shape :math:`(N_{\rm arxiv,spec},
+            N_{\rm arxiv})` or :math:`(N_{\rm arxiv,spec},)`.
+        wave_soln_arxiv (`numpy.ndarray`_):
+            Wavelength solutions for the archived arc spectra with
+            the same shape as ``spec_arxiv``.
+        nspec (:obj:`int`):
+            Number of spectral pixels in the spectra to reidentify.
+            The archived spectra are resized to this length.
+        sigdetect (:obj:`float`, optional):
+            Line-detection threshold; see
+            :func:`~pypeit.core.wavecal.wvutils.arc_lines_from_spec`.
+        fwhm (:obj:`float`, optional):
+            Line FWHM in pixels.
+        nonlinear_counts (:obj:`float`, optional):
+            Arc lines above this saturation threshold are not used.
+        debug_peaks (:obj:`bool`, optional):
+            Show the line detections.
+
+    Returns:
+        :obj:`dict`: Dictionary with the resized spectra
+        (``spec``) and wavelength solutions (``wave_soln``), the
+        detected lines in each spectrum (``det``, a dictionary with
+        keys ``'0'``, ``'1'``, etc.), the continuum-subtracted
+        spectra (``spec_cont_sub``), the smoothed and ceiled spectra
+        used for the cross-correlation (``spec_xcorr``), and their
+        FFTs (``xcorr_fft``).
+    """
+    if spec_arxiv.ndim != wave_soln_arxiv.ndim:
+        msgs.error('spec arxiv and wave_soln_arxiv must have the same dimensions')
+    if spec_arxiv.ndim == 1:
+        spec_arxiv1 = spec_arxiv.reshape(spec_arxiv.size,1)
+        wave_soln_arxiv1 = wave_soln_arxiv.reshape(wave_soln_arxiv.size,1)
+    elif spec_arxiv.ndim == 2:
+        spec_arxiv1 = spec_arxiv.copy()
+        wave_soln_arxiv1 = wave_soln_arxiv.copy()
+    else:
+        msgs.error('Unrecognized shape for spec_arxiv. It must be either a one dimensional or two '
+                   'dimensional numpy array')
+
+    arxiv = {}
+    arxiv['spec'] = arc.resize_spec(spec_arxiv1, nspec)
+    arxiv['wave_soln'] = arc.resize_spec(wave_soln_arxiv1, nspec)
+    if arxiv['spec'].shape[0] != nspec:
+        msgs.error('Spectrum sizes do not match. Something is very wrong!')
+    narxiv = arxiv['spec'].shape[1]
+
+    # Search for lines to continuum subtract the arxiv arcs and
+    # smooth and ceil them for the cross-correlation, as done by
+    # wvutils.xcorr_shift_stretch
+    arxiv['det'] = {}
+    arxiv['spec_cont_sub'] = np.zeros_like(arxiv['spec'])
+    arxiv['spec_xcorr'] = np.zeros_like(arxiv['spec'])
+    for iarxiv in range(narxiv):
+        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, arxiv['spec_cont_sub'][:,iarxiv] \
+                = wvutils.arc_lines_from_spec(arxiv['spec'][:,iarxiv], sigdetect=sigdetect,
+                                              nonlinear_counts=nonlinear_counts, fwhm=fwhm,
+                                              debug=debug_peaks)
+        arxiv['det'][str(iarxiv)] = tcent_arxiv[icut_arxiv]
+        arxiv['spec_xcorr'][:,iarxiv] = wvutils.smooth_ceil_cont(arxiv['spec'][:,iarxiv], 1.0,
+                                                                 percent_ceil=80.0, fwhm=fwhm)
+    arxiv['xcorr_fft'] = scipy.fft.rfft(arxiv['spec_xcorr'], n=wvutils.xcorr_fft_length(nspec),
+                                        axis=0)
+    return arxiv
+
+
+def select_arxiv(arxiv, indx):
+    """
+    Select a subset of the spectra in a set of prepared arxiv spectra.
+
+    Args:
+        arxiv (:obj:`dict`):
+            Prepared arxiv spectra; see :func:`prepare_arxiv`.
+        indx (:obj:`int`, array-like):
+            Index of the spectra to select.
+
+    Returns:
+        :obj:`dict`: The selected subset, with the same keys as the
+        input. The lines detected in each spectrum (``det``) are
+        renumbered.
+    """
+    _indx = np.atleast_1d(indx)
+    sub = {key: arxiv[key][:,_indx] for key in ['spec', 'wave_soln', 'spec_cont_sub',
+                                               'spec_xcorr', 'xcorr_fft']}
+    sub['det'] = {str(i): arxiv['det'][str(j)] for i,j in enumerate(_indx)}
+    return sub
+
+
+def get_arxiv(reid_arxiv, spec_arxiv, wave_soln_arxiv, nspec, sigdetect=5.0, fwhm=4.0,
+              nonlinear_counts=1e10):
+    """
+    Return the prepared arxiv spectra for a reidentification arxiv,
+    using a cached result if available.
+
+    The result of :func:`prepare_arxiv` is cached for the most recent
+    arxiv files, keyed by the arxiv file, the spectrum length, and
+    the line-detection parameters.
+
+    Args:
+        reid_arxiv (:obj:`str`):
+            Name of the arxiv file; see
+            :func:`~pypeit.core.wavecal.waveio.load_reid_arxiv`.
+        spec_arxiv, wave_soln_arxiv (`numpy.ndarray`_):
+            Archived arc spectra and wavelength solutions read from
+            ``reid_arxiv``; see :func:`prepare_arxiv`.
+        nspec (:obj:`int`):
+            Number of spectral pixels in the spectra to reidentify.
+        sigdetect (:obj:`float`, optional):
+            Line-detection threshold.
+        fwhm (:obj:`float`, optional):
+            Line FWHM in pixels.
+        nonlinear_counts (:obj:`float`, optional):
+            Arc lines above this saturation threshold are not used.
+
+    Returns:
+        :obj:`dict`: The prepared arxiv spectra; see
+        :func:`prepare_arxiv`. The returned object is shared with the
+        cache and should not be altered.
+    """
+    key = (reid_arxiv, nspec, sigdetect, fwhm, nonlinear_counts)
+    if key in _arxiv_cache:
+        _arxiv_cache.move_to_end(key)
+        return _arxiv_cache[key]
+    arxiv = prepare_arxiv(spec_arxiv, wave_soln_arxiv, nspec, sigdetect=sigdetect, fwhm=fwhm,
+                          nonlinear_counts=nonlinear_counts)
+    _arxiv_cache[key] = arxiv
+    if len(_arxiv_cache) > _arxiv_cache_size:
+        _arxiv_cache.popitem(last=False)
+    return arxiv
+
+
 def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, det_arxiv=None, detections=None, cc_thresh=0.8,cc_local_thresh = 0.8,
                match_toler=2.0, nlocal_cc=11, nonlinear_counts=1e10,sigdetect=5.0,fwhm=4.0,
-               debug_xcorr=False, debug_reid=False, debug_peaks = False):
+               debug_xcorr=False, debug_reid=False, debug_peaks = False, arxiv=None):
     """ Determine  a wavelength solution for a set of spectra based on archival wavelength solutions
 
     Parameters
@@ -576,6 +726,10 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     debug_reid: bool, default = False
        Show plots useful for debugging the line reidentification
 
+    arxiv: dict, default = None
+       The archived spectra prepared by prepare_arxiv (or get_arxiv) from spec_arxiv_in and wave_soln_arxiv_in, with the
+       same sigdetect, fwhm, and nonlinear_counts. If None, this is computed.
+
     Returns
     -------
     (detections, spec_cont_sub, patt_dict)
@@ -613,29 +767,19 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     else:
         msgs.error('spec must be a one dimensional numpy array ')
 
-    if spec_arxiv_in.ndim != wave_soln_arxiv_in.ndim:
-        msgs.error('spec arxiv and wave_soln_arxiv must have the same dimensions')
-
-    if spec_arxiv_in.ndim == 1:
-        spec_arxiv1 = spec_arxiv_in.reshape(spec_arxiv_in.size,1)
-        wave_soln_arxiv1 = wave_soln_arxiv_in.reshape(wave_soln_arxiv_in.size,1)
-    elif spec_arxiv_in.ndim == 2:
-        spec_arxiv1 = spec_arxiv_in.copy()
-        wave_soln_arxiv1 = wave_soln_arxiv_in.copy()
-    else:
-        msgs.error('Unrecognized shape for spec_arxiv. It must be either a one dimensional or two dimensional numpy array')
-
-    spec_arxiv = arc.resize_spec(spec_arxiv1, nspec)
-    wave_soln_arxiv = arc.resize_spec(wave_soln_arxiv1, nspec)
-
+    if arxiv is None:
+        arxiv = prepare_arxiv(spec_arxiv_in, wave_soln_arxiv_in, nspec, sigdetect=sigdetect, fwhm=fwhm,
+                              nonlinear_counts=nonlinear_counts, debug_peaks=debug_peaks)
+    spec_arxiv = arxiv['spec']
+    wave_soln_arxiv = arxiv['wave_soln']
     nspec_arxiv, narxiv = spec_arxiv.shape
+    if nspec_arxiv != nspec:
+        msgs.error('Spectrum sizes do not match. Something is very wrong!')
 
     this_soln = wave_soln_arxiv[:,0]
     sign = 1 if (this_soln[this_soln.size // 2] > this_soln[this_soln.size // 2 - 1]) else -1
 
     xrng = np.arange(nspec)
-    if nspec_arxiv != nspec:
-        msgs.error('Spectrum sizes do not match. Something is very wrong!')
 
     # Search for lines no matter what to continuum subtract the input arc
     tcent, ecent, cut_tcent, icut, spec_cont_sub = wvutils.arc_lines_from_spec(
@@ -644,19 +788,9 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     if detections is None:
         detections = tcent[icut]
 
-    spec_arxiv_cont_sub = np.zeros_like(spec_arxiv)
-
-    # Search for lines no matter what to continuum subtract the arxiv arc, also determine the central wavelength and
-    # dispersion of wavelength arxiv
-    det_arxiv1 = {}
-    for iarxiv in range(narxiv):
-        tcent_arxiv, ecent_arxiv, cut_tcent_arxiv, icut_arxiv, spec_cont_sub_now = wvutils.arc_lines_from_spec(
-            spec_arxiv[:,iarxiv], sigdetect=sigdetect,nonlinear_counts=nonlinear_counts, fwhm = fwhm, debug = debug_peaks)
-        spec_arxiv_cont_sub[:,iarxiv] = spec_cont_sub_now
-        det_arxiv1[str(iarxiv)] = tcent_arxiv[icut_arxiv]
-
+    # Lines detected in the arxiv arcs
     if det_arxiv is None:
-        det_arxiv = det_arxiv1
+        det_arxiv = arxiv['det']
 
     wvc_arxiv = np.zeros(narxiv, dtype=float)
     disp_arxiv = np.zeros(narxiv, dtype=float)
@@ -680,14 +814,20 @@ def reidentify(spec, spec_arxiv_in, wave_soln_arxiv_in, line_list, nreid_min, de
     shift_vec = np.zeros(narxiv)
     stretch_vec = np.zeros(narxiv)
     ccorr_vec = np.zeros(narxiv)
+    # Smooth and ceil the input arc as done by wvutils.xcorr_shift_stretch and get the
+    # initial cross-correlation with all the arxiv spectra at once
+    spec_xcorr = wvutils.smooth_ceil_cont(spec_cont_sub, 1.0, percent_ceil=80.0, fwhm=fwhm)
+    shift_cc, corr_cc = wvutils.xcorr_shift_batch(spec_xcorr, arxiv['spec_xcorr'],
+                                                  y2_fft=arxiv['xcorr_fft'], debug=debug_xcorr)
     for iarxiv in range(narxiv):
         msgs.info('Cross-correlating with arxiv slit # {:d}'.format(iarxiv))
         this_det_arxiv = det_arxiv[str(iarxiv)]
         # Match the peaks between the two spectra. This code attempts to compute the stretch if cc > cc_thresh
         success, shift_vec[iarxiv], stretch_vec[iarxiv], ccorr_vec[iarxiv], _, _ = \
-            wvutils.xcorr_shift_stretch(spec_cont_sub, spec_arxiv[:, iarxiv],
+            wvutils.xcorr_shift_stretch(spec_xcorr, arxiv['spec_xcorr'][:, iarxiv],
                                         cc_thresh=cc_thresh, fwhm=fwhm, seed=random_state,
-                                        debug=debug_xcorr)
+                                        debug=debug_xcorr, preprocessed=True,
+                                        xcorr_init=(shift_cc[iarxiv], corr_cc[iarxiv]))
         # If cc < cc_thresh or if this optimization failed, don't reidentify from this arxiv spectrum
         if success != 1:
             continue
@@ -910,6 +1050,7 @@ def full_template(spec, par, ok_mask, det, binspectral, nsnippet=2, debug_xcorr=
             ax.plot(xvals, temp_spec)  # Template
             ax.plot(xvals, np.roll(pspec, int(shift_cc)), 'k')  # Input
             plt.show()
+            from IPython import embed
             embed(header='909 autoid')
         i0 = npad // 2 + int(shift_cc)
 
@@ -978,6 +1119,7 @@ def full_template(spec, par, ok_mask, det, binspectral, nsnippet=2, debug_xcorr=
                                               sigrej_first=par['sigrej_first'],
                                               sigrej_final=par['sigrej_final'])
         except TypeError:
+            from IPython import embed
             embed(header='974 of autoid')
             wvcalib[str(slit)] = None
         else:
@@ -986,6 +1128,67 @@ def full_template(spec, par, ok_mask, det, binspectral, nsnippet=2, debug_xcorr=
     return wvcalib
 
 
+# Object whose per-slit method is called by each worker process of
+# map_slits.
+_slit_worker = None
+
+
+def _init_slit_worker(obj):
+    """
+    Initialize a :func:`map_slits` worker process by storing the
+    object used to calibrate the slits.
+    """
+    global _slit_worker
+    _slit_worker = obj
+
+
+def _call_slit_worker(method, slit):
+    """
+    Call the per-slit method of the object stored by
+    :func:`_init_slit_worker`.
+    """
+    return getattr(_slit_worker, method)(slit)
+
+
+def map_slits(obj, method, slits, nproc=1):
+    """
+    Call a per-slit method for a set of slits, possibly using
+    multiple processes.
+
+    The object is sent to each worker process once, when the
+    process is started, and the results are returned in the same
+    order as the input slits. The result for each slit is therefore
+    identical to calling the method serially, which is what is done
+    if only one process is requested.
+
+    Args:
+        obj (:obj:`object`):
+            Object with the method to call. Must be picklable if
+            ``nproc`` is not 1.
+        method (:obj:`str`):
+            Name of the method of ``obj`` to call. The method must
+            take the slit index as its only argument and return a
+            picklable result.
+        slits (array-like):
+            Indices of the slits to calibrate.
+        nproc (:obj:`int`, optional):
+            Number of processes to use. If less than 1, the number
+            of CPUs is used. The number of processes is never more
+            than the number of slits.
+
+    Returns:
+        :obj:`list`: The result of the method call for each slit.
+    """
+    _nproc = os.cpu_count() if nproc < 1 else nproc
+    _nproc = min(_nproc, len(slits))
+    if _nproc < 2:
+        return [getattr(obj, method)(slit) for slit in slits]
+    msgs.info('Calibrating {0} slits using {1} processes'.format(len(slits), _nproc))
+    with ProcessPoolExecutor(max_workers=_nproc, initializer=_init_slit_worker,
+                             initargs=(obj,)) as pool:
+        return list(pool.map(_call_slit_worker, itertools.repeat(method), slits))
+
+
 class ArchiveReid:
     r"""
     Algorithm to wavelength calibrate spectroscopic data based on an
@@ -1156,49 +1359,50 @@ class ArchiveReid:
             self.spec_arxiv[:, iarxiv] = self.wv_calib_arxiv[str(iarxiv)]['spec']
             self.wave_soln_arxiv[:, iarxiv] = self.wv_calib_arxiv[str(iarxiv)]['wave_soln']
         # arxiv orders (echelle only)
+        self.orders = orders
+        self.arxiv_orders = None
         if self.ech_fix_format:
-            arxiv_orders = []
+            self.arxiv_orders = []
             for iarxiv in range(narxiv):
-                arxiv_orders.append(self.wv_calib_arxiv[str(iarxiv)]['order'])
+                self.arxiv_orders.append(self.wv_calib_arxiv[str(iarxiv)]['order'])
 #            orders, _ = self.spectrograph.slit2order(slit_spat_pos)
 
-        ind_arxiv = np.arange(narxiv, dtype=int)
         # These are the final outputs
         self.all_patt_dict = {}
         self.detections = {}
         self.wv_calib = {}
         self.bad_slits = np.array([], dtype=np.int)
-        # Reidentify each slit, and perform a fit
+
+        # The arxiv line detections and cross-correlation templates
+        # are computed once and cached
+        slits = [slit for slit in range(self.nslits) if slit in self.ok_mask]
+        self.arxiv = {}
+        for slit in slits:
+            self.arxiv[slit] = get_arxiv(self.reid_arxiv, self.spec_arxiv, self.wave_soln_arxiv,
+                                         self.nspec,
+                                         sigdetect=wvutils.parse_param(self.par, 'sigdetect', slit),
+                                         fwhm=self.fwhm, nonlinear_counts=self.nonlinear_counts)
+
+        # Reidentify each slit, and perform a fit, using multiple
+        # processes if requested.  The debugging plots require that
+        # the slits are calibrated serially.
+        nproc = 1 if self.debug_peaks or self.debug_xcorr or self.debug_reid \
+                    else self.par['nproc']
+        results = map_slits(self, 'reidentify_slit', slits, nproc=nproc)
+
         for slit in range(self.nslits):
             # ToDO should we still be populating wave_calib with an empty dict here?
             if slit not in self.ok_mask:
                 self.wv_calib[str(slit)] = None
                 continue
-            msgs.info('Reidentifying and fitting slit # {0:d}/{1:d}'.format(slit,self.nslits-1))
-            # If this is a fixed format echelle, arxiv has exactly the same orders as the data and so
-            # we only pass in the relevant arxiv spectrum to make this much faster
-            ind_sp = arxiv_orders.index(orders[slit]) if self.ech_fix_format else ind_arxiv
-            sigdetect = wvutils.parse_param(self.par, 'sigdetect', slit)
-            cc_thresh = wvutils.parse_param(self.par, 'cc_thresh', slit)
-            self.detections[str(slit)], self.spec_cont_sub[:,slit], self.all_patt_dict[str(slit)] = \
-                reidentify(self.spec[:,slit], self.spec_arxiv[:,ind_sp], self.wave_soln_arxiv[:,ind_sp],
-                           self.tot_line_list, self.nreid_min, cc_thresh=cc_thresh, match_toler=self.match_toler,
-                           cc_local_thresh=self.cc_local_thresh, nlocal_cc=self.nlocal_cc, nonlinear_counts=self.nonlinear_counts,
-                           sigdetect=sigdetect, fwhm=self.fwhm, debug_peaks=self.debug_peaks, debug_xcorr=self.debug_xcorr,
-                           debug_reid=self.debug_reid)
+            self.detections[str(slit)], self.spec_cont_sub[:,slit], self.all_patt_dict[str(slit)], \
+                    final_fit = results[slits.index(slit)]
             # Check if an acceptable reidentification solution was found
             if not self.all_patt_dict[str(slit)]['acceptable']:
                 self.wv_calib[str(slit)] = None
                 self.bad_slits = np.append(self.bad_slits, slit)
                 continue
 
-            # Perform the fit
-            n_final = wvutils.parse_param(self.par, 'n_final', slit)
-            final_fit = wv_fitting.fit_slit(self.spec_cont_sub[:, slit], self.all_patt_dict[str(slit)],
-                                         self.detections[str(slit)],
-                                         self.tot_line_list, match_toler=self.match_toler,func=self.func, n_first=self.n_first,
-                                         sigrej_first=self.sigrej_first, n_final=n_final,sigrej_final=self.sigrej_final)
-
             # Did the fit succeed?
             if final_fit is None:
                 # This pattern wasn't good enough
@@ -1224,6 +1428,51 @@ class ArchiveReid:
         # Print the final report of all lines
         self.report_final()
 
+    def reidentify_slit(self, slit):
+        """
+        Reidentify the arc lines in a single slit and fit the
+        wavelength solution.
+
+        Args:
+            slit (:obj:`int`):
+                Index of the slit.
+
+        Returns:
+            :obj:`tuple`: The detected lines, the continuum-subtracted
+            arc spectrum, and the pattern dictionary returned by
+            :func:`reidentify`, and the result of
+            :func:`~pypeit.core.wavecal.wv_fitting.fit_slit`, which
+            is None if the reidentification was not acceptable or
+            the fit failed.
+        """
+        msgs.info('Reidentifying and fitting slit # {0:d}/{1:d}'.format(slit,self.nslits-1))
+        # If this is a fixed format echelle, arxiv has exactly the same orders as the data and so
+        # we only pass in the relevant arxiv spectrum to make this much faster
+        if self.ech_fix_format:
+            ind_sp = self.arxiv_orders.index(self.orders[slit])
+            arxiv = select_arxiv(self.arxiv[slit], ind_sp)
+        else:
+            ind_sp = np.arange(self.spec_arxiv.shape[1], dtype=int)
+            arxiv = self.arxiv[slit]
+        sigdetect = wvutils.parse_param(self.par, 'sigdetect', slit)
+        cc_thresh = wvutils.parse_param(self.par, 'cc_thresh', slit)
+        detections, spec_cont_sub, patt_dict = \
+            reidentify(self.spec[:,slit], self.spec_arxiv[:,ind_sp], self.wave_soln_arxiv[:,ind_sp],
+                       self.tot_line_list, self.nreid_min, cc_thresh=cc_thresh, match_toler=self.match_toler,
+                       cc_local_thresh=self.cc_local_thresh, nlocal_cc=self.nlocal_cc, nonlinear_counts=self.nonlinear_counts,
+                       sigdetect=sigdetect, fwhm=self.fwhm, debug_peaks=self.debug_peaks, debug_xcorr=self.debug_xcorr,
+                       debug_reid=self.debug_reid, arxiv=arxiv)
+        # Check if an acceptable reidentification solution was found
+        if not patt_dict['acceptable']:
+            return detections, spec_cont_sub, patt_dict, None
+
+        # Perform the fit
+        n_final = wvutils.parse_param(self.par, 'n_final', slit)
+        final_fit = wv_fitting.fit_slit(spec_cont_sub, patt_dict, detections, self.tot_line_list,
+                                        match_toler=self.match_toler,func=self.func, n_first=self.n_first,
+                                        sigrej_first=self.sigrej_first, n_final=n_final,sigrej_final=self.sigrej_final)
+        return detections, spec_cont_sub, patt_dict, final_fit
+
     def report_final(self):
         """Print out the final report of the wavelength calibration"""
         for slit in range(self.nslits):
@@ -1456,6 +1705,46 @@ class HolyGrail:
 
         return best_patt_dict, best_final_fit
 
+    def brute_slit(self, slit):
+        """
+        Detect the arc lines in a single slit and run the brute force
+        algorithm on the weak lines.
+
+        The minimum number of lines required to attempt a solution is
+        set by :func:`run_brute`.
+
+        Args:
+            slit (:obj:`int`):
+                Index of the slit.
+
+        Returns:
+            :obj:`tuple`: The line detections returned by the two calls
+            to :func:`~pypeit.core.wavecal.wvutils.arc_lines_from_spec`
+            (for the strong and weak lines, respectively), followed by
+            the best pattern dictionary and final fit returned by
+            :func:`run_brute_loop`. The latter two are None if there
+            were too few lines.
+        """
+        msgs.info("Working on slit: {}".format(slit))
+        # TODO Pass in all the possible params for detect_lines to arc_lines_from_spec, and update the parset
+        # Detect lines, and decide which tcent to use
+        self._all_tcent, self._all_ecent, self._cut_tcent, self._icut, _  =\
+            wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
+        self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak, self._icut_weak, _  =\
+            wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
+        detections = (self._all_tcent, self._all_ecent, self._cut_tcent, self._icut,
+                      self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak,
+                      self._icut_weak)
+
+        # Were there enough lines?
+        if self._all_tcent.size < self._min_nlines:
+            return detections + (None, None)
+
+        # Run brute force algorithm on the weak lines
+        det_weak = [self._all_tcent_weak[self._icut_weak].copy(),
+                    self._all_ecent_weak[self._icut_weak].copy()]
+        return detections + self.run_brute_loop(slit, det_weak)
+
     def run_brute(self, min_nlines=10):
         """Run through the parameter space and determine the best solution
         """
@@ -1466,17 +1755,20 @@ class HolyGrail:
         good_fit = np.zeros(self._nslit, dtype=np.bool)
         self._det_weak = {}
         self._det_stro = {}
+        # Detect the lines and find the best solution for each slit,
+        # using multiple processes if requested
+        self._min_nlines = min_nlines
+        slits = [slit for slit in range(self._nslit) if slit in self._ok_mask]
+        nproc = 1 if self._debug else self._par['nproc']
+        results = map_slits(self, 'brute_slit', slits, nproc=nproc)
+
         for slit in range(self._nslit):
-            msgs.info("Working on slit: {}".format(slit))
             if slit not in self._ok_mask:
                 self._all_final_fit[str(slit)] = None
                 continue
-            # TODO Pass in all the possible params for detect_lines to arc_lines_from_spec, and update the parset
-            # Detect lines, and decide which tcent to use
-            self._all_tcent, self._all_ecent, self._cut_tcent, self._icut, _  =\
-                wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
-            self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak, self._icut_weak, _  =\
-                wvutils.arc_lines_from_spec(self._spec[:, slit].copy(), sigdetect=self._sigdetect, nonlinear_counts = self._nonlinear_counts)
+            self._all_tcent, self._all_ecent, self._cut_tcent, self._icut, \
+                self._all_tcent_weak, self._all_ecent_weak, self._cut_tcent_weak, self._icut_weak, \
+                best_patt_dict, best_final_fit = results[slits.index(slit)]
 
             # Were there enough lines?  This mainly deals with junk slits
             if self._all_tcent.size < min_nlines:
@@ -1493,9 +1785,6 @@ class HolyGrail:
             self._det_weak[str(slit)] = [self._all_tcent_weak[self._icut_weak].copy(),self._all_ecent_weak[self._icut_weak].copy()]
             self._det_stro[str(slit)] = [self._all_tcent[self._icut].copy(),self._all_ecent[self._icut].copy()]
 
-            # Run brute force algorithm on the weak lines
-            best_patt_dict, best_final_fit = self.run_brute_loop(slit, self._det_weak[str(slit)])
-
             # Print preliminary report
             good_fit[slit] = self.report_prelim(slit, best_patt_dict, best_final_fit)
 
@@ -1950,6 +2239,7 @@ class HolyGrail:
             plt.subplot(212)
             plt.plot(xplt, dplt, 'bx')
             plt.show()
+            from IPython import embed
             embed()
 
         fact_nl = 1.2  # Non linear factor
@@ -1999,6 +2289,7 @@ class HolyGrail:
                 waves[:, slit] = utils.func_val(fitc, xv, func, minx=fmin, maxx=fmax)
 
         msgs.info("Performing a PCA on the order wavelength solutions")
+        from IPython import embed
         embed()
         pca_wave, outpar = pca.basis(xcen, waves, coeffs, lnpc, ofit, x0in=ords, mask=maskord, skipx0=False, function=func)
 
@@ -2086,6 +2377,7 @@ class HolyGrail:
                 plt.plot(final_fit['pixel_fit'], final_fit['wave_fit'], 'bx')
                 plt.plot(xplt, yplt, 'r-')
                 plt.show()
+                from IPython import embed
                 embed()
 
         # debugging
@@ -2113,6 +2405,7 @@ class HolyGrail:
             plt.subplot(212)
             plt.plot(xplt, dplt, 'bx')
             plt.show()
+            from IPython import embed
             embed()
 
         return new_bad_slits
@@ -2145,12 +2438,14 @@ class HolyGrail:
                     arr = self._all_tcent_weak.copy()[self._icut_weak]
                     err = self._all_ecent_weak.copy()[self._icut_weak]
                 else:
+                    from IPython import embed
                     embed()
             else:
                 if cut:
                     arr = self._all_tcent.copy()[self._icut]
                     err = self._all_ecent.copy()[self._icut]
                 else:
+                    from IPython import embed
                     embed()
         else:
             arr, err = arr_err[0], arr_err[1]
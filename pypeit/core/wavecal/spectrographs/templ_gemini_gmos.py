@@ -3,8 +3,6 @@ import os
 
 from pypeit.core.wavecal import templates
 
-from IPython import embed
-
 # ##############################
 def gemini_gmos_r400_hama(overwrite=False):  # GMOS R400 Hamamatsu
 
@@ -15,6 +13,7 @@ def gemini_gmos_r400_hama(overwrite=False):  # GMOS R400 Hamamatsu
     slits = [0, 2, 3, 0, 0]  # Be careful with the order..
     lcut = [5400., 6620., 8100., 9000.]
     wfile1 = os.path.join(templates.template_path, 'GMOS', 'R400', 'MasterWaveCalib_A_01_aa.json')
+    from IPython import embed
     embed(header='the file below is missing...')
     wfile5 = os.path.join(templates.template_path, 'GMOS', 'R400', 'MasterWaveCalib_A_05_aa.json')  # 5190 -- 6679
     # wfile2 = os.path.join(template_path, 'GMOS', 'R400', 'MasterWaveCalib_A_02_aa.json')
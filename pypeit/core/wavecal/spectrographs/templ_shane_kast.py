@@ -3,8 +3,6 @@ import os
 
 from pypeit.core.wavecal import templates
 
-from IPython import embed
-
 # Shane Kastb
 def shane_kastb_452(): #    if flg & (2**4):  # 452/3306
     binspec = 1
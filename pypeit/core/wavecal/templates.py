@@ -5,7 +5,6 @@
 
 import os
 import numpy as np
-from IPython import embed
 
 from matplotlib import pyplot as plt
 
@@ -242,6 +241,7 @@ def pypeit_arcspec(in_file, slit, binspec, binning=None):
                                           minx=iwv_calib['fmin'], maxx=iwv_calib['fmax'])
 
         if binning is not None and binning != binspec:
+            from IPython import embed
             embed(header='Not ready for this yet!')
         else:
             x = np.arange(len(iwv_calib['spec']))
@@ -2,13 +2,17 @@
 """
 import glob
 import os
+import io
+import copy
 import datetime
+import hashlib
 from pkg_resources import resource_filename
 from collections import OrderedDict
 
 import numpy as np
 
-from astropy.table import Table, Column, vstack
+from astropy.table import Table, Column, MaskedColumn, vstack
+from astropy.table import meta as table_meta
 
 import linetools.utils
 
@@ -16,13 +20,178 @@ import pypeit  # For path
 from pypeit import msgs
 from pypeit.core.wavecal import defs
 
-from IPython import embed
-
 # TODO: These should not be declared here
 line_path = resource_filename('pypeit', '/data/arc_lines/lists/')
 nist_path = resource_filename('pypeit','/data/arc_lines/NIST/')
 reid_arxiv_path = resource_filename('pypeit','/data/arc_lines/reid_arxiv/')
 
+# Parsed data files, keyed by the file name, modification time, and
+# size, and the reader arguments, in order of last use; see _read_table
+# and clear_cache.
+_memo = OrderedDict()
+_memo_size = 64
+# Directory with the on-disk cache of the parsed tables; see
+# set_cache_dir.  The cache is enabled by the ``linelist_cache``
+# parameter in :class:`~pypeit.par.pypeitpar.ReduxPar` or the
+# PYPEIT_LINELIST_CACHE environment variable.
+_cache_dir = os.getenv('PYPEIT_LINELIST_CACHE')
+# Version of the format of the on-disk cache files; changing it
+# invalidates all existing cache files.
+_cache_format = 2
+
+
+def set_cache_dir(cache_dir):
+    """
+    Set the directory used to cache the parsed line lists and
+    archived wavelength solutions on disk.
+
+    The parsed tables are saved as ``.npz`` files named after the
+    source file and the SHA-1 hash of its contents, such that
+    subsequent executions need not parse the (ASCII or FITS) source
+    files again.  Changing a source file changes its hash, which
+    invalidates the cached version.
+
+    By default, the directory is set by the ``PYPEIT_LINELIST_CACHE``
+    environment variable; :class:`~pypeit.pypeit.PypeIt` sets it to
+    the ``linelist_cache`` parameter in
+    :class:`~pypeit.par.pypeitpar.ReduxPar`, if provided.
+
+    Args:
+        cache_dir (:obj:`str`):
+            Directory for the cached files.  It is created when the
+            first file is cached.  If None, the on-disk cache is
+            disabled.
+    """
+    global _cache_dir
+    _cache_dir = cache_dir
+
+
+def clear_cache():
+    """
+    Clear the in-memory cache of parsed data files.
+    """
+    _memo.clear()
+
+
+def _memo_get(key, load):
+    """
+    Return an item from the in-memory cache.
+
+    The cache keeps the :attr:`_memo_size` most recently used items.
+
+    Args:
+        key (:obj:`tuple`):
+            Key of the item.
+        load (callable):
+            Function without arguments that constructs the item if
+            it is not in the cache.
+
+    Returns:
+        object: The cached item.
+    """
+    if key in _memo:
+        _memo.move_to_end(key)
+        return _memo[key]
+    _memo[key] = load()
+    if len(_memo) > _memo_size:
+        _memo.popitem(last=False)
+    return _memo[key]
+
+
+def _file_key(filename):
+    """
+    Return the key used to identify a file in the in-memory cache.
+    """
+    stat = os.stat(filename)
+    return os.path.abspath(filename), stat.st_mtime_ns, stat.st_size
+
+
+def _cache_file(filename, kwargs):
+    """
+    Return the name of the on-disk cache file for a source file read
+    with the provided reader arguments.
+    """
+    with open(filename, 'rb') as f:
+        sha = hashlib.sha1(f.read())
+    sha.update(repr((_cache_format, sorted(kwargs.items()))).encode())
+    return os.path.join(_cache_dir, '{0}.{1}.npz'.format(os.path.basename(filename),
+                                                        sha.hexdigest()))
+
+
+def _write_table_cache(tbl, ofile):
+    """
+    Write a table to an ``.npz`` cache file.
+
+    The column data and masks are saved as arrays.  The table
+    metadata and the unit, description, and format of each column are
+    saved as the YAML header used by the astropy ECSV format.
+    """
+    arrays = {'colnames': np.array(tbl.colnames),
+              'header': np.array(table_meta.get_yaml_from_table(tbl))}
+    for i, name in enumerate(tbl.colnames):
+        arrays['data{0}'.format(i)] = np.asarray(tbl[name].data)
+        if isinstance(tbl[name], MaskedColumn):
+            arrays['mask{0}'.format(i)] = np.ma.getmaskarray(tbl[name])
+    if not os.path.isdir(os.path.dirname(ofile)):
+        os.makedirs(os.path.dirname(ofile), exist_ok=True)
+    # Write to a temporary file and then move it so that other
+    # processes never see a partially written file
+    tmpfile = '{0}.{1}.tmp'.format(ofile, os.getpid())
+    with open(tmpfile, 'wb') as f:
+        np.savez(f, **arrays)
+    os.replace(tmpfile, ofile)
+
+
+def _read_table_cache(ifile):
+    """
+    Read a table from an ``.npz`` cache file written by
+    :func:`_write_table_cache`.
+    """
+    with np.load(ifile) as arrays:
+        header = table_meta.get_header_from_yaml(arrays['header'].tolist())
+        tbl = Table(meta=header.get('meta', {}))
+        for i, name in enumerate(arrays['colnames']):
+            data = arrays['data{0}'.format(i)]
+            mask = 'mask{0}'.format(i)
+            attrs = {k: header['datatype'][i].get(k)
+                        for k in ['unit', 'description', 'format']}
+            tbl[str(name)] = MaskedColumn(data=data, mask=arrays[mask], **attrs) \
+                                if mask in arrays.files else Column(data=data, **attrs)
+    return tbl
+
+
+def _read_table(filename, **kwargs):
+    """
+    Read a table, caching the result.
+
+    The table is read by `astropy.table.Table.read`_ only the first
+    time it is requested; a copy of the cached table is returned
+    thereafter, unless the file has been modified.  If an on-disk
+    cache directory has been set (see :func:`set_cache_dir`), the
+    parsed table is also saved there and read from the cache by
+    subsequent executions.
+
+    Args:
+        filename (:obj:`str`):
+            File with the table.
+        **kwargs:
+            Passed directly to `astropy.table.Table.read`_.
+
+    Returns:
+        `astropy.table.Table`_: The table.
+    """
+    def load():
+        cache_file = None if _cache_dir is None else _cache_file(filename, kwargs)
+        if cache_file is not None and os.path.isfile(cache_file):
+            return _read_table_cache(cache_file)
+        tbl = Table.read(filename, **kwargs)
+        if cache_file is not None:
+            _write_table_cache(tbl, cache_file)
+        return tbl
+
+    key = ('table',) + _file_key(filename) + (tuple(sorted(kwargs.items())),)
+    return _memo_get(key, load).copy()
+
 
 # TODO -- Move this to the WaveCalib object
 def load_wavelength_calibration(filename):
@@ -40,7 +209,8 @@ def load_wavelength_calibration(filename):
     if not os.path.isfile(filename):
         msgs.error('File does not exist: {0}'.format(filename))
 
-    wv_calib = linetools.utils.loadjson(filename)
+    wv_calib = copy.deepcopy(_memo_get(('json',) + _file_key(filename),
+                                       lambda: linetools.utils.loadjson(filename)))
 
     # Recast a few items as arrays
     for key in wv_calib.keys():
@@ -118,14 +288,13 @@ def load_reid_arxiv(arxiv_file):
     elif calibfile[-4:] == 'fits':
         # The following is a bit of a hack too
         par = None
-        wv_tbl = Table.read(calibfile)
+        wv_tbl = _read_table(calibfile)
+        flux = wv_tbl['flux'].data
+        wave = wv_tbl['wave'].data
         wv_calib_arxiv = OrderedDict()
-        nrow = wv_tbl['wave'].shape[0]
-        for irow in np.arange(nrow):
-            wv_calib_arxiv[str(irow)] = {}
-            wv_calib_arxiv[str(irow)]['spec'] = wv_tbl['flux'][irow,:]
-            wv_calib_arxiv[str(irow)]['wave_soln'] = wv_tbl['wave'][irow,:]
-            wv_calib_arxiv[str(irow)]['order'] = wv_tbl['order'][irow]
+        for irow in range(wave.shape[0]):
+            wv_calib_arxiv[str(irow)] = {'spec': flux[irow,:], 'wave_soln': wave[irow,:],
+                                         'order': wv_tbl['order'][irow]}
     else:
         msgs.error("Not ready for this extension!")
 
@@ -191,7 +360,7 @@ def load_line_list(line_file, add_path=False, use_ion=False, NIST=False):
             line_file = path+'{:s}_vacuum.ascii'.format(line_file)
         else:
             line_file = path+'{:s}_lines.dat'.format(line_file)
-    line_list = Table.read(line_file, format='ascii.fixed_width', comment='#')
+    line_list = _read_table(line_file, format='ascii.fixed_width', comment='#')
     #  NIST?
     if NIST:
         # Remove unwanted columns
@@ -349,8 +518,12 @@ def load_tree(polygon=4, numsearch=20):
     fileindx = pypeit.__path__[0] +\
                '/data/arc_lines/lists/ThAr_patterns_poly{0:d}_search{1:d}.index.npy'.format(polygon, numsearch)
     try:
-        file_load = pickle.load(open(filename, 'rb'))
-        index = np.load(fileindx)
+        # The tree is not modified by the pattern matching, so the
+        # cached tree is returned directly
+        file_load, index = _memo_get(('tree',) + _file_key(filename) + _file_key(fileindx),
+                                     lambda: (pickle.load(open(filename, 'rb')),
+                                              np.load(fileindx)))
+        index = index.copy()
     except FileNotFoundError:
         msgs.info('The requested KDTree was not found on disk' + msgs.newline() +
                   'please be patient while the ThAr KDTree is built and saved to disk.')
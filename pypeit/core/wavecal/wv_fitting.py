@@ -16,8 +16,6 @@ from pypeit import msgs
 
 from pypeit import datamodel
 
-from IPython import embed
-
 
 class WaveFit(datamodel.DataContainer):
     """
@@ -15,6 +15,7 @@ from matplotlib import pyplot as plt
 from scipy.ndimage.filters import gaussian_filter
 from scipy.signal import resample
 import scipy
+import scipy.fft
 from scipy.optimize import curve_fit
 
 from astropy.table import Table
@@ -22,8 +23,6 @@ from astropy.table import Table
 from pypeit import msgs
 from pypeit.core import arc
 
-from IPython import embed
-
 def parse_param(par, key, slit):
     # Find good lines for the tilts
     param_in = par[key]
@@ -207,8 +206,10 @@ def zerolag_shift_stretch(theta, y1, y2):
 def smooth_ceil_cont(inspec1, smooth, percent_ceil = None, use_raw_arc=False,sigdetect = 10.0, fwhm = 4.0):
     """ Utility routine to smooth and apply a ceiling to spectra """
 
-    # ToDO can we improve the logic here. Technically if use_raw_arc = True and perecent_ceil=None
-    # we don't need to peak find or continuum subtract, but this makes the code pretty uggly.
+    if use_raw_arc and percent_ceil is None:
+        # No need to peak find or continuum subtract
+        spec1 = np.copy(inspec1)
+        return spec1 if smooth is None else scipy.ndimage.filters.gaussian_filter(spec1, smooth)
 
     # Run line detection to get the continuum subtracted arc
     tampl1, tampl1_cont, tcent1, twid1, centerr1, w1, arc1, nsig1 = arc.detect_lines(inspec1, sigdetect=sigdetect, fwhm=fwhm)
@@ -298,8 +299,82 @@ def xcorr_shift(inspec1,inspec2, smooth=1.0, percent_ceil=80.0, use_raw_arc=Fals
     return lag_max[0], corr_max[0]
 
 
+def xcorr_fft_length(nspec):
+    """
+    Return the length of the FFTs used by :func:`xcorr_shift_batch`
+    to compute the full cross-correlation of two spectra with
+    ``nspec`` pixels.
+    """
+    return scipy.fft.next_fast_len(2*nspec-1, real=True)
+
+
+def xcorr_shift_batch(y1, y2, y2_fft=None, debug=False):
+    """
+    Determine the shift of each of a set of spectra relative to a
+    single reference spectrum.
+
+    This is a batched version of :func:`xcorr_shift` for spectra that
+    have already been smoothed and ceiled (see
+    :func:`smooth_ceil_cont`); i.e., the result for each spectrum in
+    ``y2`` is the same as ``xcorr_shift(y1, y2[:,i], smooth=None,
+    percent_ceil=None, use_raw_arc=True)``. The cross-correlation with
+    all spectra is computed at once using FFTs, and the FFTs of the
+    spectra in ``y2`` can be precomputed.
+
+    Args:
+        y1 (`numpy.ndarray`_):
+            Reference spectrum with shape :math:`(N_{\rm spec},)`.
+        y2 (`numpy.ndarray`_):
+            Spectra for which to compute the shifts with shape
+            :math:`(N_{\rm spec},N_{\rm y2})`.
+        y2_fft (`numpy.ndarray`_, optional):
+            The real FFT of ``y2`` along its first axis, computed
+            with length :func:`xcorr_fft_length`. If None, this is
+            computed.
+        debug (:obj:`bool`, optional):
+            Plot the cross-correlation for each spectrum.
+
+    Returns:
+        :obj:`tuple`: Two `numpy.ndarray`_ objects with the shift and
+        the maximum of the cross-correlation coefficient for each
+        spectrum in ``y2``.
+    """
+    nspec = y1.size
+    if y2.ndim != 2 or y2.shape[0] != nspec:
+        msgs.error('Spectra to correlate must have shape ({0},N).'.format(nspec))
+    nfft = xcorr_fft_length(nspec)
+    _y2_fft = scipy.fft.rfft(y2, n=nfft, axis=0) if y2_fft is None else y2_fft
+    # Full cross-correlation for lags -nspec+1 to nspec-1; see
+    # scipy.signal.correlate
+    corr = scipy.fft.irfft(scipy.fft.rfft(y1, n=nfft)[:,None] * np.conj(_y2_fft), n=nfft, axis=0)
+    corr = np.concatenate((corr[nfft-nspec+1:], corr[:nspec]), axis=0)
+    corr_norm = corr/np.sqrt(np.sum(y1*y1)*np.sum(y2*y2, axis=0))[None,:]
+
+    lags = np.arange(-nspec + 1, nspec)
+    shift = np.zeros(y2.shape[1], dtype=float)
+    cross_corr = np.zeros(y2.shape[1], dtype=float)
+    for i in range(y2.shape[1]):
+        tampl_true, tampl, pix_max, twid, centerr, ww, arc_cont, nsig \
+                = arc.detect_lines(corr_norm[:,i], sigdetect=3.0, fit_frac_fwhm=1.5, fwhm=5.0,
+                                   cont_frac_fwhm=1.0, cont_samp=30, nfind=1)
+        cross_corr[i] = np.interp(pix_max, np.arange(lags.shape[0]), corr_norm[:,i])[0]
+        shift[i] = np.interp(pix_max, np.arange(lags.shape[0]), lags)[0]
+        if debug:
+            plt.figure(figsize=(14, 6))
+            plt.plot(lags, corr_norm[:,i], color='black', drawstyle = 'steps-mid', lw=3,
+                     label = 'x-corr', linewidth = 1.0)
+            plt.plot(shift[i], cross_corr[i],'g+', markersize =6.0, label = 'peak')
+            plt.title('Best shift = {:5.3f}'.format(shift[i])
+                      + ',  corr_max = {:5.3f}'.format(cross_corr[i]))
+            plt.legend()
+            plt.show()
+
+    return shift, cross_corr
+
+
 def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ceil=80.0, use_raw_arc=False,
-                        shift_mnmx=(-0.05,0.05), stretch_mnmx=(0.95,1.05), sigdetect = 10.0, fwhm = 4.0,debug=False, seed = None):
+                        shift_mnmx=(-0.05,0.05), stretch_mnmx=(0.95,1.05), sigdetect = 10.0, fwhm = 4.0,debug=False, seed = None,
+                        preprocessed=False, xcorr_init=None):
 
     """ Determine the shift and stretch of inspec2 relative to inspec1.  This routine computes an initial
     guess for the shift via maximimizing the cross-correlation. It then performs a two parameter search for the shift and stretch
@@ -352,6 +427,14 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
         specified, the calculation will not be repeatable
     debug = False
        Show plots to the screen useful for debugging.
+    preprocessed: bool, default = False
+        The input spectra have already been smoothed and ceiled by
+        smooth_ceil_cont (using smooth, percent_ceil, use_raw_arc,
+        sigdetect, and fwhm), such that this step is skipped.
+    xcorr_init: tuple, default = None
+        The initial shift and cross-correlation coefficient, e.g. from
+        xcorr_shift_batch. If None, these are computed using
+        xcorr_shift.
 
     Returns
     -------
@@ -393,11 +476,17 @@ def xcorr_shift_stretch(inspec1, inspec2, cc_thresh=-1.0, smooth=1.0, percent_ce
 
     nspec = inspec1.size
 
-    y1 = smooth_ceil_cont(inspec1,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
-    y2 = smooth_ceil_cont(inspec2,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
+    if preprocessed:
+        y1, y2 = inspec1, inspec2
+    else:
+        y1 = smooth_ceil_cont(inspec1,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
+        y2 = smooth_ceil_cont(inspec2,smooth,percent_ceil=percent_ceil,use_raw_arc=use_raw_arc, sigdetect = sigdetect, fwhm = fwhm)
 
     # Do the cross-correlation first and determine the initial shift
-    shift_cc, corr_cc = xcorr_shift(y1, y2, smooth = None, percent_ceil = None, use_raw_arc = True, sigdetect = sigdetect, fwhm=fwhm, debug = debug)
+    if xcorr_init is None:
+        shift_cc, corr_cc = xcorr_shift(y1, y2, smooth = None, percent_ceil = None, use_raw_arc = True, sigdetect = sigdetect, fwhm=fwhm, debug = debug)
+    else:
+        shift_cc, corr_cc = xcorr_init
 
     if corr_cc < cc_thresh:
         return -1, shift_cc, 1.0, corr_cc, shift_cc, corr_cc
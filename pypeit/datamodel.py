@@ -464,8 +464,6 @@ With this implementation:
 import os
 import warnings
 
-from IPython import embed
-
 import numpy as np
 import inspect
 
@@ -945,8 +943,9 @@ class DataContainer:
                     dm_type_passed &= hdu[hduindx].header['DMODCLS'] == cls.__name__
                     dm_version_passed &= hdu[hduindx].header['DMODVER'] == cls.version
                     # Grab it
-                    _d[e] = _hdu[hduindx].data if isinstance(hdu[hduindx], fits.ImageHDU) \
-                        else Table.read(hdu[hduindx])
+                    _d[e] = _hdu[hduindx].data \
+                            if isinstance(hdu[hduindx], (fits.ImageHDU, fits.CompImageHDU)) \
+                            else Table.read(hdu[hduindx])
 
         for e in _ext:
             if 'DMODCLS' not in _hdu[e].header.keys() or 'DMODVER' not in _hdu[e].header.keys() \
@@ -969,7 +968,7 @@ class DataContainer:
                 # Already parsed this above
                 continue
             # Parse BinTableHDUs
-            if isinstance(_hdu[e], fits.BinTableHDU) \
+            if isinstance(_hdu[e], fits.BinTableHDU) and not isinstance(_hdu[e], fits.CompImageHDU) \
                     and np.any(np.isin(list(cls.datamodel.keys()), _hdu[e].columns.names)):
                 parsed_hdus += [e if _hdu[e].name is None else _hdu[e].name]
                 found_data = True
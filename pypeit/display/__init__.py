@@ -2,14 +2,13 @@
 Register the ginga global plugin(s).
 """
 import os.path
-from pkg_resources import iter_entry_points
 import numpy
 
-from ginga.misc.Bunch import Bunch
-
 required_plugins = ['SlitWavelength']
 
 def plugins_available(return_report=False):
+    # Imported here to keep the import of pypeit.display fast
+    from pkg_resources import iter_entry_points
     available_plugins = []
     for entry_point in iter_entry_points(group='ginga.rv.plugins', name=None):
         spec = entry_point.load()()
@@ -23,6 +22,7 @@ def plugins_available(return_report=False):
     return result
 
 def setup_SlitWavelength():
+    from ginga.misc.Bunch import Bunch
     return Bunch(path=os.path.join(os.path.split(__file__)[0], 'ginga_plugins.py'),
                  module='ginga_plugins', klass='SlitWavelength',
                  ptype='global', workspace='right', start=False,
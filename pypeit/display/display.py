@@ -7,7 +7,6 @@ Module for ginga routines.  Mainly for debugging
 import os
 import numpy as np
 import time
-from IPython import embed
 
 import subprocess
 
@@ -21,8 +20,6 @@ import subprocess
 
 from astropy.io import fits
 
-from ginga.util import grc
-
 from pypeit import msgs
 from pypeit import io
 
@@ -45,6 +42,8 @@ def connect_to_ginga(host='localhost', port=9000, raise_err=False, allow_new=Fal
     Returns:
         RemoteClient: connection to ginga viewer.
     """
+    # Imported here so that ginga is only imported when it is used
+    from ginga.util import grc
     # Start
     viewer = grc.RemoteClient(host, port)
     # Test
@@ -162,6 +161,7 @@ def show_image(inp, chname='Image', waveimg=None, bitmask=None, mask=None, exten
     # Giddy up
 #    waveimg = None
     if waveimg is not None:
+        from ginga.util import grc
         sh = viewer.shell()
         args = [chname, chname, grc.Blob(img.tobytes()), img.shape, img.dtype.name, header,
                 grc.Blob(waveimg.tobytes()), waveimg.dtype.name, {}]
@@ -6,8 +6,6 @@ displayed for any image.
 .. include:: ../include/links.rst
 """
 
-from IPython import embed
-
 import numpy as np
 
 from ginga import GingaPlugin
@@ -104,8 +104,6 @@ import time
 import inspect
 from collections import OrderedDict
 
-from IPython import embed
-
 import numpy as np
 
 from scipy import ndimage
@@ -1691,7 +1689,9 @@ class EdgeTraceSet(DataContainer):
         collecting those that all cross a specific spectral row into
         groups that it can follow simultaneously. If a starting
         specral row is provided directly, all traces must cross that
-        row.
+        row. If ``follow_numba`` is True in :attr:`par`, the centroids
+        are followed using a compiled kernel that gives the same
+        result.
 
         Regardless of the value of ``follow``,
         :func:`~pypeit.core.trace.masked_centroid` is run with
@@ -1834,7 +1834,8 @@ class EdgeTraceSet(DataContainer):
                                                     maxshift_start=maxshift_start,
                                                     maxshift_follow=maxshift_follow,
                                                     maxerror=maxerror, continuous=continuous,
-                                                    bitmask=self.bitmask)
+                                                    bitmask=self.bitmask,
+                                                    use_numba=self.par['follow_numba'])
                     # Update untraced
                     untraced[to_trace] = False
             else:
@@ -2912,7 +2913,8 @@ class EdgeTraceSet(DataContainer):
                                       weighting=weighting, fwhm=fwhm, maxshift=maxshift,
                                       maxerror=maxerror, function=function, maxdev=maxdev,
                                       maxiter=maxiter, niter=niter, bitmask=self.bitmask,
-                                      debug=debug, idx=idx, xmin=xmin, xmax=xmax)
+                                      debug=debug, idx=idx, xmin=xmin, xmax=xmax,
+                                      use_numba=self.par['follow_numba'])
 
         # Save the results of the edge measurements
         self.edge_cen = cen
@@ -4092,16 +4094,15 @@ class EdgeTraceSet(DataContainer):
         # Sort slits in mm from the slit-mask design
         sortindx = np.argsort(self.spectrograph.slitmask.center[:, 0])
 
-        # Left (bottom) and right (top) traces in pixels from optical model (image plane and detector)
+        # Left (bottom) and right (top) traces in pixels from optical model (image plane and detector).
+        # Trace both edges of all slits at once.
+        nslits = self.spectrograph.slitmask.nslits
+        edges = np.concatenate((self.spectrograph.slitmask.bottom, self.spectrograph.slitmask.top))
+        omodel_coo = self.spectrograph.mask_to_pixel_coordinates(x=edges[:, 0], y=edges[:, 1])
         # bottom
-        omodel_bcoo = self.spectrograph.mask_to_pixel_coordinates(x=self.spectrograph.slitmask.bottom[:, 0],
-                                                                 y=self.spectrograph.slitmask.bottom[:, 1])
-        bedge_img, ccd_b, bedge_pix = omodel_bcoo[0], omodel_bcoo[2], omodel_bcoo[3]
-
+        bedge_img, ccd_b, bedge_pix = [omodel_coo[i][:nslits] for i in [0, 2, 3]]
         # top
-        omodel_tcoo = self.spectrograph.mask_to_pixel_coordinates(x=self.spectrograph.slitmask.top[:, 0],
-                                                                  y=self.spectrograph.slitmask.top[:, 1])
-        tedge_img, ccd_t, tedge_pix = omodel_tcoo[0], omodel_tcoo[2], omodel_tcoo[3]
+        tedge_img, ccd_t, tedge_pix = [omodel_coo[i][nslits:] for i in [0, 2, 3]]
 
         # Per each slit we take the median value of the traces over the wavelength direction. These medians will be used
         # for the cross-correlation with the traces found in the images.
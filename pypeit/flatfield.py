@@ -13,8 +13,6 @@ from scipy import interpolate
 
 from matplotlib import pyplot as plt
 
-from IPython import embed
-
 from pypeit import msgs
 from pypeit import utils
 from pypeit import bspline
@@ -803,6 +801,7 @@ class FlatField(object):
                                             kwargs_bspline={'bkspace': spec_samp_fine},
                                             kwargs_reject={'groupbadpix': True, 'maxrej': 5})
             except:
+                from IPython import embed
                 embed(header='808 of flatfield')
 
             if exit_status > 1:
@@ -1276,6 +1275,7 @@ class FlatField(object):
                 scale_model[onslit_init] = 1/slit_bspl.value((waveimg[onslit_init] - minw) / (maxw - minw))[0]
 
         if debug:
+            from IPython import embed
             embed()
             pltflat = self.rawflatimg.image.copy() / self.msillumflat.copy()
             censpec = np.round(0.5 * (self.slits.left_init + self.slits.right_init)).astype(np.int)
@@ -14,8 +14,6 @@ from pypeit.images import pypeitimage
 from pypeit.core import procimg
 from pypeit import utils
 
-from IPython import embed
-
 
 class ArcImage(pypeitimage.PypeItImage):
     """
@@ -127,7 +125,7 @@ def buildimage_fromlist(spectrograph, det, frame_par, file_list,
                         bias=None, bpm=None, dark=None,
                         flatimages=None,
                         maxiters=5,
-                        ignore_saturation=True, slits=None):
+                        ignore_saturation=True, slits=None, dtype=None):
     """
     Build a PypeItImage from a list of files (and instructions)
 
@@ -150,6 +148,10 @@ def buildimage_fromlist(spectrograph, det, frame_par, file_list,
         maxiters (int, optional):
         ignore_saturation (bool, optional):
             Should be True for calibrations and False otherwise
+        dtype (:obj:`str`, `numpy.dtype`_, optional):
+            Floating-point type for the processed images (e.g.,
+            ``'float32'``).  If None, the images are kept in double
+            precision.
 
     Returns:
         :class:`pypeit.images.pypeitimage.PypeItImage`:  Or one of its children
@@ -165,7 +167,8 @@ def buildimage_fromlist(spectrograph, det, frame_par, file_list,
                                    sigma_clip=frame_par['process']['clip'],
                                    sigrej=frame_par['process']['comb_sigrej'], maxiters=maxiters,
                                    ignore_saturation=ignore_saturation, slits=slits,
-                                   combine_method=frame_par['process']['combine'])
+                                   combine_method=frame_par['process']['combine'],
+                                   dtype=dtype)
     #
     # Decorate according to the type of calibration
     #   Primarily for handling MasterFrames
@@ -186,6 +189,7 @@ def buildimage_fromlist(spectrograph, det, frame_par, file_list,
         finalImage = pypeitImage
     else:
         finalImage = None
+        from IPython import embed
         embed(header=utils.embed_header())
 
     # Internals
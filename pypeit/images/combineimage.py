@@ -20,8 +20,6 @@ from pypeit.images import pypeitimage
 from pypeit.images import rawimage
 from pypeit.images import imagebitmask
 
-from IPython import embed
-
 
 class CombineImage:
     """
@@ -54,7 +52,8 @@ class CombineImage:
             msgs.error('Combineimage requires a list of files to instantiate')
 
     def run(self, bias=None, flatimages=None, ignore_saturation=False, sigma_clip=True,
-            bpm=None, sigrej=None, maxiters=5, slits=None, dark=None, combine_method='weightmean'):
+            bpm=None, sigrej=None, maxiters=5, slits=None, dark=None, combine_method='weightmean',
+            dtype=None):
         """
         Generate a PypeItImage from a list of images
 
@@ -80,6 +79,11 @@ class CombineImage:
             combine_method (str):
                 Method to combine images
                 Allowed options are 'weightmean', 'median'
+            dtype (:obj:`str`, `numpy.dtype`_, optional):
+                Floating-point type for the processed and combined
+                images.  If None, the images are kept in double
+                precision.  The images are always combined using
+                double-precision sums.
 
         Returns:
             :class:`pypeit.images.pypeitimage.PypeItImage`:
@@ -93,7 +97,7 @@ class CombineImage:
             rawImage = rawimage.RawImage(ifile, self.spectrograph, self.det)
             # Process
             pypeitImage = rawImage.process(self.par, bias=bias, bpm=bpm, dark=dark,
-                                           flatimages=flatimages, slits=slits)
+                                           flatimages=flatimages, slits=slits, dtype=dtype)
             #embed(header='96 of combineimage')
             # Are we all done?
             if nimages == 1:
@@ -101,9 +105,9 @@ class CombineImage:
             elif kk == 0:
                 # Get ready
                 shape = (nimages, pypeitImage.image.shape[0], pypeitImage.image.shape[1])
-                img_stack = np.zeros(shape)
-                ivar_stack= np.zeros(shape)
-                rn2img_stack = np.zeros(shape)
+                img_stack = np.zeros(shape, dtype=pypeitImage.image.dtype)
+                ivar_stack= np.zeros(shape, dtype=pypeitImage.image.dtype)
+                rn2img_stack = np.zeros(shape, dtype=pypeitImage.image.dtype)
                 crmask_stack = np.zeros(shape, dtype=bool)
                 # Mask
                 bitmask = imagebitmask.ImageBitMask()
@@ -127,9 +131,7 @@ class CombineImage:
             # TODO This seems kludgy to me. Why not just pass ignore_saturation to process_one and ignore the saturation
             # when the mask is actually built, rather than untoggling the bit here
             if ignore_saturation:  # Important for calibrations as we don't want replacement by 0
-                indx = pypeitImage.bitmask.flagged(pypeitImage.fullmask, flag=['SATURATION'])
-                pypeitImage.fullmask[indx] = pypeitImage.bitmask.turn_off(
-                    pypeitImage.fullmask[indx], 'SATURATION')
+                pypeitImage.bitmask.turn_off(pypeitImage.fullmask, 'SATURATION', inplace=True)
             mask_stack[kk, :, :] = pypeitImage.fullmask
 
         # Check that the lamps being combined are all the same:
@@ -164,11 +166,15 @@ class CombineImage:
         else:
             msgs.error("Bad choice for combine.  Allowed options are 'median', 'weightmean'.")
 
-        # Build the last one
-        final_pypeitImage = pypeitimage.PypeItImage(img_list_out[0],
-                                                    ivar=utils.inverse(var_list_out[0]),
+        # Build the last one; the combined images are returned in double
+        # precision and need to be cast back to the working precision
+        final_pypeitImage = pypeitimage.PypeItImage(img_list_out[0].astype(img_stack.dtype,
+                                                                           copy=False),
+                                                    ivar=utils.inverse(var_list_out[0]).astype(
+                                                            img_stack.dtype, copy=False),
                                                     bpm=pypeitImage.bpm,
-                                                    rn2img=var_list_out[1],
+                                                    rn2img=var_list_out[1].astype(
+                                                            img_stack.dtype, copy=False),
                                                     crmask=np.logical_not(gpm),
                                                     detector=pypeitImage.detector,
                                                     PYP_SPEC=pypeitImage.PYP_SPEC)
@@ -5,8 +5,6 @@ import inspect
 
 from pypeit import datamodel
 
-from IPython import embed
-
 
 class DetectorContainer(datamodel.DataContainer):
     """
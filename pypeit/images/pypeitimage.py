@@ -15,8 +15,6 @@ from pypeit import datamodel
 from pypeit import utils
 from pypeit import masterframe
 
-from IPython import embed
-
 
 class PypeItImage(datamodel.DataContainer):
     """
@@ -238,37 +236,37 @@ class PypeItImage(datamodel.DataContainer):
         # Bad pixel mask
         if self.bpm is not None:
             indx = self.bpm.astype(bool)
-            self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'BPM')
+            self.bitmask.turn_on(self.fullmask, 'BPM', inplace=True, where=indx)
 
         # Cosmic rays
         if self.crmask is not None:
             indx = self.crmask.astype(bool)
-            self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'CR')
+            self.bitmask.turn_on(self.fullmask, 'CR', inplace=True, where=indx)
 
         # Saturated pixels
         indx = self.image >= _saturation
-        self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'SATURATION')
+        self.bitmask.turn_on(self.fullmask, 'SATURATION', inplace=True, where=indx)
 
         # Minimum counts
         indx = self.image <= _mincounts
-        self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'MINCOUNTS')
+        self.bitmask.turn_on(self.fullmask, 'MINCOUNTS', inplace=True, where=indx)
 
         # Undefined counts
         indx = np.invert(np.isfinite(self.image))
-        self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'IS_NAN')
+        self.bitmask.turn_on(self.fullmask, 'IS_NAN', inplace=True, where=indx)
 
         if self.ivar is not None:
             # Bad inverse variance values
             indx = np.invert(self.ivar > 0.0)
-            self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'IVAR0')
+            self.bitmask.turn_on(self.fullmask, 'IVAR0', inplace=True, where=indx)
 
             # Undefined inverse variances
             indx = np.invert(np.isfinite(self.ivar))
-            self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'IVAR_NAN')
+            self.bitmask.turn_on(self.fullmask, 'IVAR_NAN', inplace=True, where=indx)
 
         if slitmask is not None:
             indx = slitmask == -1
-            self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'OFFSLITS')
+            self.bitmask.turn_on(self.fullmask, 'OFFSLITS', inplace=True, where=indx)
 
 
     def update_mask_slitmask(self, slitmask):
@@ -283,7 +281,7 @@ class PypeItImage(datamodel.DataContainer):
         # Pixels excluded from any slit.
         indx = slitmask == -1
         # Finish
-        self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'OFFSLITS')
+        self.bitmask.turn_on(self.fullmask, 'OFFSLITS', inplace=True, where=indx)
 
     def update_mask_cr(self, crmask_new):
         """
@@ -298,7 +296,7 @@ class PypeItImage(datamodel.DataContainer):
         """
         self.fullmask = self.bitmask.turn_off(self.fullmask, 'CR')
         indx = crmask_new.astype(bool)
-        self.fullmask[indx] = self.bitmask.turn_on(self.fullmask[indx], 'CR')
+        self.bitmask.turn_on(self.fullmask, 'CR', inplace=True, where=indx)
 
     def sub(self, other, par):
         """
@@ -17,8 +17,6 @@ from pypeit.images import pypeitimage
 from pypeit import utils
 from pypeit.display import display
 
-from IPython import embed
-
 class RawImage(object):
     """
     Class to load and process a raw image
@@ -171,7 +169,7 @@ class RawImage(object):
         return self.rn2img.copy()
 
     def process(self, par, bpm=bpm, flatimages=None, bias=None,
-                slits=None, debug=False, dark=None):
+                slits=None, debug=False, dark=None, dtype=None):
         """
         Process the image
 
@@ -199,6 +197,10 @@ class RawImage(object):
                 Bias image
             slits (:class:`pypeit.slittrace.SlitTraceSet`, optional):
                 Used to calculate spatial flexure between the image and the slits
+            dtype (:obj:`str`, `numpy.dtype`_, optional):
+                Floating-point type for the processed image, its
+                inverse variance, and the read-noise image.  If None,
+                the images are kept in double precision.
 
         Returns:
             :class:`pypeit.images.pypeitimage.PypeItImage`:
@@ -206,6 +208,8 @@ class RawImage(object):
         """
         self.par = par
         self._bpm = bpm
+        if dtype is not None:
+            self.image = self.image.astype(dtype, copy=False)
 
         # Get started
         # Standard order
@@ -268,6 +272,11 @@ class RawImage(object):
         # Extras
         self.build_rn2img()
         self.build_ivar()
+        if dtype is not None:
+            # Some of the processing steps return double-precision images
+            self.image = self.image.astype(dtype, copy=False)
+            self.ivar = self.ivar.astype(dtype, copy=False)
+            self.rn2img = self.rn2img.astype(dtype, copy=False)
 
         # Generate a PypeItImage
         pypeitImage = pypeitimage.PypeItImage(self.image, ivar=self.ivar, rn2img=self.rn2img,
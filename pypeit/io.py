@@ -12,6 +12,8 @@ import sys
 import warnings
 import gzip
 import shutil
+import collections
+from concurrent.futures import ThreadPoolExecutor
 from packaging import version
 
 import numpy
@@ -31,8 +33,6 @@ import sklearn
 import pypeit
 import time
 
-from IPython import embed
-
 # TODO -- Move this module to core/
 
 def init_record_array(shape, dtype):
@@ -154,10 +154,15 @@ def rec_to_bintable(arr, name=None, hdr=None):
                                             for n in arr.dtype.names], name=name, header=hdr)
 
 
-def compress_file(ifile, overwrite=False, rm_original=True):
+def compress_file(ifile, overwrite=False, rm_original=True, nproc=-1, blocksize=4*2**20):
     """
     Compress a file using gzip package.
-    
+
+    The file is compressed in blocks that are compressed concurrently
+    by a pool of threads, each block written as a separate gzip
+    member.  The result is a standard (multi-member) gzip file that can
+    be read by ``gunzip``, `gzip`_, `astropy.io.fits.open`_, etc.
+
     Args:
         ifile (:obj:`str`):
             Name of file to compress.  Output file with have the same
@@ -169,6 +174,11 @@ def compress_file(ifile, overwrite=False, rm_original=True):
             uncompressed and compressed file will exist when the
             compression is finished.  If this is True, the original
             (uncompressed) file is removed.
+        nproc (:obj:`int`, optional):
+            Number of threads used to compress the file.  If less than
+            1, use all available CPUs.
+        blocksize (:obj:`int`, optional):
+            Number of (uncompressed) bytes in each compressed block.
 
     Raises:
         ValueError:
@@ -185,9 +195,31 @@ def compress_file(ifile, overwrite=False, rm_original=True):
         raise FileExistsError('{0} exists! To overwrite, set overwrite=True.'.format(ofile))
 
     # Compress the file
-    with open(ifile, 'rb') as f_in:
-        with gzip.open(ofile, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
+    _nproc = os.cpu_count() if nproc < 1 else nproc
+    with open(ifile, 'rb') as f_in, open(ofile, 'wb') as f_out:
+        blocks = iter(lambda: f_in.read(blocksize), b'')
+        if _nproc < 2:
+            nblocks = 0
+            for block in blocks:
+                f_out.write(gzip.compress(block))
+                nblocks += 1
+        else:
+            # zlib releases the GIL, so the blocks are compressed in
+            # parallel.  Limit the number of blocks held in memory, and
+            # write them in order.
+            nblocks = 0
+            pending = collections.deque()
+            with ThreadPoolExecutor(max_workers=_nproc) as executor:
+                for block in blocks:
+                    pending.append(executor.submit(gzip.compress, block))
+                    nblocks += 1
+                    if len(pending) > 2*_nproc:
+                        f_out.write(pending.popleft().result())
+                while len(pending) > 0:
+                    f_out.write(pending.popleft().result())
+        if nblocks == 0:
+            # Empty file
+            f_out.write(gzip.compress(b''))
 
     if rm_original:
         # Remove the uncompressed file
@@ -608,6 +640,47 @@ def write_to_hdu(d, name=None, hdr=None, force_to_bintbl=False):
     raise TypeError('Input must be a dictionary, astropy.table.Table, list, or numpy.ndarray.')
 
 
+def compress_image_hdu(hdu, float32=True):
+    """
+    Convert an image HDU to a tile-compressed image HDU.
+
+    The compression is lossless: integer images are compressed using
+    ``RICE_1`` and floating-point images using ``GZIP_2`` without
+    quantization.  64-bit integer images cannot be tile compressed;
+    they are converted to 32-bit integers if that does not change
+    their values and are otherwise returned uncompressed.
+
+    Args:
+        hdu (`astropy.io.fits.ImageHDU`_):
+            HDU to compress.  Other HDU types are returned unchanged.
+        float32 (:obj:`bool`, optional):
+            Convert floating-point images to single precision before
+            compressing them.
+
+    Returns:
+        `astropy.io.fits.CompImageHDU`_, `astropy.io.fits.ImageHDU`_,
+        `astropy.io.fits.BinTableHDU`_: The compressed HDU, or the
+        input HDU if it cannot be compressed.
+    """
+    if not isinstance(hdu, fits.ImageHDU) or hdu.data is None:
+        return hdu
+    data = hdu.data
+    if numpy.issubdtype(data.dtype, numpy.floating):
+        if float32:
+            data = data.astype(numpy.float32)
+        return fits.CompImageHDU(data=data, header=hdu.header, name=hdu.name,
+                                 compression_type='GZIP_2', quantize_level=0)
+    if numpy.issubdtype(data.dtype, numpy.integer):
+        if data.dtype.itemsize > 4:
+            if data.size > 0 and (numpy.amin(data) < numpy.iinfo(numpy.int32).min
+                                  or numpy.amax(data) > numpy.iinfo(numpy.int32).max):
+                return hdu
+            data = data.astype(numpy.int32)
+        return fits.CompImageHDU(data=data, header=hdu.header, name=hdu.name,
+                                 compression_type='RICE_1')
+    return hdu
+
+
 def write_to_fits(d, ofile, name=None, hdr=None, overwrite=False, checksum=True):
     """
     Write the provided object to a fits file.
@@ -619,19 +692,17 @@ def write_to_fits(d, ofile, name=None, hdr=None, overwrite=False, checksum=True)
 
     If the provided file name includes the '.gz' extension, the file
     is first written using `astropy.io.fits.HDUList.writeto`_ and
-    then compressed using :func:`compress_file`.
+    then compressed in parallel using :func:`compress_file`.
     
     .. note::
 
         - If the root directory of the output does *not* exist, this
           method will create it.
-        - Compressing the file is generally slow, but following the
-          two-step process of running
+        - Following the two-step process of running
           `astropy.io.fits.HDUList.writeto`_ and then
-          :func:`compress_file` is generally faster than having
+          :func:`compress_file` is much faster than having
           `astropy.io.fits.HDUList.writeto`_ do the compression,
-          particularly for files with many extensions (or at least
-          this was true in the past).
+          which is single-threaded.
 
     Args:
         d (:obj:`dict`, :obj:`list`, `numpy.ndarray`_, `astropy.table.Table`_, `astropy.io.fits.HDUList`_):
@@ -670,9 +741,7 @@ def write_to_fits(d, ofile, name=None, hdr=None, overwrite=False, checksum=True)
                  [fits.PrimaryHDU(header=_hdr)] + [write_to_hdu(d, name=name, hdr=_hdr)]
                  ).writeto(_ofile, overwrite=True, checksum=checksum)
 
-    # Compress the file if the output filename has a '.gz' extension;
-    # this is slow but still faster than if you have astropy.io.fits do
-    # it directly
+    # Compress the file if the output filename has a '.gz' extension
     # TODO: use pypmsgs?
     if _ofile is not ofile:
         pypeit.msgs.info('Compressing file: {0}'.format(_ofile))
@@ -680,6 +749,82 @@ def write_to_fits(d, ofile, name=None, hdr=None, overwrite=False, checksum=True)
     pypeit.msgs.info('File written to: {0}'.format(ofile))
 
 
+def append_hdus(ofile, hdus, primary_hdr=None, reserve=0):
+    """
+    Append HDUs to a fits file without reading or rewriting the
+    extensions already in the file.
+
+    If the file does not exist, it is first created with an empty
+    primary HDU.  This allows large, multi-extension files to be
+    written in pieces, as the data become available.
+
+    Args:
+        ofile (:obj:`str`):
+            File name (path) for the fits file.
+        hdus (:obj:`list`):
+            List of HDUs to append.  The list must not include a
+            primary HDU.
+        primary_hdr (`astropy.io.fits.Header`_, optional):
+            Header for the primary HDU, if the file is created.
+        reserve (:obj:`int`, optional):
+            Number of blank cards to add to the end of the primary
+            header, if the file is created.  Keywords added later
+            using :func:`update_primary_header` replace these blank
+            cards; otherwise, adding keywords can require the full
+            file to be rewritten.
+    """
+    if not os.path.isfile(ofile):
+        prihdu = fits.PrimaryHDU(header=primary_hdr)
+        for i in range(reserve):
+            prihdu.header.append(fits.Card(), bottom=True)
+        prihdu.writeto(ofile)
+    with fits.open(ofile, mode='append') as hdul:
+        for hdu in hdus:
+            hdul.append(hdu)
+
+
+def update_primary_header(ofile, cards):
+    """
+    Update the primary header of a fits file in place.
+
+    The extensions in the file are not read.  The file is only
+    rewritten if the updated header no longer fits in the space
+    allocated to the existing header; see :func:`append_hdus`.
+
+    Args:
+        ofile (:obj:`str`):
+            File name (path) for the fits file.
+        cards (:obj:`dict`):
+            Keywords and values to set.  Keywords with a value of
+            None are removed from the header, if present.
+    """
+    with fits.open(ofile, mode='update') as hdul:
+        for key, value in cards.items():
+            if value is None:
+                hdul[0].header.remove(key, ignore_missing=True)
+            else:
+                hdul[0].header[key] = value
+
+
+def truncate_fits(ofile, nhdu):
+    """
+    Remove all but the first ``nhdu`` HDUs from a fits file, in place.
+
+    This is used to remove the extensions, including any partially
+    written extension, appended to a file by an interrupted call to
+    :func:`append_hdus`.
+
+    Args:
+        ofile (:obj:`str`):
+            File name (path) for the fits file.
+        nhdu (:obj:`int`):
+            Number of HDUs to keep, including the primary HDU.
+    """
+    with fits.open(ofile) as hdul:
+        info = hdul[nhdu-1].fileinfo()
+    os.truncate(ofile, info['datLoc'] + info['datSpan'])
+
+
 def hdu_iter_by_ext(hdu, ext=None, hdu_prefix=None):
     """
     Convert the input to lists that can be iterated through by an
@@ -6,7 +6,6 @@ Implements the master frame base class.
 
 """
 import os
-from IPython import embed
 from abc import ABCMeta
 
 import numpy as np
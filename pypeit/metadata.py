@@ -25,7 +25,6 @@ from pypeit.io import dict_to_lines
 from pypeit.par import PypeItPar
 from pypeit.par.util import make_pypeit_file
 from pypeit.bitmask import BitMask
-from IPython import embed
 
 # TODO: Turn this into a DataContainer
 # Initially tried to subclass this from astropy.table.Table, but that
@@ -293,6 +292,7 @@ class PypeItMetaData:
         if len(existing_keys) > 0 and match_type:
             for key in existing_keys:
                 if len(self.table[key].shape) > 1:  # NOT ALLOWED!!
+                    from IPython import embed
                     embed(header='372 of metadata')
                 elif key in meta_data_model.keys(): # Is this meta data??
                     dtype = meta_data_model[key]['dtype']
@@ -60,7 +60,6 @@ import os
 import warnings
 from pkg_resources import resource_filename
 import inspect
-from IPython import embed
 from collections import OrderedDict
 
 import numpy
@@ -1041,7 +1040,7 @@ class Coadd2DPar(ParSet):
     For a table with the current keywords, defaults, and descriptions,
     see :ref:`pypeitpar`.
     """
-    def __init__(self, offsets=None, weights=None, use_slits4wvgrid=None):
+    def __init__(self, offsets=None, weights=None, use_slits4wvgrid=None, stream=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -1070,6 +1069,17 @@ class Coadd2DPar(ParSet):
         dtypes['weights'] = [str, list]
         descr['weights'] = 'Mode for the weights used to coadd images.  See coadd2d.py for all options.'
 
+        # Streaming
+        defaults['stream'] = False
+        dtypes['stream'] = bool
+        descr['stream'] = 'Read the section of each spec2d image that covers a slit only when ' \
+                          'that slit is coadded, instead of holding the full images of all ' \
+                          'the exposures in memory.  This limits the memory use to the ' \
+                          'images of one slit, at the cost of reading the files once per slit.  ' \
+                          'Compact spec2d files (see spec2d_compact) cannot be read in ' \
+                          'sections; their images are decompressed once and held in memory ' \
+                          'until the coadd is complete.'
+
         # Instantiate the parameter set
         super(Coadd2DPar, self).__init__(list(pars.keys()),
                                                  values=list(pars.values()),
@@ -1081,7 +1091,7 @@ class Coadd2DPar(ParSet):
     @classmethod
     def from_dict(cls, cfg):
         k = numpy.array([*cfg.keys()])
-        parkeys = ['offsets', 'weights', 'use_slits4wvgrid']
+        parkeys = ['offsets', 'weights', 'use_slits4wvgrid', 'stream']
 
         badkeys = numpy.array([pk not in parkeys for pk in k])
         if numpy.any(badkeys):
@@ -1111,7 +1121,8 @@ class CubePar(ParSet):
     def __init__(self, slit_spec=None, relative_weights=None, combine=None, output_filename=None,
                  standard_cube=None, flux_calibrate=None, reference_image=None, save_whitelight=None,
                  ra_min=None, ra_max=None, dec_min=None, dec_max=None, wave_min=None, wave_max=None,
-                 spatial_delta=None, wave_delta=None):
+                 spatial_delta=None, wave_delta=None, method=None, stream=None, scratch_dir=None,
+                 memmap=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -1215,6 +1226,35 @@ class CubePar(ParSet):
         descr['wave_delta'] = 'The wavelength step to use when generating the WCS (in Angstroms).' \
                                 'If None, the default is set by the wavelength solution.'
 
+        defaults['method'] = 'ngp'
+        options['method'] = CubePar.valid_methods()
+        dtypes['method'] = str
+        descr['method'] = 'Method used to resample the detector pixels onto the datacube. Options ' \
+                          'are: {0}. '.format(', '.join(options['method'])) + \
+                          'With ngp, each pixel is assigned to the voxel that contains its centre ' \
+                          '(nearest grid point). With drizzle, the flux of each pixel is distributed ' \
+                          'over all the voxels that overlap with its footprint on the sky and in ' \
+                          'wavelength, in proportion to the overlapping area. The latter allows for ' \
+                          'finer spaxels (spatial_delta) with fewer exposures.'
+
+        defaults['stream'] = False
+        dtypes['stream'] = bool
+        descr['stream'] = 'If set to True, the spec2d files are loaded and processed one at a time, ' \
+                          'and the datacube is accumulated incrementally. The processed pixels of ' \
+                          'each spec2d file are cached on disk (see scratch_dir), such that the ' \
+                          'pixels of all input frames are never held in memory at the same time. ' \
+                          'Use this option when combining a large number of exposures.'
+
+        defaults['scratch_dir'] = None
+        dtypes['scratch_dir'] = str
+        descr['scratch_dir'] = 'Directory used for the temporary files written when stream is True. ' \
+                               'If None, the default temporary directory of the system is used.'
+
+        defaults['memmap'] = False
+        dtypes['memmap'] = bool
+        descr['memmap'] = 'If set to True (and stream is True), the output cubes are accumulated in ' \
+                          'memory-mapped arrays stored in scratch_dir.'
+
         # Instantiate the parameter set
         super(CubePar, self).__init__(list(pars.keys()),
                                       values=list(pars.values()),
@@ -1231,7 +1271,8 @@ class CubePar(ParSet):
         # Basic keywords
         parkeys = ['slit_spec', 'output_filename', 'standard_cube', 'flux_calibrate', 'reference_image',
                    'save_whitelight', 'ra_min', 'ra_max', 'dec_min', 'dec_max', 'wave_min', 'wave_max',
-                   'spatial_delta', 'wave_delta', 'relative_weights', 'combine']
+                   'spatial_delta', 'wave_delta', 'relative_weights', 'combine', 'method', 'stream',
+                   'scratch_dir', 'memmap']
 
         badkeys = numpy.array([pk not in parkeys for pk in k])
         if numpy.any(badkeys):
@@ -1242,6 +1283,13 @@ class CubePar(ParSet):
             kwargs[pk] = cfg[pk] if pk in k else None
         return cls(**kwargs)
 
+    @staticmethod
+    def valid_methods():
+        """
+        Return the valid methods used to resample the pixels onto the datacube.
+        """
+        return ['ngp', 'drizzle']
+
     def validate(self):
         pass
 
@@ -2074,7 +2122,9 @@ class ReduxPar(ParSet):
     see :ref:`pypeitpar`.
     """
     def __init__(self, spectrograph=None, detnum=None, sortroot=None, calwin=None, scidir=None,
-                 qadir=None, redux_path=None, ignore_bad_headers=None, slitspatnum=None):
+                 qadir=None, redux_path=None, ignore_bad_headers=None, slitspatnum=None,
+                 spec1d_columnar=None, spec2d_compact=None, spec2d_wave_images=None,
+                 image_dtype=None, checkpoint=None, linelist_cache=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -2140,6 +2190,56 @@ class ReduxPar(ParSet):
         descr['redux_path'] = 'Path to folder for performing reductions.  Default is the ' \
                               'current working directory.'
 
+        defaults['spec1d_columnar'] = False
+        dtypes['spec1d_columnar'] = bool
+        descr['spec1d_columnar'] = 'Write all the objects in each spec1d file to a single ' \
+                                   'table, instead of one extension per object.  This is much ' \
+                                   'faster to write and read for files with many objects, and ' \
+                                   'allows individual objects to be read without reading the ' \
+                                   'full file.'
+
+        defaults['spec2d_compact'] = False
+        dtypes['spec2d_compact'] = bool
+        descr['spec2d_compact'] = 'Write all the floating-point images in each spec2d file in ' \
+                                  'single precision and compress each image extension using ' \
+                                  'lossless FITS tile compression.  The images are ' \
+                                  'decompressed transparently when the file is read.'
+
+        defaults['spec2d_wave_images'] = True
+        dtypes['spec2d_wave_images'] = bool
+        descr['spec2d_wave_images'] = 'Write the tilts and wavelength images to each spec2d ' \
+                                      'file.  If False, only the fits used to construct these ' \
+                                      'images are written, and the images are regenerated ' \
+                                      'when the file is read.'
+
+        defaults['image_dtype'] = 'float64'
+        options['image_dtype'] = ReduxPar.valid_image_dtypes()
+        dtypes['image_dtype'] = str
+        descr['image_dtype'] = 'Floating-point precision used to hold the processed science ' \
+                               'images and the models (sky, object, inverse variance) ' \
+                               'constructed for them.  Using float32 halves the memory ' \
+                               'footprint of the reduction; the fits (sky b-splines, ' \
+                               'wavelength solutions, extraction sums) are always computed ' \
+                               'in double precision.  Options are: {0}'.format(
+                                    ', '.join(options['image_dtype']))
+
+        defaults['checkpoint'] = False
+        dtypes['checkpoint'] = bool
+        descr['checkpoint'] = 'Save the results of each stage of the reduction of each ' \
+                              'detector (first-pass sky subtraction, object finding, ' \
+                              'global sky subtraction, and extraction) to the Checkpoints ' \
+                              'directory in the reduction path.  If the reduction is ' \
+                              'interrupted, rerunning it without overwriting resumes from ' \
+                              'the last completed stage.  The checkpoints for a detector ' \
+                              'are removed once its output is written.'
+
+        dtypes['linelist_cache'] = str
+        descr['linelist_cache'] = 'Directory used to cache the parsed arc line lists and ' \
+                                  'archived wavelength solutions on disk, such that they ' \
+                                  'are not parsed again by subsequent executions.  If None, ' \
+                                  'the directory set by the PYPEIT_LINELIST_CACHE ' \
+                                  'environment variable is used, if any.'
+
         # Instantiate the parameter set
         super(ReduxPar, self).__init__(list(pars.keys()),
                                         values=list(pars.values()),
@@ -2155,7 +2255,9 @@ class ReduxPar(ParSet):
 
         # Basic keywords
         parkeys = [ 'spectrograph', 'detnum', 'sortroot', 'calwin', 'scidir', 'qadir',
-                    'redux_path', 'ignore_bad_headers', 'slitspatnum']
+                    'redux_path', 'ignore_bad_headers', 'slitspatnum', 'spec1d_columnar',
+                    'spec2d_compact', 'spec2d_wave_images', 'image_dtype', 'checkpoint',
+                    'linelist_cache']
 
         badkeys = numpy.array([pk not in parkeys for pk in k])
         if numpy.any(badkeys):
@@ -2174,6 +2276,13 @@ class ReduxPar(ParSet):
 #    def valid_spectrographs():
 #        return available_spectrographs
 
+    @staticmethod
+    def valid_image_dtypes():
+        """
+        Return the valid precisions for the processed images.
+        """
+        return ['float64', 'float32']
+
     def validate(self):
         pass
 
@@ -2193,7 +2302,7 @@ class WavelengthSolutionPar(ParSet):
                  rms_threshold=None, match_toler=None, func=None, n_first=None, n_final=None,
                  sigrej_first=None, sigrej_final=None, wv_cen=None, disp=None, numsearch=None,
                  nfitpix=None, IDpixels=None, IDwaves=None, refframe=None,
-                 nsnippet=None):
+                 nsnippet=None, nproc=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -2432,6 +2541,15 @@ class WavelengthSolutionPar(ParSet):
         descr['refframe'] = 'Frame of reference for the wavelength calibration.  ' \
                          'Options are: {0}'.format(', '.join(options['refframe']))
 
+        defaults['nproc'] = 1
+        dtypes['nproc'] = int
+        descr['nproc'] = 'Number of processes used to calibrate the slits/orders concurrently ' \
+                         'when ``method`` is \'holy-grail\' or \'reidentify\'.  Steps that ' \
+                         'combine the results from all slits (e.g., cross-matching the line ' \
+                         'identifications) are always performed serially, and the results ' \
+                         'are identical to the serial calculation.  If less than 1, all ' \
+                         'available CPUs are used.'
+
         # Instantiate the parameter set
         super(WavelengthSolutionPar, self).__init__(list(pars.keys()),
                                                     values=list(pars.values()),
@@ -2449,7 +2567,7 @@ class WavelengthSolutionPar(ParSet):
                    'fwhm', 'reid_arxiv', 'nreid_min', 'cc_thresh', 'cc_local_thresh',
                    'nlocal_cc', 'rms_threshold', 'match_toler', 'func', 'n_first','n_final',
                    'sigrej_first', 'sigrej_final', 'wv_cen', 'disp', 'numsearch', 'nfitpix',
-                   'IDpixels', 'IDwaves', 'refframe', 'nsnippet']
+                   'IDpixels', 'IDwaves', 'refframe', 'nsnippet', 'nproc']
 
         badkeys = numpy.array([pk not in parkeys for pk in k])
         if numpy.any(badkeys):
@@ -2523,7 +2641,8 @@ class EdgeTracePar(ParSet):
                  minimum_slit_length=None, minimum_slit_length_sci=None, length_range=None,
                  minimum_slit_gap=None, clip=None, order_match=None, order_offset=None,
                  use_maskdesign=None, maskdesign_maxsep=None, maskdesign_step=None,
-                 maskdesign_sigrej=None, pad=None, add_slits=None, rm_slits=None):
+                 maskdesign_sigrej=None, pad=None, add_slits=None, rm_slits=None,
+                 follow_numba=None):
 
         # Grab the parameter names and values from the function
         # arguments
@@ -2903,6 +3022,16 @@ class EdgeTracePar(ParSet):
                             'that contains pixel (spat,spec)=(2000,2121) and on detector 3 ' \
                             'that contains pixel (2000,2121).'
 
+        defaults['follow_numba'] = False
+        dtypes['follow_numba'] = bool
+        descr['follow_numba'] = 'When following the edge centroids between adjacent spectral ' \
+                                'positions, use the compiled kernel that follows all edges ' \
+                                'in a single pass over the spectral rows.  The same compiled ' \
+                                'moment calculation is used to remeasure the centroids when ' \
+                                'refining the edge-trace fits.  The results are ' \
+                                'the same as the default pure-python calculation, but much ' \
+                                'faster for large detectors.'
+
         # Instantiate the parameter set
         super(EdgeTracePar, self).__init__(list(pars.keys()), values=list(pars.values()),
                                            defaults=list(defaults.values()),
@@ -2916,8 +3045,9 @@ class EdgeTracePar(ParSet):
         # TODO Please provide docs
         k = numpy.array([*cfg.keys()])
         parkeys = ['filt_iter', 'sobel_mode', 'edge_thresh', 'follow_span', 'det_min_spec_length',
-                   'max_shift_abs', 'max_shift_adj', 'max_spat_error', 'match_tol', 'fit_function',
-                   'fit_order', 'fit_maxdev', 'fit_maxiter', 'fit_niter', 'fit_min_spec_length',
+                   'max_shift_abs', 'max_shift_adj', 'max_spat_error',
+                   'match_tol', 'fit_function', 'fit_order', 'fit_maxdev', 'fit_maxiter',
+                   'fit_niter', 'fit_min_spec_length',
                    'auto_pca', 'left_right_pca', 'pca_min_edges', 'pca_n', 'pca_var_percent',
                    'pca_function', 'pca_order', 'pca_sigrej', 'pca_maxrej', 'pca_maxiter',
                    'smash_range', 'edge_detect_clip', 'trace_median_frac', 'trace_thresh',
@@ -2926,7 +3056,7 @@ class EdgeTracePar(ParSet):
                    'sync_to_edge', 'minimum_slit_length', 'minimum_slit_length_sci',
                    'length_range', 'minimum_slit_gap', 'clip', 'order_match', 'order_offset',
                    'use_maskdesign', 'maskdesign_maxsep', 'maskdesign_step', 'maskdesign_sigrej',
-                   'pad', 'add_slits', 'rm_slits']
+                   'pad', 'add_slits', 'rm_slits', 'follow_numba']
 
         badkeys = numpy.array([pk not in parkeys for pk in k])
         if numpy.any(badkeys):
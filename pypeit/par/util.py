@@ -7,7 +7,6 @@ import time
 import glob
 import warnings
 import textwrap
-from IPython import embed
 
 import numpy as np
 
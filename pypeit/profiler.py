@@ -0,0 +1,201 @@
+"""
+Module for profiling the execution time and memory use of the
+reduction steps.
+
+The profiler is disabled by default, in which case the overhead of
+the instrumented steps is negligible.  It is enabled by the ``-p``
+option of ``run_pypeit``; see :class:`~pypeit.pypeit.PypeIt`.
+
+Usage::
+
+    from pypeit.profiler import profiler
+
+    profiler.reset(enabled=True)
+    with profiler.step('global_skysub', det=1):
+        ...
+    profiler.write('profile.json')
+    profiler.report()
+
+.. include common links, assuming primary doc root is up one directory
+.. include:: ../include/links.rst
+
+"""
+import sys
+import time
+import json
+import contextlib
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+import numpy as np
+
+from astropy.table import Table
+
+from pypeit import msgs
+
+
+def peak_rss():
+    """
+    Return the peak resident set size (RSS) of the current process.
+
+    Returns:
+        :obj:`float`: The peak RSS in MB, or None if it cannot be
+        determined on the current platform.
+    """
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return maxrss / 1024**2 if sys.platform == 'darwin' else maxrss / 1024
+
+
+class Profiler:
+    """
+    Record the wall time, CPU time, and peak memory use of a set of
+    (possibly nested) steps.
+
+    Each execution of a step is recorded as a dictionary with:
+
+        - ``step``: The name of the step.
+        - ``path``: The names of the enclosing steps and the step
+          itself, separated by ``/``.
+        - ``context``: A dictionary with the keyword arguments passed
+          to :func:`step` (e.g., the detector and slit).
+        - ``start``: The time at which the step started in seconds
+          since the profiler was reset.
+        - ``wall``: The elapsed wall-clock time in seconds.
+        - ``cpu``: The CPU time of the main process in seconds.
+        - ``peak_rss``: The peak RSS of the process in MB at the end
+          of the step.
+        - ``delta_peak_rss``: The increase in the peak RSS in MB
+          during the step.  This is non-zero only for steps that
+          required more memory than any previous step.
+
+    Args:
+        enabled (:obj:`bool`, optional):
+            Record the steps.  If False, :func:`step` does nothing.
+    """
+    def __init__(self, enabled=False):
+        self.reset(enabled=enabled)
+
+    def reset(self, enabled=False):
+        """
+        Remove all recorded steps and enable or disable the profiler.
+
+        Args:
+            enabled (:obj:`bool`, optional):
+                Record the steps.
+        """
+        self.enabled = enabled
+        self.records = []
+        self._stack = []
+        self._tstart = time.perf_counter()
+
+    def step(self, name, **context):
+        """
+        Return a context manager that records the execution of a
+        step.
+
+        Args:
+            name (:obj:`str`):
+                Name of the step.
+            **context:
+                Information identifying this execution of the step
+                (e.g., ``det=1``).  The values must be serializable
+                by :mod:`json`.
+
+        Returns:
+            context manager: Records the step when it exits, or does
+            nothing if the profiler is disabled.
+        """
+        return self._record(name, context) if self.enabled else contextlib.nullcontext()
+
+    @contextlib.contextmanager
+    def _record(self, name, context):
+        """
+        Context manager that records a step; see :func:`step`.
+        """
+        self._stack.append(name)
+        path = '/'.join(self._stack)
+        rss0 = peak_rss()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - t0
+            cpu = time.process_time() - cpu0
+            rss = peak_rss()
+            self._stack.pop()
+            self.records.append(dict(step=name, path=path, context=context,
+                                     start=t0 - self._tstart, wall=wall, cpu=cpu, peak_rss=rss,
+                                     delta_peak_rss=None if rss is None else rss - rss0))
+
+    def summary(self):
+        """
+        Construct a table summarizing the recorded steps.
+
+        Executions of the same step (with the same path) are combined,
+        regardless of their context.
+
+        Returns:
+            `astropy.table.Table`_: Table with the path of each step,
+            the number of times it was executed, the total and maximum
+            wall time, the total CPU time, and the maximum peak RSS.
+            The rows are in the order in which each step was first
+            started.
+        """
+        paths = []
+        for rec in sorted(self.records, key=lambda r: r['start']):
+            if rec['path'] not in paths:
+                paths.append(rec['path'])
+        tbl = Table()
+        tbl['path'] = paths
+        tbl['ncalls'] = np.zeros(len(paths), dtype=int)
+        tbl['wall'] = np.zeros(len(paths), dtype=float)
+        tbl['max_wall'] = np.zeros(len(paths), dtype=float)
+        tbl['cpu'] = np.zeros(len(paths), dtype=float)
+        tbl['peak_rss'] = np.full(len(paths), np.nan, dtype=float)
+        for rec in self.records:
+            i = paths.index(rec['path'])
+            tbl['ncalls'][i] += 1
+            tbl['wall'][i] += rec['wall']
+            tbl['max_wall'][i] = max(tbl['max_wall'][i], rec['wall'])
+            tbl['cpu'][i] += rec['cpu']
+            if rec['peak_rss'] is not None:
+                tbl['peak_rss'][i] = np.fmax(tbl['peak_rss'][i], rec['peak_rss'])
+        for key in ['wall', 'max_wall', 'cpu']:
+            tbl[key].format = '.2f'
+            tbl[key].unit = 's'
+        tbl['peak_rss'].format = '.1f'
+        tbl['peak_rss'].unit = 'MB'
+        return tbl
+
+    def write(self, ofile):
+        """
+        Write all the recorded steps to a JSON file.
+
+        Args:
+            ofile (:obj:`str`):
+                Name of the output file.
+        """
+        with open(ofile, 'w') as f:
+            json.dump({'steps': self.records}, f, indent=1)
+        msgs.info('Profiling results written to {0}'.format(ofile))
+
+    def report(self):
+        """
+        Print the summary table of the recorded steps.
+        """
+        if len(self.records) == 0:
+            return
+        msgs.info('Profiling summary:' + msgs.newline()
+                  + msgs.newline().join(self.summary().pformat(max_lines=-1, max_width=-1)))
+
+
+# Global profiler used by the reduction steps
+profiler = Profiler()
@@ -7,17 +7,23 @@ Main driver class for PypeIt run
 """
 import time
 import os
+import glob
+import shutil
 import numpy as np
 import copy
 from astropy.io import fits
 from astropy.table import Table
 from pypeit import msgs
+from pypeit.profiler import profiler
 from pypeit import calibrations
 from pypeit.images import buildimage
 from pypeit.display import display
 from pypeit import reduce
 from pypeit import spec2dobj
+from pypeit import checkpoint
 from pypeit.core import qa
+from pypeit.core.wavecal import waveio
+from pypeit.core import parse
 from pypeit import specobjs
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit import slittrace
@@ -27,8 +33,6 @@ from pypeit.par.util import parse_pypeit_file
 from pypeit.par import PypeItPar
 from pypeit.metadata import PypeItMetaData
 
-from IPython import embed
-
 class PypeIt(object):
     """
     This class runs the primary calibration and extraction in PypeIt
@@ -53,6 +57,14 @@ class PypeIt(object):
         logname (:obj:`str`, optional):
             The name of an ascii log file with the details of the
             reduction.
+        jsonlog (:obj:`str`, optional):
+            The name of a file for the structured (JSON) log records;
+            see :class:`~pypeit.pypmsgs.Messages`.
+        profile (:obj:`str`, optional):
+            The name of a file for the wall time, CPU time, and peak
+            memory use of each calibration and reduction step; see
+            :class:`~pypeit.profiler.Profiler`.  If None, the steps
+            are not profiled.
         show: (:obj:`bool`, optional):
             Show reduction steps via plots (which will block further
             execution until clicked on) and outputs to ginga. Requires
@@ -61,6 +73,15 @@ class PypeIt(object):
             Over-ride reduction path in PypeIt file (e.g. Notebook usage)
         calib_only: (:obj:`bool`, optional):
             Only generate the calibration files that you can
+        calib_cache (:obj:`dict`, optional):
+            Dictionary used to keep the calibrations in memory between
+            instances of this class, keyed by the master key of each
+            calibration group and detector; see
+            :func:`get_calibrations`.  This is used by the quick-look
+            server (:class:`~pypeit.quicklook.QuickLookServer`) to
+            avoid reloading the calibrations for each exposure.  If
+            None, the calibrations are always built or loaded from the
+            master files.
 
     Attributes:
         pypeit_file (:obj:`str`):
@@ -73,10 +94,14 @@ class PypeIt(object):
 #    __metaclass__ = ABCMeta
 
     def __init__(self, pypeit_file, verbosity=2, overwrite=True, reuse_masters=False, logname=None,
-                 show=False, redux_path=None, calib_only=False):
+                 show=False, redux_path=None, calib_only=False, jsonlog=None, profile=None,
+                 calib_cache=None):
 
         # Set up logging
         self.logname = logname
+        self.jsonlog = jsonlog
+        self.profile = profile
+        profiler.reset(enabled=self.profile is not None)
         self.verbosity = verbosity
         self.pypeit_file = pypeit_file
         
@@ -144,9 +169,12 @@ class PypeIt(object):
         # reuse_masters.
         self.reuse_masters = reuse_masters
         self.show = show
+        self.calib_cache = calib_cache
 
         # Set paths
         self.calibrations_path = os.path.join(self.par['rdx']['redux_path'], self.par['calibrations']['master_dir'])
+        if self.par['rdx']['linelist_cache'] is not None:
+            waveio.set_cache_dir(self.par['rdx']['linelist_cache'])
 
         # Check for calibrations
         if not self.calib_only:
@@ -183,6 +211,11 @@ class PypeIt(object):
         """Return the path to the top-level QA directory."""
         return os.path.join(self.par['rdx']['redux_path'], self.par['rdx']['qadir'])
 
+    @property
+    def checkpoint_path(self):
+        """Return the path to the top-level directory with the reduction checkpoints."""
+        return os.path.join(self.par['rdx']['redux_path'], 'Checkpoints')
+
     def build_qa(self):
         """
         Generate QA wrappers
@@ -269,17 +302,11 @@ class PypeIt(object):
                                             ndet=self.spectrograph.ndet)
             # Loop on Detectors
             for self.det in detectors:
-                # Instantiate Calibrations class
-                self.caliBrate = calibrations.Calibrations.get_instance(
-                    self.fitstbl, self.par['calibrations'], self.spectrograph,
-                    self.calibrations_path, qadir=self.qa_path, reuse_masters=self.reuse_masters,
-                    show=self.show, slitspat_num=self.par['rdx']['slitspatnum'])
-                # Do it
-                self.caliBrate.set_config(grp_frames[0], self.det, self.par['calibrations'])
-                self.caliBrate.run_the_steps()
+                self.get_calibrations(grp_frames[0], self.det)
 
         # Finish
         self.print_end_time()
+        self.write_profile()
 
     def reduce_all(self):
         """
@@ -317,9 +344,8 @@ class PypeIt(object):
                 frames = np.where(self.fitstbl['comb_id'] == comb_id)[0]
                 bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
                 if not self.outfile_exists(frames[0]) or self.overwrite:
-                    std_spec2d, std_sobjs = self.reduce_exposure(frames, bg_frames=bg_frames)
                     # TODO come up with sensible naming convention for save_exposure for combined files
-                    self.save_exposure(frames[0], std_spec2d, std_sobjs, self.basename)
+                    self.reduce_exposure(frames, bg_frames=bg_frames, save=True)
                 else:
                     msgs.info('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
                               '. Set overwrite=True to recreate and overwrite.')
@@ -348,11 +374,10 @@ class PypeIt(object):
 #                bg_frames = np.where(self.fitstbl['bkg_id'] == comb_id)[0]
                 if not self.outfile_exists(frames[0]) or self.overwrite:
                     # TODO -- Should we reset/regenerate self.slits.mask for a new exposure
-                    sci_spec2d, sci_sobjs = self.reduce_exposure(frames, bg_frames=bg_frames,
-                                                    std_outfile=std_outfile)
-                    science_basename[j] = self.basename
                     # TODO come up with sensible naming convention for save_exposure for combined files
-                    self.save_exposure(frames[0], sci_spec2d, sci_sobjs, self.basename)
+                    self.reduce_exposure(frames, bg_frames=bg_frames, std_outfile=std_outfile,
+                                         save=True)
+                    science_basename[j] = self.basename
                 else:
                     msgs.warn('Output file: {:s} already exists'.format(self.fitstbl.construct_basename(frames[0])) +
                               '. Set overwrite=True to recreate and overwrite.')
@@ -361,6 +386,7 @@ class PypeIt(object):
 
         # Finish
         self.print_end_time()
+        self.write_profile()
 
     # This is a static method to allow for use in coadding script 
     @staticmethod
@@ -389,10 +415,19 @@ class PypeIt(object):
         else:
             return slittrace.parse_slitspatnum(slitspatnum)[0].tolist()
 
-    def reduce_exposure(self, frames, bg_frames=None, std_outfile=None):
+    def reduce_exposure(self, frames, bg_frames=None, std_outfile=None, save=False):
         """
         Reduce a single exposure
 
+        If ``save`` is True, the results for each detector are
+        appended to the output files as soon as the detector is
+        reduced (see :func:`save_detector`), and the images are freed.
+        The output files are only given their final names once all
+        the detectors have been reduced (see :func:`finalize_exposure`).
+        If the reduction is interrupted, reducing the exposure again
+        without overwriting resumes from the detectors already
+        written; see :func:`resume_exposure`.
+
         Args:
             frame (:obj:`int`):
                 0-indexed row in :attr:`fitstbl` with the frame to
@@ -402,10 +437,14 @@ class PypeIt(object):
             std_outfile (:obj:`str`, optional):
                 File with a previously reduced standard spectrum from
                 PypeIt.
+            save (:obj:`bool`, optional):
+                Write the results to the output files.
 
         Returns:
-            dict: The dictionary containing the primary outputs of
-            extraction.
+            tuple: The :class:`pypeit.spec2dobj.AllSpec2DObj` and
+            :class:`pypeit.specobjs.SpecObjs` objects with the primary
+            outputs of extraction, or None if the results were written
+            to the output files.
 
         """
 
@@ -455,34 +494,100 @@ class PypeIt(object):
             msgs.warn('Not reducing detectors: {0}'.format(' '.join([ str(d) for d in 
                                 set(np.arange(self.spectrograph.ndet))-set(detectors)])))
 
+        # Detectors already written by an interrupted reduction
+        if save:
+            self.basename = self.fitstbl.construct_basename(frames[0])
+            done = self.resume_exposure(frames[0], detectors)
+        else:
+            done = []
+
         # Loop on Detectors
         # TODO: Attempt to put in a multiprocessing call here?
         for self.det in detectors:
+            if self.det in done:
+                msgs.info('Detector {0} has already been reduced'.format(self.det))
+                continue
             msgs.info("Working on detector {0}".format(self.det))
-            # Instantiate Calibrations class
-            self.caliBrate = calibrations.Calibrations.get_instance(
-                self.fitstbl, self.par['calibrations'], self.spectrograph,
-                self.calibrations_path, qadir=self.qa_path, reuse_masters=self.reuse_masters,
-                show=self.show, slitspat_num=self.par['rdx']['slitspatnum'])
-            # These need to be separate to accomodate COADD2D
-            self.caliBrate.set_config(frames[0], self.det, self.par['calibrations'])
-            self.caliBrate.run_the_steps()
+            # Load or build the calibrations
+            self.get_calibrations(frames[0], self.det)
             # Extract
             # TODO: pass back the background frame, pass in background
             # files as an argument. extract one takes a file list as an
             # argument and instantiates science within
-            all_spec2d[self.det], tmp_sobjs \
-                    = self.reduce_one(frames, self.det, bg_frames, std_outfile=std_outfile)
+            with profiler.step('reduce', det=self.det, frame=int(frames[0])):
+                all_spec2d[self.det], tmp_sobjs \
+                        = self.reduce_one(frames, self.det, bg_frames, std_outfile=std_outfile)
+            if save:
+                # Write and free the results for this detector
+                with profiler.step('save_detector', det=self.det, frame=int(frames[0])):
+                    self.save_detector(frames[0], all_spec2d, tmp_sobjs, ndet=len(detectors))
+                del all_spec2d[self.det]
+            # The checkpoints are no longer needed
+            self.clear_checkpoints(frames[0], self.det)
+            if save:
+                continue
             # Hold em
             if tmp_sobjs.nobj > 0:
                 all_specobjs.add_sobj(tmp_sobjs)
             # JFH TODO write out the background frame?
 
-            # TODO -- Save here?  Seems like we should.  Would probably need to use update_det=True
+        if save:
+            with profiler.step('save_exposure', frame=int(frames[0])):
+                self.finalize_exposure(frames[0])
+            return None
 
         # Return
         return all_spec2d, all_specobjs
 
+    def get_calibrations(self, frame, det):
+        """
+        Build or load the calibrations for a given frame and detector.
+
+        The calibrations are set to :attr:`caliBrate`.  If
+        :attr:`calib_cache` is not None and already holds the
+        calibrations for the calibration group of this frame and
+        detector, a copy of them is used without running the
+        calibration steps; otherwise, the calibration steps are run
+        and the result is added to the cache.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in :attr:`fitstbl` with the frame to
+                calibrate.
+            det (:obj:`int`):
+                1-indexed detector number.
+
+        Returns:
+            :class:`~pypeit.calibrations.Calibrations`: The
+            calibrations for this frame and detector.
+        """
+        master_key = self.fitstbl.master_key(frame, det=det)
+        if self.calib_cache is None or master_key not in self.calib_cache:
+            # Instantiate Calibrations class
+            self.caliBrate = calibrations.Calibrations.get_instance(
+                self.fitstbl, self.par['calibrations'], self.spectrograph,
+                self.calibrations_path, qadir=self.qa_path, reuse_masters=self.reuse_masters,
+                show=self.show, slitspat_num=self.par['rdx']['slitspatnum'])
+            # These need to be separate to accomodate COADD2D
+            with profiler.step('calibrations', det=det):
+                self.caliBrate.set_config(frame, det, self.par['calibrations'])
+                self.caliBrate.run_the_steps()
+            if self.calib_cache is None:
+                return self.caliBrate
+            self.calib_cache[master_key] = self.caliBrate
+        else:
+            msgs.info('Using the calibrations for {0} held in memory'.format(master_key))
+
+        # The reduction flags bad slits in the SlitTraceSet mask, so
+        # use a copy of the slits to keep the cached calibrations
+        # unchanged
+        self.caliBrate = copy.copy(self.calib_cache[master_key])
+        self.caliBrate.slits = copy.deepcopy(self.caliBrate.slits)
+        self.caliBrate.master_key_dict = self.caliBrate.master_key_dict.copy()
+        self.caliBrate.fitstbl = self.fitstbl
+        self.caliBrate.set_config(frame, det, self.par['calibrations'])
+        return self.caliBrate
+
     def get_sci_metadata(self, frame, det):
         """
         Grab the meta data for a given science frame and specific detector
@@ -599,29 +704,33 @@ class PypeIt(object):
 
         # Build Science image
         sci_files = self.fitstbl.frame_paths(frames)
-        sciImg = buildimage.buildimage_fromlist(
-            self.spectrograph, det, frame_par,
-            sci_files, bias=self.caliBrate.msbias, bpm=self.caliBrate.msbpm,
-            dark=self.caliBrate.msdark,
-            flatimages=self.caliBrate.flatimages,
-            slits=self.caliBrate.slits,  # For flexure correction
-            ignore_saturation=False)
-
-        # Background Image?
-        if len(bg_frames) > 0:
-            bg_file_list = self.fitstbl.frame_paths(bg_frames)
-            sciImg = sciImg.sub(
-                buildimage.buildimage_fromlist(
-                self.spectrograph, det, frame_par,bg_file_list,
-                bpm=self.caliBrate.msbpm, bias=self.caliBrate.msbias,
+        with profiler.step('process_science', det=det):
+            sciImg = buildimage.buildimage_fromlist(
+                self.spectrograph, det, frame_par,
+                sci_files, bias=self.caliBrate.msbias, bpm=self.caliBrate.msbpm,
                 dark=self.caliBrate.msdark,
                 flatimages=self.caliBrate.flatimages,
                 slits=self.caliBrate.slits,  # For flexure correction
-                ignore_saturation=False), frame_par['process'])
+                ignore_saturation=False, dtype=self.par['rdx']['image_dtype'])
+
+            # Background Image?
+            if len(bg_frames) > 0:
+                bg_file_list = self.fitstbl.frame_paths(bg_frames)
+                sciImg = sciImg.sub(
+                    buildimage.buildimage_fromlist(
+                    self.spectrograph, det, frame_par,bg_file_list,
+                    bpm=self.caliBrate.msbpm, bias=self.caliBrate.msbias,
+                    dark=self.caliBrate.msdark,
+                    flatimages=self.caliBrate.flatimages,
+                    slits=self.caliBrate.slits,  # For flexure correction
+                    ignore_saturation=False, dtype=self.par['rdx']['image_dtype']),
+                    frame_par['process'])
 
         # Instantiate Reduce object
         # Required for pypeline specific object
         # At instantiaton, the fullmask in self.sciImg is modified
+        store = self.get_checkpoints(frames, det, bg_frames, std_outfile=std_outfile) \
+                    if self.par['rdx']['checkpoint'] else None
         self.redux = reduce.Reduce.get_instance(sciImg, self.spectrograph,
                                                 self.par, self.caliBrate,
                                                 self.objtype,
@@ -631,7 +740,8 @@ class PypeIt(object):
                                                 show=self.show,
                                                 det=det, binning=self.binning,
                                                 std_outfile=std_outfile,
-                                                basename=self.basename)
+                                                basename=self.basename,
+                                                checkpoint=store)
         # Show?
         if self.show:
             self.redux.show('image', image=sciImg.image, chname='processed',
@@ -674,63 +784,264 @@ class PypeIt(object):
                                         tilts=tilts,
                                         slits=copy.deepcopy(self.caliBrate.slits))
         spec2DObj.process_steps = sciImg.process_steps
+        if not self.par['rdx']['spec2d_wave_images']:
+            if self.redux.waveTilts is None or self.redux.wv_calib is None:
+                msgs.warn('No tilt or wavelength fits available; writing the tilts and '
+                          'wavelength images to the spec2d file.')
+            else:
+                # Write the fits instead of the images
+                spec2DObj.store_wave_fits(self.redux.waveTilts, self.redux.wv_calib)
 
         # Return
         return spec2DObj, sobjs
 
-    def save_exposure(self, frame, all_spec2d, all_specobjs, basename):
+    def checkpoint_dir(self, frame, det):
         """
-        Save the outputs from extraction for a given exposure
+        Return the directory with the checkpoints for the reduction of
+        one detector of an exposure.
 
         Args:
             frame (:obj:`int`):
-                0-indexed row in the metadata table with the frame
-                that has been reduced.
-            all_spec2d(:class:`pypeit.spec2dobj.AllSpec2DObj`):
-            sci_dict (:obj:`dict`):
-                Dictionary containing the primary outputs of
-                extraction
-            basename (:obj:`str`):
-                The root name for the output file.
+                0-indexed row in the metadata table with the frame.
+            det (:obj:`int`):
+                1-indexed detector number.
 
         Returns:
-            None or SpecObjs:  All of the objects saved to disk
+            :obj:`str`: The path to the directory.
+        """
+        return os.path.join(self.checkpoint_path, '{0}_{1}'.format(
+                                self.fitstbl.construct_basename(frame),
+                                parse.get_dnum(det, caps=True)))
 
+    def get_checkpoints(self, frames, det, bg_frames, std_outfile=None):
         """
-        # TODO: Need some checks here that the exposure has been reduced?
+        Construct the store for the checkpoints of the reduction of
+        one detector of an exposure; see
+        :class:`pypeit.checkpoint.CheckpointStore`.
+
+        The checkpoints are identified by the science and background
+        files, the detector, the calibration frames and the master
+        calibration files (including their modification times and
+        sizes, such that rebuilding the masters invalidates the
+        checkpoints), the standard star file, and the full set of
+        parameters; any existing checkpoints written for a different
+        set of these are discarded, as are all existing checkpoints
+        if the reduction is set to overwrite existing files.
 
-        # Determine the headers
-        row_fitstbl = self.fitstbl[frame]
+        Args:
+            frames (:obj:`list`):
+                List of frames to extract.
+            det (:obj:`int`):
+                Detector number (1-indexed).
+            bg_frames (:obj:`list`):
+                List of frames to use as the background.
+            std_outfile (:obj:`str`, optional):
+                Filename for the standard star spec1d file.
+
+        Returns:
+            :class:`pypeit.checkpoint.CheckpointStore`: The store for
+            the checkpoints.
+        """
+        bg_files = [] if len(bg_frames) == 0 else self.fitstbl.frame_paths(bg_frames)
+        # Calibration frames
+        calib_files = {ftype: self.fitstbl.find_frame_files(ftype, calib_ID=self.caliBrate.calib_ID)
+                        for ftype in ['bias', 'dark', 'arc', 'tilt', 'pixelflat', 'illumflat',
+                                      'trace', 'align']}
+        # Master calibration files
+        master_files = []
+        for master_key in sorted(set(self.caliBrate.master_key_dict.values())):
+            for f in sorted(glob.glob(os.path.join(self.caliBrate.master_dir,
+                                                   'Master*_{0}*'.format(master_key)))):
+                stat = os.stat(f)
+                master_files += [(os.path.basename(f), stat.st_mtime_ns, stat.st_size)]
+        key = checkpoint.checkpoint_key(self.fitstbl.frame_paths(frames), bg_files, int(det),
+                                        self.caliBrate.master_key_dict, calib_files,
+                                        master_files, std_outfile,
+                                        self.par.to_config(include_descr=False))
+        return checkpoint.CheckpointStore(self.checkpoint_dir(frames[0], det), key,
+                                          overwrite=self.overwrite)
+
+    def clear_checkpoints(self, frame, det):
+        """
+        Remove the checkpoints for the reduction of one detector of an
+        exposure, if there are any.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in the metadata table with the frame.
+            det (:obj:`int`):
+                1-indexed detector number.
+        """
+        path = self.checkpoint_dir(frame, det)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+            if os.path.isdir(self.checkpoint_path) and len(os.listdir(self.checkpoint_path)) == 0:
+                os.rmdir(self.checkpoint_path)
+
+    def get_output_headers(self, frame):
+        """
+        Construct the header data for the output files of an exposure.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in the metadata table with the frame.
+
+        Returns:
+            :obj:`tuple`: The primary header of the raw file, and the
+            :obj:`dict` with the metadata for the output files; see
+            :func:`pypeit.spectrographs.spectrograph.Spectrograph.subheader_for_spec`.
+        """
         # Need raw file header information
         rawfile = self.fitstbl.frame_paths(frame)
         head2d = fits.getheader(rawfile, ext=self.spectrograph.primary_hdrext)
+        return head2d, self.spectrograph.subheader_for_spec(self.fitstbl[frame], head2d)
+
+    def spec_partial_file(self, frame, twod=False):
+        """
+        Return the path to the spectral output file while the exposure
+        is being reduced; see :func:`reduce_exposure`.
+
+        Args:
+            frame (:obj:`int`):
+                Frame index from :attr:`fitstbl`.
+            twod (:obj:`bool`):
+                Name for the 2D output file; 1D file otherwise.
+
+        Returns:
+            :obj:`str`: The path for the file.
+        """
+        return self.spec_output_file(frame, twod=twod) + '.part'
+
+    def resume_exposure(self, frame, detectors):
+        """
+        Find the detectors written by an interrupted reduction of an
+        exposure.
+
+        The detectors are read from the partially written output
+        files (see :func:`spec_partial_file`), and any extensions
+        written for a detector that was not completed are removed.
+        The files are instead removed, such that the reduction starts
+        over, if the reduction is set to overwrite existing files or
+        the files do not match the list of detectors to reduce.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in the metadata table with the frame.
+            detectors (:obj:`list`):
+                The detectors to reduce.
 
+        Returns:
+            :obj:`list`: The detectors that have already been reduced.
+        """
+        outfile2d = self.spec_partial_file(frame, twod=True)
+        outfile1d = self.spec_partial_file(frame)
+        if not self.overwrite and os.path.isfile(outfile2d) and os.path.isfile(outfile1d):
+            # The 1D file is written last, such that its detectors are
+            # complete in both files
+            done = specobjs.SpecObjs.read_detectors(outfile1d)
+            if len(done) > 0 and set(done) <= set(detectors) \
+                    and spec2dobj.AllSpec2DObj.read_detectors(outfile2d)[:len(done)] == done:
+                specobjs.SpecObjs.truncate_fits(outfile1d)
+                spec2dobj.AllSpec2DObj.truncate_fits(outfile2d, done)
+                msgs.info('Resuming the reduction of {0}; detector(s) {1} already '
+                          'reduced.'.format(self.fitstbl['filename'][frame],
+                                            ', '.join([str(d) for d in done])))
+                return done
+        for ofile in [outfile2d, outfile1d]:
+            if os.path.isfile(ofile):
+                os.remove(ofile)
+        return []
+
+    def save_detector(self, frame, all_spec2d, sobjs, ndet=1):
+        """
+        Append the outputs from extraction for one detector to the
+        output files of the exposure.
+
+        The results are written to the files provided by
+        :func:`spec_partial_file`, using
+        :func:`pypeit.spec2dobj.AllSpec2DObj.append_to_fits` and
+        :func:`pypeit.specobjs.SpecObjs.append_to_fits`.  The files
+        are created when the first detector is written.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in the metadata table with the frame
+                that has been reduced.
+            all_spec2d (:class:`pypeit.spec2dobj.AllSpec2DObj`):
+                2D outputs, including those for the detector to
+                write, :attr:`det`.
+            sobjs (:class:`pypeit.specobjs.SpecObjs`):
+                Objects extracted from the detector.
+            ndet (:obj:`int`, optional):
+                The number of detectors that will be written.
+        """
         # Check for the directory
         if not os.path.isdir(self.science_path):
             os.makedirs(self.science_path)
 
-        subheader = self.spectrograph.subheader_for_spec(row_fitstbl, head2d)
+        # 2D spectra
+        outfile2d = self.spec_partial_file(frame, twod=True)
+        pri_hdr = None
+        if not os.path.isfile(outfile2d):
+            head2d, subheader = self.get_output_headers(frame)
+            pri_hdr = all_spec2d.build_primary_hdr(head2d, self.spectrograph,
+                                                   redux_path=self.par['rdx']['redux_path'],
+                                                   master_key_dict=self.caliBrate.master_key_dict,
+                                                   master_dir=self.caliBrate.master_dir,
+                                                   subheader=subheader)
+        all_spec2d.append_to_fits(outfile2d, self.det, pri_hdr=pri_hdr,
+                                  compact=self.par['rdx']['spec2d_compact'], ndet=ndet)
+
+        # 1D spectra; written last to mark the detector as complete
+        sobjs.append_to_fits(self.spec_partial_file(frame), self.det)
+
+    def finalize_exposure(self, frame):
+        """
+        Finish the output files for an exposure once all its detectors
+        have been written by :func:`save_detector`.
+
+        The 2D file is renamed, unless a subset of the detectors were
+        reduced and the output file already exists, in which case the
+        reduced detectors are replaced in the existing file; see
+        :func:`pypeit.spec2dobj.AllSpec2DObj.write_to_fits`.  The 1D
+        file is rewritten with the full header and in the requested
+        layout; see :func:`pypeit.specobjs.SpecObjs.write_to_fits`.
+
+        Args:
+            frame (:obj:`int`):
+                0-indexed row in the metadata table with the frame
+                that has been reduced.
+        """
+        head2d, subheader = self.get_output_headers(frame)
+
         # 1D spectra
+        partfile1d = self.spec_partial_file(frame)
+        all_specobjs = specobjs.SpecObjs.from_fitsfile(partfile1d)
         if all_specobjs.nobj > 0:
             # Spectra
-            outfile1d = os.path.join(self.science_path, 'spec1d_{:s}.fits'.format(basename))
+            outfile1d = self.spec_output_file(frame)
             all_specobjs.write_to_fits(subheader, outfile1d,
                                        update_det=self.par['rdx']['detnum'],
-                                       slitspatnum=self.par['rdx']['slitspatnum'])
+                                       slitspatnum=self.par['rdx']['slitspatnum'],
+                                       columnar=self.par['rdx']['spec1d_columnar'])
             # Info
-            outfiletxt = os.path.join(self.science_path, 'spec1d_{:s}.txt'.format(basename))
+            outfiletxt = os.path.splitext(outfile1d)[0] + '.txt'
             all_specobjs.write_info(outfiletxt, self.spectrograph.pypeline)
+        os.remove(partfile1d)
 
         # 2D spectra
-        outfile2d = os.path.join(self.science_path, 'spec2d_{:s}.fits'.format(basename))
-        # Build header
-        pri_hdr = all_spec2d.build_primary_hdr(head2d, self.spectrograph,
-                                               redux_path=self.par['rdx']['redux_path'],
-                                               master_key_dict=self.caliBrate.master_key_dict,
-                                               master_dir=self.caliBrate.master_dir,
-                                               subheader=subheader)
-        # Write
-        all_spec2d.write_to_fits(outfile2d, pri_hdr=pri_hdr, update_det=self.par['rdx']['detnum'])
+        partfile2d = self.spec_partial_file(frame, twod=True)
+        outfile2d = self.spec_output_file(frame, twod=True)
+        if self.par['rdx']['detnum'] is not None and os.path.isfile(outfile2d):
+            # Replace the reduced detectors in the existing file
+            all_spec2d = spec2dobj.AllSpec2DObj.from_fits(partfile2d)
+            all_spec2d.write_to_fits(outfile2d, pri_hdr=all_spec2d['meta'].pop('head0'),
+                                     update_det=self.par['rdx']['detnum'],
+                                     compact=self.par['rdx']['spec2d_compact'])
+            os.remove(partfile2d)
+        else:
+            os.replace(partfile2d, outfile2d)
+            msgs.info("Wrote: {:s}".format(outfile2d))
 
 
     def msgs_reset(self):
@@ -739,9 +1050,19 @@ class PypeIt(object):
         """
 
         # Reset the global logger
-        msgs.reset(log=self.logname, verbosity=self.verbosity)
+        msgs.reset(log=self.logname, verbosity=self.verbosity, jsonlog=self.jsonlog)
         msgs.pypeit_file = self.pypeit_file
 
+    def write_profile(self):
+        """
+        Write the profiling results, if requested, and print the
+        summary.
+        """
+        if self.profile is None:
+            return
+        profiler.write(self.profile)
+        profiler.report()
+
     def print_end_time(self):
         """
         Print the elapsed time
@@ -9,8 +9,6 @@ import os
 import inspect
 import datetime
 
-from IPython import embed
-
 import numpy as np
 
 from astropy.table import hstack, Table
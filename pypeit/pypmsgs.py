@@ -7,10 +7,12 @@ Module for terminal and file logging.
 """
 import sys
 import os
+import re
+import time
+import json
 import getpass
 import glob
 import textwrap
-import inspect
 
 # Imported for versioning
 import scipy
@@ -30,6 +32,10 @@ class PypeItError(Exception):
     pass
 
 
+# Matches the ANSI escape sequences used to color the messages
+_ansi_escape = re.compile('\x1B\\[[0-9;]*m')
+
+
 class Messages:
     """
     Create coloured text for messages printed to screen.
@@ -37,6 +43,11 @@ class Messages:
     For further details on colours see the following example:
     http://ascii-table.com/ansi-escape-sequences.php
 
+    All message methods accept optional positional arguments used to
+    format the message string (``msg.format(*args)``).  The
+    formatting is only performed if the message is actually printed
+    or logged.
+
     Parameters
     ----------
     log : str or None
@@ -49,8 +60,15 @@ class Messages:
     colors : bool
       If true, the screen output will have colors, otherwise
       normal screen output will be displayed
+    jsonlog : str or None
+      Name of a file for structured log records.  Each message is
+      written as a single-line JSON record with the time of the
+      message, the time elapsed since the log was initialized, the
+      message level, the file, line and function that issued the
+      message, and the message itself (no JSON log is written if
+      None).
     """
-    def __init__(self, log=None, verbosity=None, colors=True):
+    def __init__(self, log=None, verbosity=None, colors=True, jsonlog=None):
 
         # Initialize other variables
         self._defverb = 1
@@ -68,6 +86,9 @@ class Messages:
         # Initialize the log
         self._log = None
         self._initialize_log_file(log=log)
+        self._jsonlog = None
+        self._tstart = None
+        self._initialize_json_log(jsonlog=jsonlog)
 
         # Use colors?
         self._start = None
@@ -89,34 +110,45 @@ class Messages:
             self.enablecolors()
 
     def _cleancolors(self, msg):
-        cols = [self._end, self._start,
-                self._black_CL, self._yellow_CL, self._blue_CL, self._green_CL, self._red_CL,
-                self._white_RD, self._white_GR, self._white_BK, self._white_BL,
-                self._black_YL, self._yellow_BK]
-        for i in cols:
-            msg = msg.replace(i, '')
-        return msg
-
-    def _devmsg(self):
-        if self._verbosity == 2:
-            info = inspect.getouterframes(inspect.currentframe())[3]
-            devmsg = self._start + self._blue_CL + info[1].split('/')[-1] + ' ' + str(info[2]) \
-                        + ' ' + info[3] + '()' + self._end + ' - '
-        else:
-            devmsg = ''
-        return devmsg
+        return _ansi_escape.sub('', msg) if self._start else msg
 
-    def _print(self, premsg, msg, last=True):
+    @staticmethod
+    def _callsite(depth=3):
+        """
+        Return the file, line number, and function name of the calling
+        code.
+
+        The default depth is for the caller of the public message
+        methods, which call :func:`_print`, which calls this method.
         """
-        Print to standard error and the log file
+        frame = sys._getframe(depth)
+        return os.path.basename(frame.f_code.co_filename), frame.f_lineno, frame.f_code.co_name
+
+    def _print(self, premsg, msg, args=(), last=True, level=None):
         """
-        devmsg = self._devmsg()
+        Print to standard error and the log files
+        """
+        if self._verbosity == 0 and self._log is None and self._jsonlog is None:
+            # Nothing to do
+            return
+        if len(args) > 0:
+            msg = msg.format(*args)
+        callsite = self._callsite() if self._verbosity == 2 or self._jsonlog is not None \
+                        else None
+        devmsg = self._start + self._blue_CL + '{0} {1} {2}()'.format(*callsite) + self._end \
+                        + ' - ' if self._verbosity == 2 else ''
         _msg = premsg+devmsg+msg
         if self._verbosity != 0:
             print(_msg, file=sys.stderr)
         if self._log:
             clean_msg = self._cleancolors(_msg)
             self._log.write(clean_msg+'\n' if last else clean_msg)
+        if self._jsonlog is not None and level is not None:
+            now = time.time()
+            self._jsonlog.write(json.dumps({'time': now, 'elapsed': now - self._tstart,
+                                            'level': level, 'file': callsite[0],
+                                            'line': callsite[1], 'function': callsite[2],
+                                            'message': self._cleancolors(msg)}) + '\n')
 
     def _initialize_log_file(self, log=None):
         """
@@ -136,7 +168,18 @@ class Messages:
         self._log.write("You are using astropy version={:s}\n\n".format(astropy.__version__))
         self._log.write("------------------------------------------------------\n\n")
 
-    def reset(self, log=None, verbosity=None, colors=True):
+    def _initialize_json_log(self, jsonlog=None):
+        """
+        Expects self._jsonlog is already None.
+        """
+        self._tstart = time.time()
+        if jsonlog is None:
+            return
+        # Line buffered so that the records can be monitored while the
+        # code is running
+        self._jsonlog = open(jsonlog, 'w', buffering=1)
+
+    def reset(self, log=None, verbosity=None, colors=True, jsonlog=None):
         """
         Reinitialize the object.
 
@@ -146,6 +189,7 @@ class Messages:
         # Initialize other variables
         self._verbosity = self._defverb if verbosity is None else verbosity
         self.reset_log_file(log)
+        self.reset_json_log(jsonlog)
         self.disablecolors()
         if colors:
             self.enablecolors()
@@ -156,19 +200,28 @@ class Messages:
             self._log = None
         self._initialize_log_file(log=log)
 
+    def reset_json_log(self, jsonlog):
+        if self._jsonlog:
+            self._jsonlog.close()
+            self._jsonlog = None
+        self._initialize_json_log(jsonlog=jsonlog)
+
     def close(self):
         '''
-        Close the log file before the code exits
+        Close the log files before the code exits
         '''
         close_qa(self.pypeit_file)
+        self.reset_json_log(None)
         return self.reset_log_file(None)
 
-    def error(self, msg):
+    def error(self, msg, *args):
         """
         Print an error message
         """
+        if len(args) > 0:
+            msg = msg.format(*args)
         premsg = '\n'+self._start + self._white_RD + '[ERROR]   ::' + self._end + ' '
-        self._print(premsg, msg)
+        self._print(premsg, msg, level='ERROR')
 
         # Close log file
         # TODO: This no longer "closes" the QA plots
@@ -180,57 +233,57 @@ class Messages:
         # would be executed.
         sys.exit(1)
 
-    def info(self, msg):
+    def info(self, msg, *args):
         """
         Print an information message
         """
         premsg = self._start + self._green_CL + '[INFO]    ::' + self._end + ' '
-        self._print(premsg, msg)
+        self._print(premsg, msg, args=args, level='INFO')
 
-    def info_update(self, msg, last=False):
+    def info_update(self, msg, *args, last=False):
         """
         Print an information message that needs to be updated
         """
         premsg = '\r' + self._start + self._green_CL + '[INFO]    ::' + self._end + ' '
-        self._print(premsg, msg, last=last)
+        self._print(premsg, msg, args=args, last=last, level='INFO')
 
-    def test(self, msg):
+    def test(self, msg, *args):
         """
         Print a test message
         """
         if self._verbosity == 2:
             premsg = self._start + self._white_BL + '[TEST]    ::' + self._end + ' '
-            self._print(premsg, msg)
+            self._print(premsg, msg, args=args, level='TEST')
 
-    def warn(self, msg):
+    def warn(self, msg, *args):
         """
         Print a warning message
         """
         premsg = self._start + self._red_CL + '[WARNING] ::' + self._end + ' '
-        self._print(premsg, msg)
+        self._print(premsg, msg, args=args, level='WARNING')
 
-    def bug(self, msg):
+    def bug(self, msg, *args):
         """
         Print a bug message
         """
         premsg = self._start + self._white_BK + '[BUG]     ::' + self._end + ' '
-        self._print(premsg, msg)
+        self._print(premsg, msg, args=args, level='BUG')
 
-    def work(self, msg):
+    def work(self, msg, *args):
         """
         Print a work in progress message
         """
         if self._verbosity == 2:
             premsgp = self._start + self._black_CL + '[WORK IN ]::' + self._end + '\n'
             premsgs = self._start + self._yellow_CL + '[PROGRESS]::' + self._end + ' '
-            self._print(premsgp+premsgs, msg)
+            self._print(premsgp+premsgs, msg, args=args, level='WORK')
 
-    def prindent(self, msg):
+    def prindent(self, msg, *args):
         """
         Print an indent
         """
         premsg = '             '
-        self._print(premsg, msg)
+        self._print(premsg, msg, args=args)
 
     def input(self):
         """
@@ -0,0 +1,418 @@
+"""
+Quick-look reductions, including a long-running server that keeps the
+calibrations in memory.
+
+At the telescope, the quick-look scripts (e.g., ``pypeit_ql_mos``) are
+typically run on every new exposure.  Each execution imports PypeIt,
+builds the metadata for the files, and reloads all the master
+calibrations from disk.  The :class:`QuickLookServer` avoids this
+overhead by running in a single, long-running process (see
+``pypeit_ql_server``) that holds the
+:class:`~pypeit.calibrations.Calibrations` objects of the most recently
+used setups in memory.  New exposures are submitted to the server over
+HTTP on the local host (see :func:`submit` and the ``--server`` option
+of ``pypeit_ql_mos``) and the server returns the paths to the spec2d and
+spec1d files.
+
+A quick-look job is defined by the name of the spectrograph, the list
+of raw files, their frame types, and (optionally) a list of parameter
+lines.  The frames that are not science or standard frames define the
+*setup*: jobs with the same spectrograph, calibration frames, and
+parameters reuse the same calibrations.
+
+.. include common links, assuming primary doc root is up one directory
+.. include:: ../include/links.rst
+
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+
+import numpy as np
+
+from configobj import ConfigObj
+
+from pypeit import msgs
+from pypeit.core import framematch
+
+
+def setup_key(spectrograph, files, frametypes, cfg_lines=None):
+    """
+    Construct the key that identifies the setup of a quick-look job.
+
+    The key is the hash of the spectrograph name, the calibration
+    frames (i.e., any frame that is not a science or standard frame)
+    and their frame types, and the parameter lines.  The science and
+    standard frames do not contribute to the key.
+
+    Args:
+        spectrograph (:obj:`str`):
+            Name of the spectrograph.
+        files (:obj:`list`):
+            Full path to each raw file.
+        frametypes (:obj:`list`):
+            Comma-separated frame types of each file (e.g.,
+            ``'arc,tilt'``).
+        cfg_lines (:obj:`list`, optional):
+            Parameter lines for the reduction.
+
+    Returns:
+        :obj:`str`: The 12-character key for the setup.
+    """
+    calibs = sorted([(os.path.abspath(f), ','.join(sorted(t.split(','))))
+                        for f, t in zip(files, frametypes)
+                        if 'science' not in t and 'standard' not in t])
+    txt = json.dumps([spectrograph, calibs, [] if cfg_lines is None else list(cfg_lines)])
+    return hashlib.sha1(txt.encode('utf-8')).hexdigest()[:12]
+
+
+def write_pypeit_file(spectrograph, files, frametypes, cfg_lines, output_path=None,
+                      comb_id=None, bkg_id=None):
+    """
+    Write the pypeit file for a quick-look reduction.
+
+    The frame types are set directly instead of being determined from
+    the headers, and all the files are assigned to setup ``A``.
+
+    Args:
+        spectrograph (:obj:`str`):
+            Name of the spectrograph.
+        files (:obj:`list`):
+            Full path to each raw file.
+        frametypes (:obj:`list`):
+            Comma-separated frame types of each file (e.g.,
+            ``'pixelflat,trace,illumflat'``).
+        cfg_lines (:obj:`list`):
+            Parameter lines for the reduction.  These must include the
+            ``[rdx]`` section with the spectrograph name.
+        output_path (:obj:`str`, optional):
+            Root path for the pypeit file; see
+            :func:`~pypeit.metadata.PypeItMetaData.write_pypeit`.
+        comb_id (:obj:`list`, optional):
+            The combination group of each file.  If None, each science
+            and standard frame is reduced separately.
+        bkg_id (:obj:`list`, optional):
+            The combination group used as the background for each file
+            (e.g., for A-B pairs).  If None, no background frames are
+            used.
+
+    Returns:
+        :obj:`str`: The name of the pypeit file.
+    """
+    # Imported here to keep the import of this module light
+    from pypeit import pypeitsetup
+
+    if len(frametypes) != len(files):
+        msgs.error('Must provide one frame type for each file.')
+
+    ps = pypeitsetup.PypeItSetup(files, path='./', spectrograph_name=spectrograph,
+                                 cfg_lines=cfg_lines)
+    ps.build_fitstbl()
+
+    # PypeItSetup sorts the files by MJD; find the row of each input
+    # file
+    rows = np.array([ps.fitstbl['filename'].data.tolist().index(os.path.basename(f))
+                        for f in files])
+
+    # Set the frame types
+    bm = framematch.FrameTypeBitMask()
+    type_bits = np.zeros(len(files), dtype=bm.minimum_dtype())
+    for row, ftype in zip(rows, frametypes):
+        type_bits[row] = bm.turn_on(type_bits[row], ftype.split(','))
+    ps.fitstbl.set_frame_types(type_bits)
+
+    # Set the combination groups
+    if comb_id is not None:
+        ps.fitstbl['comb_id'] = -1
+        ps.fitstbl['comb_id'][rows] = comb_id
+    if bkg_id is not None:
+        ps.fitstbl['bkg_id'] = -1
+        ps.fitstbl['bkg_id'][rows] = bkg_id
+    ps.fitstbl.set_combination_groups()
+    ps.fitstbl['setup'] = 'A'
+
+    # Write
+    ofiles = ps.fitstbl.write_pypeit(output_path=output_path, configs='A',
+                                     write_bkg_pairs=True, cfg_lines=cfg_lines)
+    if len(ofiles) > 1:
+        msgs.error("Bad things happened..")
+    return ofiles[0]
+
+
+class QuickLookServer:
+    """
+    Reduce quick-look jobs while keeping the calibrations of the most
+    recently used setups in memory.
+
+    Each setup (see :func:`setup_key`) is reduced in its own directory,
+    ``<redux_path>/<spectrograph>_<key>``, so that the master
+    calibrations written to disk are also reused after a setup has been
+    dropped from memory.  The calibrations are held in memory for at
+    most ``max_setups`` setups; when a new setup is added, the least
+    recently used setup is dropped.
+
+    Jobs are reduced one at a time, in the order they are received.
+
+    Args:
+        redux_path (:obj:`str`, optional):
+            Root directory for the reductions.  If None, use the
+            current working directory.
+        max_setups (:obj:`int`, optional):
+            Maximum number of setups to hold in memory.
+        verbosity (:obj:`int`, optional):
+            Verbosity level passed to :class:`~pypeit.pypeit.PypeIt`.
+
+    Attributes:
+        setups (`collections.OrderedDict`_):
+            The calibrations held in memory for each setup, ordered
+            from the least to the most recently used.  Each item is a
+            dictionary with the
+            :class:`~pypeit.calibrations.Calibrations` objects; see the
+            ``calib_cache`` argument of :class:`~pypeit.pypeit.PypeIt`.
+    """
+    def __init__(self, redux_path=None, max_setups=2, verbosity=1):
+        self.redux_path = os.getcwd() if redux_path is None else os.path.abspath(redux_path)
+        if max_setups < 1:
+            msgs.error('Must keep at least one setup in memory.')
+        self.max_setups = max_setups
+        self.verbosity = verbosity
+        self.setups = OrderedDict()
+        self.httpd = None
+
+    def calib_cache(self, key):
+        """
+        Return the calibrations held in memory for a setup.
+
+        The setup is marked as the most recently used.  If it is not
+        in memory, an empty cache is added for it and, if necessary,
+        the least recently used setup is dropped.
+
+        Args:
+            key (:obj:`str`):
+                The setup key; see :func:`setup_key`.
+
+        Returns:
+            :obj:`dict`: The calibrations held in memory for this
+            setup.
+        """
+        if key in self.setups:
+            self.setups.move_to_end(key)
+            return self.setups[key]
+        while len(self.setups) >= self.max_setups:
+            old_key, _ = self.setups.popitem(last=False)
+            msgs.info('Removing setup {0} from memory'.format(old_key))
+        self.setups[key] = {}
+        return self.setups[key]
+
+    def reduce(self, spectrograph, files, frametypes, cfg_lines=None, comb_id=None,
+               bkg_id=None):
+        """
+        Reduce a quick-look job.
+
+        Args:
+            spectrograph (:obj:`str`):
+                Name of the spectrograph.
+            files (:obj:`list`):
+                Full path to each raw file.
+            frametypes (:obj:`list`):
+                Comma-separated frame types of each file.
+            cfg_lines (:obj:`list`, optional):
+                Parameter lines for the reduction.  The spectrograph
+                and reduction path are set by the server.
+            comb_id (:obj:`list`, optional):
+                The combination group of each file; see
+                :func:`write_pypeit_file`.
+            bkg_id (:obj:`list`, optional):
+                The background combination group of each file; see
+                :func:`write_pypeit_file`.
+
+        Returns:
+            :obj:`dict`: Dictionary with the setup key (``setup``),
+            whether or not the calibrations were already in memory
+            (``in_memory``), and the lists of spec2d and spec1d files
+            written (``spec2d`` and ``spec1d``).
+        """
+        # Imported here to keep the import of this module light
+        from pypeit import pypeit
+
+        key = setup_key(spectrograph, files, frametypes, cfg_lines=cfg_lines)
+        in_memory = key in self.setups
+        cache = self.calib_cache(key)
+
+        # Set the spectrograph and the reduction path
+        root = '{0}_{1}'.format(spectrograph, key)
+        cfg = ConfigObj(cfg_lines)
+        if 'rdx' not in cfg.keys():
+            cfg['rdx'] = {}
+        cfg['rdx']['spectrograph'] = spectrograph
+        cfg['rdx']['redux_path'] = os.path.join(self.redux_path, root,
+                                                '{0}_A'.format(spectrograph))
+
+        pypeit_file = write_pypeit_file(spectrograph, files, frametypes, cfg.write(),
+                                        output_path=os.path.join(self.redux_path, root),
+                                        comb_id=comb_id, bkg_id=bkg_id)
+        pypeIt = pypeit.PypeIt(pypeit_file, verbosity=self.verbosity, reuse_masters=True,
+                               overwrite=True, logname=pypeit_file.replace('.pypeit', '.log'),
+                               show=False, calib_cache=cache)
+        pypeIt.reduce_all()
+        msgs.info('Data reduction complete')
+
+        # Collect the output files
+        is_reduced = pypeIt.fitstbl.find_frames('science') \
+                        | pypeIt.fitstbl.find_frames('standard')
+        frames = [np.where(pypeIt.fitstbl['comb_id'] == comb)[0][0]
+                    for comb in np.unique(pypeIt.fitstbl['comb_id'][is_reduced])]
+        spec2d = [pypeIt.spec_output_file(frame, twod=True) for frame in frames]
+        spec1d = [pypeIt.spec_output_file(frame) for frame in frames]
+        return dict(setup=key, in_memory=in_memory,
+                    spec2d=[f for f in spec2d if os.path.isfile(f)],
+                    spec1d=[f for f in spec1d if os.path.isfile(f)])
+
+    def status(self):
+        """
+        Return the setups held in memory.
+
+        Returns:
+            :obj:`dict`: Dictionary with the keys of the setups held in
+            memory, from the least to the most recently used
+            (``setups``), and the master keys of their calibrations
+            (``calibrations``).
+        """
+        return dict(setups=list(self.setups.keys()),
+                    calibrations={key: list(cache.keys()) for key, cache in self.setups.items()})
+
+    def serve(self, host='localhost', port=8765):
+        """
+        Serve the quick-look jobs until the server is shut down.
+
+        The server accepts the following requests:
+
+            - ``POST /reduce``: Reduce a job.  The body must be a JSON
+              dictionary with the arguments of :func:`reduce`, and the
+              response is a JSON dictionary with its result (and
+              ``status='ok'``), or with ``status='error'`` and the
+              error ``message`` if the reduction failed.
+            - ``GET /status``: Return :func:`status`.
+            - ``POST /shutdown``: Stop the server.
+
+        Args:
+            host (:obj:`str`, optional):
+                Host name.  The server does not provide any
+                authentication, so it should only listen on the local
+                host.
+            port (:obj:`int`, optional):
+                Port number.  If 0, a free port is selected; the port
+                actually used is available from :attr:`port`.
+        """
+        self.httpd = HTTPServer((host, port), QuickLookHandler)
+        self.httpd.ql_server = self
+        msgs.info('Quick-look server listening on {0}:{1}'.format(host, self.port))
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.httpd = None
+
+    @property
+    def port(self):
+        """The port of the running server, or None if it is not running."""
+        return None if self.httpd is None else self.httpd.server_address[1]
+
+    def shutdown(self):
+        """
+        Stop the server; see :func:`serve`.
+        """
+        if self.httpd is not None:
+            # shutdown() blocks until serve_forever() returns, so it
+            # must not be called from the thread handling the request
+            threading.Thread(target=self.httpd.shutdown).start()
+
+
+class QuickLookHandler(BaseHTTPRequestHandler):
+    """
+    Handle the HTTP requests to a :class:`QuickLookServer`; see
+    :func:`QuickLookServer.serve`.
+    """
+    def _respond(self, result, code=200):
+        """
+        Send a JSON response.
+        """
+        body = json.dumps(result).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/status':
+            self._respond(dict(status='ok', **self.server.ql_server.status()))
+        else:
+            self._respond(dict(status='error', message='Unknown request: {0}'.format(self.path)),
+                          code=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        if self.path == '/shutdown':
+            self._respond(dict(status='ok'))
+            self.server.ql_server.shutdown()
+        elif self.path == '/reduce':
+            try:
+                job = json.loads(self.rfile.read(length).decode('utf-8'))
+                result = self.server.ql_server.reduce(**job)
+            except Exception as e:
+                # Keep the server running
+                self._respond(dict(status='error', message='{0}: {1}'.format(
+                                    e.__class__.__name__, e)), code=500)
+            else:
+                self._respond(dict(status='ok', **result))
+        else:
+            self._respond(dict(status='error', message='Unknown request: {0}'.format(self.path)),
+                          code=404)
+
+    def log_message(self, format, *args):
+        msgs.info('Quick-look request: ' + format % args)
+
+
+def submit(job, host='localhost', port=8765, timeout=None):
+    """
+    Submit a request to a running :class:`QuickLookServer`.
+
+    Args:
+        job (:obj:`dict`, :obj:`str`):
+            The arguments of :func:`QuickLookServer.reduce` for the
+            job to reduce, or one of ``'status'`` or ``'shutdown'``.
+        host (:obj:`str`, optional):
+            Host name of the server.
+        port (:obj:`int`, optional):
+            Port number of the server.
+        timeout (:obj:`float`, optional):
+            Timeout in seconds for the request.  If None, wait until
+            the job is reduced.
+
+    Returns:
+        :obj:`dict`: The response from the server.
+
+    Raises:
+        PypeItError:
+            Raised if the server returned an error.
+    """
+    url = 'http://{0}:{1}/'.format(host, port)
+    if job == 'status':
+        req = urlrequest.Request(url + 'status')
+    elif job == 'shutdown':
+        req = urlrequest.Request(url + 'shutdown', data=b'', method='POST')
+    else:
+        req = urlrequest.Request(url + 'reduce', data=json.dumps(job).encode('utf-8'),
+                                 headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urlrequest.urlopen(req, timeout=timeout) as f:
+            return json.loads(f.read().decode('utf-8'))
+    except HTTPError as e:
+        result = json.loads(e.read().decode('utf-8'))
+        msgs.error('Quick-look server returned an error: {0}'.format(result['message']))
@@ -6,7 +6,6 @@ Main driver class for skysubtraction and extraction
 
 """
 
-import inspect
 import numpy as np
 import os
 
@@ -19,6 +18,7 @@ from scipy.optimize import least_squares
 
 from pypeit import specobjs
 from pypeit import msgs, utils
+from pypeit.profiler import profiler
 from pypeit import masterframe, flatfield
 from pypeit.display import display
 from pypeit.core import skysub, extract, pixels, wave, flexure, flat
@@ -27,8 +27,6 @@ from pypeit.core.moment import moment1d
 
 from linetools.spectra import xspectrum1d
 
-from IPython import embed
-
 
 class Reduce(object):
     """
@@ -54,6 +52,15 @@ class Reduce(object):
            Show plots along the way?
         std_outfile (str):
            Filename of the standard star output
+        checkpoint (:class:`pypeit.checkpoint.CheckpointStore`, optional):
+           Store used to save the results of each stage of
+           :func:`run` (``initial_sky``: first-pass object finding and
+           global sky subtraction; ``find_objects``: second-pass
+           object finding; ``global_sky``: second-pass global sky
+           subtraction and global flexure correction; ``extract``:
+           local sky subtraction and extraction), and to restore them
+           if they were saved by a previous, interrupted reduction.
+           If None, no checkpoints are used.
 
     Attributes:
         ivarmodel (`numpy.ndarray`_):
@@ -97,7 +104,8 @@ class Reduce(object):
     @classmethod
     def get_instance(cls, sciImg, spectrograph, par, caliBrate,
                  objtype, ir_redux=False, det=1, std_redux=False, show=False,
-                 binning=None, setup=None, std_outfile=None, basename=None):
+                 binning=None, setup=None, std_outfile=None, basename=None,
+                 checkpoint=None):
         """
         Instantiate the Reduce subclass appropriate for the provided
         spectrograph.
@@ -112,6 +120,8 @@ class Reduce(object):
             caliBrate (:class:`pypeit.calibrations.Calibrations`):
             basename (str, optional):
                 Output filename used for spectral flexure QA
+            checkpoint (:class:`pypeit.checkpoint.CheckpointStore`, optional):
+                Store for the checkpoints of :func:`run`.
             **kwargs
                 Passed to Parent init
 
@@ -122,11 +132,12 @@ class Reduce(object):
                     if c.__name__ == (spectrograph.pypeline + 'Reduce'))(
             sciImg, spectrograph, par, caliBrate, objtype, ir_redux=ir_redux, det=det,
             std_redux=std_redux, show=show,binning=binning, setup=setup,
-            std_outfile=std_outfile, basename=basename)
+            std_outfile=std_outfile, basename=basename, checkpoint=checkpoint)
 
     def __init__(self, sciImg, spectrograph, par, caliBrate,
                  objtype, ir_redux=False, det=1, std_redux=False, show=False,
-                 binning=None, setup=None, std_outfile=None, basename=None):
+                 binning=None, setup=None, std_outfile=None, basename=None,
+                 checkpoint=None):
 
         # Setup the parameters sets for this object. NOTE: This uses objtype, not frametype!
 
@@ -139,6 +150,7 @@ class Reduce(object):
         self.std_outfile = std_outfile
         self.scaleimg = np.array([1.0], dtype=np.float)  # np.array([1]) applies no scale
         self.basename = basename
+        self.checkpoint = checkpoint
         # Parse
         # Slit pieces
         #   WARNING -- It is best to unpack here then pass around self.slits
@@ -277,6 +289,7 @@ class Reduce(object):
             # Purge out the negative objects if this was a near-IR reduction unless negative objects are requested
 
             # Quick loop over the objects
+            wave_interp = extract.WaveImageInterpolator(self.waveimg)
             for iobj in range(self.sobjs.nobj):
                 sobj = self.sobjs[iobj]
                 plate_scale = self.get_platescale(sobj)
@@ -288,7 +301,7 @@ class Reduce(object):
                                                inmask, self.waveimg,
                                                global_sky, self.sciImg.rn2img,
                                                self.par['reduce']['extraction']['boxcar_radius']/plate_scale,
-                                               sobj)
+                                               sobj, wave_interp=wave_interp)
 
             # Fill up extra bits and pieces
             self.objmodel = np.zeros_like(self.sciImg.image)
@@ -364,27 +377,46 @@ class Reduce(object):
         msgs.info("Generating wavelength image")
         self.waveimg = self.wv_calib.build_waveimg(self.tilts, self.slits, spat_flexure=self.spat_flexure_shift)
 
-        # First pass object finding
-        self.sobjs_obj, self.nobj, skymask_init = \
-            self.find_objects(self.sciImg.image, std_trace=std_trace,
-                              show_peaks=show_peaks,
-                              show=self.reduce_show & (not self.std_redux),
-                              manual_extract_dict=self.par['reduce']['extraction']['manual'].dict_for_objfind())
-
-        # Check if the user wants to overwrite the skymask with a pre-defined sky regions file
-        skymask_init, usersky = self.load_skyregions(skymask_init)
-
-        # Global sky subtract
-        self.initial_sky = self.global_skysub(skymask=skymask_init).copy()
+        # First pass object finding and global sky subtraction
+        checkpoint = self.load_checkpoint('initial_sky')
+        if checkpoint is None:
+            with profiler.step('find_objects', det=self.det):
+                self.sobjs_obj, self.nobj, skymask_init = \
+                    self.find_objects(self.sciImg.image, std_trace=std_trace,
+                                      show_peaks=show_peaks,
+                                      show=self.reduce_show & (not self.std_redux),
+                                      manual_extract_dict=self.par['reduce']['extraction']['manual'].dict_for_objfind())
+
+            # Check if the user wants to overwrite the skymask with a pre-defined sky regions file
+            skymask_init, usersky = self.load_skyregions(skymask_init)
+
+            # Global sky subtract
+            with profiler.step('global_skysub', det=self.det):
+                self.initial_sky = self.global_skysub(skymask=skymask_init).copy()
+            self.save_checkpoint('initial_sky', sobjs=self.sobjs_obj, nobj=int(self.nobj),
+                                 initial_sky=self.initial_sky, skymask_init=skymask_init,
+                                 usersky=bool(usersky))
+        else:
+            self.sobjs_obj, self.nobj, self.initial_sky, skymask_init, usersky \
+                    = [checkpoint[k] for k in ['sobjs', 'nobj', 'initial_sky', 'skymask_init',
+                                               'usersky']]
 
         # Second pass object finding on sky-subtracted image
         if (not self.std_redux) and (not self.par['reduce']['findobj']['skip_second_find']):
-            self.sobjs_obj, self.nobj, self.skymask = \
-                self.find_objects(self.sciImg.image - self.initial_sky,
-                                  std_trace=std_trace,
-                                  show=self.reduce_show,
-                                  show_peaks=show_peaks,
-                                  manual_extract_dict=self.par['reduce']['extraction']['manual'].dict_for_objfind())
+            checkpoint = self.load_checkpoint('find_objects')
+            if checkpoint is None:
+                with profiler.step('find_objects', det=self.det):
+                    self.sobjs_obj, self.nobj, self.skymask = \
+                        self.find_objects(self.sciImg.image - self.initial_sky,
+                                          std_trace=std_trace,
+                                          show=self.reduce_show,
+                                          show_peaks=show_peaks,
+                                          manual_extract_dict=self.par['reduce']['extraction']['manual'].dict_for_objfind())
+                self.save_checkpoint('find_objects', sobjs=self.sobjs_obj, nobj=int(self.nobj),
+                                     skymask=self.skymask)
+            else:
+                self.sobjs_obj, self.nobj, self.skymask \
+                        = [checkpoint[k] for k in ['sobjs', 'nobj', 'skymask']]
         else:
             msgs.info("Skipping 2nd run of finding objects")
 
@@ -395,28 +427,52 @@ class Reduce(object):
 
         # Do we have any positive objects to proceed with?
         if self.nobj > 0:
-            # Global sky subtraction second pass. Uses skymask from object finding
-            if (self.std_redux or self.par['reduce']['extraction']['skip_optimal'] or
-                    self.par['reduce']['findobj']['skip_second_find'] or usersky):
-                self.global_sky = self.initial_sky.copy()
+            checkpoint = self.load_checkpoint('global_sky')
+            if checkpoint is None:
+                # Global sky subtraction second pass. Uses skymask from object finding
+                if (self.std_redux or self.par['reduce']['extraction']['skip_optimal'] or
+                        self.par['reduce']['findobj']['skip_second_find'] or usersky):
+                    self.global_sky = self.initial_sky.copy()
+                else:
+                    with profiler.step('global_skysub', det=self.det):
+                        self.global_sky = self.global_skysub(skymask=self.skymask, show=self.reduce_show)
+
+                # Apply a global flexure correction to each slit
+                # provided it's not a standard star
+                if self.par['flexure']['spec_method'] != 'skip' and not self.std_redux:
+                    with profiler.step('spec_flexure_correct', det=self.det, mode='global'):
+                        self.spec_flexure_correct(mode='global')
+                self.save_checkpoint('global_sky', global_sky=self.global_sky,
+                                     slitshift=self.slitshift)
             else:
-                self.global_sky = self.global_skysub(skymask=self.skymask, show=self.reduce_show)
-
-            # Apply a global flexure correction to each slit
-            # provided it's not a standard star
-            if self.par['flexure']['spec_method'] != 'skip' and not self.std_redux:
-                self.spec_flexure_correct(mode='global')
+                self.global_sky, self.slitshift = checkpoint['global_sky'], checkpoint['slitshift']
+                if np.any(self.slitshift != 0):
+                    # Re-apply the global flexure correction to the wavelengths
+                    self.waveimg = self.wv_calib.build_waveimg(self.tilts, self.slits,
+                                                               spat_flexure=self.spat_flexure_shift,
+                                                               spec_flexure=self.slitshift)
 
             # Extract + Return
-            self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs \
-                = self.extract(self.global_sky, self.sobjs_obj)
+            checkpoint = self.load_checkpoint('extract')
+            if checkpoint is None:
+                with profiler.step('local_skysub_extract', det=self.det):
+                    self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs \
+                        = self.extract(self.global_sky, self.sobjs_obj)
+                self.save_checkpoint('extract', sobjs=self.sobjs, skymodel=self.skymodel,
+                                     objmodel=self.objmodel, ivarmodel=self.ivarmodel,
+                                     outmask=self.outmask)
+            else:
+                self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs \
+                        = [checkpoint[k] for k in ['skymodel', 'objmodel', 'ivarmodel',
+                                                   'outmask', 'sobjs']]
             if self.ir_redux:
                 self.sobjs.make_neg_pos() if return_negative else self.sobjs.purge_neg()
         else:  # No objects, pass back what we have
             # Apply a global flexure correction to each slit
             # provided it's not a standard star
             if self.par['flexure']['spec_method'] != 'skip' and not self.std_redux:
-                self.spec_flexure_correct(mode='global')
+                with profiler.step('spec_flexure_correct', det=self.det, mode='global'):
+                    self.spec_flexure_correct(mode='global')
             #Could have negative objects but no positive objects so purge them
             if self.ir_redux:
                 self.sobjs_obj.make_neg_pos() if return_negative else self.sobjs_obj.purge_neg()
@@ -440,10 +496,12 @@ class Reduce(object):
             msgs.warn('No objects to extract!')
         elif self.par['flexure']['spec_method'] not in ['skip', 'slitcen'] and not self.std_redux:
             # Apply a refined estimate of the flexure to objects, and then apply reference frame correction to objects
-            self.spec_flexure_correct(mode='local', sobjs=self.sobjs)
+            with profiler.step('spec_flexure_correct', det=self.det, mode='local'):
+                self.spec_flexure_correct(mode='local', sobjs=self.sobjs)
 
         # Apply a reference frame correction to each object and the waveimg
-        self.refframe_correct(ra, dec, obstime, sobjs=self.sobjs)
+        with profiler.step('refframe_correct', det=self.det):
+            self.refframe_correct(ra, dec, obstime, sobjs=self.sobjs)
 
         # Update the mask
         reduce_masked = np.where(np.invert(self.reduce_bpm_init) & self.reduce_bpm)[0]
@@ -455,6 +513,69 @@ class Reduce(object):
         return self.skymodel, self.objmodel, self.ivarmodel, self.outmask, self.sobjs, \
                self.scaleimg, self.waveimg, self.tilts
 
+    def save_checkpoint(self, stage, sobjs=None, **kwargs):
+        """
+        Save the results of a stage of :func:`run` to
+        :attr:`checkpoint`.
+
+        Along with the provided results, the checkpoint includes the
+        attributes that the stages modify in place: the science image
+        masks, :attr:`reduce_bpm`, :attr:`scaleimg` and, if a relative
+        scale has been applied, the science image and its inverse
+        variance.
+
+        Args:
+            stage (:obj:`str`):
+                The name of the stage.
+            sobjs (:class:`pypeit.specobjs.SpecObjs`, optional):
+                The objects to save.
+            **kwargs:
+                The arrays (`numpy.ndarray`_ or None) and scalars to
+                save.
+        """
+        if self.checkpoint is None:
+            return
+        arrays = dict(reduce_bpm=self.reduce_bpm, fullmask=self.sciImg.fullmask,
+                      crmask=self.sciImg.crmask, scaleimg=self.scaleimg)
+        if self.scaleimg.size > 1:
+            arrays['sciimg'] = self.sciImg.image
+            arrays['sciivar'] = self.sciImg.ivar
+        meta = dict(steps=self.steps)
+        for key, value in kwargs.items():
+            if value is None or isinstance(value, np.ndarray):
+                arrays[key] = value
+            else:
+                meta[key] = value
+        self.checkpoint.save(stage, arrays=arrays, meta=meta, sobjs=sobjs)
+
+    def load_checkpoint(self, stage):
+        """
+        Restore the results of a stage of :func:`run` from
+        :attr:`checkpoint`; see :func:`save_checkpoint`.
+
+        Args:
+            stage (:obj:`str`):
+                The name of the stage.
+
+        Returns:
+            :obj:`dict`: The results of the stage, with the objects
+            in ``sobjs``, or None if the stage has not been saved.
+        """
+        if self.checkpoint is None or not self.checkpoint.has(stage):
+            return None
+        arrays, meta, sobjs = self.checkpoint.load(stage)
+        self.reduce_bpm = arrays.pop('reduce_bpm')
+        self.sciImg.fullmask = arrays.pop('fullmask')
+        self.sciImg.crmask = arrays.pop('crmask')
+        self.scaleimg = arrays.pop('scaleimg')
+        if 'sciimg' in arrays:
+            self.sciImg.image = arrays.pop('sciimg')
+            self.sciImg.ivar = arrays.pop('sciivar')
+        self.steps = meta.pop('steps')
+        arrays.update(meta)
+        arrays['sobjs'] = specobjs.SpecObjs() if sobjs is None else sobjs
+        return arrays
+
     def find_objects(self, image, std_trace=None,
                      show_peaks=False, show_fits=False,
                      show_trace=False, show=False, manual_extract_dict=None,
@@ -576,13 +697,14 @@ class Reduce(object):
                 continue
 
             # Find sky
-            self.global_sky[thismask] = skysub.global_skysub(self.sciImg.image, self.sciImg.ivar, self.tilts,
-                                                             thismask, self.slits_left[:,slit_idx],
-                                                             self.slits_right[:,slit_idx],
-                                                             inmask=inmask, sigrej=sigrej,
-                                                             bsp=self.par['reduce']['skysub']['bspline_spacing'],
-                                                             no_poly=self.par['reduce']['skysub']['no_poly'],
-                                                             pos_mask=(not self.ir_redux), show_fit=show_fit)
+            with profiler.step('slit', det=self.det, slit=int(slit_spat)):
+                self.global_sky[thismask] = skysub.global_skysub(self.sciImg.image, self.sciImg.ivar, self.tilts,
+                                                                 thismask, self.slits_left[:,slit_idx],
+                                                                 self.slits_right[:,slit_idx],
+                                                                 inmask=inmask, sigrej=sigrej,
+                                                                 bsp=self.par['reduce']['skysub']['bspline_spacing'],
+                                                                 no_poly=self.par['reduce']['skysub']['no_poly'],
+                                                                 pos_mask=(not self.ir_redux), show_fit=show_fit)
             # Mask if something went wrong
             if np.sum(self.global_sky[thismask]) == 0.:
                 self.reduce_bpm[slit_idx] = True
@@ -595,7 +717,7 @@ class Reduce(object):
             self.sciImg.update_mask_cr(self.sciImg.crmask)
 
         # Step
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('global_skysub')
 
         if show:
             sobjs_show = None if show_objs else self.sobjs_obj
@@ -1010,32 +1132,33 @@ class MultiSlitReduce(Reduce):
             # done through objfind where all the relevant information
             # is. This will be a png file(s) per slit.
 
-            sobjs_slit, skymask[thismask] = \
-                    extract.objfind(image, thismask,
-                                self.slits_left[:,slit_idx],
-                                self.slits_right[:,slit_idx],
-                                inmask=inmask, ir_redux=self.ir_redux,
-                                ncoeff=self.par['reduce']['findobj']['trace_npoly'],
-                                std_trace=std_trace,
-                                sig_thresh=self.par['reduce']['findobj']['sig_thresh'],
-                                hand_extract_dict=manual_extract_dict,
-                                specobj_dict=specobj_dict, show_peaks=show_peaks,
-                                show_fits=show_fits, show_trace=show_trace,
-                                trim_edg=self.par['reduce']['findobj']['find_trim_edge'],
-                                cont_fit=self.par['reduce']['findobj']['find_cont_fit'],
-                                npoly_cont=self.par['reduce']['findobj']['find_npoly_cont'],
-                                fwhm=self.par['reduce']['findobj']['find_fwhm'],
-                                boxcar_rad_skymask=boxcar_rad_skymask,
-                                maxdev=self.par['reduce']['findobj']['find_maxdev'],
-                                find_min_max=self.par['reduce']['findobj']['find_min_max'],
-                                qa_title=qa_title, nperslit=self.par['reduce']['findobj']['maxnumber'],
-                                debug_all=debug)
+            with profiler.step('slit', det=self.det, slit=int(slit_spat)):
+                sobjs_slit, skymask[thismask] = \
+                        extract.objfind(image, thismask,
+                                    self.slits_left[:,slit_idx],
+                                    self.slits_right[:,slit_idx],
+                                    inmask=inmask, ir_redux=self.ir_redux,
+                                    ncoeff=self.par['reduce']['findobj']['trace_npoly'],
+                                    std_trace=std_trace,
+                                    sig_thresh=self.par['reduce']['findobj']['sig_thresh'],
+                                    hand_extract_dict=manual_extract_dict,
+                                    specobj_dict=specobj_dict, show_peaks=show_peaks,
+                                    show_fits=show_fits, show_trace=show_trace,
+                                    trim_edg=self.par['reduce']['findobj']['find_trim_edge'],
+                                    cont_fit=self.par['reduce']['findobj']['find_cont_fit'],
+                                    npoly_cont=self.par['reduce']['findobj']['find_npoly_cont'],
+                                    fwhm=self.par['reduce']['findobj']['find_fwhm'],
+                                    boxcar_rad_skymask=boxcar_rad_skymask,
+                                    maxdev=self.par['reduce']['findobj']['find_maxdev'],
+                                    find_min_max=self.par['reduce']['findobj']['find_min_max'],
+                                    qa_title=qa_title, nperslit=self.par['reduce']['findobj']['maxnumber'],
+                                    debug_all=debug)
 
             sobjs.add_sobj(sobjs_slit)
 
 
         # Steps
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('find_objects_pypeline')
         if show:
             self.show('image', image=image*(self.sciImg.fullmask == 0), chname = 'objfind',
                       sobjs=sobjs, slits=True)
@@ -1096,22 +1219,23 @@ class MultiSlitReduce(Reduce):
                 # True  = Good, False = Bad for inmask
                 ingpm = (self.sciImg.fullmask == 0) & thismask
                 # Local sky subtraction and extraction
-                self.skymodel[thismask], self.objmodel[thismask], self.ivarmodel[thismask], \
-                    self.extractmask[thismask] = skysub.local_skysub_extract(
-                    self.sciImg.image, self.sciImg.ivar, self.tilts, self.waveimg,
-                    self.global_sky, self.sciImg.rn2img,
-                    thismask, self.slits_left[:,slit_idx], self.slits_right[:, slit_idx],
-                    self.sobjs[thisobj], ingpm,
-                    spat_pix=spat_pix,
-                    model_full_slit=self.par['reduce']['extraction']['model_full_slit'],
-                    box_rad=self.par['reduce']['extraction']['boxcar_radius']/self.get_platescale(None),
-                    sigrej=self.par['reduce']['skysub']['sky_sigrej'],
-                    model_noise=model_noise, std=self.std_redux,
-                    bsp=self.par['reduce']['skysub']['bspline_spacing'],
-                    sn_gauss=self.par['reduce']['extraction']['sn_gauss'],
-                    show_profile=show_profile,
-                    use_2dmodel_mask=self.par['reduce']['extraction']['use_2dmodel_mask'],
-                    no_local_sky=self.par['reduce']['skysub']['no_local_sky'])
+                with profiler.step('slit', det=self.det, slit=int(slit_spat)):
+                    self.skymodel[thismask], self.objmodel[thismask], self.ivarmodel[thismask], \
+                        self.extractmask[thismask] = skysub.local_skysub_extract(
+                        self.sciImg.image, self.sciImg.ivar, self.tilts, self.waveimg,
+                        self.global_sky, self.sciImg.rn2img,
+                        thismask, self.slits_left[:,slit_idx], self.slits_right[:, slit_idx],
+                        self.sobjs[thisobj], ingpm,
+                        spat_pix=spat_pix,
+                        model_full_slit=self.par['reduce']['extraction']['model_full_slit'],
+                        box_rad=self.par['reduce']['extraction']['boxcar_radius']/self.get_platescale(None),
+                        sigrej=self.par['reduce']['skysub']['sky_sigrej'],
+                        model_noise=model_noise, std=self.std_redux,
+                        bsp=self.par['reduce']['skysub']['bspline_spacing'],
+                        sn_gauss=self.par['reduce']['extraction']['sn_gauss'],
+                        show_profile=show_profile,
+                        use_2dmodel_mask=self.par['reduce']['extraction']['use_2dmodel_mask'],
+                        no_local_sky=self.par['reduce']['skysub']['no_local_sky'])
 
         # Set the bit for pixels which were masked by the extraction.
         # For extractmask, True = Good, False = Bad
@@ -1119,7 +1243,7 @@ class MultiSlitReduce(Reduce):
         self.outmask[iextract] = self.sciImg.bitmask.turn_on(self.outmask[iextract], 'EXTRACT')
 
         # Step
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('local_skysub_extract')
 
         if show:
             self.show('local', sobjs = self.sobjs, slits= True)
@@ -1241,7 +1365,7 @@ class EchelleReduce(Reduce):
             show_trace=show_trace, debug=debug)
 
         # Steps
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('find_objects_pypeline')
         if show:
             self.show('image', image=image*(self.sciImg.fullmask == 0), chname='ech_objfind',sobjs=sobjs_ech, slits=False)
 
@@ -1298,7 +1422,7 @@ class EchelleReduce(Reduce):
                                                   show_resids=show_resids, show_fwhm=show_fwhm)
 
         # Step
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('local_skysub_extract')
 
         if show:
             self.show('local', sobjs = self.sobjs, slits= True, chname='ech_local')
@@ -1521,7 +1645,7 @@ class IFUReduce(MultiSlitReduce, Reduce):
             self.sciImg.update_mask_cr(self.sciImg.crmask)
 
         # Step
-        self.steps.append(inspect.stack()[0][3])
+        self.steps.append('joint_skysub')
 
         if show:
             sobjs_show = None if show_objs else self.sobjs_obj
@@ -1569,6 +1693,7 @@ class IFUReduce(MultiSlitReduce, Reduce):
 
         debug = False
         if debug:
+            from IPython import embed
             embed()
             wavefull = np.linspace(3950, 4450, 10000)
             import matplotlib.pylab as pl
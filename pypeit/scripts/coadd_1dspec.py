@@ -14,8 +14,6 @@ from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 from astropy.io import fits
 
-from IPython import embed
-
 # TODO JFH: Put this SmartFormatter in a common place, like pypeit.pypmsgs
 
 # A trick from stackoverflow to allow multi-line output in the help:
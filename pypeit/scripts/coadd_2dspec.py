@@ -21,8 +21,6 @@ from pypeit.spectrographs.util import load_spectrograph
 from pypeit import specobjs
 from pypeit import spec2dobj
 
-from IPython import embed
-
 
 def parse_args(options=None, return_parser=False):
 
@@ -193,7 +191,7 @@ def main(args):
         msgs.info('Creating directory for Science output: {0}'.format(scipath))
         os.makedirs(scipath)
 
-    # THE FOLLOWING MIMICS THE CODE IN pypeit.save_exposure()
+    # THE FOLLOWING MIMICS THE CODE IN pypeit.PypeIt.finalize_exposure()
 
     # TODO -- These lines should be above once reduce() passes back something sensible
     all_specobjs = specobjs.SpecObjs()
@@ -16,6 +16,7 @@ from astropy.coordinates import SkyCoord
 from astropy.wcs import WCS
 import numpy as np
 import copy, os
+import tempfile
 
 from pypeit import msgs, par, io, spec2dobj
 from pypeit.spectrographs.util import load_spectrograph
@@ -23,8 +24,7 @@ from pypeit.core import datacube as dc_utils
 from pypeit.core.flux_calib import load_extinction_data, extinction_correction
 from pypeit.core.flexure import calculate_image_offset
 from pypeit.core import parse
-
-from IPython import embed
+from pypeit.core import coadd
 
 
 def parse_args(options=None, return_parser=False):
@@ -43,6 +43,233 @@ def parse_args(options=None, return_parser=False):
     return parser.parse_args() if options is None else parser.parse_args(options)
 
 
+def load_spec2d_pixels(spec, fil, det, ref_scale=None, wave_ref=None, footprint=False):
+    """ Load a spec2D file and extract the sky coordinates, wavelength,
+    counts and inverse variance of all good pixels on the slits
+
+    The counts are sky subtracted, corrected for the relative scale of
+    the slits, the differential atmospheric refraction and extinction.
+
+    Args:
+        spec (:class:`pypeit.spectrographs.spectrograph.Spectrograph`):
+            The spectrograph used to obtain the data
+        fil (str):
+            The spec2D file
+        det (int):
+            The detector to load
+        ref_scale (`numpy.ndarray`_, optional):
+            The reference scaling image. If None, the scaling image of
+            this frame is used.
+        wave_ref (float, optional):
+            The reference wavelength of the DAR correction. If None,
+            the central wavelength of this frame is used.
+        footprint (bool, optional):
+            Also compute the footprint of each pixel (see
+            :func:`pypeit.core.datacube.pixel_footprints`), which is
+            returned as an array of shape (N, 5) with the key footprint.
+
+    Returns:
+        dict: Dictionary with the 1D flattened arrays of all good pixels
+        (ra, dec, wave, sci, ivar), the (S/N)^2 used to weight the frame
+        (sn2), the reference scale image and wavelength (ref_scale,
+        wave_ref), the spatial scale of a spaxel (dspat, in degrees), the
+        wavelength solution (wave0, wavemax and dwv), the WCS of the frame
+        (wcs), the slits (slits) and the extent of the slits on the
+        sky (minmax).
+    """
+    # Load it up
+    spec2DObj = spec2dobj.Spec2DObj.from_file(fil, det)
+    detector = spec2DObj.detector
+
+    # Setup for PypeIt imports
+    msgs.reset(verbosity=2)
+
+    if ref_scale is None:
+        ref_scale = spec2DObj.scaleimg.copy()
+    # Extract the information
+    sciimg = (spec2DObj.sciimg-spec2DObj.skymodel) * (ref_scale/spec2DObj.scaleimg)  # Subtract sky and apply relative sky
+    ivar = spec2DObj.ivarraw / (ref_scale/spec2DObj.scaleimg)**2
+    waveimg = spec2DObj.waveimg
+    bpmmask = spec2DObj.bpmmask
+
+    # Grab the slit edges
+    slits = spec2DObj.slits
+
+    wave0 = waveimg[waveimg != 0.0].min()
+    diff = waveimg[1:, :] - waveimg[:-1, :]
+    dwv = float(np.median(diff[diff != 0.0]))
+    msgs.info("Using wavelength solution: wave0={0:.3f}, dispersion={1:.3f} Angstrom/pixel".format(wave0, dwv))
+
+    msgs.info("Constructing slit image")
+    slitid_img_init = slits.slit_img(pad=0, initial=True, flexure=spec2DObj.sci_spat_flexure)
+    onslit_gpm = (slitid_img_init > 0) & (bpmmask == 0)
+
+    # Grab the WCS of this frame
+    wcs = spec.get_wcs(spec2DObj.head0, slits, detector.platescale, wave0, dwv)
+
+    # Find the spatial scale of this image
+    # TODO :: probably need to put this in the DetectorContainer
+    pxscl = detector.platescale * parse.parse_binning(detector.binning)[1] / 3600.0  # This should be degrees/pixel
+    slscl = spec.get_meta_value([spec2DObj.head0], 'slitwid')
+
+    # Generate an RA/DEC image
+    msgs.info("Generating RA/DEC image")
+    raimg, decimg, minmax = slits.get_radec_image(wcs, initial=True, flexure=spec2DObj.sci_spat_flexure)
+
+    # Perform the DAR correction
+    if wave_ref is None:
+        wave_ref = 0.5*(np.min(waveimg[onslit_gpm]) + np.max(waveimg[onslit_gpm]))
+    # Get DAR parameters
+    raval = spec.get_meta_value([spec2DObj.head0], 'ra')
+    decval = spec.get_meta_value([spec2DObj.head0], 'dec')
+    obstime = spec.get_meta_value([spec2DObj.head0], 'obstime')
+    pressure = spec.get_meta_value([spec2DObj.head0], 'pressure')
+    temperature = spec.get_meta_value([spec2DObj.head0], 'temperature')
+    rel_humidity = spec.get_meta_value([spec2DObj.head0], 'humidity')
+    coord = SkyCoord(raval, decval, unit=(units.deg, units.deg))
+    location = spec.location  # TODO :: spec.location should probably end up in the TelescopePar (spec.telescope.location)
+    ra_corr, dec_corr = dc_utils.dar_correction(waveimg[onslit_gpm], coord, obstime, location,
+                                                pressure, temperature, rel_humidity, wave_ref=wave_ref)
+    raimg[onslit_gpm] += ra_corr
+    decimg[onslit_gpm] += dec_corr
+
+    # Get copies of arrays to be saved
+    wave_ext = waveimg[onslit_gpm].copy()
+    flux_ext = sciimg[onslit_gpm].copy()
+    ivar_ext = ivar[onslit_gpm].copy()
+
+    # Perform extinction correction
+    msgs.info("Applying extinction correction")
+    longitude = spec.telescope['longitude']
+    latitude = spec.telescope['latitude']
+    airmass = spec2DObj.head0[spec.meta['airmass']['card']]
+    extinct = load_extinction_data(longitude, latitude)
+    # extinction_correction requires the wavelength is sorted
+    wvsrt = np.argsort(wave_ext)
+    ext_corr = extinction_correction(wave_ext[wvsrt] * units.AA, airmass, extinct)
+    # Correct for extinction
+    flux_sav = flux_ext[wvsrt] * ext_corr
+    ivar_sav = ivar_ext[wvsrt] / ext_corr ** 2
+    # sort back to the original ordering
+    resrt = np.argsort(wvsrt)
+
+    pix = dict(ra=raimg[onslit_gpm], dec=decimg[onslit_gpm], wave=wave_ext, sci=flux_sav[resrt],
+               ivar=ivar_sav[resrt], sn2=np.median(flux_sav[resrt]*np.sqrt(ivar_sav[resrt]))**2,
+               ref_scale=ref_scale, wave_ref=wave_ref, dspat=max(pxscl, slscl), wave0=wave0,
+               wavemax=np.max(waveimg), dwv=dwv, wcs=wcs, slits=slits, minmax=minmax)
+    if footprint:
+        msgs.info("Calculating the footprint of each pixel")
+        pix['footprint'] = dc_utils.pixel_footprints(slits, wcs, waveimg, onslit_gpm, initial=True,
+                                                     flexure=spec2DObj.sci_spat_flexure)
+    return pix
+
+
+def register_whitelight(whitelight_imgs, reference_image, ref_idx, dspat, cosdec):
+    """ Calculate the spatial offsets of a set of white light images
+    relative to a reference image
+
+    Args:
+        whitelight_imgs (`numpy.ndarray`_):
+            White light images of each frame, shape (N, M, numfiles)
+        reference_image (`numpy.ndarray`_):
+            The reference white light image, shape (N, M)
+        ref_idx (int):
+            Index of the frame used as the reference image, which is
+            not registered. Use -1 if none of the frames are the
+            reference image.
+        dspat (float):
+            The size of each spaxel on the sky (in degrees)
+        cosdec (float):
+            Cosine of the mean declination of all pixels
+
+    Returns:
+        tuple: Two `numpy.ndarray`_ with the RA and DEC shifts (in
+        degrees) to apply to each frame.
+    """
+    numfiles = whitelight_imgs.shape[2]
+    ra_shifts, dec_shifts = np.zeros(numfiles), np.zeros(numfiles)
+    # Calculate the image offsets - check the reference is a zero shift
+    ra_shift_ref, dec_shift_ref = calculate_image_offset(reference_image.copy(), reference_image.copy())
+    for ff in range(numfiles):
+        # Don't correlate the reference image with itself
+        if ff == ref_idx:
+            continue
+        # Calculate the shift
+        ra_shift, dec_shift = calculate_image_offset(whitelight_imgs[:, :, ff], reference_image.copy())
+        # Convert to reference
+        ra_shift -= ra_shift_ref
+        dec_shift -= dec_shift_ref
+        # Convert pixel shift to degress shift
+        ra_shifts[ff] = ra_shift * dspat/cosdec
+        dec_shifts[ff] = dec_shift * dspat
+        msgs.info("Spatial shift of cube #{0:d}: RA, DEC (arcsec) = {1:+0.3f}, {2:+0.3f}".format(
+                  ff+1, ra_shifts[ff]*3600.0, dec_shifts[ff]*3600.0))
+    return ra_shifts, dec_shifts
+
+
+def get_cube_bins(spec, cubepar, coord_range, dspat, dwv, cosdec, last):
+    """ Generate the WCS and the bins of the output datacube
+
+    Args:
+        spec (:class:`pypeit.spectrographs.spectrograph.Spectrograph`):
+            The spectrograph used to obtain the data
+        cubepar (:class:`pypeit.par.pypeitpar.CubePar`):
+            The cube parameters
+        coord_range (tuple):
+            The minimum and maximum RA, DEC and wavelength of all pixels
+        dspat (float):
+            The size of each spaxel on the sky (in degrees)
+        dwv (float):
+            The wavelength step of the input frames (in Angstroms)
+        cosdec (float):
+            Cosine of the mean declination of all pixels
+        last (dict):
+            The dictionary returned by :func:`load_spec2d_pixels` for the
+            last input frame. This is only used if the frames are not
+            combined.
+
+    Returns:
+        tuple: The `astropy.wcs.wcs.WCS`_ used to compute the pixel
+        coordinates, the fits header of the output WCS, and a tuple with
+        the bin edges along each dimension.
+    """
+    # Setup the cube ranges
+    ra_min = cubepar['ra_min'] if cubepar['ra_min'] is not None else coord_range[0]
+    ra_max = cubepar['ra_max'] if cubepar['ra_max'] is not None else coord_range[1]
+    dec_min = cubepar['dec_min'] if cubepar['dec_min'] is not None else coord_range[2]
+    dec_max = cubepar['dec_max'] if cubepar['dec_max'] is not None else coord_range[3]
+    wav_min = cubepar['wave_min'] if cubepar['wave_min'] is not None else coord_range[4]
+    wav_max = cubepar['wave_max'] if cubepar['wave_max'] is not None else coord_range[5]
+    if cubepar['wave_delta'] is not None: dwv = cubepar['wave_delta']
+    # Generate a master WCS to register all frames
+    coord_min = [ra_min, dec_min, wav_min]
+    coord_dlt = [dspat, dspat, dwv]
+    masterwcs = dc_utils.generate_masterWCS(coord_min, coord_dlt, name=spec.name)
+    msgs.info(msgs.newline()+"-"*40 +
+              msgs.newline() + "Parameters of the WCS:" +
+              msgs.newline() + "RA   min, max = {0:f}, {1:f}".format(ra_min, ra_max) +
+              msgs.newline() + "DEC  min, max = {0:f}, {1:f}".format(dec_min, dec_max) +
+              msgs.newline() + "WAVE min, max = {0:f}, {1:f}".format(wav_min, wav_max) +
+              msgs.newline() + "Spaxel size = {0:f}''".format(3600.0*dspat) +
+              msgs.newline() + "Wavelength step = {0:f} A".format(dwv) +
+              msgs.newline() + "-" * 40)
+
+    # Generate the output binning
+    if cubepar['combine']:
+        numra = int((ra_max-ra_min) * cosdec / dspat)
+        numdec = int((dec_max-dec_min)/dspat)
+        numwav = int((wav_max-wav_min)/dwv)
+        xbins = np.arange(1+numra)-0.5
+        ybins = np.arange(1+numdec)-0.5
+        spec_bins = np.arange(1+numwav)-0.5
+        return masterwcs, masterwcs.to_header(), (xbins, ybins, spec_bins)
+
+    slitlength = int(np.round(np.median(last['slits'].get_slitlengths(initial=True, median=True))))
+    numwav = int((last['wavemax'] - last['wave0']) / dwv)
+    xbins, ybins, spec_bins = spec.get_datacube_bins(slitlength, last['minmax'], numwav)
+    return last['wcs'], last['wcs'].to_header(), (xbins, ybins, spec_bins)
+
+
 def coadd_cube(files, parset, overwrite=False):
     """ Main routine to coadd spec2D files into a 3D datacube
 
@@ -87,12 +314,19 @@ def coadd_cube(files, parset, overwrite=False):
         msgs.error("Flux calibration is not currently implemented" + msgs.newline() +
                    "Please set 'flux_calibrate = False'")
 
+    if cubepar['stream']:
+        # Process one spec2d file at a time
+        coadd_cube_stream(files, spec, det, cubepar, outfile, out_whitelight, ref_scale=ref_scale,
+                          overwrite=overwrite)
+        return
+
     # prep
     numfiles = len(files)
     combine = cubepar['combine']
 
     all_ra, all_dec, all_wave = np.array([]), np.array([]), np.array([])
     all_sci, all_ivar, all_idx, all_wghts = np.array([]), np.array([]), np.array([]), np.array([])
+    all_footprint = np.zeros((0, 5))
     all_wcs = []
     dspat = None if cubepar['spatial_delta'] is None else  cubepar['spatial_delta']/3600.0  # binning size on the sky (/3600 to convert to degrees)
     dwv = cubepar['wave_delta']       # binning size in wavelength direction (in Angstroms)
@@ -101,99 +335,32 @@ def coadd_cube(files, parset, overwrite=False):
     weights = np.ones(numfiles)  # Weights to use when combining cubes
     for ff, fil in enumerate(files):
         # Load it up
-        spec2DObj = spec2dobj.Spec2DObj.from_file(fil, det)
-        detector = spec2DObj.detector
-
-        # Setup for PypeIt imports
-        msgs.reset(verbosity=2)
-
-        if ref_scale is None:
-            ref_scale = spec2DObj.scaleimg.copy()
-        # Extract the information
-        sciimg = (spec2DObj.sciimg-spec2DObj.skymodel) * (ref_scale/spec2DObj.scaleimg)  # Subtract sky and apply relative sky
-        ivar = spec2DObj.ivarraw / (ref_scale/spec2DObj.scaleimg)**2
-        waveimg = spec2DObj.waveimg
-        bpmmask = spec2DObj.bpmmask
-
-        # Grab the slit edges
-        slits = spec2DObj.slits
-
-        wave0 = waveimg[waveimg != 0.0].min()
-        diff = waveimg[1:, :] - waveimg[:-1, :]
-        dwv = float(np.median(diff[diff != 0.0]))
-        msgs.info("Using wavelength solution: wave0={0:.3f}, dispersion={1:.3f} Angstrom/pixel".format(wave0, dwv))
-
-        msgs.info("Constructing slit image")
-        slitid_img_init = slits.slit_img(pad=0, initial=True, flexure=spec2DObj.sci_spat_flexure)
-        onslit_gpm = (slitid_img_init > 0) & (bpmmask == 0)
-
-        # Grab the WCS of this frame
-        wcs = spec.get_wcs(spec2DObj.head0, slits, detector.platescale, wave0, dwv)
-        all_wcs.append(copy.deepcopy(wcs))
+        pix = load_spec2d_pixels(spec, fil, det, ref_scale=ref_scale, wave_ref=wave_ref,
+                                 footprint=cubepar['method'] == 'drizzle')
+        ref_scale, wave_ref, dwv = pix['ref_scale'], pix['wave_ref'], pix['dwv']
+        all_wcs.append(copy.deepcopy(pix['wcs']))
 
         # Find the largest spatial scale of all images being combined
-        # TODO :: probably need to put this in the DetectorContainer
-        pxscl = detector.platescale * parse.parse_binning(detector.binning)[1] / 3600.0  # This should be degrees/pixel
-        slscl = spec.get_meta_value([spec2DObj.head0], 'slitwid')
         if dspat is None:
-            dspat = max(pxscl, slscl)
-        elif max(pxscl, slscl) > dspat:
-            dspat = max(pxscl, slscl)
-
-        # Generate an RA/DEC image
-        msgs.info("Generating RA/DEC image")
-        raimg, decimg, minmax = slits.get_radec_image(wcs, initial=True, flexure=spec2DObj.sci_spat_flexure)
-
-        # Perform the DAR correction
-        if wave_ref is None:
-            wave_ref = 0.5*(np.min(waveimg[onslit_gpm]) + np.max(waveimg[onslit_gpm]))
-        # Get DAR parameters
-        raval = spec.get_meta_value([spec2DObj.head0], 'ra')
-        decval = spec.get_meta_value([spec2DObj.head0], 'dec')
-        obstime = spec.get_meta_value([spec2DObj.head0], 'obstime')
-        pressure = spec.get_meta_value([spec2DObj.head0], 'pressure')
-        temperature = spec.get_meta_value([spec2DObj.head0], 'temperature')
-        rel_humidity = spec.get_meta_value([spec2DObj.head0], 'humidity')
-        coord = SkyCoord(raval, decval, unit=(units.deg, units.deg))
-        location = spec.location  # TODO :: spec.location should probably end up in the TelescopePar (spec.telescope.location)
-        ra_corr, dec_corr = dc_utils.dar_correction(waveimg[onslit_gpm], coord, obstime, location,
-                                                    pressure, temperature, rel_humidity, wave_ref=wave_ref)
-        raimg[onslit_gpm] += ra_corr
-        decimg[onslit_gpm] += dec_corr
-
-        # Get copies of arrays to be saved
-        wave_ext = waveimg[onslit_gpm].copy()
-        flux_ext = sciimg[onslit_gpm].copy()
-        ivar_ext = ivar[onslit_gpm].copy()
-
-        # Perform extinction correction
-        msgs.info("Applying extinction correction")
-        longitude = spec.telescope['longitude']
-        latitude = spec.telescope['latitude']
-        airmass = spec2DObj.head0[spec.meta['airmass']['card']]
-        extinct = load_extinction_data(longitude, latitude)
-        # extinction_correction requires the wavelength is sorted
-        wvsrt = np.argsort(wave_ext)
-        ext_corr = extinction_correction(wave_ext[wvsrt] * units.AA, airmass, extinct)
-        # Correct for extinction
-        flux_sav = flux_ext[wvsrt] * ext_corr
-        ivar_sav = ivar_ext[wvsrt] / ext_corr ** 2
-        # sort back to the original ordering
-        resrt = np.argsort(wvsrt)
+            dspat = pix['dspat']
+        elif pix['dspat'] > dspat:
+            dspat = pix['dspat']
 
         # Calculate the weights relative to the zeroth cube
         if ff != 0:
-            weights[ff] = np.median(flux_sav[resrt]*np.sqrt(ivar_sav[resrt]))**2
+            weights[ff] = pix['sn2']
 
         # Store the information
-        numpix = raimg[onslit_gpm].size
-        all_ra = np.append(all_ra, raimg[onslit_gpm].copy())
-        all_dec = np.append(all_dec, decimg[onslit_gpm].copy())
-        all_wave = np.append(all_wave, wave_ext.copy())
-        all_sci = np.append(all_sci, flux_sav[resrt].copy())
-        all_ivar = np.append(all_ivar, ivar_sav[resrt].copy())
+        numpix = pix['ra'].size
+        all_ra = np.append(all_ra, pix['ra'])
+        all_dec = np.append(all_dec, pix['dec'])
+        all_wave = np.append(all_wave, pix['wave'])
+        all_sci = np.append(all_sci, pix['sci'])
+        all_ivar = np.append(all_ivar, pix['ivar'])
         all_idx = np.append(all_idx, ff*np.ones(numpix))
         all_wghts = np.append(all_wghts, weights[ff]*np.ones(numpix))
+        if cubepar['method'] == 'drizzle':
+            all_footprint = np.append(all_footprint, pix['footprint'], axis=0)
 
     # Grab cos(dec) for convenience
     cosdec = np.cos(np.mean(all_dec) * np.pi / 180.0)
@@ -217,24 +384,11 @@ def coadd_cube(files, parset, overwrite=False):
                 dc_utils.make_whitelight_fromref(all_ra, all_dec, all_wave, all_sci, all_wghts, all_idx, dspat,
                                                  cubepar['reference_image'])
             msgs.info("Calculating the spatial translation of each cube relative to user-defined 'reference_image'")
-        # Calculate the image offsets - check the reference is a zero shift
-        ra_shift_ref, dec_shift_ref = calculate_image_offset(reference_image.copy(), reference_image.copy())
+        # Calculate and apply the image offsets
+        ra_shifts, dec_shifts = register_whitelight(whitelight_imgs, reference_image, ref_idx, dspat, cosdec)
         for ff in range(numfiles):
-            # Don't correlate the reference image with itself
-            if ff == ref_idx:
-                continue
-            # Calculate the shift
-            ra_shift, dec_shift = calculate_image_offset(whitelight_imgs[:, :, ff], reference_image.copy())
-            # Convert to reference
-            ra_shift -= ra_shift_ref
-            dec_shift -= dec_shift_ref
-            # Convert pixel shift to degress shift
-            ra_shift *= dspat/cosdec
-            dec_shift *= dspat
-            msgs.info("Spatial shift of cube #{0:d}: RA, DEC (arcsec) = {1:+0.3f}, {2:+0.3f}".format(ff+1, ra_shift*3600.0, dec_shift*3600.0))
-            # Apply the shift
-            all_ra[all_idx == ff] += ra_shift
-            all_dec[all_idx == ff] += dec_shift
+            all_ra[all_idx == ff] += ra_shifts[ff]
+            all_dec[all_idx == ff] += dec_shifts[ff]
 
         # Generate a white light image of *all* data
         msgs.info("Generating global white light image")
@@ -268,71 +422,39 @@ def coadd_cube(files, parset, overwrite=False):
         img_hdu = fits.PrimaryHDU(whitelight_img.T, header=wlwcs.to_header())
         img_hdu.writeto(out_whitelight, overwrite=overwrite)
 
-    # Setup the cube ranges
-    ra_min = cubepar['ra_min'] if cubepar['ra_min'] is not None else np.min(all_ra)
-    ra_max = cubepar['ra_max'] if cubepar['ra_max'] is not None else np.max(all_ra)
-    dec_min = cubepar['dec_min'] if cubepar['dec_min'] is not None else np.min(all_dec)
-    dec_max = cubepar['dec_max'] if cubepar['dec_max'] is not None else np.max(all_dec)
-    wav_min = cubepar['wave_min'] if cubepar['wave_min'] is not None else np.min(all_wave)
-    wav_max = cubepar['wave_max'] if cubepar['wave_max'] is not None else np.max(all_wave)
-    if cubepar['wave_delta'] is not None: dwv = cubepar['wave_delta']
-    # Generate a master WCS to register all frames
-    coord_min = [ra_min, dec_min, wav_min]
-    coord_dlt = [dspat, dspat, dwv]
-    masterwcs = dc_utils.generate_masterWCS(coord_min, coord_dlt, name=specname)
-    msgs.info(msgs.newline()+"-"*40 +
-              msgs.newline() + "Parameters of the WCS:" +
-              msgs.newline() + "RA   min, max = {0:f}, {1:f}".format(ra_min, ra_max) +
-              msgs.newline() + "DEC  min, max = {0:f}, {1:f}".format(dec_min, dec_max) +
-              msgs.newline() + "WAVE min, max = {0:f}, {1:f}".format(wav_min, wav_max) +
-              msgs.newline() + "Spaxel size = {0:f}''".format(3600.0*dspat) +
-              msgs.newline() + "Wavelength step = {0:f} A".format(dwv) +
-              msgs.newline() + "-" * 40)
-
-    # Generate the output binning
-    if combine:
-        numra = int((ra_max-ra_min) * cosdec / dspat)
-        numdec = int((dec_max-dec_min)/dspat)
-        numwav = int((wav_max-wav_min)/dwv)
-        xbins = np.arange(1+numra)-0.5
-        ybins = np.arange(1+numdec)-0.5
-        spec_bins = np.arange(1+numwav)-0.5
-    else:
-        slitlength = int(np.round(np.median(slits.get_slitlengths(initial=True, median=True))))
-        numwav = int((np.max(waveimg) - wave0) / dwv)
-        xbins, ybins, spec_bins = spec.get_datacube_bins(slitlength, minmax, numwav)
+    # Setup the cube WCS and binning
+    coord_range = (np.min(all_ra), np.max(all_ra), np.min(all_dec), np.max(all_dec),
+                   np.min(all_wave), np.max(all_wave))
+    cubewcs, hdr, bins = get_cube_bins(spec, cubepar, coord_range, dspat, dwv, cosdec, pix)
 
     # Make the cube
-    msgs.info("Generating pixel coordinates")
-    if combine:
-        pix_coord = masterwcs.wcs_world2pix(all_ra, all_dec, all_wave * 1.0E-10, 0)
-        hdr = masterwcs.to_header()
-    else:
-        pix_coord = wcs.wcs_world2pix(np.vstack((all_ra, all_dec, all_wave*1.0E-10)).T, 0)
-        hdr = wcs.to_header()
-
-    # Find the NGP coordinates for all input pixels
-    msgs.info("Generating data cube")
-    bins = (xbins, ybins, spec_bins)
-    datacube, edges = np.histogramdd(pix_coord, bins=bins, weights=all_sci*all_wghts)
-    norm, edges = np.histogramdd(pix_coord, bins=bins, weights=all_wghts)
-    norm_cube = (norm > 0) / (norm + (norm == 0))
-    datacube *= norm_cube
     # Create the variance cube, including weights
-    msgs.info("Generating variance cube")
     all_var = (all_ivar > 0) / (all_ivar + (all_ivar == 0))
-    var_cube, edges = np.histogramdd(pix_coord, bins=bins, weights=all_var * all_wghts**2)
-    var_cube *= norm_cube**2
+    if cubepar['method'] == 'drizzle':
+        msgs.info("Generating data cube")
+        # Distribute the flux of each pixel over the overlapping voxels
+        cubes = dc_utils.drizzle_sums(cubewcs, bins, all_ra, all_dec, all_wave, all_footprint, all_sci,
+                                      all_var, all_wghts)
+        datacube, var_cube = dc_utils.finalize_cube(cubes[..., 0], cubes[..., 1], cubes[..., 2])
+    else:
+        msgs.info("Generating pixel coordinates")
+        pix_coord = cubewcs.wcs_world2pix(np.vstack((all_ra, all_dec, all_wave*1.0E-10)).T, 0)
+        # Find the NGP coordinates for all input pixels
+        msgs.info("Generating data cube")
+        bin_indx = coadd.histogram_bin_indices(pix_coord, bins)
+        datacube, var_cube = dc_utils.finalize_cube(
+                *coadd.histogram_sums(bin_indx, tuple(b.size-1 for b in bins),
+                                      weights=[all_sci*all_wghts, all_wghts, all_var * all_wghts**2]))
 
     # Save the datacube
     debug = False
-    if debug:
-        datacube_resid, edges = np.histogramdd(pix_coord, bins=(xbins, ybins, spec_bins), weights=all_sci*np.sqrt(all_ivar))
-        norm, edges = np.histogramdd(pix_coord, bins=(xbins, ybins, spec_bins))
+    if debug and cubepar['method'] == 'ngp':
+        datacube_resid, norm = coadd.histogram_sums(bin_indx, datacube.shape,
+                                                    weights=[all_sci*np.sqrt(all_ivar), None])
         norm_cube = (norm > 0) / (norm + (norm == 0))
         outfile = "datacube_resid.fits"
         msgs.info("Saving datacube as: {0:s}".format(outfile))
-        hdu = fits.PrimaryHDU((datacube_resid*norm_cube).T, header=masterwcs.to_header())
+        hdu = fits.PrimaryHDU((datacube_resid*norm_cube).T, header=hdr)
         hdu.writeto(outfile, overwrite=overwrite)
 
     msgs.info("Saving datacube as: {0:s}".format(outfile))
@@ -341,6 +463,208 @@ def coadd_cube(files, parset, overwrite=False):
     final_cube.to_file(outfile, hdr=hdr, overwrite=overwrite)
 
 
+def coadd_cube_stream(files, spec, det, cubepar, outfile, out_whitelight, ref_scale=None, overwrite=False):
+    """ Coadd spec2D files into a 3D datacube, processing one file at a time
+
+    This produces the same datacube as :func:`coadd_cube`, but the
+    pixels of all input frames are never held in memory at the same time.
+    Each spec2D file is loaded and processed once, and the pixel data are
+    cached on disk in ``cubepar['scratch_dir']``. The white light images,
+    relative weights and the datacube are then accumulated by streaming
+    through the cached frames one at a time. If ``cubepar['memmap']`` is
+    True, the output cubes are accumulated in memory-mapped arrays.
+
+    Args:
+        files (list):
+            List of all spec2D files
+        spec (:class:`pypeit.spectrographs.spectrograph.Spectrograph`):
+            The spectrograph used to obtain the data
+        det (int):
+            The detector to coadd
+        cubepar (:class:`pypeit.par.pypeitpar.CubePar`):
+            The cube parameters
+        outfile (str):
+            The output datacube filename
+        out_whitelight (str):
+            The output white light image filename
+        ref_scale (`numpy.ndarray`_, optional):
+            Reference image used to correct the relative scale of the
+            slits. If None, the scale image of the first frame is used.
+        overwrite (bool):
+            Overwrite the output file, if it exists?
+    """
+    numfiles = len(files)
+    combine = cubepar['combine']
+    dspat = None if cubepar['spatial_delta'] is None else cubepar['spatial_delta']/3600.0
+    wave_ref = None
+    weights = np.ones(numfiles)  # Weights to use when combining cubes
+    drizzle = cubepar['method'] == 'drizzle'
+    # Ranges, summed declination and number of pixels of each frame
+    coord_range = np.zeros((numfiles, 6))
+    dec_sum = np.zeros(numfiles)
+    npix = np.zeros(numfiles, dtype=int)
+
+    with tempfile.TemporaryDirectory(dir=cubepar['scratch_dir']) as scratch_dir:
+        # Load and process each frame once, caching the pixels on disk
+        cache_files = [os.path.join(scratch_dir, 'pixels_{0:d}.npy'.format(ff)) for ff in range(numfiles)]
+        for ff, fil in enumerate(files):
+            msgs.info("Processing frame {0:d}/{1:d}: {2:s}".format(ff+1, numfiles, fil))
+            pix = load_spec2d_pixels(spec, fil, det, ref_scale=ref_scale, wave_ref=wave_ref, footprint=drizzle)
+            ref_scale, wave_ref, dwv = pix['ref_scale'], pix['wave_ref'], pix['dwv']
+            # Find the largest spatial scale of all images being combined
+            if dspat is None or pix['dspat'] > dspat:
+                dspat = pix['dspat']
+            # Calculate the weights relative to the zeroth cube
+            if ff != 0:
+                weights[ff] = pix['sn2']
+            coord_range[ff] = [np.min(pix['ra']), np.max(pix['ra']), np.min(pix['dec']),
+                               np.max(pix['dec']), np.min(pix['wave']), np.max(pix['wave'])]
+            dec_sum[ff] = np.sum(pix['dec'])
+            npix[ff] = pix['ra'].size
+            cache = np.vstack([pix[key] for key in ['ra', 'dec', 'wave', 'sci', 'ivar']])
+            if drizzle:
+                cache = np.vstack((cache, pix['footprint'].T))
+                del pix['footprint']
+            np.save(cache_files[ff], cache)
+            # Only keep the metadata of the last frame
+            for key in ['ra', 'dec', 'wave', 'sci', 'ivar']:
+                del pix[key]
+            del cache
+
+        # Spatial offsets of each frame
+        ra_shifts, dec_shifts = np.zeros(numfiles), np.zeros(numfiles)
+
+        def frame_pixels(ff, footprint=False):
+            """ Return the ra, dec, wave, sci and ivar (and footprint) of a cached frame """
+            cache = np.load(cache_files[ff], mmap_mode='r')
+            ra, dec, wave, sci, ivar = cache[:5]
+            pixels = (ra + ra_shifts[ff], dec + dec_shifts[ff], np.asarray(wave), np.asarray(sci),
+                      np.asarray(ivar))
+            return pixels + (np.asarray(cache[5:].T),) if footprint else pixels
+
+        def full_range():
+            """ Return the coordinate range and cos(dec) of all shifted frames """
+            _range = coord_range + np.column_stack((ra_shifts, ra_shifts, dec_shifts, dec_shifts,
+                                                    np.zeros(numfiles), np.zeros(numfiles)))
+            _range = (np.min(_range[:, 0]), np.max(_range[:, 1]), np.min(_range[:, 2]),
+                      np.max(_range[:, 3]), np.min(_range[:, 4]), np.max(_range[:, 5]))
+            return _range, np.cos(np.sum(dec_sum + dec_shifts*npix) / np.sum(npix) * np.pi / 180.0)
+
+        def global_whitelight():
+            """ Generate a white light image of all frames """
+            msgs.info("Generating global white light image")
+            _range, _cosdec = full_range()
+            if cubepar["reference_image"] is None:
+                wlwcs, numra, numdec = dc_utils.generate_whitelightWCS(*_range, dspat, _cosdec)
+            else:
+                reference_image, wlwcs = dc_utils.load_reference_whitelight(cubepar['reference_image'],
+                                                                            _range[4], _range[5])
+                numra, numdec = reference_image.shape
+            wlsums = None
+            for ff in range(numfiles):
+                ra, dec, wave, sci, _ = frame_pixels(ff)
+                wlsums = dc_utils.accumulate_whitelight(ra, dec, wave, sci, np.full(ra.size, weights[ff]),
+                                                        wlwcs, numra, numdec, wlsums=wlsums)
+            return dc_utils.finalize_whitelight(*wlsums)[0], wlwcs
+
+        # Grab cos(dec) for convenience
+        _, cosdec = full_range()
+
+        whitelight_img = None
+        spec_weights = None
+        if combine:
+            # Generate the white light image of each frame
+            _range, _cosdec = full_range()
+            if cubepar["reference_image"] is None:
+                wlwcs, numra, numdec = dc_utils.generate_whitelightWCS(*_range, dspat, _cosdec)
+            else:
+                reference_image, wlwcs = dc_utils.load_reference_whitelight(cubepar['reference_image'],
+                                                                            _range[4], _range[5])
+                numra, numdec = reference_image.shape
+            whitelight_imgs = np.zeros((numra, numdec, numfiles))
+            for ff in range(numfiles):
+                msgs.info("Generating white light image of frame {0:d}/{1:d}".format(ff + 1, numfiles))
+                ra, dec, wave, sci, _ = frame_pixels(ff)
+                wlsums = dc_utils.accumulate_whitelight(ra, dec, wave, sci, np.full(ra.size, weights[ff]),
+                                                        wlwcs, numra, numdec)
+                whitelight_imgs[:, :, ff] = dc_utils.finalize_whitelight(*wlsums)[0]
+
+            if cubepar["reference_image"] is None:
+                # ref_idx will be the index of the cube with the highest S/N
+                ref_idx = np.argmax(weights)
+                reference_image = whitelight_imgs[:, :, ref_idx].copy()
+                msgs.info("Calculating spatial translation of each cube relative to cube #{0:d})".format(ref_idx+1))
+            else:
+                ref_idx = -1  # Don't use an index
+                msgs.info("Calculating the spatial translation of each cube relative to user-defined 'reference_image'")
+            ra_shifts, dec_shifts = register_whitelight(whitelight_imgs, reference_image, ref_idx, dspat, cosdec)
+
+            # Generate a white light image of *all* data
+            whitelight_img, wlwcs = global_whitelight()
+
+            # Calculate the relative spectral weights of each frame
+            msgs.info("Calculating the optimal weights of each pixel")
+            _range, _ = full_range()
+            weightsWCS, weights_bins = dc_utils.get_weights_wcs(whitelight_img, _range[0], _range[2],
+                                                                _range[4], _range[5], dspat, dwv)
+            numwav = weights_bins[2].size - 1
+            flux_stack = np.zeros((numwav, numfiles))
+            ivar_stack = np.zeros((numwav, numfiles))
+            for ff in range(numfiles):
+                msgs.info("Extracting spectrum of highest S/N detection from frame {0:d}/{1:d}".format(
+                          ff + 1, numfiles))
+                ra, dec, wave, sci, ivar = frame_pixels(ff)
+                flux_stack[:, ff], ivar_stack[:, ff] \
+                        = dc_utils.extract_weights_spectrum(ra, dec, wave, sci, ivar, weightsWCS, weights_bins)
+            wave_spec, spec_weights = dc_utils.spectral_weights(weightsWCS, flux_stack, ivar_stack,
+                                                                relative_weights=cubepar['relative_weights'])
+
+        # Check if a whitelight image should be saved
+        if cubepar['save_whitelight']:
+            # Check if the white light image still needs to be generated - if so, generate it now
+            if whitelight_img is None:
+                whitelight_img, wlwcs = global_whitelight()
+            # Prepare and save the fits file
+            msgs.info("Saving white light image as: {0:s}".format(out_whitelight))
+            img_hdu = fits.PrimaryHDU(whitelight_img[:, :, None].T, header=wlwcs.to_header())
+            img_hdu.writeto(out_whitelight, overwrite=overwrite)
+
+        # Setup the cube WCS and binning
+        _range, _ = full_range()
+        cubewcs, hdr, bins = get_cube_bins(spec, cubepar, _range, dspat, dwv, cosdec, pix)
+        shape = tuple(b.size-1 for b in bins)
+
+        # Accumulate the cubes one frame at a time
+        msgs.info("Generating data cube")
+        # The flux, weight and variance sums are interleaved along the last axis
+        if cubepar['memmap']:
+            cubes = np.lib.format.open_memmap(os.path.join(scratch_dir, 'cubes.npy'), mode='w+',
+                                              dtype=float, shape=shape + (3,))
+        else:
+            cubes = np.zeros(shape + (3,))
+        for ff in range(numfiles):
+            msgs.info("Adding frame {0:d}/{1:d} to the data cube".format(ff + 1, numfiles))
+            ra, dec, wave, sci, ivar, *footprint = frame_pixels(ff, footprint=drizzle)
+            wghts = np.full(ra.size, weights[ff]) if spec_weights is None \
+                        else dc_utils.interp_weights(wave_spec, spec_weights[:, ff], wave)
+            var = (ivar > 0) / (ivar + (ivar == 0))
+            if drizzle:
+                dc_utils.drizzle_sums(cubewcs, bins, ra, dec, wave, footprint[0], sci, var, wghts, cubes=cubes)
+                continue
+            pix_coord = cubewcs.wcs_world2pix(np.vstack((ra, dec, wave*1.0E-10)).T, 0)
+            bin_indx = coadd.histogram_bin_indices(pix_coord, bins)
+            for ii, _sum in enumerate(coadd.histogram_sums(bin_indx, shape,
+                                                           weights=[sci*wghts, wghts, var*wghts**2])):
+                cubes[..., ii] += _sum
+        datacube, var_cube = dc_utils.finalize_cube(cubes[..., 0], cubes[..., 1], cubes[..., 2])
+
+        msgs.info("Saving datacube as: {0:s}".format(outfile))
+        final_cube = dc_utils.DataCube(datacube.T, var_cube.T, spec.name,
+                                       refscale=ref_scale, fluxed=cubepar['flux_calibrate'])
+        final_cube.to_file(outfile, hdr=hdr, overwrite=overwrite)
+        del final_cube, datacube, var_cube, cubes
+
+
 def main(args):
     if args.file is None:
         msgs.error('You must input a coadd3d file')
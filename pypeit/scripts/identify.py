@@ -7,8 +7,6 @@
 Launch the identify GUI tool.
 """
 
-from IPython import embed
-
 
 def parse_args(options=None, return_parser=False):
     import argparse
@@ -30,8 +30,6 @@ from pypeit.images import buildimage
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit.core.parse import get_dnum
 
-from IPython import embed
-
 
 
 
@@ -369,6 +367,7 @@ def main(args):
     out = shell.call_global_plugin_method('WCSMatch', 'set_reference_channel', [chname_skyresids], {})
 
     if args.embed:
+        from IPython import embed
         embed()
 
     return 0
@@ -28,6 +28,9 @@ def parse_args(options=None, return_parser=False):
                         help='Use a user-supplied pixel flat (e.g. keck_lris_blue)')
     parser.add_argument('--slit_spat', type=str,
                         help='Reduce only this slit on this detector DET:SPAT_ID, e.g. 1:175')
+    parser.add_argument('--server', type=str,
+                        help='Submit the frames to a running quick-look server at HOST:PORT '
+                             '(see pypeit_ql_server) instead of reducing them here')
 
     if return_parser:
         return parser
@@ -38,13 +41,9 @@ def parse_args(options=None, return_parser=False):
 def main(args):
 
     import os
-    import numpy as np
-
-    from IPython import embed
 
     from pypeit import pypeit
-    from pypeit import pypeitsetup
-    from pypeit.core import framematch
+    from pypeit import quicklook
     from pypeit import msgs
 
     spec = args.spectrograph
@@ -52,7 +51,9 @@ def main(args):
     # Config the run
     cfg_lines = ['[rdx]']
     cfg_lines += ['    spectrograph = {0}'.format(spec)]
-    cfg_lines += ['    redux_path = {0}_A'.format(os.path.join(os.getcwd(),spec))]
+    if args.server is None:
+        # The quick-look server sets its own reduction path
+        cfg_lines += ['    redux_path = {0}_A'.format(os.path.join(os.getcwd(),spec))]
     if args.slit_spat is not None:
         msgs.info("--slit_spat provided.  Ignoring --det")
     else:
@@ -88,42 +89,26 @@ def main(args):
     data_files = [os.path.join(args.full_rawpath, args.arc),
                   os.path.join(args.full_rawpath, args.flat),
                   os.path.join(args.full_rawpath,args.science)]
-
-    # Setup
-    ps = pypeitsetup.PypeItSetup(data_files, path='./', spectrograph_name=spec,
-                                 cfg_lines=cfg_lines)
-    ps.build_fitstbl()
-    # TODO -- Get the type_bits from  'science'
-    bm = framematch.FrameTypeBitMask()
-    file_bits = np.zeros(3, dtype=bm.minimum_dtype())
-    file_bits[0] = bm.turn_on(file_bits[0], ['arc', 'tilt'])
-    file_bits[1] = bm.turn_on(file_bits[1], ['pixelflat', 'trace', 'illumflat']
-                                             if args.user_pixflat is None 
-                                             else ['trace', 'illumflat'])
-    file_bits[2] = bm.turn_on(file_bits[2], 'science')
-
-    # PypeItSetup sorts according to MJD
-    #   Deal with this
-    asrt = []
-    for ifile in data_files:
-        bfile = os.path.basename(ifile)
-        idx = ps.fitstbl['filename'].data.tolist().index(bfile)
-        asrt.append(idx)
-    asrt = np.array(asrt)
-
-    # Set bits
-    ps.fitstbl.set_frame_types(file_bits[asrt])
-    ps.fitstbl.set_combination_groups()
-    # Extras
-    ps.fitstbl['setup'] = 'A'
+    frametypes = ['arc,tilt',
+                  'pixelflat,trace,illumflat' if args.user_pixflat is None else 'trace,illumflat',
+                  'science']
+
+    # Submit to the quick-look server?
+    if args.server is not None:
+        host, port = args.server.split(':')
+        result = quicklook.submit(dict(spectrograph=spec,
+                                       files=[os.path.abspath(f) for f in data_files],
+                                       frametypes=frametypes, cfg_lines=cfg_lines),
+                                  host=host, port=int(port))
+        for f in result['spec2d'] + result['spec1d']:
+            print(f)
+        return 0
 
     # Write
-    ofiles = ps.fitstbl.write_pypeit(configs='A', write_bkg_pairs=True, cfg_lines=cfg_lines)
-    if len(ofiles) > 1:
-        msgs.error("Bad things happened..")
+    ofile = quicklook.write_pypeit_file(spec, data_files, frametypes, cfg_lines)
 
     # Instantiate the main pipeline reduction object
-    pypeIt = pypeit.PypeIt(ofiles[0], verbosity=2,
+    pypeIt = pypeit.PypeIt(ofile, verbosity=2,
                            reuse_masters=True, overwrite=True,
                            logname='mos.log', show=False)
     # Run
@@ -134,4 +119,3 @@ def main(args):
     pypeIt.build_qa()
 
     return 0
-
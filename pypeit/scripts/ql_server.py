@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+#
+# See top-level LICENSE file for Copyright information
+#
+# -*- coding: utf-8 -*-
+"""
+This script runs a quick-look server that keeps the calibrations in memory
+"""
+
+def parse_args(options=None, return_parser=False):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Run a quick-look server that reduces the '
+                                                 'frames submitted by pypeit_ql_mos --server, '
+                                                 'keeping the calibrations of the most recently '
+                                                 'used setups in memory',
+                                     formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-r', '--redux_path', type=str, default=None,
+                        help='Root directory for the reductions; default is the current '
+                             'directory')
+    parser.add_argument('--host', type=str, default='localhost', help='Host name')
+    parser.add_argument('-p', '--port', type=int, default=8765, help='Port number')
+    parser.add_argument('-n', '--max_setups', type=int, default=2,
+                        help='Maximum number of setups with calibrations held in memory')
+    parser.add_argument('-v', '--verbosity', type=int, default=1,
+                        help='Verbosity level between 0 [none] and 2 [all]')
+
+    if return_parser:
+        return parser
+
+    return parser.parse_args() if options is None else parser.parse_args(options)
+
+
+def main(args):
+
+    from pypeit import quicklook
+
+    server = quicklook.QuickLookServer(redux_path=args.redux_path, max_setups=args.max_setups,
+                                       verbosity=args.verbosity)
+    server.serve(host=args.host, port=args.port)
+
+    return 0
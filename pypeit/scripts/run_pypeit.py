@@ -40,6 +40,14 @@ def parse_args(options=None, return_parser=False):
                         help='PypeIt reduction file (must have .pypeit extension)')
     parser.add_argument('-v', '--verbosity', type=int, default=2,
                         help='Verbosity level between 0 [none] and 2 [all]')
+    parser.add_argument('-j', '--jsonlog', type=str, default=None,
+                        help='Also write the log messages as JSON records, one per line, to '
+                             'this file')
+    parser.add_argument('-p', '--profile', default=False, action='store_true',
+                        help='Record the wall time, CPU time, and peak memory use of each '
+                             'calibration and reduction step.  The results are written to '
+                             '<pypeit_file root>_profile.json, and a summary is printed at the '
+                             'end of the run.')
     # JFH TODO Are the -t and -r keyword still valid given that run_pypeit no longer runs setup?
     parser.add_argument('-t', '--hdrframetype', default=False, action='store_true',
                         help='Use file headers and the instument-specific keywords to determine'
@@ -93,6 +101,7 @@ def main(args):
     if splitnm[1] != '.pypeit':
         msgs.error("Bad extension for PypeIt reduction file."+msgs.newline()+".pypeit is required")
     logname = splitnm[0] + ".log"
+    profile = splitnm[0] + "_profile.json" if args.profile else None
 
     # Instantiate the main pipeline reduction object
     pypeIt = pypeit.PypeIt(args.pypeit_file, verbosity=args.verbosity,
@@ -100,7 +109,8 @@ def main(args):
                            overwrite=args.overwrite,
                            redux_path=args.redux_path,
                            calib_only=args.calib_only,
-                           logname=logname, show=args.show)
+                           logname=logname, show=args.show, jsonlog=args.jsonlog,
+                           profile=profile)
 
     # JFH I don't see why this is an optional argument here. We could allow the user to modify an infinite number of parameters
     # from the command line? Why do we have the PypeIt file then? This detector can be set in the pypeit file.
@@ -6,7 +6,6 @@ from astropy.io import fits
 from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 import argparse
-from IPython import embed
 import textwrap
 from pypeit import sensfunc
 import os
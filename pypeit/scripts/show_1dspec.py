@@ -2,7 +2,6 @@
 """
 Wrapper to the linetools XSpecGUI
 """
-from IPython import embed
 
 def parse_args(options=None, return_parser=False):
     import argparse
@@ -35,7 +34,8 @@ def main(args):
     from pypeit import specobjs
     from pypeit import msgs
 
-    sobjs = specobjs.SpecObjs.from_fitsfile(args.file, chk_version=False)
+    # Only read the requested object, if provided
+    sobjs = specobjs.SpecObjs.from_fitsfile(args.file, chk_version=False, names=args.obj)
 
     # List only?
     if args.list:
@@ -52,9 +52,9 @@ def main(args):
         return
 
     if args.obj is not None:
-        exten = np.where(sobjs.NAME == args.obj)[0][0]
-        if exten < 0:
+        if sobjs.nobj == 0:
             msgs.error("Bad input object name: {:s}".format(args.obj))
+        exten = 0
     else:
         exten = args.exten-1 # 1-index in FITS file
 
@@ -11,8 +11,6 @@ import os
 
 import numpy as np
 
-from IPython import embed
-
 from astropy.io import fits
 from astropy.stats import sigma_clipped_stats
 
@@ -186,6 +184,7 @@ def main(args):
     shell.call_global_plugin_method('WCSMatch', 'set_reference_channel', [chname_resids], {})
 
     if args.embed:
+        from IPython import embed
         embed()
 
         # Playing with some mask stuff
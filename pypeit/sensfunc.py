@@ -4,7 +4,6 @@ import os
 import inspect
 import numpy as np
 import scipy
-from IPython import embed
 import inspect
 
 from matplotlib import pyplot as plt
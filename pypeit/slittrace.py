@@ -7,8 +7,6 @@ Implements the objects used to hold slit edge data.
 """
 import inspect
 
-from IPython import embed
-
 import numpy as np
 
 from astropy.table import Table
@@ -395,7 +393,8 @@ class SlitTraceSet(datamodel.DataContainer):
             slitlen = np.median(slitlen, axis=1)
         return slitlen
 
-    def get_radec_image(self, wcs, initial=True, flexure=None, trace_cen=None):
+    def get_radec_image(self, wcs, initial=True, flexure=None, trace_cen=None, slice_offset=0.,
+                        spat_offset=0.):
         """Generate an RA and DEC image for every pixel in the frame
 
         Parameters
@@ -413,6 +412,14 @@ class SlitTraceSet(datamodel.DataContainer):
         trace_cen : `numpy.ndarray`_, optional
             Central traces of each slit. Shape should be (slits.nspec, slits.nslits).
             If None, the average of the left and right slit edges will be used
+        slice_offset : float, optional
+            Offset (in units of slices) from the centre of each pixel at which
+            to evaluate the coordinates. Used to determine the on-sky footprint
+            of each pixel.
+        spat_offset : float, optional
+            Offset (in units of spatial pixels) from the centre of each pixel at
+            which to evaluate the coordinates. Used to determine the on-sky
+            footprint of each pixel.
 
         Returns
         -------
@@ -441,8 +448,8 @@ class SlitTraceSet(datamodel.DataContainer):
             evalpos = onslit_init[1] - trace_cen[onslit_init[0], slit_idx]
             minmax[:, 0] = np.min(evalpos)
             minmax[:, 1] = np.max(evalpos)
-            slitID = np.ones(evalpos.size) * slit_idx - wcs.wcs.crpix[0]
-            world_ra, world_dec, _ = wcs.wcs_pix2world(slitID, evalpos, onslit_init[0], 0)
+            slitID = np.ones(evalpos.size) * slit_idx - wcs.wcs.crpix[0] + slice_offset
+            world_ra, world_dec, _ = wcs.wcs_pix2world(slitID, evalpos + spat_offset, onslit_init[0], 0)
             # Set the RA first and DEC next
             raimg[onslit] = world_ra.copy()
             decimg[onslit] = world_dec.copy()
@@ -487,7 +494,7 @@ class SlitTraceSet(datamodel.DataContainer):
         return left.copy(), right.copy(), self.mask.copy()
 
     def slit_img(self, pad=None, slitidx=None, initial=False, flexure=None,
-                 exclude_flag=None, use_spatial=True):
+                 exclude_flag=None, use_spatial=True, section=None):
         r"""
         Construct an image identifying each pixel with its associated
         slit.
@@ -536,6 +543,12 @@ class SlitTraceSet(datamodel.DataContainer):
                 Warning -- This could conflict with input slitids, i.e. avoid using both
             use_spatial (bool, optional):
                 If True, use self.spat_id value instead of 0-based indices
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices selecting the spectral and
+                spatial section of the image to construct.  The
+                result is identical to the same section of the full
+                image, but slits that do not overlap the section are
+                skipped.  If None, the full image is constructed.
 
 
         Returns:
@@ -557,6 +570,9 @@ class SlitTraceSet(datamodel.DataContainer):
         spec = np.arange(self.nspec)
 
         left, right, _ = self.select_edges(initial=initial, flexure=flexure)
+        if section is not None:
+            spec, spat = spec[section[0]], spat[section[1]]
+            left, right = left[section[0]], right[section[0]]
 
         # Choose the slits to use
         if slitidx is not None:
@@ -567,12 +583,18 @@ class SlitTraceSet(datamodel.DataContainer):
                 bpm &= np.invert(self.bitmask.flagged(self.mask, flag=exclude_flag))
             slitidx = np.where(np.invert(bpm))[0]
 
+        if section is not None and spat.size > 0:
+            # Only consider the slits that overlap the section
+            overlap = (np.amax(right, axis=0, initial=-np.inf) + _pad[1] > spat[0]) \
+                        & (np.amin(left, axis=0, initial=np.inf) - _pad[0] < spat[-1])
+            slitidx = slitidx[overlap[slitidx]]
+
         # TODO: When specific slits are chosen, need to check that the
         # padding doesn't lead to slit overlap.
 
         # Find the pixels in each slit, limited by the minimum and
         # maximum spectral position.
-        slitid_img = np.full((self.nspec,self.nspat), -1, dtype=int)
+        slitid_img = np.full((spec.size,spat.size), -1, dtype=int)
         for i in slitidx:
             slit_id = self.spat_id[i] if use_spatial else i
             indx = (spat[None,:] > left[:,i,None] - _pad[0]) \
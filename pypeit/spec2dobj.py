@@ -8,7 +8,7 @@ Module for the Spec2DObj class
 import os
 import inspect
 import datetime
-from IPython import embed
+import json
 
 import numpy as np
 
@@ -19,6 +19,8 @@ from pypeit import msgs
 from pypeit import io
 from pypeit import datamodel
 from pypeit import slittrace
+from pypeit import wavetilts
+from pypeit.core import fitting
 from pypeit.images import detector_container
 from pypeit.images import imagebitmask
 
@@ -27,6 +29,63 @@ def spec2d_hdu_prefix(det):
     return 'DET{:02d}-'.format(det)
 
 
+def read_section(file, det, key, section=None, cache=None):
+    """
+    Read a section of one of the images in a spec2d file.
+
+    Only the requested section is read from disk, such that the full
+    image is never held in memory.  Tile-compressed images (see the
+    ``spec2d_compact`` parameter in
+    :class:`~pypeit.par.pypeitpar.ReduxPar`) are the exception: they
+    cannot be read in sections and are decompressed in full before the
+    section is selected.  When reading many sections of the same
+    compressed file, provide ``cache`` to decompress each image only
+    once; note this means the decompressed images are held in memory,
+    such that compact files do not limit the memory use when streaming
+    the images.  If the tilts or wavelength images were not written to
+    the file, the section is regenerated from the stored fits; see
+    :func:`Spec2DObj.store_wave_fits`.
+
+    Args:
+        file (:obj:`str`):
+            Name of the spec2d file.
+        det (:obj:`int`):
+            The detector with the image to read.
+        key (:obj:`str`):
+            The image to read; must be one of the array elements of
+            the :class:`Spec2DObj` datamodel (e.g., ``'sciimg'``).
+        section (:obj:`tuple`, optional):
+            A 2-tuple of slices selecting the spectral and spatial
+            section of the image.  If None, the full image is read.
+        cache (:obj:`dict`, optional):
+            Dictionary used to keep the decompressed tile-compressed
+            images of ``file``, keyed by the extension name.  The
+            caller owns the dictionary and is responsible for clearing
+            it.  Uncompressed images are never added to the cache.  If
+            None, compressed images are decompressed on every call.
+
+    Returns:
+        `numpy.ndarray`_: The image section.
+    """
+    if key not in Spec2DObj.datamodel or Spec2DObj.datamodel[key]['otype'] != np.ndarray:
+        msgs.error('{0} is not an image in the Spec2DObj datamodel.'.format(key))
+    ext = spec2d_hdu_prefix(det)+key.upper()
+    if cache is not None and ext in cache:
+        return cache[ext].copy() if section is None else cache[ext][section].copy()
+    with io.fits_open(file) as hdul:
+        if key in ['tilts', 'waveimg'] and ext not in hdul:
+            s2dobj = Spec2DObj.from_file(file, det, load_images=False)
+            return s2dobj.build_tilts(section=section) if key == 'tilts' \
+                        else s2dobj.build_waveimg(section=section)
+        hdu = hdul[ext]
+        if isinstance(hdu, fits.CompImageHDU):
+            data = hdu.data
+            if cache is not None:
+                cache[ext] = data
+            return data.copy() if section is None else data[section].copy()
+        return hdu.data.copy() if section is None else hdu.section[section]
+
+
 class Spec2DObj(datamodel.DataContainer):
     """Class to handle 2D spectral image outputs of PypeIt
 
@@ -41,7 +100,7 @@ class Spec2DObj(datamodel.DataContainer):
             Primary header if instantiated from a FITS file
 
     """
-    version = '1.0.3'
+    version = '1.0.4'
 
     # TODO 2d data model should be expanded to include:
     # waveimage  --  flexure and heliocentric corrections should be applied to the final waveimage and since this is unique to
@@ -89,10 +148,19 @@ class Spec2DObj(datamodel.DataContainer):
                                   descr='Relativistic velocity correction for wavelengths'),
                  'detector': dict(otype=detector_container.DetectorContainer,
                                   descr='Detector DataContainer'),
+                 'wavetilts': dict(otype=wavetilts.WaveTilts,
+                                   descr='Fit to the wavelength tilts.  If present, the tilts '
+                                         'and wavelength images are not written to disk and '
+                                         'are instead regenerated from the fits when read.'),
+                 'wave_fits': dict(otype=astropy.table.Table,
+                                   descr='Coefficients of the 1D wavelength solution for each '
+                                         'slit; see wavetilts.'),
+                 'wave_fit2d': dict(otype=fitting.PypeItFit,
+                                    descr='2D wavelength solution (echelle); see wavetilts.'),
                  'det': dict(otype=int, descr='Detector index')}
 
     @classmethod
-    def from_file(cls, file, det, chk_version=True):
+    def from_file(cls, file, det, chk_version=True, load_images=True):
         """
         Overload :func:`pypeit.datamodel.DataContainer.from_file` to allow det
         input and to slurp the header
@@ -102,6 +170,14 @@ class Spec2DObj(datamodel.DataContainer):
             det (:obj:`int`):
             chk_version (:obj:`bool`):
                 If False, allow a mismatch in datamodel to proceed
+            load_images (:obj:`bool`, optional):
+                Read the image data.  If False, only the headers of
+                the image extensions are read, such that the images
+                in the returned object are None; use
+                :func:`read_section` to read them as needed.  If
+                True, the tilts and wavelength images are regenerated
+                from their fits if they were not written to the file;
+                see :func:`restore_wave_images`.
 
         Returns:
             `Spec2DObj`:
@@ -111,14 +187,22 @@ class Spec2DObj(datamodel.DataContainer):
         # Quick check on det
         if not np.any(['DET{:02d}'.format(det) in hdu.name for hdu in hdul]):
             msgs.error("Requested detector {} is not in this file - {}".format(det, file))
+        if not load_images:
+            # Keep the headers, but not the data
+            hdul = fits.HDUList([fits.ImageHDU(header=hdu.header, name=hdu.name)
+                                 if isinstance(hdu, (fits.ImageHDU, fits.CompImageHDU)) else hdu
+                                 for hdu in hdul])
         #
         slf = super(Spec2DObj, cls).from_hdu(hdul, hdu_prefix=spec2d_hdu_prefix(det), chk_version=chk_version)
         slf.head0 = hdul[0].header
+        if load_images:
+            slf.restore_wave_images()
         return slf
 
     def __init__(self, det, sciimg, ivarraw, skymodel, objmodel, ivarmodel,
                  scaleimg, waveimg, bpmmask, detector, sci_spat_flexure, sci_spec_flexure,
-                 vel_type, vel_corr, slits, tilts):
+                 vel_type, vel_corr, slits, tilts, wavetilts=None, wave_fits=None,
+                 wave_fit2d=None):
         # Slurp
         args, _, _, values = inspect.getargvalues(inspect.currentframe())
         _d = dict([(k,values[k]) for k in args[1:]])
@@ -162,6 +246,10 @@ class Spec2DObj(datamodel.DataContainer):
             # Skip Nones
             if self[key] is None:
                 continue
+            # The tilts and wavelength images are regenerated from
+            # their fits
+            if key in ['tilts', 'waveimg'] and self.wavetilts is not None:
+                continue
             # Array?
             if self.datamodel[key]['otype'] == np.ndarray:
                 tmp = {}
@@ -179,6 +267,9 @@ class Spec2DObj(datamodel.DataContainer):
             # Spectral flexure
             elif key == 'sci_spec_flexure':
                 d.append(dict(sci_spec_flexure=self.sci_spec_flexure))
+            # Tilt and wavelength fits
+            elif key in ['wavetilts', 'wave_fits', 'wave_fit2d']:
+                d.append({key: self[key]})
             else: # Add to header of the primary image
                 d[0][key] = self[key]
         # Return
@@ -197,6 +288,140 @@ class Spec2DObj(datamodel.DataContainer):
         """
         return spec2d_hdu_prefix(self.det)
 
+    def store_wave_fits(self, waveTilts, wv_calib):
+        """
+        Store the fits used to construct the tilts and wavelength
+        images.
+
+        When the object is written, the (float64) tilts and
+        wavelength images are then replaced by these fits, and the
+        images are regenerated when the file is read; see
+        :func:`restore_wave_images`.  The regenerated images are
+        identical to the images built during the reduction, except
+        in slits that were masked after the wavelength image was
+        constructed.
+
+        Args:
+            waveTilts (:class:`~pypeit.wavetilts.WaveTilts`):
+                The fit to the wavelength tilts.
+            wv_calib (:class:`~pypeit.wavecalib.WaveCalib`):
+                The wavelength calibration.
+        """
+        # Only keep what is needed to evaluate the tilts
+        self.wavetilts = wavetilts.WaveTilts(coeffs=waveTilts.coeffs, nslit=waveTilts.nslit,
+                                             spat_id=waveTilts.spat_id,
+                                             spat_order=waveTilts.spat_order,
+                                             spec_order=waveTilts.spec_order,
+                                             func2d=waveTilts.func2d,
+                                             bpmtilts=None, spat_flexure=waveTilts.spat_flexure,
+                                             PYP_SPEC=waveTilts.PYP_SPEC)
+        # 1D solutions, with the coefficients padded to the same length
+        fits1d = [None if wv_fit is None else wv_fit.pypeitfit for wv_fit in wv_calib.wv_fits]
+        nfitc = np.array([0 if f is None else f.fitc.size for f in fits1d])
+        self.wave_fits = astropy.table.Table()
+        self.wave_fits['spat_id'] = wv_calib.spat_ids
+        self.wave_fits['func'] = ['' if f is None else f.func for f in fits1d]
+        self.wave_fits['minx'] = [0. if f is None else f.minx for f in fits1d]
+        self.wave_fits['maxx'] = [0. if f is None else f.maxx for f in fits1d]
+        self.wave_fits['nfitc'] = nfitc
+        self.wave_fits['fitc'] = np.zeros((nfitc.size, max(np.amax(nfitc, initial=0), 1)),
+                                          dtype=float)
+        for i, f in enumerate(fits1d):
+            if f is not None:
+                self.wave_fits['fitc'][i,:f.fitc.size] = f.fitc
+        # 2D solution
+        self.wave_fit2d = None if not wv_calib.par['echelle'] or wv_calib.wv_fit2d is None \
+                            else fitting.PypeItFit(fitc=wv_calib.wv_fit2d.fitc,
+                                                   order=wv_calib.wv_fit2d.order,
+                                                   func=wv_calib.wv_fit2d.func,
+                                                   minx=wv_calib.wv_fit2d.minx,
+                                                   maxx=wv_calib.wv_fit2d.maxx,
+                                                   minx2=wv_calib.wv_fit2d.minx2,
+                                                   maxx2=wv_calib.wv_fit2d.maxx2)
+
+    def build_tilts(self, section=None):
+        """
+        Regenerate the tilts image from the stored fit; see
+        :func:`store_wave_fits`.
+
+        Args:
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices selecting the spectral and spatial
+                section of the image to build.  If None, the full
+                image is built.
+
+        Returns:
+            `numpy.ndarray`_: The tilts image or image section.
+        """
+        if self.wavetilts is None:
+            msgs.error('No tilt fit available to build the tilts image.')
+        slitmask = self.slits.slit_img(flexure=self.sci_spat_flexure,
+                                       exclude_flag=self.slits.bitmask.exclude_for_reducing,
+                                       section=section)
+        # Spatial shift between the science and tilt frames
+        flexure = (0. if self.sci_spat_flexure is None else self.sci_spat_flexure) \
+                    - (0. if self.wavetilts.spat_flexure is None else self.wavetilts.spat_flexure)
+        return self.wavetilts.fit2tiltimg(slitmask, flexure=flexure,
+                                          shape=(self.slits.nspec, self.slits.nspat),
+                                          section=section)
+
+    def build_waveimg(self, tilts=None, section=None):
+        """
+        Regenerate the wavelength image from the stored fits; see
+        :func:`store_wave_fits`.
+
+        The spectral flexure and reference-frame corrections are
+        applied.
+
+        Args:
+            tilts (`numpy.ndarray`_, optional):
+                The tilts image (or image section).  If None, it is
+                built using :func:`build_tilts`.
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices selecting the spectral and spatial
+                section of the image to build.  If None, the full
+                image is built.
+
+        Returns:
+            `numpy.ndarray`_: The wavelength image or image section.
+        """
+        if self.wave_fits is None:
+            msgs.error('No wavelength fits available to build the wavelength image.')
+        # Import here to avoid importing the wavelength calibration GUI
+        from pypeit import wavecalib
+        from pypeit.core.wavecal import wv_fitting
+        if tilts is None:
+            tilts = self.build_tilts(section=section)
+        wv_fits = np.asarray([wv_fitting.WaveFit(row['spat_id'])
+                              if row['nfitc'] == 0 else
+                              wv_fitting.WaveFit(row['spat_id'], pypeitfit=fitting.PypeItFit(
+                                  fitc=np.asarray(row['fitc'][:row['nfitc']]), func=row['func'],
+                                  minx=float(row['minx']), maxx=float(row['maxx'])))
+                              for row in self.wave_fits])
+        wv_calib = wavecalib.WaveCalib(wv_fits=wv_fits, nslits=len(self.wave_fits),
+                                       spat_ids=np.asarray(self.wave_fits['spat_id']),
+                                       PYP_SPEC=self.slits.PYP_SPEC, wv_fit2d=self.wave_fit2d,
+                                       strpar=json.dumps(dict(echelle=self.wave_fit2d is not None)))
+        spec_flexure = None if self.sci_spec_flexure is None \
+                            else np.asarray(self.sci_spec_flexure['sci_spec_flexure'], dtype=float)
+        waveimg = wv_calib.build_waveimg(tilts, self.slits, spat_flexure=self.sci_spat_flexure,
+                                         spec_flexure=spec_flexure, section=section)
+        if self.vel_corr is not None:
+            waveimg *= self.vel_corr
+        return waveimg
+
+    def restore_wave_images(self):
+        """
+        Regenerate the tilts and wavelength images from their fits,
+        if they are not available; see :func:`store_wave_fits`.
+        """
+        if self.wavetilts is None:
+            return
+        if self.tilts is None:
+            self.tilts = self.build_tilts()
+        if self.waveimg is None and self.wave_fits is not None:
+            self.waveimg = self.build_waveimg(tilts=self.tilts)
+
     def update_slits(self, spec2DObj):
         """
         Update the object at all good slits in the input object
@@ -274,6 +499,7 @@ class AllSpec2DObj(object):
         detectors = hdul[0].header[slf.hdr_prefix+'DETS']
         for det in [int(item) for item in detectors.split(',')]:
             obj = Spec2DObj.from_hdu(hdul, hdu_prefix=spec2d_hdu_prefix(det), chk_version=chk_version)
+            obj.restore_wave_images()
             slf[det] = obj
         # Header
         slf['meta']['head0'] = hdul[0].header
@@ -319,6 +545,15 @@ class AllSpec2DObj(object):
         """Get an item directly from the internal dict."""
         return self.__dict__[item]
 
+    def __delitem__(self, item):
+        """
+        Remove a detector, e.g., to free its images once they have
+        been written; see :func:`append_to_fits`.
+        """
+        if not isinstance(item, int):
+            raise KeyError('Key must be an integer, i.e. detector number')
+        del self.__dict__[item]
+
     def build_primary_hdr(self, raw_header, spectrograph, master_key_dict=None, master_dir=None,
                           redux_path=None, subheader=None):
         """
@@ -399,7 +634,8 @@ class AllSpec2DObj(object):
         #
         return hdr
 
-    def write_to_fits(self, outfile, pri_hdr=None, update_det=None, overwrite=True):
+    def write_to_fits(self, outfile, pri_hdr=None, update_det=None, overwrite=True,
+                      compact=False):
         """
         Write the spec2d FITS file
 
@@ -412,6 +648,11 @@ class AllSpec2DObj(object):
             update_det (list, optional):
                 Detector to be updated
             overwrite (bool, optional):
+            compact (bool, optional):
+                Write all the floating-point images in single
+                precision and compress each image extension using
+                lossless FITS tile compression; see
+                :func:`~pypeit.io.compress_image_hdu`.
 
         """
         if os.path.isfile(outfile):
@@ -428,24 +669,15 @@ class AllSpec2DObj(object):
                         self[det] = _allspecobj[det]
 
         # Primary HDU for output
-        prihdu = fits.PrimaryHDU()
-        # Header
-        if pri_hdr is not None:
-            prihdu.header = pri_hdr
-
-        # Add meta to Primary Header
-        for key in self['meta']:
-            # This is not a header card
-            if key == 'head0':
-                continue
-            #
-            prihdu.header[self.hdr_prefix+key.upper()] = self['meta'][key]
+        prihdu = self._primary_hdu(pri_hdr=pri_hdr)
 
         # Loop on em (in order of detector)
         extnum = 1
         hdus = [prihdu]
         for det in self.detectors:
             hdul = self[det].to_hdu()
+            if compact:
+                hdul = [io.compress_image_hdu(hdu) for hdu in hdul]
             # TODO -- Make adding EXT000X a default of DataContainer?
             for hdu in hdul:
                 keywd = 'EXT{:04d}'.format(extnum)
@@ -463,6 +695,149 @@ class AllSpec2DObj(object):
         hdulist.writeto(outfile, overwrite=overwrite)
         msgs.info("Wrote: {:s}".format(outfile))
 
+    def _primary_hdu(self, pri_hdr=None):
+        """
+        Construct the primary HDU with the meta data.
+
+        Args:
+            pri_hdr (`astropy.io.fits.Header`_, optional):
+                Header to be used in lieu of default
+
+        Returns:
+            `astropy.io.fits.PrimaryHDU`_: The primary HDU.
+        """
+        prihdu = fits.PrimaryHDU()
+        # Header
+        if pri_hdr is not None:
+            prihdu.header = pri_hdr
+
+        # Add meta to Primary Header
+        for key in self['meta']:
+            # This is not a header card
+            if key == 'head0':
+                continue
+            #
+            prihdu.header[self.hdr_prefix+key.upper()] = self['meta'][key]
+        return prihdu
+
+    @staticmethod
+    def _ext_keys(hdr):
+        """
+        Return the keywords in a primary header with the extension
+        names.
+        """
+        return [key for key in hdr.keys() if len(key) == 7 and key[:3] == 'EXT'
+                    and key[3:].isdigit()]
+
+    @classmethod
+    def read_detectors(cls, filename):
+        """
+        Read the list of detectors in a spec2d file from its primary
+        header.
+
+        Args:
+            filename (:obj:`str`):
+                Name of the spec2d file.
+
+        Returns:
+            :obj:`list`: The detectors in the file, in the order
+            they were written.
+        """
+        dets = fits.getheader(filename).get(cls.hdr_prefix+'DETS')
+        return [] if dets is None else [int(item) for item in str(dets).split(',')]
+
+    def append_to_fits(self, outfile, det, pri_hdr=None, compact=False, ndet=1):
+        """
+        Append the extensions for one detector to a spec2d FITS file.
+
+        Unlike :func:`write_to_fits`, the extensions already in the
+        file are neither read nor rewritten.  This allows the
+        detectors of an exposure to be written one at a time, as the
+        reduction proceeds, such that the images for each detector
+        can be freed once written.  The file is created if it does
+        not exist.
+
+        The detector is only added to the list of detectors in the
+        primary header (see :func:`read_detectors`) once all of its
+        extensions have been written.  Any extensions written by an
+        interrupted call to this method can be removed using
+        :func:`truncate_fits`.
+
+        Args:
+            outfile (:obj:`str`):
+                Output filename
+            det (:obj:`int`):
+                Detector to write.
+            pri_hdr (:class:`astropy.io.fits.Header`, optional):
+                Header to be used in lieu of default, if the file is
+                created.  Usually generated by
+                :func:`pypeit,spec2dobj.AllSpec2DObj.build_primary_hdr`
+            compact (:obj:`bool`, optional):
+                Compress the images; see :func:`write_to_fits`.
+            ndet (:obj:`int`, optional):
+                The expected number of detectors in the file.  Used
+                to reserve space in the primary header for the
+                extension names when the file is created.
+        """
+        hdul = self[det].to_hdu()
+        if compact:
+            hdul = [io.compress_image_hdu(hdu) for hdu in hdul]
+
+        if os.path.isfile(outfile):
+            hdr = fits.getheader(outfile)
+            dets = self.read_detectors(outfile)
+            if det in dets:
+                msgs.error('Detector {0} has already been written to {1}.'.format(det, outfile))
+            extnum = len(self._ext_keys(hdr)) + 1
+            prihdr = None
+        else:
+            dets = []
+            extnum = 1
+            prihdr = self._primary_hdu(pri_hdr=pri_hdr).header
+
+        # Append the extensions
+        io.append_hdus(outfile, hdul, primary_hdr=prihdr, reserve=ndet*len(hdul)+1)
+
+        # Record them in the primary header
+        cards = {}
+        for hdu in hdul:
+            cards['EXT{:04d}'.format(extnum)] = hdu.name
+            extnum += 1
+        cards[self.hdr_prefix+'DETS'] = str(dets + [det])[1:-1]
+        io.update_primary_header(outfile, cards)
+        msgs.info("Wrote detector {0} to: {1:s}".format(det, outfile))
+
+    @classmethod
+    def truncate_fits(cls, filename, detectors):
+        """
+        Remove the extensions for all but the first detectors written
+        to a spec2d file by :func:`append_to_fits`.
+
+        Any extensions after those of the last listed detector,
+        including any partially written extension, are removed, and
+        the primary header is updated accordingly.
+
+        Args:
+            filename (:obj:`str`):
+                Name of the spec2d file.
+            detectors (:obj:`list`):
+                The detectors to keep.  These must be the first
+                detectors written to the file, in the same order.
+        """
+        dets = cls.read_detectors(filename)
+        if dets[:len(detectors)] != list(detectors):
+            msgs.error('Detectors {0} are not the first written to {1}.'.format(detectors,
+                                                                                 filename))
+        hdr = fits.getheader(filename)
+        ext_keys = cls._ext_keys(hdr)
+        prefixes = tuple([spec2d_hdu_prefix(det) for det in detectors])
+        nkeep = np.sum([hdr[key].startswith(prefixes) for key in ext_keys]) \
+                    if len(detectors) > 0 else 0
+        io.truncate_fits(filename, nkeep+1)
+        cards = dict.fromkeys(ext_keys[nkeep:])
+        cards[cls.hdr_prefix+'DETS'] = str(list(detectors))[1:-1] if len(detectors) > 0 else None
+        io.update_primary_header(filename, cards)
+
     def __repr__(self):
         # Generate sets string
         txt = '<{:s}: '.format(self.__class__.__name__)
@@ -7,7 +7,7 @@ Module for the SpecObj classes
 """
 import copy
 import inspect
-from IPython import embed
+import weakref
 
 import numpy as np
 
@@ -29,6 +29,13 @@ naming_model = {}
 for skey in ['SPAT', 'SLIT', 'DET', 'SCI','OBJ', 'ORDER']:
     naming_model[skey.lower()] = skey
 
+containers = weakref.WeakKeyDictionary()
+"""
+The :class:`~pypeit.specobjs.SpecObjs` objects that keep arrays of the
+attributes of each :class:`SpecObj`; these are reset by
+:func:`SpecObj.__setitem__`.
+"""
+
 def det_hdu_prefix(det):
     return 'DET{:02d}-'.format(det)
 
@@ -198,6 +205,16 @@ class SpecObj(datamodel.DataContainer):
         # Name
         self.set_name()
 
+    def __setitem__(self, item, value):
+        """
+        Over-ride :func:`pypeit.datamodel.DataContainer.__setitem__` to
+        reset the arrays of this item kept by any
+        :class:`~pypeit.specobjs.SpecObjs` holding this object.
+        """
+        super(SpecObj, self).__setitem__(item, value)
+        for sobjs in containers.get(self, ()):
+            sobjs._attrs.pop(item, None)
+
     def _init_internals(self):
         # Object finding
         self.smash_peakflux = None
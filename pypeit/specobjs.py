@@ -6,12 +6,13 @@ Module for the SpecObjs and SpecObj classes
 """
 import os
 import re
+import weakref
 
 import numpy as np
 
 from astropy import units
 from astropy.io import fits
-from astropy.table import Table
+from astropy.table import Table, MaskedColumn
 
 from pypeit import msgs
 from pypeit import specobj
@@ -21,8 +22,6 @@ from pypeit.core import parse
 from pypeit.images import detector_container
 from pypeit import slittrace
 
-from IPython import embed
-
 
 class SpecObjs:
     """
@@ -45,19 +44,48 @@ class SpecObjs:
     """
     version = '1.0.0'
 
+    columnar_index = 'SPECOBJ_INDEX'
+    """
+    Extension name for the table with the scalar data of all objects in
+    the columnar layout.
+    """
+
+    columnar_data = 'SPECOBJ_DATA'
+    """
+    Extension name for the table with the (padded) arrays of all objects
+    in the columnar layout.
+    """
+
+    index_keys = ['NAME', 'DET', 'SLITID', 'ECH_ORDER']
+    """
+    Datamodel items returned by :func:`read_index`.
+    """
+
+    array_keys = [key for key, dm in specobj.SpecObj.datamodel.items()
+                    if dm['otype'] is np.ndarray or key == 'DETECTOR']
+    """
+    Datamodel items that are not kept as arrays by :func:`__getattr__`.
+    """
+
     @classmethod
-    def from_fitsfile(cls, fits_file, det=None, chk_version=True):
+    def from_fitsfile(cls, fits_file, det=None, chk_version=True, names=None):
         """
         Instantiate from a FITS file
 
         Also tag on the Header
 
+        Both the one-extension-per-object layout and the columnar
+        layout (see :func:`write_to_fits`) are read.  For the latter,
+        only the table rows of the selected objects are read from disk.
+
         Args:
             fits_file (str):
             det (int, optional):
                 Only load SpecObj matching this det value
             chk_version (:obj:`bool`):
                 If False, allow a mismatch in datamodel to proceed
+            names (:obj:`str`, :obj:`list`, optional):
+                Only load the SpecObj with these NAME values
 
         Returns:
             specobsj.SpecObjs
@@ -76,14 +104,25 @@ class SpecObjs:
         for hdu in hdul[1:]:
             if 'DETECTOR' in hdu.name:
                 detector_hdus[hdu.header['DET']] = detector_container.DetectorContainer.from_hdu(hdu)
+        _names = None if names is None else np.atleast_1d(names)
         # Now the objects
-        for hdu in hdul[1:]:
-            if 'DETECTOR' in hdu.name:
-                continue
-            sobj = specobj.SpecObj.from_hdu(hdu, chk_version=chk_version)
-            # Restrict on det?
-            if det is not None and sobj.DET != det:
-                continue
+        if cls.columnar_index in hdul:
+            sobjs = columnar_to_specobjs(hdul, det=det, names=_names, chk_version=chk_version)
+        else:
+            sobjs = []
+            for hdu in hdul[1:]:
+                if 'DETECTOR' in hdu.name:
+                    continue
+                # Restrict on name?  Check the extension name so that
+                # the data are not read unless needed
+                if _names is not None and hdu.name not in _names:
+                    continue
+                sobj = specobj.SpecObj.from_hdu(hdu, chk_version=chk_version)
+                # Restrict on det?
+                if det is not None and sobj.DET != det:
+                    continue
+                sobjs += [sobj]
+        for sobj in sobjs:
             # Check for detector
             if sobj.DET in detector_hdus.keys():
                 sobj.DETECTOR = detector_hdus[sobj.DET]
@@ -93,12 +132,52 @@ class SpecObjs:
         hdul.close()
         return slf
 
+    @classmethod
+    def read_index(cls, fits_file):
+        """
+        Read the NAME, DET, SLITID and ECH_ORDER of all objects in a
+        spec1d file without reading any of the spectra.
+
+        Args:
+            fits_file (str):
+
+        Returns:
+            `astropy.table.Table`_: One row per object, in the order
+            the objects are stored in the file.  Missing values are
+            masked.
+        """
+        hdul = io.fits_open(fits_file)
+        if cls.columnar_index in hdul:
+            tbl = Table.read(hdul[cls.columnar_index])
+            for key in cls.index_keys:
+                if key not in tbl.keys():
+                    tbl[key] = MaskedColumn(np.zeros(len(tbl), dtype=int),
+                                            mask=np.ones(len(tbl), dtype=bool))
+            tbl = tbl[cls.index_keys]
+        else:
+            rows = [[hdu.header.get(key) for key in cls.index_keys] for hdu in hdul[1:]
+                        if 'DETECTOR' not in hdu.name]
+            tbl = Table(masked=True)
+            for i, key in enumerate(cls.index_keys):
+                col = [row[i] for row in rows]
+                msk = np.array([c is None for c in col], dtype=bool)
+                fill = '' if key == 'NAME' else 0
+                tbl[key] = MaskedColumn([fill if m else c for c, m in zip(col, msk)], mask=msk)
+        hdul.close()
+        return tbl
+
     def __init__(self, specobjs=None, header=None):
 
+        # The SpecObj objects are held in an over-allocated buffer so
+        # that appending is amortized O(1); see the specobjs property.
+        self._buffer = np.empty(0, dtype=object)
+        self._nobj = 0
+        # Arrays of the scalar SpecObj datamodel items, built on first
+        # access; see __getattr__.
+        self._attrs = {}
+
         # Only two attributes are allowed for this Object -- specobjs, header
-        if specobjs is None:
-            self.specobjs = np.array([])
-        else:
+        if specobjs is not None:
             if isinstance(specobjs, (list, np.ndarray)):
                 specobjs = np.array(specobjs)
             self.specobjs = specobjs
@@ -123,7 +202,7 @@ class SpecObjs:
         """
         if not '_SpecObjs__initialised' in self.__dict__:  # this test allows attributes to be set in the __init__ method
             return dict.__setattr__(self, item, value)
-        elif item in self.__dict__:  # any normal attributes are handled normally
+        elif item in self.__dict__ or item == 'specobjs':  # any normal attributes are handled normally
             dict.__setattr__(self, item, value)
         else:
             # Special handling when the input is an array/list and the length matches that of the slice
@@ -136,6 +215,57 @@ class SpecObjs:
             for specobj in self.specobjs:
                 setattr(specobj, item, value)
 
+    @property
+    def specobjs(self):
+        """
+        The `numpy.ndarray`_ of :class:`~pypeit.specobj.SpecObj` objects.
+        """
+        return self._buffer[:self._nobj]
+
+    @specobjs.setter
+    def specobjs(self, value):
+        self._buffer = value
+        self._nobj = len(value)
+        self._attrs = {}
+
+    def _set_subset(self, parent, index):
+        """
+        Set the objects to a subset of another :class:`SpecObjs`,
+        including any of its attribute arrays.
+
+        Args:
+            parent (:class:`SpecObjs`):
+                Object with the full set.
+            index (:obj:`slice`, `numpy.ndarray`_, :obj:`list`):
+                Selection of the objects in ``parent``.
+        """
+        self.specobjs = parent.specobjs[index]
+        if len(parent._attrs) > 0:
+            self._register(self.specobjs)
+            self._attrs = dict([(k, np.array(v[:parent.nobj][index]))
+                                    for k, v in parent._attrs.items()])
+
+    def _register(self, sobjs):
+        """
+        Register this object as holding the provided
+        :class:`~pypeit.specobj.SpecObj` objects so that their changes
+        reset the relevant attribute arrays.
+        """
+        for sobj in sobjs:
+            specobj.containers.setdefault(sobj, weakref.WeakSet()).add(self)
+
+    def __getstate__(self):
+        """
+        Drop the attribute arrays when pickling or (deep) copying the
+        object; the copied :class:`~pypeit.specobj.SpecObj` objects are
+        not registered with the copy (see :func:`_register`), such that
+        the arrays would not be reset by changes to the objects.  The
+        arrays are rebuilt on the next access.
+        """
+        state = self.__dict__.copy()
+        state['_attrs'] = {}
+        return state
+
     @property
     def nobj(self):
         """
@@ -145,7 +275,7 @@ class SpecObjs:
             int
 
         """
-        return len(self.specobjs)
+        return self._nobj
 
     def unpack_object(self, ret_flam=False, extract_type='OPT'):
         """
@@ -316,7 +446,7 @@ class SpecObjs:
 
         # Sort objects according to their spatial location. Necessary for the extraction to properly work
         if self.nobj > 0:
-            self.specobjs = self.specobjs[np.argsort(self.SPAT_PIXPOS)]
+            self._set_subset(self, np.argsort(self.SPAT_PIXPOS))
 
     def purge_neg(self):
         """
@@ -432,12 +562,39 @@ class SpecObjs:
 
         """
         if isinstance(sobj, specobj.SpecObj):
-            self.specobjs = np.append(self.specobjs, [sobj])
-        elif isinstance(sobj, (np.ndarray,list)):
-            self.specobjs = np.append(self.specobjs, sobj)
+            new = [sobj]
+        elif isinstance(sobj, np.ndarray):
+            new = list(sobj.ravel())
+        elif isinstance(sobj, list):
+            new = sobj
         elif isinstance(sobj, SpecObjs):
-            for isobj in sobj:
-                self.specobjs = np.append(self.specobjs, isobj)
+            new = list(sobj.specobjs)
+        else:
+            return
+        nobj = self._nobj + len(new)
+        # Grow the buffer geometrically
+        if nobj > self._buffer.size:
+            buffer = np.empty(max(nobj, 2*self._buffer.size), dtype=object)
+            buffer[:self._nobj] = self._buffer[:self._nobj]
+            self._buffer = buffer
+        for i, _sobj in enumerate(new):
+            self._buffer[self._nobj+i] = _sobj
+        # Extend the attribute arrays
+        if len(self._attrs) > 0:
+            self._register(new)
+        for k in list(self._attrs.keys()):
+            values = lst_to_array([getattr(_sobj, k) for _sobj in new])
+            attr = self._attrs[k]
+            if not np.can_cast(values.dtype, attr.dtype, casting='safe'):
+                # Will be rebuilt on the next access
+                del self._attrs[k]
+                continue
+            if nobj > attr.size:
+                _attr = np.empty(self._buffer.size, dtype=attr.dtype)
+                _attr[:self._nobj] = attr[:self._nobj]
+                self._attrs[k] = attr = _attr
+            attr[self._nobj:nobj] = values
+        self._nobj = nobj
 
     def remove_sobj(self, index):
         """
@@ -449,7 +606,7 @@ class SpecObjs:
         msk = np.ones(self.specobjs.size, dtype=bool)
         msk[index] = False
         # Do it
-        self.specobjs = self.specobjs[msk]
+        self._set_subset(self, msk)
 
     def copy(self):
         """
@@ -489,23 +646,39 @@ class SpecObjs:
             # here for the many ways to give a slice; a tuple of ndarray
             # is produced by np.where, as in t[np.where(t['a'] > 2)]
             # For all, a new table is constructed with slice of all columns
-            return SpecObjs(specobjs=self.specobjs[item], header=self.header)
+            sobjs = SpecObjs(header=self.header)
+            sobjs._set_subset(self, item)
+            return sobjs
 
     def __getattr__(self, k):
         """
         Overloaded to generate an array of attribute 'k' from the
         :class:`pypeit.specobj.SpecObj` objects.
 
-        First attempts to grab data from the Summary table, then the list
+        Arrays of the scalar datamodel items (e.g., SLITID, DET, NAME)
+        are kept after they are first built, extended as objects are
+        added, and reset whenever the item is set for any of the
+        objects, so that repeated selections do not loop over the
+        objects.
         """
+        if k.startswith('_'):
+            raise AttributeError(k)
         if len(self.specobjs) == 0:
             raise ValueError("Empty specobjs")
+        if k in self._attrs:
+            return self._attrs[k][:self.nobj].copy()
         try:
             lst = [getattr(specobj, k) for specobj in self.specobjs]
         except ValueError:
             raise ValueError("Attribute does not exist")
         # Recast as an array
-        return lst_to_array(lst)
+        arr = lst_to_array(lst)
+        if k in specobj.SpecObj.datamodel and k not in self.array_keys \
+                and not isinstance(arr, units.Quantity):
+            if len(self._attrs) == 0:
+                self._register(self.specobjs)
+            self._attrs[k] = arr.copy()
+        return arr
 
     # Printing
     def __repr__(self):
@@ -520,13 +693,21 @@ class SpecObjs:
         return txt
 
     def __len__(self):
-        return len(self.specobjs)
+        return self._nobj
 
     def write_to_fits(self, subheader, outfile, overwrite=True, update_det=None,
-                      slitspatnum=None, debug=False):
+                      slitspatnum=None, debug=False, columnar=None):
         """
         Write the set of SpecObj objects to one multi-extension FITS file
 
+        By default, each object is written to its own ``BinTableHDU``.
+        With ``columnar=True``, all objects are instead written to two
+        tables, one row per object: :attr:`columnar_index` holds the
+        scalar datamodel items (NAME, SLITID, DET, etc) and the length
+        of each array, and :attr:`columnar_data` holds the arrays
+        zero-padded to a common length.  See
+        :func:`specobjs_to_columnar`.
+
         Args:
             subheader (:obj:`dict`):
             outfile (str):
@@ -536,8 +717,15 @@ class SpecObjs:
             update_det (int or list, optional):
               If provided, do not clobber the existing file but only update
               the indicated detectors.  Useful for re-running on a subset of detectors
+            columnar (:obj:`bool`, optional):
+                Write the columnar layout.  If None, use the layout
+                recorded by the ``COLUMNAR`` keyword in ``subheader``,
+                if present; i.e., re-writing a file read with
+                :func:`from_fitsfile` keeps its layout.
 
         """
+        if columnar is None:
+            columnar = subheader.get('COLUMNAR', False)
         if os.path.isfile(outfile) and (not overwrite):
             msgs.warn("Outfile exists.  Set overwrite=True to clobber it")
             return
@@ -578,15 +766,66 @@ class SpecObjs:
         prihdu.header['DMODCLS'] = (self.__class__.__name__, 'Datamodel class')
         prihdu.header['DMODVER'] = (self.version, 'Datamodel version')
 
-        detector_hdus = {}
         nspec, ext = 0, 0
-        # Loop on the SpecObj objects
-        for sobj in _specobjs:
+        prihdu.header['COLUMNAR'] = (columnar, 'Objects written to a single table')
+        if columnar:
+            _specobjs = [sobj for sobj in _specobjs if sobj is not None]
+            hdus += specobjs_to_columnar(_specobjs)
+            nspec = len(_specobjs)
+            detector_hdus = {}
+            for sobj in _specobjs:
+                if sobj.DETECTOR is not None:
+                    detector_hdus[sobj.DET] = sobj.DETECTOR.to_hdu()[0]
+        else:
+            # Loop on the SpecObj objects
+            shdus, detector_hdus = self._object_hdus(_specobjs)
+            for shdu in shdus:
+                # Extension
+                keywd = 'EXT{:04d}'.format(ext)
+                prihdu.header[keywd] = shdu.name
+                ext += 1
+                nspec += 1
+            # Append
+            hdus += shdus
+
+        # Deal with Detectors
+        # TODO - Add EXT to the primary header for these??
+        hdus += self._detector_hdus(detector_hdus)
+
+        # A few more for the header
+        prihdu.header['NSPEC'] = nspec
+
+        # Code versions
+        io.initialize_header(hdr=prihdu.header)
+
+        # Finish
+        hdulist = fits.HDUList(hdus)
+        if debug:
+            import pdb; pdb.set_trace()
+        hdulist.writeto(outfile, overwrite=overwrite)
+        msgs.info("Wrote 1D spectra to {:s}".format(outfile))
+        return
+
+    @staticmethod
+    def _object_hdus(sobjs):
+        """
+        Construct the HDUs for the one-extension-per-object layout.
+
+        Args:
+            sobjs (:obj:`list`, :class:`SpecObjs`):
+                The objects to write.
+
+        Returns:
+            :obj:`tuple`: The list of HDUs with the object data, and
+            a :obj:`dict` with the HDU for each detector, keyed by the
+            detector number; see :func:`_detector_hdus`.
+        """
+        hdus = []
+        detector_hdus = {}
+        for sobj in sobjs:
             if sobj is None:
                 continue
             # HDUs
-            if debug:
-                import pdb; pdb.set_trace()
             shdul = sobj.to_hdu()
             if len(shdul) == 2:  # Detector?
                 detector_hdus[sobj['DET']] = shdul[1]
@@ -602,37 +841,122 @@ class SpecObjs:
             #shdu[0].header['DMODVER'] = (self.version, 'Datamodel version')
             # Name
             shdu[0].name = sobj.NAME
-            # Extension
-            keywd = 'EXT{:04d}'.format(ext)
-            prihdu.header[keywd] = sobj.NAME
-            ext += 1
-            nspec += 1
             # Append
             hdus += shdu
+        return hdus, detector_hdus
 
-        # Deal with Detectors
+    @staticmethod
+    def _detector_hdus(detector_hdus):
+        """
+        Name the detector HDUs.
+
+        Args:
+            detector_hdus (:obj:`dict`):
+                The HDU for each detector, keyed by the detector
+                number.
+
+        Returns:
+            :obj:`list`: The list of named HDUs.
+        """
+        hdus = []
         for key, item in detector_hdus.items():
-            # TODO - Add EXT to the primary header for these??
             prefix = specobj.det_hdu_prefix(key)
             # Name
             if prefix not in item.name:  # In case we are re-loading
                 item.name = specobj.det_hdu_prefix(key)+item.name
             # Append
             hdus += [item]
+        return hdus
 
-        # A few more for the header
-        prihdu.header['NSPEC'] = nspec
+    @staticmethod
+    def read_detectors(fits_file):
+        """
+        Read the list of detectors written to a spec1d file by
+        :func:`append_to_fits`.
 
-        # Code versions
-        io.initialize_header(hdr=prihdu.header)
+        Args:
+            fits_file (:obj:`str`):
 
-        # Finish
-        hdulist = fits.HDUList(hdus)
-        if debug:
-            import pdb; pdb.set_trace()
-        hdulist.writeto(outfile, overwrite=overwrite)
-        msgs.info("Wrote 1D spectra to {:s}".format(outfile))
-        return
+        Returns:
+            :obj:`list`: The detectors in the file, in the order
+            they were written.
+        """
+        dets = fits.getheader(fits_file).get('DETS')
+        return [] if dets is None else [int(item) for item in str(dets).split(',')]
+
+    def append_to_fits(self, outfile, det):
+        """
+        Append the objects extracted from one detector to a spec1d
+        FITS file.
+
+        Unlike :func:`write_to_fits`, the extensions already in the
+        file are neither read nor rewritten.  This allows the objects
+        from each detector of an exposure to be written as soon as
+        they are extracted.  The objects are written using the
+        one-extension-per-object layout, and the file is created, with
+        a minimal primary header, if it does not exist.  All the
+        extensions, including those with the detector data, are
+        listed by the ``EXT`` keywords in the primary header.
+
+        The detector is added to the ``DETS`` keyword in the primary
+        header (see :func:`read_detectors`) once all of its objects
+        have been written, even if there are no objects.  Any
+        extensions written by an interrupted call to this method can
+        be removed using :func:`truncate_fits`.  Files written by this
+        method are read by :func:`from_fitsfile`.
+
+        Args:
+            outfile (:obj:`str`):
+            det (:obj:`int`):
+                The detector with the objects.
+
+        """
+        if np.any([sobj.DET != det for sobj in self.specobjs]):
+            msgs.error('All objects must be from detector {0}.'.format(det))
+        shdus, detector_hdus = self._object_hdus(self.specobjs)
+        hdus = shdus + self._detector_hdus(detector_hdus)
+
+        if os.path.isfile(outfile):
+            hdr = fits.getheader(outfile)
+            dets = self.read_detectors(outfile)
+            if det in dets:
+                msgs.error('Detector {0} has already been written to {1}.'.format(det, outfile))
+            nspec = hdr['NSPEC']
+            ext = hdr['NEXT']
+            prihdr = None
+        else:
+            dets = []
+            nspec, ext = 0, 0
+            prihdr = io.initialize_header(primary=True)
+            prihdr['DMODCLS'] = (self.__class__.__name__, 'Datamodel class')
+            prihdr['DMODVER'] = (self.version, 'Datamodel version')
+            prihdr['COLUMNAR'] = (False, 'Objects written to a single table')
+
+        # Append the extensions
+        io.append_hdus(outfile, hdus, primary_hdr=prihdr)
+
+        # Record them in the primary header
+        cards = {}
+        for hdu in hdus:
+            cards['EXT{:04d}'.format(ext)] = hdu.name
+            ext += 1
+        cards['NEXT'] = ext
+        cards['NSPEC'] = nspec + len(shdus)
+        cards['DETS'] = str(dets + [det])[1:-1]
+        io.update_primary_header(outfile, cards)
+        msgs.info("Wrote 1D spectra for detector {0} to {1:s}".format(det, outfile))
+
+    @classmethod
+    def truncate_fits(cls, fits_file):
+        """
+        Remove any extensions written to a spec1d file by an
+        interrupted call to :func:`append_to_fits`.
+
+        Args:
+            fits_file (:obj:`str`):
+        """
+        hdr = fits.getheader(fits_file)
+        io.truncate_fits(fits_file, hdr.get('NEXT', 0)+1)
 
     def write_info(self, outfile, pypeline):
         """
@@ -770,3 +1094,129 @@ def lst_to_array(lst, mask=None):
     else:
         return np.array(lst)[mask]
 
+
+
+def specobjs_to_columnar(sobjs):
+    """
+    Construct the two binary tables of the columnar spec1d layout.
+
+    The first table (:attr:`SpecObjs.columnar_index`) has one column per
+    scalar :class:`~pypeit.specobj.SpecObj` datamodel item (masked where
+    the item is None) and, for each array item, a ``<key>_LEN`` column
+    with its length (-1 where the item is None).  The second table
+    (:attr:`SpecObjs.columnar_data`) has one column per array item,
+    zero-padded to the longest array across all objects.  Items that
+    are None for all objects are not written.  The DETECTOR is not
+    included; see :func:`SpecObjs.write_to_fits`.
+
+    Args:
+        sobjs (:obj:`list`):
+            List of :class:`~pypeit.specobj.SpecObj` objects.
+
+    Returns:
+        :obj:`list`: The two `astropy.io.fits.BinTableHDU`_ objects.
+    """
+    nobj = len(sobjs)
+    index = Table()
+    data = Table()
+    for key, dm in specobj.SpecObj.datamodel.items():
+        if key == 'DETECTOR':
+            continue
+        values = [sobj[key] for sobj in sobjs]
+        isnone = np.array([v is None for v in values], dtype=bool)
+        if np.all(isnone):
+            continue
+        if dm['otype'] is not np.ndarray:
+            fill = values[np.where(np.logical_not(isnone))[0][0]]
+            fill = '' if isinstance(fill, str) else type(fill)(0)
+            index[key] = MaskedColumn([fill if m else v for v, m in zip(values, isnone)],
+                                      mask=isnone)
+            continue
+        if any(v.ndim != 1 for v, m in zip(values, isnone) if not m):
+            msgs.error('Columnar spec1d output only supports 1D arrays; {0} is not.'.format(key))
+        length = np.array([-1 if m else v.size for v, m in zip(values, isnone)])
+        dtype = values[np.where(np.logical_not(isnone))[0][0]].dtype
+        arr = np.zeros((nobj, max(np.amax(length), 1)), dtype=dtype)
+        for i in np.where(np.logical_not(isnone))[0]:
+            arr[i,:length[i]] = values[i]
+        index['{0}_LEN'.format(key)] = length
+        data[key] = arr
+
+    hdus = [fits.table_to_hdu(index), fits.table_to_hdu(data)]
+    for hdu, name in zip(hdus, [SpecObjs.columnar_index, SpecObjs.columnar_data]):
+        hdu.name = name
+        hdu.header['DMODCLS'] = (specobj.SpecObj.__name__, 'Datamodel class')
+        hdu.header['DMODVER'] = (specobj.SpecObj.version, 'Datamodel version')
+    return hdus
+
+
+def columnar_to_specobjs(hdul, det=None, names=None, chk_version=True):
+    """
+    Instantiate :class:`~pypeit.specobj.SpecObj` objects from the
+    columnar spec1d layout written by :func:`specobjs_to_columnar`.
+
+    The index table is read in full, but only the rows of the data
+    table for the selected objects are read.  When the file is
+    memory-mapped (the `astropy.io.fits`_ default), this means the
+    spectra of all other objects are never read from disk.
+
+    Args:
+        hdul (`astropy.io.fits.HDUList`_):
+            Opened spec1d file.
+        det (:obj:`int`, optional):
+            Only load objects on this detector.
+        names (array-like, optional):
+            Only load objects with these NAME values.
+        chk_version (:obj:`bool`, optional):
+            If True, raise an error if the datamodel version does
+            not match the code; otherwise, only warn.
+
+    Returns:
+        :obj:`list`: The selected :class:`~pypeit.specobj.SpecObj`
+        objects, in the order they are stored in the file.
+    """
+    index_hdu = hdul[SpecObjs.columnar_index]
+    if index_hdu.header['DMODCLS'] != specobj.SpecObj.__name__:
+        msgs.error('The HDU(s) cannot be parsed by a {0} object!'.format(
+                   specobj.SpecObj.__name__))
+    if index_hdu.header['DMODVER'] != specobj.SpecObj.version:
+        _f = msgs.error if chk_version else msgs.warn
+        _f('Current version of {0} object in code (v{1})'.format(specobj.SpecObj.__name__,
+                                                                specobj.SpecObj.version)
+           + ' does not match version used to write your HDU(s)!')
+    index = Table.read(index_hdu)
+    # Select the rows
+    rows = np.ones(len(index), dtype=bool)
+    if det is not None:
+        rows &= index['DET'] == det
+    if names is not None:
+        rows &= np.isin(index['NAME'], names)
+    rows = np.where(rows)[0]
+    if rows.size == 0:
+        return []
+
+    # Only read the selected rows of each array
+    data = hdul[SpecObjs.columnar_data].data
+    arrays = {}
+    for key in data.columns.names:
+        arr = np.asarray(data[key][rows])
+        # Force native byte ordering
+        arrays[key] = arr.astype(arr.dtype.type) if arr.dtype.byteorder not in ['=', '|'] \
+                        else arr
+
+    sobjs = []
+    for i, row in enumerate(rows):
+        _d = dict.fromkeys(specobj.SpecObj.datamodel.keys())
+        for key in index.keys():
+            if key.endswith('_LEN'):
+                continue
+            if np.ma.is_masked(index[key][row]):
+                continue
+            otype = specobj.SpecObj.datamodel[key]['otype']
+            _d[key] = (otype[0] if isinstance(otype, tuple) else otype)(index[key][row])
+        for key in arrays.keys():
+            length = index['{0}_LEN'.format(key)][row]
+            if length >= 0:
+                _d[key] = arrays[key][i,:length]
+        sobjs += [specobj.SpecObj.from_dict(d=_d)]
+    return sobjs
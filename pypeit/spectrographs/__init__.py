@@ -1,37 +1,78 @@
+"""
+Spectrograph classes.
+
+The spectrograph modules are only imported when they are needed, which
+keeps the import of :mod:`pypeit.spectrographs` (and any script that
+only needs the list of available spectrographs) fast.  Each module is
+imported when the relevant spectrograph is instantiated by
+:func:`~pypeit.spectrographs.util.load_spectrograph`, or when it is
+accessed as an attribute of this package (e.g.,
+``pypeit.spectrographs.keck_deimos``).
+"""
+import importlib
+
+# Name of each available spectrograph and the module that defines it.
+# This must be updated when a new spectrograph is added; see
+# pypeit/tests/test_spectrographs.py::test_registry.
+spectrograph_modules = {'gemini_flamingos1': 'gemini_flamingos',
+                        'gemini_flamingos2': 'gemini_flamingos',
+                        'gemini_gmos_north_e2v': 'gemini_gmos',
+                        'gemini_gmos_north_ham': 'gemini_gmos',
+                        'gemini_gmos_north_ham_ns': 'gemini_gmos',
+                        'gemini_gmos_south_ham': 'gemini_gmos',
+                        'gemini_gnirs': 'gemini_gnirs',
+                        'keck_deimos': 'keck_deimos',
+                        'keck_hires_red': 'keck_hires',
+                        'keck_kcwi': 'keck_kcwi',
+                        'keck_lris_blue': 'keck_lris',
+                        'keck_lris_blue_orig': 'keck_lris',
+                        'keck_lris_red': 'keck_lris',
+                        'keck_lris_red_orig': 'keck_lris',
+                        'keck_mosfire': 'keck_mosfire',
+                        'keck_nires': 'keck_nires',
+                        'keck_nirspec_low': 'keck_nirspec',
+                        'lbt_luci1': 'lbt_luci',
+                        'lbt_luci2': 'lbt_luci',
+                        'lbt_mods1b': 'lbt_mods',
+                        'lbt_mods1r': 'lbt_mods',
+                        'lbt_mods2b': 'lbt_mods',
+                        'lbt_mods2r': 'lbt_mods',
+                        'magellan_fire': 'magellan_fire',
+                        'magellan_fire_long': 'magellan_fire',
+                        'magellan_mage': 'magellan_mage',
+                        'mdm_osmos_mdm4k': 'mdm_osmos',
+                        'mmt_binospec': 'mmt_binospec',
+                        'mmt_bluechannel': 'mmt_bluechannel',
+                        'mmt_mmirs': 'mmt_mmirs',
+                        'not_alfosc': 'not_alfosc',
+                        'p200_dbsp_blue': 'p200_dbsp',
+                        'p200_dbsp_red': 'p200_dbsp',
+                        'p200_tspec': 'p200_tspec',
+                        'shane_kast_blue': 'shane_kast',
+                        'shane_kast_red': 'shane_kast',
+                        'shane_kast_red_ret': 'shane_kast',
+                        'tng_dolores': 'tng_dolores',
+                        'vlt_fors2': 'vlt_fors',
+                        'vlt_xshooter_nir': 'vlt_xshooter',
+                        'vlt_xshooter_uvb': 'vlt_xshooter',
+                        'vlt_xshooter_vis': 'vlt_xshooter',
+                        'wht_isis_blue': 'wht_isis',
+                        'wht_isis_red': 'wht_isis'}
+
+# The names of the available spectrographs
+available_spectrographs = sorted(spectrograph_modules.keys())
+
+
+def __getattr__(name):
+    """
+    Import the spectrograph modules (and the base module) when they
+    are first accessed as attributes of this package.
+    """
+    if name in ['spectrograph', 'slitmask', 'opticalmodel', 'util'] \
+            + list(spectrograph_modules.values()):
+        return importlib.import_module('{0}.{1}'.format(__name__, name))
+    raise AttributeError('module {0} has no attribute {1}'.format(__name__, name))
 
-from pypeit.spectrographs import spectrograph
-
-# The import of all the spectrograph modules here is what enables the dynamic
-# compiling of all the available spectrographs below
-from pypeit.spectrographs import gemini_flamingos
-from pypeit.spectrographs import gemini_gmos
-from pypeit.spectrographs import gemini_gnirs
-from pypeit.spectrographs import keck_deimos
-from pypeit.spectrographs import keck_hires
-from pypeit.spectrographs import keck_kcwi
-from pypeit.spectrographs import keck_lris
-from pypeit.spectrographs import keck_mosfire
-from pypeit.spectrographs import keck_nires
-from pypeit.spectrographs import keck_nirspec
-from pypeit.spectrographs import lbt_luci
-from pypeit.spectrographs import lbt_mods
-from pypeit.spectrographs import magellan_fire
-from pypeit.spectrographs import magellan_mage
-from pypeit.spectrographs import mdm_osmos
-from pypeit.spectrographs import mmt_binospec
-from pypeit.spectrographs import mmt_bluechannel
-from pypeit.spectrographs import mmt_mmirs
-from pypeit.spectrographs import not_alfosc
-from pypeit.spectrographs import p200_dbsp
-from pypeit.spectrographs import p200_tspec
-from pypeit.spectrographs import shane_kast
-from pypeit.spectrographs import tng_dolores
-from pypeit.spectrographs import vlt_fors
-from pypeit.spectrographs import vlt_xshooter
-from pypeit.spectrographs import wht_isis
-
-# Build the list of names for the available spectrographs
-import numpy as np
 
 def all_subclasses(cls):
     """
@@ -41,15 +82,46 @@ def all_subclasses(cls):
     return set(cls.__subclasses__()).union(
         [s for c in cls.__subclasses__() for s in all_subclasses(c)])
 
+
+def spectrograph_class(name):
+    """
+    Return the class for a spectrograph, importing only the module
+    that defines it.
+
+    Args:
+        name (:obj:`str`):
+            Name of the spectrograph.  Must be one of
+            ``available_spectrographs``.
+
+    Returns:
+        :obj:`type`: The spectrograph class.
+    """
+    from pypeit.spectrographs import spectrograph
+    module = importlib.import_module('{0}.{1}'.format(__name__, spectrograph_modules[name]))
+    for c in all_subclasses(spectrograph.Spectrograph):
+        if c.name == name:
+            return c
+    raise KeyError('{0} is not defined by {1}'.format(name, module.__name__))
+
+
 def spectrograph_classes():
-    # Recursively collect all subclasses
-    spec_c = np.array(list(all_subclasses(spectrograph.Spectrograph)))
+    """
+    Return the classes for all available spectrographs.
+
+    This imports all the spectrograph modules.
+
+    Returns:
+        :obj:`dict`: Dictionary with the spectrograph name and class,
+        sorted by name.
+    """
+    # Import all the spectrograph modules and then recursively collect
+    # all subclasses
+    from pypeit.spectrographs import spectrograph
+    for module in set(spectrograph_modules.values()):
+        importlib.import_module('{0}.{1}'.format(__name__, module))
+    spec_c = list(all_subclasses(spectrograph.Spectrograph))
     # Select spectrograph classes with a defined name; spectrographs without a
     # name are either undefined or a base class.
-    spec_c = spec_c[[c.name is not None for c in spec_c]]
+    spec_c = [c for c in spec_c if c.name is not None]
     # Construct a dictionary with the spectrograph name and class
-    srt = np.argsort(np.array([c.name for c in spec_c]))
-    return dict([ (c.name,c) for c in spec_c[srt]])
-
-available_spectrographs = list(spectrograph_classes().keys())
-
+    return dict([(c.name, c) for c in sorted(spec_c, key=lambda c: c.name)])
@@ -6,8 +6,6 @@ Module for Gemini GMOS specific methods.
 import glob
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 
 from pypeit import msgs
@@ -286,6 +284,7 @@ class GeminiGMOSSpectrograph(spectrograph.Spectrograph):
             elif det == 3:  # BLUEST DETECTOR
                 order = range(4, 0, -1)
         else:
+            from IPython import embed
             embed()
 
         # insert extensions into master image...
@@ -508,6 +507,7 @@ class GeminiGMOSSHamSpectrograph(GeminiGMOSSpectrograph):
             # Apply the mask
             xbin = int(binning.split(' ')[0])
             if xbin != 2:
+                from IPython import embed
                 embed()
             badr = (281*2)//xbin # Transposed
             bpm_img[badr:badr+(2*2)//xbin,:] = 1
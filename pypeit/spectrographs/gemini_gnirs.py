@@ -5,8 +5,6 @@ Module for Gemini/GNIRS specific methods.
 """
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 
 from pypeit import msgs
@@ -10,8 +10,6 @@ import re
 import warnings
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 
 from scipy import interpolate
@@ -902,8 +900,13 @@ class KeckDEIMOSSpectrograph(spectrograph.Spectrograph):
               detector.
 
         If arrays are provided for both `x`, `y`, and `wave`, the
-        returned objects have the shape :math:`N_\lambda\times S_x`,
-        where :math:`S_x` is the shape of the x and y arrays.
+        returned objects have the shape :math:`N_x\times N_\lambda`,
+        where :math:`N_x` is the number of x and y coordinates.  If
+        `corners` is True, the shape is :math:`N_{\rm slit}\times 4
+        \times N_\lambda`.  All the coordinates are traced through the
+        optical model at all wavelengths at once, and the result is kept
+        in memory; see
+        :func:`~pypeit.spectrographs.opticalmodel.OpticalModel.mask_to_imaging_coordinates`.
 
         Args:
             x (array-like, optional):
@@ -990,14 +993,14 @@ class KeckDEIMOSSpectrograph(spectrograph.Spectrograph):
             npoints = 250
             wave = np.arange(npoints) * 24. + 4000.
 
-        # Compute the detector image plane coordinates (in pixels)
+        # Compute the detector image plane coordinates (in pixels) for
+        # all coordinates and wavelengths at once
         x_img, y_img = self.optical_model.mask_to_imaging_coordinates(_x, _y, self.amap, self.bmap,
-                                                                      nslits=self.slitmask.nslits,
                                                                       wave=wave, order=order)
         # Reshape if computing the corner positions
         if corners:
-            x_img = x_img.reshape(self.slitmask.corners.shape[:2])
-            y_img = y_img.reshape(self.slitmask.corners.shape[:2])
+            x_img = x_img.reshape(self.slitmask.corners.shape[:2] + x_img.shape[1:])
+            y_img = y_img.reshape(self.slitmask.corners.shape[:2] + y_img.shape[1:])
 
         # Use the detector map to convert to the detector coordinates
         return (x_img, y_img) + self.detector_map.ccd_coordinates(x_img, y_img, in_mm=False)
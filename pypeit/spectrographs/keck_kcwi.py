@@ -7,8 +7,6 @@ Implements KCWI-specific functions.
 
 import glob
 
-from IPython import embed
-
 import numpy as np
 
 from astropy import wcs, units
@@ -6,8 +6,6 @@ Module for LRIS specific methods.
 import glob
 import os
 
-from IPython import embed
-
 from pkg_resources import resource_filename
 
 import numpy as np
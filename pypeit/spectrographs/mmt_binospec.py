@@ -6,8 +6,6 @@ Module for MMT/BINOSPEC specific methods.
 import glob
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 
 from pypeit import msgs
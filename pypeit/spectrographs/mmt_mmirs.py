@@ -6,8 +6,6 @@ Module for MMT MMIRS
 import glob
 from pkg_resources import resource_filename
 
-from IPython import embed
-
 import numpy as np
 from scipy.signal import savgol_filter
 
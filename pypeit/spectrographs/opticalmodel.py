@@ -5,9 +5,75 @@ Module to generate an optical model for a spectrograph.
 
 """
 import warnings
+import hashlib
+from collections import OrderedDict
+
 from pypeit import msgs
 import numpy
 import scipy
+import scipy.interpolate
+
+# Interpolators for the pre- and post-grating maps, keyed by the
+# hash of the interpolated data; see _map_interpolator.
+_interpolators = {}
+# Image-plane coordinates of the most recently traced slit-mask
+# designs, keyed by the hash of the mask coordinates, wavelengths,
+# grating setup, and maps; see
+# OpticalModel.mask_to_imaging_coordinates.
+_traces = OrderedDict()
+# Maximum number of traced slit-mask designs kept in memory
+max_cached_traces = 16
+
+
+def clear_cache():
+    """
+    Clear the in-memory cache of map interpolators and traced slit
+    masks.
+    """
+    _interpolators.clear()
+    _traces.clear()
+
+
+def _hash(*items):
+    """
+    Return the SHA-1 hash of a set of arrays and/or simple objects.
+    """
+    sha = hashlib.sha1()
+    for item in items:
+        if isinstance(item, numpy.ndarray):
+            sha.update('{0}{1}'.format(item.dtype.str, item.shape).encode())
+            sha.update(numpy.ascontiguousarray(item).tobytes())
+        else:
+            sha.update(repr(item).encode())
+    return sha.hexdigest()
+
+
+def _map_interpolator(points, values):
+    """
+    Return the interpolator for a pre- or post-grating map.
+
+    Constructing the interpolator requires a triangulation of the map
+    grid and an estimate of the gradients of the interpolated values,
+    which is much more expensive than the interpolation itself.  The
+    interpolators are therefore constructed once and kept in memory.
+
+    Args:
+        points (`numpy.ndarray`_):
+            Coordinates of the map grid; shape is :math:`(N,2)`.
+        values (`numpy.ndarray`_):
+            The values to interpolate; shape is :math:`(N,M)` to
+            interpolate :math:`M` quantities at once.
+
+    Returns:
+        `scipy.interpolate.CloughTocher2DInterpolator`_: The
+        interpolator, which returns -1e10 for points outside the grid.
+    """
+    key = _hash(points, values)
+    if key not in _interpolators:
+        _interpolators[key] = scipy.interpolate.CloughTocher2DInterpolator(points, values,
+                                                                           fill_value=-1e10)
+    return _interpolators[key]
+
 # ----------------------------------------------------------------------
 # General class for a reflection grating
 class ReflectionGrating:
@@ -110,23 +176,25 @@ class ReflectionGrating:
     #     # Return vectors transformed out of the grating conjugate surface
     #     return OpticalModel.conjugate_surface_transform(_r, self.transform)
 
-    def reflect(self, r, nslits, wave=None, order=1):
+    def reflect(self, r, nslits=None, wave=None, order=1):
         """
         Propagate an input ray for a given wavelength and order.
 
         wave is in angstroms
         ruling is in mm^-1
 
-        If more than one wave provided, wavelength samples are ordered
-        along the first axis.
+        If more than one wave provided, the rays must be ordered such
+        that all wavelengths for a given position are contiguous; i.e.,
+        ray ``i`` is reflected at wavelength ``wave[i % wave.size]``.
 
         Taken from xidl/DEEP2/spec2d/pro/model/qmodel.pro.
 
         Args:
             r (numpy.ndarray):
                 Rays to propagate.
-            nslits (:obj:`int`):
-                Number of slits
+            nslits (:obj:`int`, optional):
+                Number of slits.  Not used; the number of positions is
+                set by the number of rays and wavelengths.
             wave (`numpy.ndarray`_):
                 The wavelengths in angstroms for the propagated coordinates.
             order (:obj:`int`):
@@ -145,11 +213,14 @@ class ReflectionGrating:
             raise NotImplementedError('Input wavelength must be one number or a vector.')
         nwave = _wave.size
 
-        _wave_arr = numpy.tile(_wave, (nslits, 1))
-
         _r = numpy.atleast_2d(r)
         if _r.ndim > 2:
             raise NotImplementedError('Rays must be 1D for a single ray, or 2D for multiple.')
+        if _r.shape[0] % nwave != 0:
+            msgs.error('Number of rays must be a multiple of the number of wavelengths.')
+
+        # Wavelength for each ray
+        _wave = numpy.tile(_wave, _r.shape[0]//nwave)
 
         # Transform into the grating conjugate surface
         _r = OpticalModel.conjugate_surface_transform(_r, self.transform, forward=True)
@@ -160,18 +231,13 @@ class ReflectionGrating:
 
         # Use the grating equation to get the output angle (minus sign
         # in front of sin(alpha) is for reflection)
-        beta = (numpy.arcsin((order * 1e-7 * self.ruling * _wave_arr.ravel() / numpy.cos(gamma))
-                             - numpy.sin(alpha))).reshape(_wave_arr.shape).T
+        beta = numpy.arcsin((order * 1e-7 * self.ruling * _wave / numpy.cos(gamma))
+                            - numpy.sin(alpha))
 
         # Revert to ray vectors
-        wavesign = 1 - 2 * (_wave_arr.T < 0)
-        _r = numpy.array([numpy.sin(gamma),
-                          numpy.sin(-beta * wavesign).T.flatten() * numpy.cos(gamma),
-                          numpy.cos(-beta * wavesign).T.flatten() * numpy.cos(gamma)]).T
-
-        #if nwave == 1:
-        #    # Flatten if only one wave provided
-        #    _r = _r[0]
+        beta *= -(1 - 2 * (_wave < 0))
+        cosg = numpy.cos(gamma)
+        _r = numpy.column_stack((numpy.sin(gamma), numpy.sin(beta) * cosg, numpy.cos(beta) * cosg))
 
         # Return vectors transformed out of the grating conjugate surface
         return OpticalModel.conjugate_surface_transform(_r, self.transform)
@@ -613,43 +679,43 @@ class OpticalModel:
                 Size of the spectral direction
 
         Returns:
-            `numpy.ndarray`_: Rays propagated from mask plane to grating.
+            `numpy.ndarray`_: Rays propagated from mask plane to grating.  The
+            rays for each mask coordinate are repeated ``npoints`` times,
+            such that all the rays for a given coordinate are contiguous.
 
         """
-
-        xmm = numpy.tile(x, (npoints, 1))
-        ymm = numpy.tile(y, (npoints, 1))
+        _x = numpy.atleast_1d(x).ravel()
+        _y = numpy.atleast_1d(y).ravel()
 
         sx = amap['tanx'].squeeze().T.shape[0]
         sy = amap['tanx'].squeeze().T.shape[1]
 
         # create a set of indices to interpolate amap into
-        xindx = (xmm - amap['xmin']) / amap['xstep']
-        yindx = (ymm - amap['ymin']) / amap['ystep']
+        xindx = (_x - amap['xmin']) / amap['xstep']
+        yindx = (_y - amap['ymin']) / amap['ystep']
 
         # preparing input and output coordinates for interpolation
-        _x, _y = numpy.meshgrid(amap['xarr'].squeeze(), amap['yarr'].squeeze())
-        out_coo = numpy.column_stack((xmm.ravel(), ymm.ravel()))
-        in_coo = numpy.column_stack((_x.ravel(), _y.ravel()))
+        _xarr, _yarr = numpy.meshgrid(amap['xarr'].squeeze(), amap['yarr'].squeeze())
+        out_coo = numpy.column_stack((_x, _y))
+        in_coo = numpy.column_stack((_xarr.ravel(), _yarr.ravel()))
 
-        interp = scipy.interpolate.CloughTocher2DInterpolator(in_coo, amap['tanx'].ravel(),
-                                                              fill_value=-1e10)
-        tanxx = interp(out_coo).reshape(xindx.shape)
-
-        interp = scipy.interpolate.CloughTocher2DInterpolator(in_coo, amap['tany'].ravel(),
-                                                              fill_value=-1e10)
-        tanyy = interp(out_coo).reshape(xindx.shape)
+        # Interpolate both tangents at once.  The input vectors do not
+        # depend on wavelength, so they're only computed once for each
+        # coordinate.
+        interp = _map_interpolator(in_coo, numpy.column_stack((amap['tanx'].ravel(),
+                                                               amap['tany'].ravel())))
+        tanxx, tanyy = interp(out_coo).T
 
         whbad = (xindx < 4) | (xindx > (sx - 4)) | (yindx < 4) | (yindx > (sy - 4))
         tanxx[whbad] = -1e10
         tanyy[whbad] = -1e10
 
-        rr_2 = (-1. / numpy.sqrt(1. + numpy.square(tanxx).T + numpy.square(tanyy).T)).ravel()
-        rr = numpy.array([rr_2 * tanxx.T.ravel(), rr_2 * tanyy.T.ravel(), rr_2]).T
+        rr_2 = -1. / numpy.sqrt(1. + numpy.square(tanxx) + numpy.square(tanyy))
+        rr = numpy.column_stack((rr_2 * tanxx, rr_2 * tanyy, rr_2))
 
-        return rr
+        return rr if npoints == 1 else numpy.repeat(rr, npoints, axis=0)
 
-    def post_grating_vectors_to_ics_coo(self, r, bmap, nslits, npoints):
+    def post_grating_vectors_to_ics_coo(self, r, bmap, nslits=None, npoints=1):
         """
         Revert rays from post-grating output vectors to CCD coordinates, by interpolating a post-grating
         map (bmap).
@@ -663,8 +729,9 @@ class OpticalModel:
                 Rays to be transformed
             bmap (`FITS_rec`):
                 post-grating map
-            nslits (:obj:`int`):
-                Number of slits
+            nslits (:obj:`int`, optional):
+                Number of slits.  Not used; the number of positions is
+                set by the number of rays and ``npoints``.
             npoints (:obj:`int`):
                 Size of the spectral direction
 
@@ -684,18 +751,15 @@ class OpticalModel:
         sy = bmap['gridx'].squeeze().T.shape[1]
 
         # preparing input and output coordinates for interpolation
-        indx = numpy.logical_not(bmap['gridx'].squeeze() == -1e10)
+        indx = numpy.logical_not(bmap['gridx'].squeeze() == -1e10).ravel()
         _x, _y = numpy.meshgrid(numpy.arange(sx), numpy.arange(sy))
         out_coo = numpy.column_stack((xindx.ravel(), yindx.ravel()))
-        in_coo = numpy.column_stack((_x.ravel()[indx.ravel()], _y.ravel()[indx.ravel()]))
-
-        interp = scipy.interpolate.CloughTocher2DInterpolator(in_coo, bmap['gridx'].ravel()[indx.ravel()],
-                                                              fill_value=-1e10)
-        xics = interp(out_coo)
+        in_coo = numpy.column_stack((_x.ravel()[indx], _y.ravel()[indx]))
 
-        interp = scipy.interpolate.CloughTocher2DInterpolator(in_coo, bmap['gridy'].ravel()[indx.ravel()],
-                                                              fill_value=-1e10)
-        yics = interp(out_coo)
+        # Interpolate both coordinates at once
+        interp = _map_interpolator(in_coo, numpy.column_stack((bmap['gridx'].ravel()[indx],
+                                                               bmap['gridy'].ravel()[indx])))
+        xics, yics = interp(out_coo).T
 
         whbad = (xindx < 4) | (xindx > (sx - 4)) | (yindx < 4) | (yindx > (sy - 4))
         xics[whbad] = -1e10
@@ -706,19 +770,26 @@ class OpticalModel:
         yics[wh] = -1e4
 
         if npoints > 1:
-            xics = xics.reshape(nslits, npoints)
-            yics = yics.reshape(nslits, npoints)
+            xics = xics.reshape(-1, npoints)
+            yics = yics.reshape(-1, npoints)
 
         return xics, yics
 
-    def mask_to_imaging_coordinates(self, x, y, amap, bmap, nslits, wave, order):
-        """
+    def mask_to_imaging_coordinates(self, x, y, amap, bmap, nslits=None, wave=None, order=1):
+        r"""
         Convert mask coordinates in mm to detector coordinates in pixels.
 
         wave is in angstroms
 
-        If more than one wavelength is provided, wavelength samples are
-        ordered along the first axis.
+        All the coordinates are traced at all wavelengths in a single
+        set of array operations.  If more than one wavelength is
+        provided, wavelength samples are ordered along the last axis.
+
+        The result is kept in memory, keyed by the mask coordinates,
+        the wavelengths, the grating setup, and the maps, such that
+        repeating the calculation for the same slit-mask design (e.g.,
+        for each detector in the mosaic) is nearly free.  Use
+        :func:`clear_cache` to clear the cached results.
 
         Taken from xidl/DEEP2/spec2d/pro/model/qmodel.pro.
 
@@ -731,30 +802,51 @@ class OpticalModel:
                 pre-grating map
             bmap (`FITS_rec`):
                 post-grating map
-            nslits (:obj:`int`):
-                Number of slits
-            wave (`numpy.ndarray`_):
-                The wavelengths in angstroms for the propagated coordinates.
-            order (:obj:`int`):
+            nslits (:obj:`int`, optional):
+                Number of slits.  Not used; the coordinates for all the
+                provided x and y values are returned.
+            wave (`numpy.ndarray`_, optional):
+                The wavelengths in angstroms for the propagated
+                coordinates.  If None, use the central wavelength of
+                the grating.
+            order (:obj:`int`, optional):
                 The grating order.
 
         Returns:
-            Two `numpy.ndarray`_: Detector image plane coordinates in pixels
+            Two `numpy.ndarray`_: Detector image plane coordinates in
+            pixels.  The shape is :math:`(N_x,N_\lambda)` if more than
+            one wavelength is provided, and :math:`(N_x,)` otherwise.
         """
-
-        npoints = 1 if wave is None else numpy.atleast_1d(wave).shape[0]
+        _x = numpy.atleast_1d(x).ravel().astype(float)
+        _y = numpy.atleast_1d(y).ravel().astype(float)
+        _wave = None if wave is None else numpy.atleast_1d(wave).astype(float)
+        npoints = 1 if _wave is None else _wave.shape[0]
+
+        # Check if this mask design and grating setup was already traced
+        key = _hash(_x, _y, _wave, order, self.grating.ruling, self.grating.tilt,
+                    self.grating.roll, self.grating.yaw, self.grating.central_wave,
+                    numpy.asarray(amap), numpy.asarray(bmap))
+        if key in _traces:
+            _traces.move_to_end(key)
+            return tuple(c.copy() for c in _traces[key])
 
         # First get the grating input vectors
         # r = self.mask_coo_to_grating_input_vectors(x, y)
-        r = self.pre_grating_vectors(x, y, amap, npoints=npoints)
+        r = self.pre_grating_vectors(_x, _y, amap, npoints=npoints)
 
         # Reflect the rays off the grating
-        r = self.grating.reflect(r, nslits, wave, order)
+        r = self.grating.reflect(r, wave=_wave, order=order)
 
         # Propagate the rays through the camera to the detector and
         # return the imaging coordinates (in mm)
         # return self.grating_output_vectors_to_ics_coo(r, sign=1 - 2 * (x < 0))
-        return self.post_grating_vectors_to_ics_coo(r, bmap, nslits, npoints)
+        x_img, y_img = self.post_grating_vectors_to_ics_coo(r, bmap, npoints=npoints)
+
+        # Keep the result, removing the least recently used
+        _traces[key] = (x_img.copy(), y_img.copy())
+        while len(_traces) > max_cached_traces:
+            _traces.popitem(last=False)
+        return x_img, y_img
 
 # NOTE: Keep this around for the time-being.
     # def mask_to_imaging_coordinates(self, x, y, wave, order):
@@ -906,8 +998,7 @@ class DetectorMap:
         coo = numpy.array([_x, _y]).T - self.npix[None,:]/2
 
         # Rotatate and offset by the CCD center
-        coo = numpy.array([numpy.matmul(self.rot_matrix[d], c) for d,c in zip(_d,coo)]) \
-                    + self.ccd_center[_d,:]
+        coo = numpy.einsum('nij,nj->ni', self.rot_matrix[_d], coo) + self.ccd_center[_d,:]
 
         x_img = coo[0,0] if inp_shape is None else coo[:,0].reshape(inp_shape)
         y_img = coo[0,1] if inp_shape is None else coo[:,1].reshape(inp_shape)
@@ -958,8 +1049,7 @@ class DetectorMap:
         coo = numpy.array([_x, _y]).T[None,:,:] - self.ccd_center[:,None,:]
 
         # Apply the rotation matrix and offset by the chip center
-        coo = numpy.array([[numpy.matmul(r.T, _c) for _c in c] \
-                                for r,c in zip(self.rot_matrix, coo)]) + self.npix[None,None,:]/2
+        coo = numpy.einsum('kji,knj->kni', self.rot_matrix, coo) + self.npix[None,None,:]/2
 
         # Determine the associated detector (1-indexed)
         indx = numpy.all((coo > 0) & (coo <= self.npix[None,None,:]), axis=2)
@@ -972,8 +1062,10 @@ class DetectorMap:
         d[numpy.sum(indx, axis=0) == 0] = -1
 
         # Pull out the coordinates for the correct detector
-        coo = numpy.array([coo[_d-1,i,:] if _d > 0 else numpy.full(coo.shape[2:],-1.) 
-                                for i,_d in enumerate(d)])
+        on_det = d > 0
+        _coo = numpy.full(coo.shape[1:], -1.)
+        _coo[on_det] = coo[d[on_det]-1, numpy.where(on_det)[0], :]
+        coo = _coo
 
         # Return the coordinates
         return d if inp_shape is None else d.reshape(inp_shape), \
@@ -39,8 +39,6 @@ from pypeit.core import procimg
 from pypeit.core import meta
 from pypeit.par import pypeitpar
 
-from IPython import embed
-
 # TODO: Create an EchelleSpectrograph derived class that holds all of
 # the echelle specific methods.
 
@@ -844,6 +842,7 @@ class Spectrograph:
                     # Bomb out?
                     if kerror:
                         # TODO: Do we want this embed here?
+                        from IPython import embed
                         embed(header=utils.embed_header())
                         msgs.error('Required meta "{0}" did not load!'.format(meta_key)
                                    + 'You may have a corrupt header.')
@@ -2,16 +2,25 @@
 Module to run tests on ararclines
 """
 import os
+import shutil
 import numpy as np
 import pytest
+from astropy.table import Table
 
 from linetools.spectra import xspectrum1d
 
 import pypeit
 from pypeit.core import arc
+from pypeit.core.wavecal import wvutils
+from pypeit.core.wavecal import autoid
+from pypeit.core.wavecal import waveio
 
 import pkg_resources
 
+def data_path(filename):
+    data_dir = os.path.join(os.path.dirname(__file__), 'files')
+    return os.path.join(data_dir, filename)
+
 def test_detect_lines():
     # Using Paranal night sky as an 'arc'
     sky_file = pkg_resources.resource_filename('pypeit', 'data/sky_spec/paranal_sky.fits')
@@ -20,5 +29,91 @@ def test_detect_lines():
             = arc.detect_lines(arx_sky.flux.value)
     assert (len(arx_w[0]) > 3275)
 
+def test_xcorr_shift_batch():
+    # Shifted copies of the Paranal night-sky spectrum
+    sky_file = pkg_resources.resource_filename('pypeit', 'data/sky_spec/paranal_sky.fits')
+    flux = xspectrum1d.XSpectrum1D.from_file(sky_file).flux.value[5000:7000]
+    x = np.arange(flux.size)
+    shifts = [-20.3, 0., 4.6]
+    y2 = np.stack([np.interp(x-s, x, flux) for s in shifts], axis=1)
+    y1 = wvutils.smooth_ceil_cont(flux, 1.0, percent_ceil=80.0)
+    y2 = np.stack([wvutils.smooth_ceil_cont(y, 1.0, percent_ceil=80.0) for y in y2.T], axis=1)
+
+    shift, corr = wvutils.xcorr_shift_batch(y1, y2)
+    for i in range(len(shifts)):
+        _shift, _corr = wvutils.xcorr_shift(y1, y2[:,i], smooth=None, percent_ceil=None,
+                                            use_raw_arc=True)
+        assert np.isclose(shift[i], _shift) and np.isclose(corr[i], _corr), \
+                'Batch cross-correlation should match xcorr_shift'
+    assert np.allclose(-shift, shifts, atol=0.5), 'Bad shifts'
+
+class ShiftedSky:
+    # Shifted copies of the Paranal night-sky spectrum, one per slit
+    def __init__(self, shifts):
+        sky_file = pkg_resources.resource_filename('pypeit', 'data/sky_spec/paranal_sky.fits')
+        flux = xspectrum1d.XSpectrum1D.from_file(sky_file).flux.value[5000:7000]
+        x = np.arange(flux.size)
+        self.spec = np.stack([np.interp(x-s, x, flux) for s in shifts], axis=1)
+
+    def detect(self, slit):
+        return arc.detect_lines(self.spec[:,slit])[2]
+
+def test_map_slits():
+    sky = ShiftedSky([-20.3, 0., 4.6, 11.1])
+    slits = [3, 0, 2]
+    serial = autoid.map_slits(sky, 'detect', slits)
+    parallel = autoid.map_slits(sky, 'detect', slits, nproc=2)
+    assert len(parallel) == len(slits), 'Should return one result per slit'
+    for s, p in zip(serial, parallel):
+        assert np.array_equal(s, p), 'Parallel results should match serial results'
+
+def test_waveio_cache():
+    waveio.clear_cache()
+    lines = waveio.load_line_lists(['ArI', 'NeI'])
+    # Modifying the returned table should not affect the cached version
+    lines.remove_column('ion')
+    lines = waveio.load_line_lists(['ArI', 'NeI'])
+    assert 'ion' in lines.colnames, 'Cached table was modified'
+    arxiv, _ = waveio.load_reid_arxiv('magellan_mage.fits')
+
+    # Parse the files again and save them in the on-disk cache, then
+    # read them from the on-disk cache
+    cache_dir = data_path('waveio_cache')
+    waveio.set_cache_dir(cache_dir)
+    try:
+        for i in range(2):
+            waveio.clear_cache()
+            _lines = waveio.load_line_lists(['ArI', 'NeI'])
+            _arxiv, _ = waveio.load_reid_arxiv('magellan_mage.fits')
+            assert len(os.listdir(cache_dir)) == 3, 'Should cache the two lists and the arxiv'
+            assert _lines.colnames == lines.colnames, 'Bad cached line list'
+            assert _lines.meta == lines.meta, 'Cached line list lost its metadata'
+            for name in lines.colnames:
+                assert np.array_equal(_lines[name], lines[name]), 'Bad cached line list'
+            assert list(_arxiv.keys()) == list(arxiv.keys()), 'Bad cached arxiv'
+            for key in arxiv.keys():
+                assert np.array_equal(_arxiv[key]['spec'], arxiv[key]['spec']) \
+                        and np.array_equal(_arxiv[key]['wave_soln'], arxiv[key]['wave_soln']) \
+                        and _arxiv[key]['order'] == arxiv[key]['order'], 'Bad cached arxiv'
+        # Units and descriptions are preserved
+        tbl = Table({'wave': np.arange(3.)}, meta={'BINSPEC': 2})
+        tbl['wave'].unit = 'Angstrom'
+        tbl['wave'].description = 'Wavelength'
+        waveio._write_table_cache(tbl, os.path.join(cache_dir, 'tst.npz'))
+        _tbl = waveio._read_table_cache(os.path.join(cache_dir, 'tst.npz'))
+        assert _tbl.meta == tbl.meta and _tbl['wave'].unit == tbl['wave'].unit \
+                and _tbl['wave'].description == tbl['wave'].description, 'Lost table attributes'
+    finally:
+        waveio.set_cache_dir(None)
+        waveio.clear_cache()
+        shutil.rmtree(cache_dir)
+
+    # The in-memory cache is limited in size
+    for i in range(waveio._memo_size + 5):
+        waveio._memo_get(('tst', i), lambda: i)
+    assert len(waveio._memo) == waveio._memo_size
+    assert ('tst', 0) not in waveio._memo and ('tst', i) in waveio._memo
+    waveio.clear_cache()
+
 # Many more functions in pypeit.core.arc that need tests!
 
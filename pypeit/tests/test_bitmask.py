@@ -110,3 +110,30 @@ def test_wrong_bits():
 
     assert numpy.sum(image_bm.flagged(mask, flag='COSMIC')) == numpy.sum(cosmics_indx)
 
+
+
+def test_multiple_flags():
+    image_bm = ImageBitMask()
+    rng = numpy.random.default_rng(8)
+    mask = rng.integers(0, high=8, size=(100,100)).astype(image_bm.minimum_dtype())
+    indx = rng.uniform(size=mask.shape) < 0.5
+
+    flags = ['BPM', 'SATURATED']
+    assert numpy.array_equal(image_bm.flagged(mask, flag=flags),
+                             image_bm.flagged(mask, flag='BPM')
+                                | image_bm.flagged(mask, flag='SATURATED'))
+
+    for method in ['turn_on', 'turn_off', 'toggle']:
+        func = getattr(image_bm, method)
+        # Same as applying the flags one at a time
+        _mask = func(func(mask, 'BPM'), 'SATURATED')
+        assert numpy.array_equal(func(mask, flags), _mask)
+        # Select the values to change
+        _mask = mask.copy()
+        _mask[indx] = func(mask[indx], flags)
+        assert numpy.array_equal(func(mask, flags, where=indx), _mask)
+        # Change the values in place
+        _inplace = mask.copy()
+        assert func(_inplace, flags, inplace=True, where=indx) is _inplace
+        assert numpy.array_equal(_inplace, _mask)
+        assert _inplace.dtype == mask.dtype
@@ -9,7 +9,7 @@ import glob
 import numpy as np
 
 from pypeit.images import buildimage
-from pypeit.tests.tstutils import dev_suite_required
+from pypeit.tests.tstutils import dev_suite_required, data_path
 from pypeit.par import pypeitpar
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit.core import procimg
@@ -46,3 +46,18 @@ def test_combine(deimos_flat_files):
     assert deimos_flat.image.shape == (4096,2048)
 
 
+def test_image_dtype():
+    par = kast_blue.default_pypeit_par()['scienceframe']
+    par['process']['use_biasimage'] = False
+    par['process']['use_pixelflat'] = False
+    par['process']['use_illumflat'] = False
+    files = [data_path('b27.fits.gz')]*2
+    sciimg = buildimage.buildimage_fromlist(kast_blue, 1, par, files, ignore_saturation=False)
+    _sciimg = buildimage.buildimage_fromlist(kast_blue, 1, par, files, ignore_saturation=False,
+                                             dtype='float32')
+    for key in ['image', 'ivar', 'rn2img']:
+        assert _sciimg[key].dtype == np.float32, '{0} should be single precision'.format(key)
+        assert np.allclose(_sciimg[key], sciimg[key], rtol=1e-5,
+                           atol=1e-5*np.absolute(sciimg[key]).max()), \
+                '{0} changed'.format(key)
+    assert np.array_equal(_sciimg.fullmask, sciimg.fullmask), 'Mask changed'
@@ -0,0 +1,149 @@
+"""
+Module to test the reduction checkpoints
+"""
+import os
+import shutil
+from types import SimpleNamespace
+
+import pytest
+
+import numpy as np
+
+from pypeit import checkpoint
+from pypeit import reduce
+from pypeit import slittrace
+from pypeit import specobj
+from pypeit import specobjs
+from pypeit.images import pypeitimage
+from pypeit.spectrographs.util import load_spectrograph
+from pypeit.tests.tstutils import data_path, get_kastb_detector
+
+
+def test_store():
+    path = data_path('tst_checkpoint')
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    sobjs = specobjs.SpecObjs()
+    sobj = specobj.SpecObj('MultiSlit', 1, SLITID=10)
+    sobj.SPAT_PIXPOS = 32.004471741616726
+    sobj.TRACE_SPAT = np.linspace(30., 34., 20)
+    sobj.trace_spec = np.arange(20)
+    sobj.maskwidth = 32.59826948236068
+    sobjs.add_sobj(sobj)
+
+    key = checkpoint.checkpoint_key(['b27.fits.gz'], 1)
+    store = checkpoint.CheckpointStore(path, key)
+    assert store.stages == []
+    img = np.arange(12.).reshape(3,4)
+    store.save('first', arrays=dict(img=img, mask=None), meta=dict(nobj=1), sobjs=sobjs)
+    store.save('second', arrays=dict(img=2*img))
+    assert store.stages == ['first', 'second']
+
+    # Read back
+    store = checkpoint.CheckpointStore(path, key)
+    assert store.has('second')
+    arrays, meta, _sobjs = store.load('first')
+    assert np.array_equal(arrays['img'], img) and arrays['mask'] is None
+    assert meta == {'nobj': 1}
+    # Scalars and internal attributes are preserved exactly
+    assert _sobjs.nobj == 1
+    assert _sobjs[0].SPAT_PIXPOS == sobj.SPAT_PIXPOS
+    assert _sobjs[0].maskwidth == sobj.maskwidth
+    assert np.array_equal(_sobjs[0].trace_spec, sobj.trace_spec)
+    assert np.array_equal(_sobjs[0].TRACE_SPAT, sobj.TRACE_SPAT)
+    arrays, meta, _sobjs = store.load('second')
+    assert _sobjs is None and meta == {}
+
+    # Saving a stage again drops the following stages
+    store.save('first', arrays=dict(img=img))
+    assert store.stages == ['first']
+
+    # Checkpoints for a different reduction are removed
+    store = checkpoint.CheckpointStore(path, checkpoint.checkpoint_key(['b27.fits.gz'], 2))
+    assert store.stages == [] and not os.path.isdir(path)
+
+    store.save('first', arrays=dict(img=img))
+    assert checkpoint.CheckpointStore(path, store.key, overwrite=True).stages == []
+    assert not os.path.isdir(path)
+
+
+def synthetic_reduce(store=None):
+    """
+    Instantiate the reduction of a synthetic exposure of two slits,
+    each with one object.
+    """
+    nspec, nspat = 200, 100
+    rng = np.random.default_rng(3)
+    spec_img, spat_img = np.meshgrid(np.arange(nspec), np.arange(nspat), indexing='ij')
+    left = np.array([8., 54.])[None,:] + np.zeros((nspec,1))
+    slits = slittrace.SlitTraceSet(left, left+38, 'MultiSlit', nspat=nspat,
+                                   PYP_SPEC='shane_kast_blue')
+    tilts = (spec_img + 0.02*(spat_img - nspat/2))/(nspec-1.)
+    waveimg = 4000. + 2*tilts*(nspec-1)
+    img = 200 + 100*np.sin(tilts*40) + 80*np.exp(-0.5*((spat_img-27.)/2.)**2) \
+            + 50*np.exp(-0.5*((spat_img-74.)/2.)**2)
+    img += rng.normal(size=img.shape)*np.sqrt(img)
+    sciImg = pypeitimage.PypeItImage(image=img, ivar=1/img, rn2img=np.full(img.shape, 9.),
+                                     bpm=np.zeros(img.shape, dtype=int),
+                                     detector=get_kastb_detector(), PYP_SPEC='shane_kast_blue')
+    sciImg.build_mask()
+    # Mock the calibrations
+    caliBrate = SimpleNamespace(slits=slits,
+                    wavetilts=SimpleNamespace(is_synced=lambda slits: None, spat_flexure=0.,
+                                              fit2tiltimg=lambda slitmask, flexure=None: tilts),
+                    wv_calib=SimpleNamespace(build_waveimg=lambda tilts, slits, spat_flexure=None,
+                                             spec_flexure=None: waveimg))
+
+    spectrograph = load_spectrograph('shane_kast_blue')
+    par = spectrograph.default_pypeit_par()
+    par['calibrations']['wavelengths']['refframe'] = 'observed'
+    par['scienceframe']['process']['mask_cr'] = False
+    par['rdx']['redux_path'] = data_path('tst_checkpoint_redux')
+    os.makedirs(os.path.join(par['rdx']['redux_path'], 'QA', 'PNGs'), exist_ok=True)
+    return reduce.Reduce.get_instance(sciImg, spectrograph, par, caliBrate, 'science', det=1,
+                                      basename='tst', checkpoint=store)
+
+
+def test_reduce_resume():
+    path = data_path('tst_checkpoint')
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    radec = dict(ra='10:00:00', dec='+10:00:00')
+
+    def fail(*args, **kwargs):
+        raise ValueError('Failed')
+
+    # Reference reduction without checkpoints
+    ref = synthetic_reduce().run(**radec)
+
+    # Interrupt the reduction during the extraction
+    store = checkpoint.CheckpointStore(path, 'key')
+    redux = synthetic_reduce(store=store)
+    redux.extract = fail
+    with pytest.raises(ValueError):
+        redux.run(**radec)
+    assert store.stages == ['initial_sky', 'find_objects', 'global_sky']
+    # Global flexure correction was applied
+    assert np.all(redux.slitshift != 0)
+
+    # Resume: the object finding and sky subtraction are not redone
+    store = checkpoint.CheckpointStore(path, 'key')
+    redux = synthetic_reduce(store=store)
+    redux.find_objects = fail
+    redux.global_skysub = fail
+    out = redux.run(**radec)
+    assert store.stages == ['initial_sky', 'find_objects', 'global_sky', 'extract']
+    assert redux.steps == ['find_objects_pypeline', 'global_skysub', 'find_objects_pypeline',
+                           'global_skysub', 'local_skysub_extract']
+
+    # The result is identical to the uninterrupted reduction
+    for _ref, _out in zip(ref[:4] + ref[5:], out[:4] + out[5:]):
+        assert np.array_equal(_ref, _out)
+    assert ref[4].nobj == out[4].nobj == 2
+    for key in ['NAME', 'TRACE_SPAT', 'OPT_WAVE', 'OPT_COUNTS', 'BOX_COUNTS', 'FLEX_SHIFT_TOTAL']:
+        assert np.array_equal(ref[4][key], out[4][key]), '{0} changed'.format(key)
+
+    # Clean up
+    shutil.rmtree(path)
+    shutil.rmtree(data_path('tst_checkpoint_redux'))
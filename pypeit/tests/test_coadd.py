@@ -342,6 +342,123 @@ def test_sigma_clip():
 
 '''
 
+def test_histogram_sums():
+    """ Test the single-pass binning against numpy histograms """
+    rng = np.random.RandomState(1234)
+    # 1D
+    x = rng.uniform(-0.1, 1.1, 1000)
+    x[:2] = [0., 1.]
+    w = rng.normal(size=x.size)
+    bins = np.linspace(0., 1., 11)
+    indx = coadd.histogram_bin_indices(x, bins)
+    nused, hist = coadd.histogram_sums(indx, bins.size-1, weights=[None, w])
+    assert np.array_equal(nused, np.histogram(x, bins=bins)[0]), 'Bad 1D counts'
+    assert np.allclose(hist, np.histogram(x, bins=bins, weights=w)[0]), 'Bad 1D sums'
+    # 3D with irregular bins
+    sample = rng.uniform(size=(1000,3))
+    bins = [np.linspace(0., 1., 5), np.sort(rng.uniform(size=7)), np.linspace(0.2, 0.8, 4)]
+    indx = coadd.histogram_bin_indices(sample, bins)
+    hist = coadd.histogram_sums(indx, (4,6,3), weights=sample[:,0])
+    assert np.allclose(hist, np.histogramdd(sample, bins=bins, weights=sample[:,0])[0]), \
+            'Bad 3D sums'
+
+
+def test_drizzle_sums():
+    """ Test the flux-conserving resampling of pixels onto a datacube """
+    from pypeit.core import datacube
+    dspat = 0.5/3600.
+    cubewcs = datacube.generate_masterWCS([180., 30., 4000.], [dspat, dspat, 1.])
+    bins = (np.arange(21)-0.5, np.arange(21)-0.5, np.arange(51)-0.5)
+    # Pixels with a rotated footprint of ~0.6x0.2 spaxels, well inside the cube
+    rng = np.random.RandomState(1234)
+    npix = 5000
+    cosdec = np.cos(np.radians(30.))
+    ra = 180. + rng.uniform(3, 16, npix)*dspat/cosdec
+    dec = 30. + rng.uniform(3, 16, npix)*dspat
+    wave = rng.uniform(4010., 4040., npix)
+    footprint = np.tile([0.5*dspat/cosdec, 0.3*dspat, -0.1*dspat/cosdec, 0.2*dspat, 0.7], (npix,1))
+    sci = np.full(npix, 3.)
+    cubes = datacube.drizzle_sums(cubewcs, bins, ra, dec, wave, footprint, sci, np.ones(npix),
+                                  np.ones(npix))
+    # The fractions of each pixel sum to unity
+    assert np.isclose(np.sum(cubes[..., 1]), npix), 'Flux is not conserved'
+    # A uniform input yields a uniform cube
+    flux, var = datacube.finalize_cube(cubes[..., 0], cubes[..., 1], cubes[..., 2])
+    assert np.allclose(flux[cubes[..., 1] > 0], 3.), 'Bad drizzled flux'
+
+
+def synthetic_cube_pixels(spec, fil, det, ref_scale=None, wave_ref=None, footprint=False):
+    """
+    Mock :func:`pypeit.scripts.coadd_datacube.load_spec2d_pixels` with
+    the pixels of a synthetic IFU frame of a point source; the frame
+    index is given by ``fil``, and each frame is offset on the sky.
+    """
+    from pypeit.core import datacube
+    ff = int(fil)
+    rng = np.random.RandomState(ff)
+    dspat = 0.5/3600.
+    cosdec = np.cos(np.radians(30.))
+    ra, dec, wave = np.meshgrid(np.arange(20.), np.arange(24.), np.arange(4000., 4060.),
+                                indexing='ij')
+    ra = 180. + (ra + 0.6*ff)*dspat/cosdec
+    dec = 30. + (dec - 0.4*ff)*dspat
+    wave = wave + 0.3*ff
+    src = 50*np.exp(-0.5*(np.square((ra - 180. - 10*dspat/cosdec)*cosdec/dspat/1.5)
+                          + np.square((dec - 30. - 12*dspat)/dspat/1.5)))
+    sci = src * (1 + 0.1*np.sin(wave/10.)) + rng.normal(size=src.shape)
+    pix = dict(ra=ra.ravel(), dec=dec.ravel(), wave=wave.ravel(), sci=sci.ravel(),
+               ivar=np.ones(sci.size), sn2=float(10+ff), ref_scale=ref_scale,
+               wave_ref=4030. if wave_ref is None else wave_ref, dspat=dspat, wave0=4000.,
+               wavemax=4060., dwv=1.0, wcs=None, slits=None, minmax=None)
+    if footprint:
+        pix['footprint'] = np.tile([0.9*dspat/cosdec, 0.1*dspat, -0.1*dspat/cosdec, 0.9*dspat,
+                                    1.0], (ra.size,1))
+    return pix
+
+
+@pytest.mark.parametrize('method', ['ngp', 'drizzle'])
+def test_coadd_datacube_stream_synthetic(method, tmp_path, monkeypatch):
+    """ Streaming the frames should not change the datacube """
+    from types import SimpleNamespace
+    from astropy.io import fits
+    from pypeit import spec2dobj
+    from pypeit.scripts import coadd_datacube
+    monkeypatch.setattr(coadd_datacube, 'load_spec2d_pixels', synthetic_cube_pixels)
+    monkeypatch.setattr(spec2dobj.Spec2DObj, 'from_file',
+                        lambda fil, det: SimpleNamespace(head0={'PYP_SPEC': 'shane_kast_blue'}))
+    files = ['0', '1', '2']
+    cubes = []
+    for stream, memmap in [(False, False), (True, False), (True, True)]:
+        parset = load_spectrograph('shane_kast_blue').default_pypeit_par()
+        cubepar = parset['reduce']['cube']
+        cubepar['method'] = method
+        cubepar['combine'] = True
+        cubepar['relative_weights'] = True
+        cubepar['save_whitelight'] = True
+        cubepar['stream'] = stream
+        cubepar['memmap'] = memmap
+        cubepar['scratch_dir'] = str(tmp_path)
+        cubepar['output_filename'] = str(tmp_path / 'datacube_{0}.fits'.format(len(cubes)))
+        coadd_cube(files, parset, overwrite=True)
+        with fits.open(cubepar['output_filename']) as hdu:
+            cubes += [[h.data for h in hdu if h.data is not None]]
+        with fits.open(cubepar['output_filename'].replace('.fits', '_whitelight.fits')) as hdu:
+            cubes[-1] += [np.squeeze(hdu[0].data)]
+        # The scratch files are removed
+        assert sorted(os.listdir(tmp_path)) == sorted(['datacube_{0}.fits'.format(i)
+                                                       for i in range(len(cubes))]
+                                                      + ['datacube_{0}_whitelight.fits'.format(i)
+                                                         for i in range(len(cubes))])
+
+    assert np.any(cubes[0][0] > 0), 'Cube should not be empty'
+    for _cubes in cubes[1:]:
+        assert len(_cubes) == len(cubes[0])
+        for ref, data in zip(cubes[0], _cubes):
+            assert ref.shape == data.shape, 'Streamed cube has a different shape'
+            assert np.allclose(ref, data, rtol=1e-10, atol=1e-10, equal_nan=True), \
+                    'Streamed cube is different'
+
+
 @cooked_required
 def test_coadd_datacube():
     """ Test the coaddition of spec2D files into datacubes """
@@ -351,3 +468,17 @@ def test_coadd_datacube():
     files = [spec2d_file1, spec2d_file2]
     coadd_cube(files, None, overwrite=True)
     os.remove('datacube.fits')
+
+
+@cooked_required
+def test_coadd_datacube_stream():
+    """ Test the streaming coaddition of spec2D files into datacubes """
+    droot = os.path.join(os.getenv('PYPEIT_DEV'), 'Cooked')
+    spec2d_file1 = os.path.join(droot, 'Science', 'spec2d_KB.20191219.56886-BB1245p4238_KCWI_2019Dec19T154806.538.fits')
+    spec2d_file2 = os.path.join(droot, 'Science', 'spec2d_KB.20191219.57662-BB1245p4238_KCWI_2019Dec19T160102.755.fits')
+    files = [spec2d_file1, spec2d_file2]
+    parset = load_spectrograph('keck_kcwi').default_pypeit_par()
+    parset['reduce']['cube']['stream'] = True
+    parset['reduce']['cube']['memmap'] = True
+    coadd_cube(files, parset, overwrite=True)
+    os.remove('datacube.fits')
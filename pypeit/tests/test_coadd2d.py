@@ -0,0 +1,40 @@
+"""
+Module to test 2D coadding
+"""
+import os
+
+import numpy as np
+
+from pypeit import coadd2d
+from pypeit.spectrographs.util import load_spectrograph
+from pypeit.tests.tstutils import write_spec2d_files
+
+
+def test_stream():
+    files = write_spec2d_files()
+    spectrograph = load_spectrograph('shane_kast_blue')
+    coadds = []
+    for stream in [False, True]:
+        par = spectrograph.default_pypeit_par()
+        par['coadd2d']['use_slits4wvgrid'] = True
+        par['coadd2d']['stream'] = stream
+        coadd = coadd2d.CoAdd2D.get_instance(files, spectrograph, par, det=1,
+                                             offsets=np.array([0., -3.]), weights='uniform')
+        if stream:
+            # The images are not held in memory
+            assert coadd.stack_dict['sciimg_stack'] is None
+            section, slit_stack = coadd.load_slit_stack(1)
+            assert slit_stack['sciimg_stack'].shape == (2, 260, 42)
+            assert np.all(np.any(slit_stack['thismask_stack'], axis=(1,2)))
+        coadds += [(coadd.wave_grid, coadd.coadd())]
+
+    # Streaming the slits does not change the result
+    assert np.array_equal(coadds[0][0], coadds[1][0])
+    assert len(coadds[0][1]) == 3
+    for coadd_dict, _coadd_dict in zip(coadds[0][1], coadds[1][1]):
+        for key in coadd_dict.keys():
+            assert np.array_equal(coadd_dict[key], _coadd_dict[key], equal_nan=True), \
+                    '{0} changed'.format(key)
+
+    for f in files:
+        os.remove(f)
@@ -12,6 +12,7 @@ from pypeit.tests.tstutils import cooked_required
 from pypeit.spectrographs import util
 
 from pypeit import edgetrace
+from pypeit.core import trace
 
 @cooked_required
 def test_addrm_slit():
@@ -41,6 +42,55 @@ def test_addrm_slit():
     assert edges.ntrace//2 == nslits, 'Did not remove trace.'
 
 
+def test_follow_centroid_numba():
+    """ The compiled centroid-following kernel should match the python version. """
+    rng = np.random.default_rng(99)
+    nspec, nspat = 500, 200
+    x = np.arange(nspat)
+    start = np.array([20., 70.3, 120., 195.])
+    img = np.zeros((nspec,nspat), dtype=float)
+    for c in start:
+        cen = c + 3*np.sin(np.arange(nspec)/100)
+        img += 100*np.exp(-0.5*np.square((x[None,:]-cen[:,None])/2))
+    img += rng.normal(scale=3., size=img.shape)
+    ivar = np.full(img.shape, 1/9., dtype=float)
+    ivar[rng.random(img.shape) < 0.01] = 0.
+    bpm = rng.random(img.shape) < 0.01
+
+    bitmask = edgetrace.EdgeTraceBitMask()
+    for kwargs in [dict(bitmask=bitmask), dict(), dict(maxerror=None, continuous=False)]:
+        xc, xe, xm = trace.follow_centroid(img, 250, start, ivar=ivar, bpm=bpm, **kwargs)
+        _xc, _xe, _xm = trace.follow_centroid(img, 250, start, ivar=ivar, bpm=bpm,
+                                              use_numba=True, **kwargs)
+        assert np.allclose(xc, _xc), 'Centroids should match'
+        assert np.allclose(xe, _xe), 'Errors should match'
+        assert np.array_equal(xm, _xm), 'Masks should match'
+    assert np.any(xm), 'Edge trace should be masked'
+
+
+def test_fit_trace_numba():
+    """ Refining the traces with the compiled moments should match the python version. """
+    rng = np.random.default_rng(98)
+    nspec, nspat = 300, 200
+    x = np.arange(nspat)
+    start = np.array([20., 70.3, 120., 180.])
+    cen = start[None,:] + 3*np.sin(np.arange(nspec)/100)[:,None]
+    img = np.zeros((nspec,nspat), dtype=float)
+    for i in range(start.size):
+        img += 100*np.exp(-0.5*np.square((x[None,:]-cen[:,i,None])/2))
+    img += rng.normal(scale=3., size=img.shape)
+    bitmask = edgetrace.EdgeTraceBitMask()
+    for weighting in ['uniform', 'gaussian']:
+        fit = trace.fit_trace(img, cen + 0.5, 3, weighting=weighting, maxshift=1.,
+                              maxerror=0.2, bitmask=bitmask)
+        _fit = trace.fit_trace(img, cen + 0.5, 3, weighting=weighting, maxshift=1.,
+                               maxerror=0.2, bitmask=bitmask, use_numba=True)
+        for i in range(3):
+            assert np.allclose(fit[i], _fit[i]), 'Fits and centroids should match'
+        assert np.array_equal(fit[3], _fit[3]), 'Masks should match'
+        assert np.all(np.absolute(_fit[0] - cen) < 0.25), 'Fit should recover the traces'
+
+
 # TODO: Can we (and is it useful to) get these tests back?
 
 '''
@@ -0,0 +1,91 @@
+"""
+Module to test the boxcar and optimal extraction
+"""
+import numpy as np
+
+from pypeit import specobj
+from pypeit.core import extract
+
+
+def synthetic_frame(nspec=200, nspat=100):
+    rng = np.random.default_rng(10)
+    spat = np.arange(nspat)[None,:]
+    spec = np.arange(nspec)[:,None]
+    trace = 40. + 0.05*np.arange(nspec)
+    sky = np.full((nspec, nspat), 50.)
+    img = sky + 100*np.exp(-0.5*((spat - trace[:,None])/2.)**2) \
+                + rng.normal(size=(nspec, nspat))
+    ivar = np.full(img.shape, 0.01)
+    rn2 = np.full(img.shape, 4.)
+    waveimg = 5000. + 2.*spec + 0.01*spat
+    # Bad wavelengths to use the interpolation
+    waveimg[100:103,:] = 0.
+    mask = np.ones(img.shape, dtype=bool)
+    mask[50:60,38:45] = False
+    thismask = (spat > 10) & (spat < 90) & np.ones((nspec,1), dtype=bool)
+    return img, ivar, mask, waveimg, sky, rn2, thismask, trace
+
+
+def new_specobj(trace):
+    sobj = specobj.SpecObj('MultiSlit', 1, SLITID=0)
+    sobj.TRACE_SPAT = trace
+    sobj.trace_spec = np.arange(trace.size)
+    return sobj
+
+
+def test_spat_cutout():
+    trace = np.array([20.2, 30.7])
+    assert extract.spat_cutout(trace, 5., 100) == (13, 39)
+    # Include the profile range
+    assert extract.spat_cutout(trace, 5., 100, spat_range=(5, 45)) == (5, 45)
+    # Limited to the image
+    assert extract.spat_cutout(trace, 25., 100) == (0, 59)
+    # Off the image
+    assert extract.spat_cutout(trace-100, 5., 100) == (0, 1)
+    assert extract.spat_cutout(trace+100, 5., 100) == (99, 100)
+
+
+def test_boxcar_cutout():
+    img, ivar, mask, waveimg, sky, rn2, thismask, trace = synthetic_frame()
+    keys = ['BOX_WAVE', 'BOX_COUNTS', 'BOX_COUNTS_IVAR', 'BOX_COUNTS_NIVAR', 'BOX_MASK',
+            'BOX_COUNTS_SKY', 'BOX_COUNTS_RN', 'BOX_NPIX']
+    wave_interp = extract.WaveImageInterpolator(waveimg)
+    # Trace offsets and the first column of the cutout; the cutouts
+    # include the full aperture or the image edge
+    for offset, lo in [(0., 20), (-40., 0), (55., 20)]:
+        full = new_specobj(trace + offset)
+        extract.extract_boxcar(img, ivar, mask, waveimg, sky, rn2, 4., full)
+
+        # Use a cutout of the images and a shared interpolator
+        cut = new_specobj(trace + offset)
+        sl = np.s_[:,lo:lo+80]
+        extract.extract_boxcar(img[sl], ivar[sl], mask[sl], waveimg[sl], sky[sl], rn2[sl], 4.,
+                               cut, spat_offset=lo, wave_interp=wave_interp)
+        for key in keys:
+            assert np.array_equal(getattr(full, key), getattr(cut, key)), \
+                    '{0} changed for offset {1}'.format(key, offset)
+    assert wave_interp.spline is not None, 'Interpolator should have been used'
+
+
+def test_optimal_cutout():
+    img, ivar, mask, waveimg, sky, rn2, thismask, trace = synthetic_frame()
+    spat = np.arange(img.shape[1])[None,:]
+    oprof = np.exp(-0.5*((spat - trace[:,None])/2.)**2)
+    oprof[:,:25] = 0.
+    oprof[:,60:] = 0.
+    oprof[100:103,:] = 0.
+    keys = ['OPT_WAVE', 'OPT_COUNTS', 'OPT_COUNTS_IVAR', 'OPT_COUNTS_NIVAR', 'OPT_MASK',
+            'OPT_COUNTS_SKY', 'OPT_COUNTS_RN', 'OPT_FRAC_USE', 'OPT_CHI2']
+
+    full = new_specobj(trace)
+    extract.extract_optimal(img, ivar, mask, waveimg, sky, rn2, thismask, oprof, 4., full)
+    assert np.allclose(np.median(full.OPT_COUNTS), 100*np.sqrt(2*np.pi)*2., rtol=0.05), \
+            'Bad optimal extraction'
+
+    cut = new_specobj(trace)
+    sl = np.s_[:,20:70]
+    extract.extract_optimal(img[sl], ivar[sl], mask[sl], waveimg[sl], sky[sl], rn2[sl],
+                            thismask[sl], oprof[sl], 4., cut, spat_range=(5, 40), spat_offset=20,
+                            wave_interp=extract.WaveImageInterpolator(waveimg, thismask=thismask))
+    for key in keys:
+        assert np.array_equal(getattr(full, key), getattr(cut, key)), '{0} changed'.format(key)
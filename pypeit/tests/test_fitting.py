@@ -58,6 +58,36 @@ def test_legendre():
     np.testing.assert_allclose(pypeitFit.fitc, np.array([  6.37115652e-01,   6.83317251e-17,
                                                    -6.84581686e-01, -7.59352737e-17]), atol=1e-9)
 
+def test_evaluate_2d():
+    rng = np.random.default_rng(1)
+    x, x2 = rng.uniform(size=(2,1000))
+    for func, val2d in zip(['polynomial2d', 'legendre2d', 'chebyshev2d'],
+                           [np.polynomial.polynomial.polyval2d, np.polynomial.legendre.legval2d,
+                            np.polynomial.chebyshev.chebval2d]):
+        pypeitFit = fitting.PypeItFit(fitc=rng.normal(size=(6,4)), func=func, minx=0., maxx=1.,
+                                      minx2=0., maxx2=1.)
+        xv, x2v = (x, x2) if func == 'polynomial2d' else (2*x-1, 2*x2-1)
+        # Scattered points, evaluated in chunks
+        np.testing.assert_allclose(fitting.evaluate_fit(pypeitFit.fitc, func, x, x2=x2, minx=0.,
+                                                        maxx=1., minx2=0., maxx2=1., chunk=300),
+                                   val2d(xv, x2v, pypeitFit.fitc), rtol=0, atol=1e-12)
+        # Constant second coordinate
+        np.testing.assert_allclose(pypeitFit.eval(x, x2=0.3),
+                                   pypeitFit.eval(x, x2=np.full_like(x, 0.3)), rtol=0, atol=1e-12)
+        # Grid
+        grid = pypeitFit.eval_grid(x[:50], x2[:20])
+        _x2, _x = np.meshgrid(x2[:20], x[:50])
+        np.testing.assert_allclose(grid, pypeitFit.eval(_x, x2=_x2), rtol=0, atol=1e-12)
+        # The basis matrices are cached
+        assert fitting.fit_basis(func[:-2], x[:50], 6, minx=0., maxx=1., cache=True) \
+                is fitting.fit_basis(func[:-2], x[:50], 6, minx=0., maxx=1., cache=True)
+        # Single precision output
+        grid32 = pypeitFit.eval_grid(x[:50], x2[:20], dtype=np.float32)
+        assert grid32.dtype == np.float32
+        assert np.array_equal(grid32, grid.astype(np.float32))
+        assert pypeitFit.eval(x, x2=x2, dtype=np.float32).dtype == np.float32
+
+
 def test_robust_fit():
     # NEED A TEST!!
     pass
@@ -66,3 +66,23 @@ def test_flex_shift():
 #    pyplot.plot(new_wave, obj_spec.flux)
 #    pyplot.show()
     assert np.abs(flex_dict['shift'] - 43.7) < 0.1
+
+
+def test_spat_flex_shift():
+    # Narrow slits, as in a multi-object mask, offset in the image
+    nspec, nspat = 600, 400
+    spec = np.arange(nspec)
+    left = np.array([x0 + 5*np.sin(spec/nspec*np.pi) for x0 in range(20, 380, 37)]).T
+    right = left + 8
+    slits = slittrace.SlitTraceSet(left, right, 'MultiSlit', nspat=nspat, PYP_SPEC='dummy')
+    shift = 1.5
+    spat = np.arange(nspat)
+    sciimg = np.zeros((nspec, nspat), dtype=float)
+    for i in range(left.shape[1]):
+        sciimg += 100./(1+np.exp(-2*(spat[None,:]-left[:,i,None]-shift))) \
+                    / (1+np.exp(2*(spat[None,:]-right[:,i,None]-shift)))
+
+    flex = flexure.spat_flexure_shift(sciimg, slits)
+    assert np.absolute(flex - shift) < 0.1, 'Bad spatial flexure'
+    # Subsampling the spectral rows gives a very similar answer
+    assert np.absolute(flexure.spat_flexure_shift(sciimg, slits, step=4) - flex) < 0.02
@@ -0,0 +1,64 @@
+"""
+Module to test the I/O routines
+"""
+import os
+import gzip
+import time
+
+import numpy as np
+
+from astropy.io import fits
+
+from pypeit import io
+from pypeit.tests.tstutils import data_path, benchmark_required
+
+
+def test_compress_file():
+    ifile = data_path('tst_compress.fits')
+    data = np.random.default_rng(3).normal(size=(1000,1000)).astype(np.float32)
+    fits.HDUList([fits.PrimaryHDU(data)]).writeto(ifile, overwrite=True)
+    with open(ifile, 'rb') as f:
+        raw = f.read()
+    # Use many small blocks so that the file has many gzip members
+    io.compress_file(ifile, overwrite=True, nproc=3, blocksize=2**17)
+    assert not os.path.isfile(ifile)
+    with gzip.open(ifile+'.gz', 'rb') as f:
+        assert f.read() == raw
+    with fits.open(ifile+'.gz') as hdu:
+        assert np.array_equal(hdu[0].data, data)
+    os.remove(ifile+'.gz')
+
+    # Empty file
+    open(ifile, 'wb').close()
+    io.compress_file(ifile, overwrite=True)
+    with gzip.open(ifile+'.gz', 'rb') as f:
+        assert f.read() == b''
+    os.remove(ifile+'.gz')
+
+
+def test_write_to_fits():
+    ofile = data_path('tst_write.fits.gz')
+    data = np.arange(1e5).reshape(100,1000)
+    io.write_to_fits(data, ofile, name='DATA', overwrite=True)
+    assert not os.path.isfile(ofile[:-3])
+    with fits.open(ofile) as hdu:
+        assert np.array_equal(hdu['DATA'].data, data)
+    os.remove(ofile)
+
+
+@benchmark_required
+def test_compress_throughput(tmp_path):
+    """
+    Report the compression throughput with one and all processors.
+    """
+    ifile = str(tmp_path / 'tst_compress.fits')
+    data = np.random.default_rng(3).normal(size=(4000,2000)).astype(np.float32)
+    size = data.nbytes/2**20
+    for nproc in [1, -1]:
+        fits.HDUList([fits.PrimaryHDU(data)]).writeto(ifile, overwrite=True)
+        t = time.perf_counter()
+        io.compress_file(ifile, overwrite=True, nproc=nproc)
+        print('nproc={0}: {1:.1f} MB/s'.format(nproc, size/(time.perf_counter() - t)))
+        with fits.open(ifile+'.gz') as hdu:
+            assert np.array_equal(hdu[0].data, data)
+        os.remove(ifile+'.gz')
@@ -1,3 +1,5 @@
+import time
+
 import pytest
 
 import numpy as np
@@ -5,6 +7,7 @@ import numpy as np
 from scipy.special import erf
 
 from pypeit.core import moment
+from pypeit.tests.tstutils import benchmark_required
 
 def test_basics():
     c = [45,50,55]
@@ -155,3 +158,70 @@ def test_width():
     assert np.absolute(np.mean(xr/sig)-1) < 0.02, 'Second moment should be good to better than 2%'
 
 
+
+def test_batch():
+    """
+    Test that the compiled batch calculation matches moment1d.
+    """
+    rng = np.random.default_rng(3)
+    nrow, ncol = 200, 150
+    x = np.arange(ncol)
+    img = np.zeros((nrow,ncol), dtype=float)
+    col = np.array([-2., 0.3, 30., 60.2, 90., 120.7, 149.5])
+    for c in col[2:6]:
+        img += 100*np.exp(-0.5*np.square((x-c)/3))[None,:]
+    img += rng.normal(scale=3., size=img.shape)
+    ivar = np.full(img.shape, 1/9., dtype=float)
+    ivar[rng.random(img.shape) < 0.05] = 0.
+    bpm = rng.random(img.shape) < 0.05
+
+    for weighting, width in zip(['uniform', 'gaussian'], [8., 2.]):
+        for order in [0, 1, 2, [0,1,2]]:
+            mu, mue, mum = moment.moment1d(img, col, width, ivar=ivar, bpm=bpm, order=order,
+                                           weighting=weighting, mesh=True)
+            _mu, _mue, _mum = moment.moment1d_batch(img, col, width, ivar=ivar, bpm=bpm,
+                                                    order=order, weighting=weighting)
+            assert np.allclose(mu, _mu), 'Moments should match'
+            assert np.allclose(mue, _mue), 'Errors should match'
+            assert np.array_equal(mum, _mum), 'Masks should match'
+
+    # Bounds and preallocated output
+    out = (np.empty((2,nrow,col.size), dtype=float), np.empty((2,nrow,col.size), dtype=float),
+           np.empty((2,nrow,col.size), dtype=bool))
+    mu, mue, mum = moment.moment1d(img, col, 8., ivar=ivar, order=[0,1], bounds=([0,-1],[None,1]))
+    _mu, _mue, _mum = moment.moment1d_batch(img, col, 8., ivar=ivar, order=[0,1],
+                                            bounds=([0,-1],[None,1]), out=out)
+    assert _mu is out[0], 'Should use the provided array'
+    assert np.allclose(mu, _mu) and np.allclose(mue, _mue) and np.array_equal(mum, _mum), \
+            'Bounded moments should match'
+    assert np.any(mum), 'Some moments should be out of bounds'
+
+    # Single values
+    assert np.isclose(moment.moment1d(img, 60., 8., row=10, order=1)[0],
+                      moment.moment1d_batch(img, 60., 8., row=10, order=1)[0]), \
+            'Single moments should match'
+
+
+@benchmark_required
+def test_batch_benchmark():
+    """
+    Time the first moment and its error for all traces in all rows of
+    DEIMOS- and LRIS-sized images.
+    """
+    rng = np.random.default_rng(3)
+    for name, (nrow, ncol), ntrace in [('DEIMOS', (4096, 2048), 60), ('LRIS', (2048, 1024), 20)]:
+        img = rng.normal(scale=3., size=(nrow,ncol)) + 10.
+        ivar = np.full(img.shape, 1/9., dtype=float)
+        bpm = rng.random(img.shape) < 0.01
+        col = np.linspace(20, ncol-20, ntrace)[None,:] + np.zeros((nrow,1))
+        # Compile the kernel before timing
+        moment.moment1d_batch(img[:2], col[:2], 8., ivar=ivar[:2], bpm=bpm[:2], order=1)
+        t = time.perf_counter()
+        mu, mue, mum = moment.moment1d(img, col, 8., ivar=ivar, bpm=bpm, order=1)
+        t_moment1d = time.perf_counter() - t
+        t = time.perf_counter()
+        _mu, _mue, _mum = moment.moment1d_batch(img, col, 8., ivar=ivar, bpm=bpm, order=1)
+        t_batch = time.perf_counter() - t
+        print('{0} {1}x{2}, {3} traces: moment1d {4:.3f}s, moment1d_batch {5:.3f}s'.format(
+              name, nrow, ncol, ntrace, t_moment1d, t_batch))
+        assert np.allclose(mu, _mu) and np.allclose(mue, _mue) and np.array_equal(mum, _mum)
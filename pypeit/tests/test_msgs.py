@@ -1,6 +1,8 @@
 """
 Module to run tests on armsgs
 """
+import os
+import json
 import numpy as np
 import pytest
 
@@ -32,3 +34,20 @@ def test_msgs():
     msgs.work("test 123")
     msgs.close()
 
+
+def test_json_log():
+    outfil = 'tst_log.jsonl'
+    msgs = pypmsgs.Messages(None, verbosity=0, jsonlog=outfil)
+    msgs.info('test {0} {1}', 1, 'two')
+    msgs.warn('test 123')
+    msgs.test('not logged at this verbosity')
+    msgs.close()
+    with open(outfil, 'r') as f:
+        records = [json.loads(line) for line in f]
+    os.remove(outfil)
+    assert len(records) == 2, 'Should write one record per message'
+    assert [r['level'] for r in records] == ['INFO', 'WARNING'], 'Bad levels'
+    assert records[0]['message'] == 'test 1 two', 'Message not formatted'
+    assert records[0]['function'] == 'test_json_log', 'Bad call site'
+    assert records[0]['file'] == os.path.basename(__file__), 'Bad call site'
+    assert records[1]['elapsed'] >= records[0]['elapsed'] >= 0, 'Bad elapsed time'
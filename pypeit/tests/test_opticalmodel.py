@@ -9,7 +9,10 @@ import numpy
 
 import pytest
 
-from pypeit.spectrographs.opticalmodel import DetectorMap
+from astropy.io import fits
+
+from pypeit.spectrographs import opticalmodel
+from pypeit.spectrographs.opticalmodel import DetectorMap, ReflectionGrating
 from pypeit.spectrographs.keck_deimos import DEIMOSCameraDistortion, KeckDEIMOSSpectrograph
 
 from pypeit.tests.tstutils import dev_suite_required
@@ -67,3 +70,67 @@ def test_deimos_ccd_slits():
     assert n_per_ccd[1] == 14, 'Incorrect number of slits on CCD 1'
 
 
+
+
+def test_deimos_detectormap():
+    spec = KeckDEIMOSSpectrograph()
+    d = spec.get_detector_map()
+    # Pixel coordinates on each of the 8 chips
+    det = numpy.repeat(numpy.arange(d.nccd)+1, 3)
+    xpix = numpy.tile([20., 1024., 2000.], d.nccd)
+    ypix = numpy.tile([100., 2048., 4000.], d.nccd)
+    ximg, yimg = d.image_coordinates(xpix, ypix, detector=det, in_mm=False)
+    _det, _xpix, _ypix = d.ccd_coordinates(ximg, yimg, in_mm=False)
+    assert numpy.array_equal(_det, det), 'Wrong detector'
+    assert numpy.allclose(_xpix, xpix) and numpy.allclose(_ypix, ypix), 'I/O mismatch'
+    # Points off the detector
+    _det, _xpix, _ypix = d.ccd_coordinates(numpy.array([1e5]), numpy.array([1e5]), in_mm=False)
+    assert _det[0] == -1 and _xpix[0] == -1 and _ypix[0] == -1, 'Should be off the detector'
+
+
+def test_deimos_batched_trace():
+    spec = KeckDEIMOSSpectrograph()
+    mp_dir = os.path.join(os.path.dirname(opticalmodel.__file__), os.pardir, 'data',
+                          'static_calibs', 'keck_deimos')
+    spec.amap = fits.getdata(os.path.join(mp_dir, 'amap.s3.2003mar04.fits'))
+    spec.bmap = fits.getdata(os.path.join(mp_dir, 'bmap.s3.2003mar04.fits'))
+    roll, yaw, tilt = spec._grating_orientation(3, 831, 0.)
+    spec.grating = ReflectionGrating(831.90, tilt, roll, yaw, central_wave=8500.)
+
+    # Trace the corners of 5 slits at 3 wavelengths at once
+    x = numpy.array([-200., -100., 0., 100., 200.])
+    y = numpy.array([40., 60., 80., 60., 40.])
+    corners = numpy.stack([numpy.column_stack((x+dx, y+dy))
+                           for dx, dy in [(-2,-0.5), (2,-0.5), (2,0.5), (-2,0.5)]], axis=1)
+    wave = numpy.array([7500., 8500., 9500.])
+    opticalmodel.clear_cache()
+    ximg, yimg, ccd, xpix, ypix = spec.mask_to_pixel_coordinates(x=corners[..., 0].ravel(),
+                                                                 y=corners[..., 1].ravel(),
+                                                                 wave=wave)
+    assert ximg.shape == (20, 3), 'Wrong shape'
+    assert numpy.all(ximg > -1e4), 'All corners should be in the image plane'
+    assert len(opticalmodel._traces) == 1, 'Result should be cached'
+
+    # Should be identical to tracing each corner at each wavelength
+    # separately
+    for i in [0, 7, 19]:
+        for j in range(wave.size):
+            _ximg, _yimg = spec.optical_model.mask_to_imaging_coordinates(
+                                corners[..., 0].ravel()[i], corners[..., 1].ravel()[i],
+                                spec.amap, spec.bmap, wave=wave[j])
+            assert numpy.isclose(_ximg[0], ximg[i,j]) and numpy.isclose(_yimg[0], yimg[i,j]), \
+                    'Batched trace does not match'
+
+    # Repeating the trace returns the cached result, even with a new
+    # grating instance
+    nkeys = len(opticalmodel._traces)
+    spec.grating = ReflectionGrating(831.90, tilt, roll, yaw, central_wave=8500.)
+    _ximg = spec.mask_to_pixel_coordinates(x=corners[..., 0].ravel(), y=corners[..., 1].ravel(),
+                                           wave=wave)[0]
+    assert len(opticalmodel._traces) == nkeys, 'Should have used the cached trace'
+    assert numpy.array_equal(_ximg, ximg), 'Cached trace changed'
+    # ... and the cached result is not changed by the caller
+    _ximg[...] = 0.
+    assert numpy.array_equal(spec.mask_to_pixel_coordinates(x=corners[..., 0].ravel(),
+                                                            y=corners[..., 1].ravel(),
+                                                            wave=wave)[0], ximg)
@@ -0,0 +1,46 @@
+"""
+Module to run tests on the profiler
+"""
+import os
+import json
+import numpy as np
+import pytest
+
+from pypeit.profiler import Profiler
+
+
+def test_disabled():
+    prof = Profiler()
+    with prof.step('step1'):
+        pass
+    assert len(prof.records) == 0, 'Disabled profiler should not record anything'
+
+
+def test_profile():
+    prof = Profiler(enabled=True)
+    for det in [1, 2]:
+        with prof.step('reduce', det=det):
+            for slit in range(3):
+                with prof.step('slit', det=det, slit=slit):
+                    np.sum(np.ones((100,100)))
+    # Steps are recorded even if they raise an exception
+    with pytest.raises(ValueError):
+        with prof.step('bad'):
+            raise ValueError('test')
+
+    assert len(prof.records) == 9, 'Should record each execution of each step'
+    assert prof.records[0]['path'] == 'reduce/slit', 'Bad nested path'
+    assert prof.records[0]['context'] == {'det': 1, 'slit': 0}, 'Bad context'
+    assert all([r['wall'] >= 0 and r['cpu'] >= 0 for r in prof.records]), 'Bad times'
+
+    tbl = prof.summary()
+    assert list(tbl['path']) == ['reduce', 'reduce/slit', 'bad'], 'Bad order of steps'
+    assert list(tbl['ncalls']) == [2, 6, 1], 'Bad number of calls'
+    assert tbl['wall'][0] >= tbl['wall'][1], 'Enclosing step should take longer'
+
+    ofile = 'tst_profile.json'
+    prof.write(ofile)
+    with open(ofile, 'r') as f:
+        records = json.load(f)['steps']
+    os.remove(ofile)
+    assert len(records) == 9, 'Bad output file'
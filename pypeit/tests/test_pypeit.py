@@ -2,6 +2,9 @@
 Module to run tests on arsave
 """
 import os
+import shutil
+import time
+from types import SimpleNamespace
 
 import numpy as np
 
@@ -10,7 +13,12 @@ import pytest
 from pypeit import msgs
 from pypeit.par.util import make_pypeit_file
 from pypeit import pypeitsetup
+from pypeit import quicklook
+from pypeit import spec2dobj
+from pypeit import specobjs
+from pypeit import specobj
 from pypeit.pypeit import PypeIt
+from pypeit.tests.tstutils import get_kastb_detector, write_spec2d_files
 
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'files')
@@ -60,3 +68,118 @@ def test_select_detectors():
     assert np.array_equal(PypeIt.select_detectors(detnum=[1,3]), [1,3]), \
             'Incorrect detectors selected.'
 
+
+
+def test_resume():
+    redux_path = data_path('tst_resume')
+    if os.path.isdir(redux_path):
+        shutil.rmtree(redux_path)
+    pypeit_file = quicklook.write_pypeit_file('shane_kast_blue',
+                                              [data_path('b1.fits.gz'), data_path('b27.fits.gz')],
+                                              ['arc,tilt', 'science'],
+                                              ['[rdx]', 'spectrograph = shane_kast_blue',
+                                               'detnum = 1, 2, 3', '[calibrations]',
+                                               'raise_chk_error = False'],
+                                              output_path=redux_path)
+    spec2d_file = write_spec2d_files(nexp=1)[0]
+
+    def run(fail=None):
+        # Mock the calibrations and the reduction of each detector
+        pypeIt = PypeIt(pypeit_file, overwrite=False, redux_path=redux_path)
+        pypeIt.get_calibrations = lambda frame, det: None
+        pypeIt.caliBrate = SimpleNamespace(master_key_dict={'arc': 'A_1_01'},
+                                           master_dir='Masters')
+        reduced = []
+        def reduce_one(frames, det, bg_frames, std_outfile=None):
+            reduced.append(det)
+            if det == fail:
+                raise ValueError('Failed')
+            spec2DObj = spec2dobj.Spec2DObj.from_file(spec2d_file, 1)
+            spec2DObj.det = det
+            sobjs = specobjs.SpecObjs()
+            for i in range(det-1):
+                sobj = specobj.SpecObj('MultiSlit', det, SLITID=i)
+                sobj.SPAT_PIXPOS = 10.*i
+                sobj.SPAT_FRACPOS = 0.5
+                sobj.BOX_RADIUS = 3.
+                sobj.FWHM = 2.
+                sobj.maskwidth = 4.
+                sobj.BOX_WAVE = np.arange(10.)
+                sobj.BOX_COUNTS = np.ones(10)
+                sobj.BOX_COUNTS_IVAR = np.ones(10)
+                sobj.OPT_WAVE = np.arange(10.)
+                sobj.OPT_COUNTS = np.ones(10)
+                sobj.OPT_COUNTS_IVAR = np.ones(10)
+                sobj.DETECTOR = get_kastb_detector()
+                sobj.DETECTOR['det'] = det
+                sobj.set_name()
+                sobjs.add_sobj(sobj)
+            return spec2DObj, sobjs
+        pypeIt.reduce_one = reduce_one
+        if fail is None:
+            pypeIt.reduce_all()
+        else:
+            with pytest.raises(ValueError):
+                pypeIt.reduce_all()
+        return pypeIt, reduced
+
+    # Fail on the last detector; only the partial files are left behind
+    pypeIt, reduced = run(fail=3)
+    assert reduced == [1, 2, 3]
+    spec1d_file = pypeIt.spec_output_file(1)
+    spec2d_file_out = pypeIt.spec_output_file(1, twod=True)
+    assert os.path.isfile(pypeIt.spec_partial_file(1))
+    assert os.path.isfile(pypeIt.spec_partial_file(1, twod=True))
+    assert not os.path.isfile(spec1d_file) and not os.path.isfile(spec2d_file_out)
+    assert specobjs.SpecObjs.read_detectors(pypeIt.spec_partial_file(1)) == [1, 2]
+
+    # Resume: only the last detector is reduced
+    pypeIt, reduced = run()
+    assert reduced == [3]
+    assert not os.path.isfile(pypeIt.spec_partial_file(1))
+    assert not os.path.isfile(pypeIt.spec_partial_file(1, twod=True))
+    assert spec2dobj.AllSpec2DObj.read_detectors(spec2d_file_out) == [1, 2, 3]
+    sobjs = specobjs.SpecObjs.from_fitsfile(spec1d_file)
+    assert np.array_equal(sobjs.DET, [2, 3, 3])
+
+    # Nothing left to do
+    pypeIt, reduced = run()
+    assert reduced == []
+
+    # Clean up
+    shutil.rmtree(redux_path)
+    os.remove(spec2d_file)
+
+
+def test_checkpoint_masters(tmp_path):
+    redux_path = str(tmp_path)
+    pypeit_file = quicklook.write_pypeit_file('shane_kast_blue',
+                                              [data_path('b1.fits.gz'), data_path('b27.fits.gz')],
+                                              ['arc,tilt', 'science'],
+                                              ['[rdx]', 'spectrograph = shane_kast_blue',
+                                               'checkpoint = True', '[calibrations]',
+                                               'raise_chk_error = False'],
+                                              output_path=redux_path)
+    pypeIt = PypeIt(pypeit_file, overwrite=False, redux_path=redux_path)
+    master_dir = os.path.join(redux_path, 'Masters')
+    os.makedirs(master_dir, exist_ok=True)
+    master_file = os.path.join(master_dir, 'MasterArc_A_1_01.fits')
+    with open(master_file, 'w') as f:
+        f.write('arc')
+    pypeIt.caliBrate = SimpleNamespace(master_key_dict={'arc': 'A_1_01'},
+                                       master_dir=master_dir, calib_ID=0)
+    frames = np.where(pypeIt.fitstbl.find_frames('science'))[0]
+
+    store = pypeIt.get_checkpoints(frames, 1, [])
+    store.save('skysub', arrays={'a': np.arange(3)})
+    # Same masters: the checkpoint is kept
+    assert pypeIt.get_checkpoints(frames, 1, []).has('skysub')
+
+    # Rebuilt master: the checkpoint is discarded
+    time.sleep(0.01)
+    with open(master_file, 'w') as f:
+        f.write('rebuilt arc')
+    assert not pypeIt.get_checkpoints(frames, 1, []).has('skysub')
+
+    pypeIt.clear_checkpoints(frames[0], 1)
+    assert not os.path.isdir(pypeIt.checkpoint_dir(frames[0], 1))
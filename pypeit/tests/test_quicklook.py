@@ -0,0 +1,96 @@
+"""
+Module to test the quick-look server
+"""
+import os
+import shutil
+import threading
+import time
+
+import pytest
+
+from pypeit.pypmsgs import PypeItError
+from pypeit.par.util import parse_pypeit_file
+from pypeit import quicklook
+from pypeit.tests.tstutils import dev_suite_required, data_path
+
+
+def test_setup_key():
+    files = [data_path('b1.fits.gz'), data_path('b27.fits.gz')]
+    key = quicklook.setup_key('shane_kast_blue', files, ['arc,tilt', 'science'])
+    # The science frames do not change the setup
+    assert quicklook.setup_key('shane_kast_blue', files[:1], ['tilt,arc']) == key
+    # The calibration frames and parameters do
+    assert quicklook.setup_key('shane_kast_blue', files, ['arc', 'science']) != key
+    assert quicklook.setup_key('shane_kast_blue', files, ['arc,tilt', 'science'],
+                               cfg_lines=['[rdx]', 'detnum = 1']) != key
+
+
+def test_write_pypeit_file():
+    # Provide the files out of order
+    files = [data_path('b27.fits.gz'), data_path('b1.fits.gz')]
+    ofile = quicklook.write_pypeit_file('shane_kast_blue', files, ['science', 'arc,tilt'],
+                                        ['[rdx]', 'spectrograph = shane_kast_blue'],
+                                        output_path=data_path(''))
+    assert os.path.isfile(ofile)
+    _, data_files, frametype, usrdata, setups = parse_pypeit_file(ofile, runtime=True)
+    assert frametype == {'b1.fits.gz': 'arc,tilt', 'b27.fits.gz': 'science'}
+    assert setups == ['A']
+    # Clean up
+    shutil.rmtree(os.path.dirname(ofile))
+
+
+def test_server():
+    server = quicklook.QuickLookServer(redux_path=data_path(''), max_setups=2)
+
+    # Least-recently-used setups are removed
+    server.calib_cache('a')['det1'] = None
+    server.calib_cache('b')
+    server.calib_cache('a')
+    server.calib_cache('c')
+    assert list(server.setups.keys()) == ['a', 'c']
+    assert server.status()['calibrations'] == {'a': ['det1'], 'c': []}
+
+    # Run the server
+    thread = threading.Thread(target=server.serve, kwargs=dict(port=0))
+    thread.start()
+    for i in range(100):
+        if server.port is not None:
+            break
+        time.sleep(0.1)
+    assert server.port is not None, 'Server did not start'
+
+    status = quicklook.submit('status', port=server.port)
+    assert status['status'] == 'ok'
+    assert status['setups'] == ['a', 'c']
+
+    # Errors are returned to the client, and the server keeps running
+    with pytest.raises(PypeItError):
+        quicklook.submit(dict(spectrograph='shane_kast_blue', files=[data_path('b1.fits.gz')],
+                              frametypes=['arc', 'science']), port=server.port)
+    assert quicklook.submit('status', port=server.port)['status'] == 'ok'
+
+    assert quicklook.submit('shutdown', port=server.port)['status'] == 'ok'
+    thread.join(timeout=10)
+    assert not thread.is_alive()
+
+
+@dev_suite_required
+def test_server_reduce():
+    droot = os.path.join(os.environ['PYPEIT_DEV'], 'RAW_DATA', 'shane_kast_blue', '600_4310_d55')
+    files = [os.path.join(droot, f) for f in ['b1.fits.gz', 'b10.fits.gz', 'b27.fits.gz']]
+    frametypes = ['arc,tilt', 'pixelflat,trace,illumflat', 'science']
+    redux_path = data_path('ql_server')
+    if os.path.isdir(redux_path):
+        shutil.rmtree(redux_path)
+
+    server = quicklook.QuickLookServer(redux_path=redux_path, max_setups=1)
+    result = server.reduce('shane_kast_blue', files, frametypes)
+    assert not result['in_memory']
+    assert len(result['spec2d']) == 1 and os.path.isfile(result['spec2d'][0])
+    # Reducing the next exposure reuses the calibrations
+    result = server.reduce('shane_kast_blue', files, frametypes)
+    assert result['in_memory']
+    assert len(server.setups[result['setup']]) == 1
+
+    # Clean up
+    shutil.rmtree(redux_path)
@@ -5,6 +5,8 @@ import pytest
 import numpy as np
 
 from pypeit.core import skysub
+from pypeit import specobj
+from pypeit import specobjs
 from pypeit.slittrace import SlitTraceSet
 
 
@@ -49,4 +51,64 @@ def test_generatemask():
     skymask = skysub.generate_mask("IFU", regs, slits, slits.left_init, slits.right_init)
     assert(np.array_equal(skymask, tstmsk))
 
-test_userregions()
\ No newline at end of file
+test_userregions()
+
+
+def synthetic_slit(nspec=300, nspat=80, dtype=float):
+    rng = np.random.default_rng(10)
+    spat = np.arange(nspat)[None,:]
+    spec = np.arange(nspec)[:,None]
+    trace = 0.4*nspat + 0.05*np.arange(nspec)
+    tilts = (spec + 0.02*(spat-nspat/2)) / (nspec-1) * np.ones((1,nspat))
+    waveimg = 5000. + 2.*tilts*(nspec-1)
+    sky = 300 + 200*np.sin(tilts*40)
+    img = sky + 100*np.exp(-0.5*((spat - trace[:,None])/2.)**2)
+    img += rng.normal(size=img.shape)*np.sqrt(img)
+    ivar = 1/img
+    rn2 = np.full(img.shape, 9.)
+    thismask = (spat > 5) & (spat < nspat-5) & np.ones((nspec,1), dtype=bool)
+    left = np.full(nspec, 5.5)
+    right = np.full(nspec, nspat-5.5)
+    return img.astype(dtype), ivar.astype(dtype), rn2.astype(dtype), tilts, waveimg, \
+                thismask, left, right, trace
+
+
+def test_float32():
+    # Reduce the same slit in single and double precision
+    models = []
+    for dtype in [np.float64, np.float32]:
+        img, ivar, rn2, tilts, waveimg, thismask, left, right, trace \
+                = synthetic_slit(dtype=dtype)
+        global_sky = np.zeros_like(img)
+        global_sky[thismask] = skysub.global_skysub(img, ivar, tilts, thismask, left, right,
+                                                    inmask=thismask)
+        sobj = specobj.SpecObj('MultiSlit', 1, SLITID=0)
+        sobj.TRACE_SPAT = trace
+        sobj.trace_spec = np.arange(trace.size)
+        sobj.SPAT_PIXPOS = trace[trace.size//2]
+        sobj.SPAT_FRACPOS = 0.4
+        sobj.maskwidth = 10.
+        sobj.FWHM = 4.7
+        sobj.smash_peakflux = 100.
+        sobj.OBJID = 1
+        sobjs = specobjs.SpecObjs()
+        sobjs.add_sobj(sobj)
+        skymodel, objmodel, ivarmodel, outmask \
+                = skysub.local_skysub_extract(img, ivar, tilts, waveimg, global_sky, rn2,
+                                              thismask, left, right, sobjs, ingpm=thismask,
+                                              box_rad=7.)
+        # The models are kept in the working precision
+        assert skymodel.dtype == dtype and objmodel.dtype == dtype \
+                    and ivarmodel.dtype == dtype, 'Models should not change type'
+        models += [(global_sky, skymodel, objmodel, sobjs[0])]
+
+    # Images agree to single precision
+    for model, _model in zip(models[0][:3], models[1][:3]):
+        assert np.allclose(_model, model, rtol=1e-5, atol=1e-5*np.absolute(model).max())
+    # As do the extracted spectra
+    for key in ['OPT_COUNTS', 'OPT_COUNTS_IVAR', 'OPT_COUNTS_SKY', 'BOX_COUNTS',
+                'BOX_COUNTS_IVAR', 'BOX_COUNTS_SKY']:
+        flux = getattr(models[0][3], key)
+        _flux = getattr(models[1][3], key)
+        assert np.allclose(_flux, flux, rtol=1e-5, atol=1e-5*np.absolute(flux).max()), \
+                '{0} changed'.format(key)
@@ -33,6 +33,18 @@ def test_init():
     center = (left+right)/2
     assert np.all(center == 5), 'Bad center'
 
+def test_slit_img_section():
+    spec = np.arange(200)
+    left = np.stack([10+0.01*spec, 30+0.02*spec, 31.5+0.02*spec], axis=1)
+    slits = SlitTraceSet(left, left + 12, 'MultiSlit', nspat=60, PYP_SPEC='dummy',
+                         specmin=np.array([-1, 20, 5.]), specmax=np.array([200, 150, 190.]))
+    img = slits.slit_img(flexure=1.5)
+    # Sections are identical to the same section of the full image,
+    # including where the slits overlap
+    for section in [(slice(0,200), slice(0,60)), (slice(10,160), slice(25,50)),
+                    (slice(0,30), slice(0,12))]:
+        assert np.array_equal(slits.slit_img(flexure=1.5, section=section), img[section])
+
 def test_io():
 
     slits = SlitTraceSet(np.full((1000,3), 2, dtype=float), np.full((1000,3), 8, dtype=float),
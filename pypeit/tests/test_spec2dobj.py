@@ -17,8 +17,11 @@ from pypeit.spectrographs.util import load_spectrograph
 from pypeit.tests import tstutils
 from pypeit.tests import test_wavetilts
 from pypeit import wavetilts
+from pypeit import wavecalib
 from pypeit import slittrace
 from pypeit import pypmsgs
+from pypeit.core import fitting
+from pypeit.core.wavecal import wv_fitting
 
 def data_path(filename):
     data_dir = os.path.join(os.path.dirname(__file__), 'files')
@@ -94,6 +97,96 @@ def test_spec2dobj_io(init_dict):
     _spec2DObj = spec2dobj.Spec2DObj.from_file(ofile, init_dict['det'])
     os.remove(ofile)
 
+def test_spec2dobj_read_section(init_dict):
+    init_dict['sciimg'] = np.arange(1e6).reshape(1000,1000)
+    spec2DObj = spec2dobj.Spec2DObj(**init_dict)
+    spec2DObj.detector = tstutils.get_kastb_detector()
+    ofile = data_path('tst_spec2d.fits')
+    if os.path.isfile(ofile):
+        os.remove(ofile)
+    spec2DObj.to_file(ofile)
+    # Read without the images
+    _spec2DObj = spec2dobj.Spec2DObj.from_file(ofile, init_dict['det'], load_images=False)
+    assert _spec2DObj.sciimg is None and _spec2DObj.waveimg is None
+    assert _spec2DObj.sci_spat_flexure == 3.5
+    assert np.array_equal(_spec2DObj.slits.left_init, spec2DObj.slits.left_init)
+    # Read sections of the images
+    section = (slice(100,300), slice(20,40))
+    assert np.array_equal(spec2dobj.read_section(ofile, 1, 'sciimg', section=section),
+                          spec2DObj.sciimg[section].astype(np.float32))
+    assert np.array_equal(spec2dobj.read_section(ofile, 1, 'waveimg'), spec2DObj.waveimg)
+    with pytest.raises(pypmsgs.PypeItError):
+        spec2dobj.read_section(ofile, 1, 'slits')
+    os.remove(ofile)
+
+def test_spec2dobj_wave_fits(init_dict):
+    slits = init_dict['slits']
+    nspat = slits.nslits
+    # Tilt and wavelength fits
+    rng = np.random.default_rng(7)
+    waveTilts = wavetilts.WaveTilts(coeffs=rng.normal(scale=0.01, size=(4,3,nspat)),
+                                    nslit=nspat, spat_id=slits.spat_id,
+                                    spat_order=np.array([2,1,2]), spec_order=np.array([3,3,2]),
+                                    func2d='legendre2d', spat_flexure=1.5,
+                                    bpmtilts=np.zeros((1000,1000), dtype=int))
+    waveTilts.coeffs[0,0,:] = 1.
+    wv_fits = np.asarray([wv_fitting.WaveFit(spat_id, pypeitfit=fitting.PypeItFit(
+                            fitc=np.array([5000., 1000., 2.][:3-i]), func='legendre', minx=0.,
+                            maxx=1.)) for i, spat_id in enumerate(slits.spat_id)])
+    wv_calib = wavecalib.WaveCalib(wv_fits=wv_fits, nslits=nspat, spat_ids=slits.spat_id,
+                                   strpar='{"echelle": false}')
+    # Build the images as done by Reduce
+    slitmask = slits.slit_img(flexure=init_dict['sci_spat_flexure'],
+                              exclude_flag=slits.bitmask.exclude_for_reducing)
+    init_dict['sci_spec_flexure']['sci_spec_flexure'] = [0.5, 0., -1.]
+    init_dict['tilts'] = waveTilts.fit2tiltimg(slitmask, flexure=init_dict['sci_spat_flexure']
+                                                                 - waveTilts.spat_flexure)
+    init_dict['waveimg'] = wv_calib.build_waveimg(
+                                init_dict['tilts'], slits,
+                                spat_flexure=init_dict['sci_spat_flexure'],
+                                spec_flexure=np.asarray(init_dict['sci_spec_flexure']
+                                                        ['sci_spec_flexure'], dtype=float)) \
+                            * init_dict['vel_corr']
+    spec2DObj = spec2dobj.Spec2DObj(**init_dict)
+    spec2DObj.detector = tstutils.get_kastb_detector()
+    spec2DObj.store_wave_fits(waveTilts, wv_calib)
+    assert spec2DObj.wavetilts.bpmtilts is None
+
+    # The images are not written, and are regenerated when read
+    allspec2D = spec2dobj.AllSpec2DObj()
+    allspec2D['meta']['ir_redux'] = False
+    allspec2D[1] = spec2DObj
+    ofile = data_path('tst_allspec2d.fits')
+    for compact in [False, True]:
+        allspec2D.write_to_fits(ofile, overwrite=True, compact=compact)
+        with fits.open(ofile) as hdu:
+            assert 'DET01-TILTS' not in hdu and 'DET01-WAVEIMG' not in hdu
+            assert isinstance(hdu['DET01-SCIIMG'], fits.CompImageHDU) == compact
+        _spec2DObj = spec2dobj.Spec2DObj.from_file(ofile, 1)
+        assert np.array_equal(_spec2DObj.tilts, spec2DObj.tilts)
+        assert np.array_equal(_spec2DObj.waveimg, spec2DObj.waveimg)
+        assert np.array_equal(_spec2DObj.sciimg, spec2DObj.sciimg.astype(np.float32))
+        assert np.array_equal(_spec2DObj.bpmmask, spec2DObj.bpmmask)
+        assert np.array_equal(spec2dobj.AllSpec2DObj.from_fits(ofile)[1].waveimg,
+                              spec2DObj.waveimg)
+        # Sections are regenerated without building the full image
+        section = (slice(100,300), slice(10,30))
+        for key in ['tilts', 'waveimg', 'skymodel']:
+            assert np.array_equal(spec2dobj.read_section(ofile, 1, key, section=section),
+                                  _spec2DObj[key][section])
+        # Only the compressed images are cached
+        cache = {}
+        for key in ['sciimg', 'waveimg']:
+            assert np.array_equal(spec2dobj.read_section(ofile, 1, key, section=section,
+                                                         cache=cache),
+                                  _spec2DObj[key][section])
+        assert list(cache.keys()) == (['DET01-SCIIMG'] if compact else [])
+        if compact:
+            # Subsequent sections are selected from the cached image
+            cache['DET01-SCIIMG'] = np.zeros_like(cache['DET01-SCIIMG'])
+            assert not np.any(spec2dobj.read_section(ofile, 1, 'sciimg', cache=cache))
+    os.remove(ofile)
+
 def test_spec2dobj_update_slit(init_dict):
     # Build two
     spec2DObj1 = spec2dobj.Spec2DObj(**init_dict)
@@ -179,3 +272,60 @@ def test_all2dobj_update_image(init_dict):
     assert np.array_equal(allspec2D_2[1].sciimg, spec2DObj1.sciimg)
 
     os.remove(ofile)
+
+
+def test_all2dobj_append(init_dict):
+    allspec2D = spec2dobj.AllSpec2DObj()
+    allspec2D['meta']['ir_redux'] = False
+    for det in [1,2]:
+        allspec2D[det] = spec2dobj.Spec2DObj(**init_dict)
+        allspec2D[det].det = det
+        allspec2D[det].sciimg = allspec2D[det].sciimg*det
+    pri_hdr = allspec2D.build_primary_hdr(fits.Header(), load_spectrograph('shane_kast_blue'))
+
+    # Write the full file
+    ofile = data_path('tst_allspec2d.fits')
+    allspec2D.write_to_fits(ofile, pri_hdr=pri_hdr.copy())
+    hdul = fits.open(ofile)
+
+    # Write one detector at a time and free the images
+    _ofile = data_path('tst_allspec2d_append.fits')
+    if os.path.isfile(_ofile):
+        os.remove(_ofile)
+    for det in [1,2]:
+        allspec2D.append_to_fits(_ofile, det, pri_hdr=pri_hdr.copy(), ndet=2)
+        del allspec2D[det]
+        assert spec2dobj.AllSpec2DObj.read_detectors(_ofile) == list(range(1,det+1))
+    assert allspec2D.detectors == []
+    _hdul = fits.open(_ofile)
+    assert [h.name for h in _hdul] == [h.name for h in hdul]
+    for key in spec2dobj.AllSpec2DObj._ext_keys(hdul[0].header):
+        assert _hdul[0].header[key] == hdul[0].header[key]
+    _allspec2D = spec2dobj.AllSpec2DObj.from_fits(_ofile)
+    assert _allspec2D.detectors == [1,2]
+    assert np.array_equal(_allspec2D[2].sciimg, init_dict['sciimg']*2)
+    hdul.close()
+    _hdul.close()
+
+    # Cannot write the same detector twice
+    for det in [2,3]:
+        allspec2D[det] = spec2dobj.Spec2DObj(**init_dict)
+        allspec2D[det].det = det
+    with pytest.raises(pypmsgs.PypeItError):
+        allspec2D.append_to_fits(_ofile, 2)
+
+    # Remove a detector, and an interrupted write of another
+    size = os.path.getsize(_ofile)
+    fits.HDUList([fits.PrimaryHDU()] + allspec2D[3].to_hdu()[:2]).writeto(ofile, overwrite=True)
+    with open(_ofile, 'ab') as f, open(ofile, 'rb') as g:
+        g.seek(2880)
+        f.write(g.read()[:-1000])
+    spec2dobj.AllSpec2DObj.truncate_fits(_ofile, [1])
+    assert os.path.getsize(_ofile) < size
+    assert spec2dobj.AllSpec2DObj.read_detectors(_ofile) == [1]
+    allspec2D.append_to_fits(_ofile, 2)
+    assert os.path.getsize(_ofile) == size
+    assert spec2dobj.AllSpec2DObj.from_fits(_ofile).detectors == [1,2]
+
+    os.remove(ofile)
+    os.remove(_ofile)
@@ -2,6 +2,8 @@
 Module to run tests on SpecObjs
 """
 import os
+import copy
+import pickle
 
 import numpy as np
 import pytest
@@ -9,6 +11,7 @@ import pytest
 from astropy.io import fits
 
 from pypeit import msgs
+from pypeit.pypmsgs import PypeItError
 from pypeit import specobjs
 from pypeit import specobj
 from pypeit import io
@@ -132,3 +135,131 @@ def test_io(sobj1, sobj2, sobj3, sobj4):
     assert _sobjs1.nobj == 3
     assert _sobjs1[2].BOX_WAVE.size == 2000
     os.remove(ofile)
+
+
+def test_io_columnar(sobj1, sobj2, sobj3, sobj4):
+    sobjs = specobjs.SpecObjs([sobj1,sobj2,sobj3,sobj4])
+    sobjs[0]['BOX_WAVE'] = np.arange(1000).astype(float)
+    sobjs[1]['BOX_WAVE'] = np.arange(1000).astype(float)
+    sobjs[2]['BOX_WAVE'] = np.arange(500).astype(float)
+    sobjs[1]['BOX_COUNTS'] = np.ones_like(sobjs[1].BOX_WAVE)
+    sobjs[2]['BOX_MASK'] = np.ones(500, dtype=bool)
+    sobjs[3]['RA'] = 10.
+    sobjs[0]['DETECTOR'] = tstutils.get_kastb_detector()
+    # Write
+    header = fits.PrimaryHDU().header
+    ofile = data_path('tst_specobjs_columnar.fits')
+    if os.path.isfile(ofile):
+        os.remove(ofile)
+    sobjs.write_to_fits(header, ofile, overwrite=False, columnar=True)
+    hdul = io.fits_open(ofile)
+    assert len(hdul) == 4  # Primary + Index + Data + 1 Detector
+    assert hdul[0].header['NSPEC'] == 4
+    assert hdul[0].header['COLUMNAR']
+    hdul.close()
+
+    # Read all
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    assert _sobjs.nobj == 4
+    assert np.array_equal(_sobjs.NAME, sobjs.NAME)
+    assert np.array_equal(sobjs[2].BOX_WAVE, _sobjs[2].BOX_WAVE)
+    assert _sobjs[0].BOX_COUNTS is None and _sobjs[3].BOX_WAVE is None
+    assert _sobjs[2].BOX_MASK.dtype == bool
+    assert _sobjs[3].RA == 10. and _sobjs[0].RA is None
+    assert _sobjs[0].DETECTOR is not None and _sobjs[1].DETECTOR is None
+
+    # Index and selection
+    index = specobjs.SpecObjs.read_index(ofile)
+    assert np.array_equal(index['NAME'], sobjs.NAME)
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile, names=sobjs[1].NAME)
+    assert _sobjs.nobj == 1
+    assert np.array_equal(_sobjs[0].BOX_COUNTS, sobjs[1].BOX_COUNTS)
+    assert specobjs.SpecObjs.from_fitsfile(ofile, det=1).nobj == 2
+
+    # Re-writing keeps the layout
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    _sobjs.write_to_fits(_sobjs.header, ofile, overwrite=True)
+    hdul = io.fits_open(ofile)
+    assert specobjs.SpecObjs.columnar_index in hdul
+    hdul.close()
+    os.remove(ofile)
+
+
+def test_attr_sync(sobj1, sobj2, sobj3, sobj4):
+    sobjs = specobjs.SpecObjs([sobj1,sobj2,sobj3])
+    assert np.array_equal(sobjs.SLITID, [0,1,0])
+    # Changes to the objects are seen
+    sobjs[1].SLITID = 5
+    assert np.array_equal(sobjs.SLITID, [0,5,0])
+    # Returned arrays are copies
+    slitid = sobjs.SLITID
+    slitid[0] = 10
+    assert sobjs.SLITID[0] == 0
+    # Appends extend the arrays
+    sobjs.add_sobj(sobj4)
+    assert np.array_equal(sobjs.SLITID, [0,5,0,10])
+    assert np.array_equal(sobjs.DET, [1,2,3,1])
+    # Subsets, and changes made through them
+    sub = sobjs[sobjs.DET == 1]
+    assert np.array_equal(sub.SLITID, [0,10])
+    sub.SLITID = 7
+    assert np.array_equal(sobjs.SLITID, [7,5,0,7])
+    # Values that do not fit the existing array
+    name = sobjs.NAME
+    sobj5 = specobj.SpecObj('MultiSlit', 1, SLITID=1234567)
+    sobjs.add_sobj(sobj5)
+    assert sobjs.NAME[-1] == sobj5.NAME
+    sobjs.remove_sobj(4)
+    assert np.array_equal(sobjs.NAME, name)
+    # Many appends
+    for i in range(100):
+        sobjs.add_sobj(specobj.SpecObj('MultiSlit', 1, SLITID=i))
+    assert sobjs.nobj == 104
+    assert np.array_equal(sobjs.SLITID[4:], np.arange(100))
+
+
+def test_attr_sync_copy(sobj1, sobj2, sobj3):
+    sobjs = specobjs.SpecObjs([sobj1,sobj2,sobj3])
+    assert np.array_equal(sobjs.SLITID, [0,1,0])
+    # Changes to the objects of deep copies and unpickled objects are
+    # seen by the copy, but not by the original
+    for _sobjs in [copy.deepcopy(sobjs), pickle.loads(pickle.dumps(sobjs))]:
+        assert np.array_equal(_sobjs.SLITID, [0,1,0])
+        _sobjs[1].SLITID = 77
+        assert np.array_equal(_sobjs.SLITID, [0,77,0])
+        assert np.array_equal(sobjs.SLITID, [0,1,0])
+
+
+def test_append(sobj1, sobj2, sobj4):
+    sobjs = specobjs.SpecObjs([sobj1,sobj4,sobj2])
+    for sobj in sobjs:
+        sobj['BOX_WAVE'] = np.arange(1000).astype(float)
+        sobj['DETECTOR'] = tstutils.get_kastb_detector()
+    sobjs[2].DETECTOR['det'] = 2
+    ofile = data_path('tst_specobjs_append.fits')
+    if os.path.isfile(ofile):
+        os.remove(ofile)
+    # Append each detector, including one without any objects
+    for det in [1,3,2]:
+        specobjs.SpecObjs(sobjs.specobjs[sobjs.DET == det]).append_to_fits(ofile, det)
+    assert specobjs.SpecObjs.read_detectors(ofile) == [1,3,2]
+    hdul = io.fits_open(ofile)
+    assert len(hdul) == 6  # Primary + 3 Obj + 2 Detectors
+    assert hdul[0].header['NSPEC'] == 3
+    hdul.close()
+    with pytest.raises(PypeItError):
+        sobjs[:1].append_to_fits(ofile, 1)
+    with pytest.raises(PypeItError):
+        sobjs.append_to_fits(ofile, 4)
+
+    # Interrupted write
+    size = os.path.getsize(ofile)
+    io.append_hdus(ofile, [fits.ImageHDU(np.ones(10))])
+    specobjs.SpecObjs.truncate_fits(ofile)
+    assert os.path.getsize(ofile) == size
+
+    _sobjs = specobjs.SpecObjs.from_fitsfile(ofile)
+    assert np.array_equal(_sobjs.NAME, sobjs.NAME)
+    assert np.all([sobj.DETECTOR is not None for sobj in _sobjs])
+    assert _sobjs[2].DETECTOR.det == 2
+    os.remove(ofile)
@@ -2,6 +2,8 @@
 Module to test spectrograph read functions
 """
 import os
+import sys
+import subprocess
 
 import pytest
 import glob
@@ -9,6 +11,7 @@ import glob
 from pkg_resources import resource_filename
 
 from pypeit import spectrographs
+from pypeit.spectrographs.util import load_spectrograph
 from pypeit.core import procimg
 
 from pypeit.tests.tstutils import dev_suite_required
@@ -248,3 +251,42 @@ def test_vltxshooternir():
     assert bpm.shape == (2045, 1097)
 
 
+
+
+def test_registry():
+    # The registry must list every spectrograph class and the module
+    # that defines it
+    classes = spectrographs.spectrograph_classes()
+    assert list(classes.keys()) == spectrographs.available_spectrographs
+    for name, c in classes.items():
+        assert c.__module__ == 'pypeit.spectrographs.{0}'.format(
+                                    spectrographs.spectrograph_modules[name])
+        assert spectrographs.spectrograph_class(name) is c
+    assert isinstance(load_spectrograph('shane_kast_blue'), classes['shane_kast_blue'])
+
+
+def test_lazy_import():
+    # Importing the registry should not import any of the spectrograph
+    # modules, and loading a spectrograph should only import the module
+    # that defines it; the debugging and display packages should not be
+    # imported.  Run in a separate process so that the modules imported
+    # by the rest of the tests are not already loaded.
+    code = 'import sys\n' \
+           'import pypeit.spectrographs\n' \
+           'print(" ".join(sorted(sys.modules)))\n' \
+           'from pypeit.spectrographs.util import load_spectrograph\n' \
+           'load_spectrograph("shane_kast_blue")\n' \
+           'print(" ".join(sorted(sys.modules)))\n'
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(os.path.dirname(spectrographs.__path__[0])),
+                                         env.get('PYTHONPATH', '')])
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True,
+                            env=env, check=True)
+    registry_modules, modules = [m.split() for m in result.stdout.strip().split('\n')[-2:]]
+    assert [m for m in registry_modules if m.startswith('pypeit.spectrographs.')] == []
+    assert [m for m in modules if m.startswith('pypeit.spectrographs.')] \
+                == ['pypeit.spectrographs.shane_kast', 'pypeit.spectrographs.spectrograph',
+                    'pypeit.spectrographs.util']
+    for m in ['IPython', 'ginga']:
+        assert m not in registry_modules and m not in modules, \
+                '{0} should not be imported'.format(m)
@@ -90,3 +90,25 @@ def test_boxcar_smooth_rows():
 
 
 
+
+
+def test_cross_correlate():
+    rng = np.random.default_rng(99)
+    x = rng.normal(size=500)
+    y = rng.normal(size=500)
+    maxlag = 10
+    _xcorr = np.correlate(x, y, mode='full')[x.size-maxlag-1:x.size+maxlag]
+    # Direct and FFT computations
+    lags, xcorr = utils.cross_correlate(x, y, maxlag, method='direct')
+    assert np.array_equal(lags, np.arange(-maxlag, maxlag+1))
+    assert np.allclose(xcorr, _xcorr), 'Bad direct cross-correlation'
+    lags, xcorr = utils.cross_correlate(x, y, maxlag, method='fft')
+    assert np.allclose(xcorr, _xcorr), 'Bad FFT cross-correlation'
+
+    # Correlation within each row, summed over (every other) row
+    x = rng.normal(size=(20,100))
+    y = rng.normal(size=(20,100))
+    _xcorr = np.sum([np.correlate(_x, _y, mode='full')[x.shape[1]-maxlag-1:x.shape[1]+maxlag]
+                        for _x, _y in zip(x[::2], y[::2])], axis=0)
+    lags, xcorr = utils.cross_correlate(x, y, maxlag, step=2)
+    assert np.allclose(xcorr, _xcorr), 'Bad row-summed cross-correlation'
@@ -53,6 +53,37 @@ def test_wavetilts():
     os.remove(outfile)
 
 
+def test_fit2tiltimg():
+    nspec, nspat = 300, 200
+    rng = np.random.default_rng(2)
+    left = np.array([10., 70., 130.])[None,:] + np.linspace(-3, 3, nspec)[:,None]
+    slits = slittrace.SlitTraceSet(left, left+50, 'MultiSlit', nspat=nspat,
+                                   PYP_SPEC='shane_kast_blue')
+    wvtilts = wavetilts.WaveTilts(coeffs=0.1*rng.normal(size=(6,4,3)), nslit=3,
+                                  spat_order=np.array([3,2,3]), spec_order=np.array([5,5,4]),
+                                  spat_id=slits.spat_id, func2d='legendre2d')
+    slitmask = slits.slit_img()
+    tilts = wvtilts.fit2tiltimg(slitmask, flexure=0.3)
+    # Compare with the tilts of each slit evaluated over the full image
+    for i, slit_spat in enumerate(slits.spat_id):
+        coeff = wvtilts.coeffs[:wvtilts.spec_order[i]+1,:wvtilts.spat_order[i]+1,i]
+        _tilts = tracewave.fit2tilts((nspec, nspat), coeff, 'legendre2d', spat_shift=-0.3)
+        indx = slitmask == slit_spat
+        assert np.array_equal(tilts[indx], _tilts[indx])
+    assert np.all(tilts[slitmask < 0] == 0)
+    # Section of the image
+    section = (slice(100, 250), slice(60, 190))
+    _tilts = wvtilts.fit2tiltimg(slits.slit_img(slitidx=1, section=section), flexure=0.3,
+                                 shape=(nspec, nspat), section=section, dtype=np.float32)
+    assert _tilts.dtype == np.float32
+    indx = slits.slit_img(section=section) == slits.spat_id[1]
+    assert np.array_equal(_tilts[indx], tilts[section][indx].astype(np.float32))
+    # Undefined tilts are clamped, not propagated
+    coeff = np.zeros((3,3))
+    coeff[0,0] = np.nan
+    assert np.all(tracewave.fit2tilts((nspec, nspat), coeff, 'legendre2d') == 1.2)
+
+
 @cooked_required
 def test_instantiate_from_master(master_dir):
     master_file = os.path.join(os.getenv('PYPEIT_DEV'), 'Cooked', 'shane_kast_blue',
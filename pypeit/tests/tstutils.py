@@ -10,6 +10,7 @@ from IPython import embed
 import numpy as np
 from astropy import time
 from astropy.io import fits
+from astropy.table import Table
 
 from pypeit.images import buildimage
 from pypeit import edgetrace
@@ -20,6 +21,8 @@ from pypeit.core.wavecal import waveio
 from pypeit.spectrographs.util import load_spectrograph
 from pypeit.metadata import PypeItMetaData
 from pypeit import masterframe
+from pypeit import slittrace
+from pypeit import spec2dobj
 
 # ----------------------------------------------------------------------
 # pytest @decorators setting the tests to perform
@@ -41,6 +44,11 @@ except:
 else:
     bspline_ext = True
 bspline_ext_required = pytest.mark.skipif(not bspline_ext, reason='Could not import C extension')
+
+# Benchmarks are only run on request; they report their timings when
+# pytest is run with -s
+benchmark_required = pytest.mark.skipif(os.getenv('PYPEIT_BENCHMARK') is None,
+                                        reason='benchmarks only run if PYPEIT_BENCHMARK is set')
 # ----------------------------------------------------------------------
 
 
@@ -218,3 +226,38 @@ def load_kast_blue_masters(aimg=False, mstilt=False, edges=False, tilts=False, w
 
     # Return
     return ret
+
+
+def write_spec2d_files(nexp=2, nspec=300, nspat=200):
+    """
+    Write a set of synthetic spec2d files with dithered exposures of
+    three slits.
+    """
+    rng = np.random.default_rng(12)
+    spec = np.arange(nspec)
+    left = np.array([20., 80., 140.])[None,:] + 3*((spec[:,None]-nspec/2)/nspec)**2
+    spat_img, spec_img = np.meshgrid(np.arange(nspat), spec)
+    files = []
+    for iexp in range(nexp):
+        slits = slittrace.SlitTraceSet(left, left + 40, 'MultiSlit', nspat=nspat,
+                                       PYP_SPEC='shane_kast_blue',
+                                       specmin=np.array([-1, 20, 5.]),
+                                       specmax=np.array([nspec, 280, nspec-10.]))
+        waveimg = 4000 + 2.0*spec_img + 0.01*spat_img + 0.5*iexp
+        skymodel = 100 + 10*np.sin(waveimg/7.)
+        objmodel = 50*np.exp(-0.5*((spat_img - left[:,1,None] - 20 - 3*iexp)/2.)**2)
+        sciimg = skymodel + objmodel + rng.normal(size=skymodel.shape)
+        tbl = Table()
+        tbl['spat_id'] = slits.spat_id
+        tbl['sci_spec_flexure'] = np.zeros(slits.nslits)
+        s2d = spec2dobj.Spec2DObj(det=1, sciimg=sciimg, ivarraw=np.ones_like(sciimg),
+                                  skymodel=skymodel, objmodel=objmodel,
+                                  ivarmodel=1/sciimg.clip(1), scaleimg=np.ones_like(sciimg),
+                                  waveimg=waveimg,
+                                  bpmmask=(rng.uniform(size=sciimg.shape) < 0.01).astype(int),
+                                  detector=get_kastb_detector(), slits=slits,
+                                  tilts=spec_img/(nspec-1.), sci_spat_flexure=0.4*iexp,
+                                  sci_spec_flexure=tbl, vel_type=None, vel_corr=None)
+        files += [data_path('spec2d_tst_coadd2d_{0}.fits'.format(iexp))]
+        s2d.to_file(files[-1], overwrite=True)
+    return files
@@ -7,7 +7,6 @@ traces using principle-component analysis.
 
 """
 import warnings
-from IPython import embed
 
 import numpy as np
 
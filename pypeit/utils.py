@@ -13,15 +13,10 @@ import itertools
 from collections import deque
 from bisect import insort, bisect_left
 
-from IPython import embed
-
 import numpy as np
 from numpy.lib.stride_tricks import as_strided
 
-from scipy import interpolate, ndimage
-
-import matplotlib
-from matplotlib import pyplot as plt
+from scipy import interpolate, ndimage, fft
 
 from astropy import units
 from astropy import stats
@@ -418,6 +413,8 @@ def pyplot_rcparams():
     Returns:
 
     """
+    # Import here to avoid the cost of importing pyplot with this module
+    from matplotlib import pyplot as plt
     # set some plotting parameters
     plt.rcParams["xtick.top"] = True
     plt.rcParams["ytick.right"] = True
@@ -450,6 +447,7 @@ def pyplot_rcparams_default():
     Returns:
 
     """
+    import matplotlib
     matplotlib.rcParams.update(matplotlib.rcParamsDefault)
 
 
@@ -580,7 +578,7 @@ def fast_running_median(seq, window_size):
 # https://stackoverflow.com/questions/30677241/how-to-limit-cross-correlation-window-width-in-numpy
 # slightly modified to return lags
 
-def cross_correlate(x, y, maxlag):
+def cross_correlate(x, y, maxlag, step=1, method='auto'):
     """
 
     Cross correlation with a maximum number of lags. This computes the same result as::
@@ -589,16 +587,32 @@ def cross_correlate(x, y, maxlag):
 
     Edges are padded with zeros using ``np.pad(mode='constant')``.
 
+    If ``x`` and ``y`` are two-dimensional, the cross-correlation is
+    computed along the second axis (i.e., within each row) and summed
+    over the rows; ``step`` can be used to only include every
+    ``step``-th row.
+
+    The direct computation is used for short vectors and few lags;
+    otherwise, the cross-correlation is computed from the Fourier
+    transforms of ``x`` and ``y``, which gives the same result to
+    numerical precision.
+
     Args:
         x (ndarray):
             First vector of the cross-correlation.
         y (ndarray):
             Second vector of the cross-correlation. `x` and `y` must be
-            one-dimensional numpy arrays with the same length.
+            one- or two-dimensional numpy arrays with the same shape.
         maxlag (int):
             The maximum lag for which to compute the cross-correlation.
             The cross correlation is computed at integer lags from
             (-maxlag, maxlag)
+        step (:obj:`int`, optional):
+            For two-dimensional input, only use every ``step``-th row.
+        method (:obj:`str`, optional):
+            Method used for the computation: ``'direct'``, ``'fft'``,
+            or ``'auto'`` to select the faster of the two.
+            Two-dimensional input always uses ``'fft'``.
 
     Returns:
         tuple:  Returns are as follows:
@@ -611,19 +625,36 @@ def cross_correlate(x, y, maxlag):
 
     x = np.asarray(x)
     y = np.asarray(y)
-    if x.ndim != 1:
-        msgs.error('x must be one-dimensional.')
-    if y.ndim != 1:
-        msgs.error('y must be one-dimensional.')
-
+    if x.ndim not in [1, 2]:
+        msgs.error('x must be one- or two-dimensional.')
+    if y.shape != x.shape:
+        msgs.error('x and y must have the same shape.')
+    if method not in ['auto', 'direct', 'fft']:
+        msgs.error('Unknown cross-correlation method: {0}'.format(method))
 
-    #py = np.pad(y.conj(), 2*maxlag, mode=mode)
-    py = np.pad(y, 2*maxlag, mode='constant')
-    T = as_strided(py[2*maxlag:], shape=(2*maxlag+1, len(y) + 2*maxlag),
-                   strides=(-py.strides[0], py.strides[0]))
-    px = np.pad(x, maxlag, mode='constant')
     lags = np.arange(-maxlag, maxlag + 1,dtype=float)
-    return lags, T.dot(px)
+    nfft = fft.next_fast_len(x.shape[-1] + maxlag, real=True)
+    if method == 'auto':
+        # The direct computation scales as the number of lags, the FFT
+        # as the log of the padded length
+        method = 'fft' if x.ndim == 2 or 2*maxlag+1 > 5*np.log2(nfft) else 'direct'
+
+    if method == 'direct' and x.ndim == 1:
+        #py = np.pad(y.conj(), 2*maxlag, mode=mode)
+        py = np.pad(y, 2*maxlag, mode='constant')
+        T = as_strided(py[2*maxlag:], shape=(2*maxlag+1, len(y) + 2*maxlag),
+                       strides=(-py.strides[0], py.strides[0]))
+        px = np.pad(x, maxlag, mode='constant')
+        return lags, T.dot(px)
+
+    # Zero-padding to nfft ensures lags up to maxlag do not wrap
+    _x = x if x.ndim == 1 else x[::step]
+    _y = y if y.ndim == 1 else y[::step]
+    xy = fft.rfft(_x, n=nfft, axis=-1) * np.conj(fft.rfft(_y, n=nfft, axis=-1))
+    if xy.ndim == 2:
+        xy = np.sum(xy, axis=0)
+    xcorr = fft.irfft(xy, n=nfft)
+    return lags, np.append(xcorr[nfft-maxlag:], xcorr[:maxlag+1])
 
 
 
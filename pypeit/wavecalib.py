@@ -9,8 +9,6 @@ import copy
 import inspect
 import json
 
-from IPython import embed
-
 import numpy as np
 
 from matplotlib import pyplot as plt
@@ -180,7 +178,7 @@ class WaveCalib(datamodel.DataContainer):
         if not np.array_equal(self.spat_ids, slits.spat_id):
             msgs.error("Your wvcalib solutions are out of sync with your slits.  Remove Masters and start from scratch")
 
-    def build_waveimg(self, tilts, slits, spat_flexure=None, spec_flexure=None):
+    def build_waveimg(self, tilts, slits, spat_flexure=None, spec_flexure=None, section=None):
         """
         Main algorithm to build the wavelength image
 
@@ -200,6 +198,11 @@ class WaveCalib(datamodel.DataContainer):
                 array should be the same as the number of slits. The
                 value of each element is the spectral shift in pixels
                 to be applied to each slit.
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices with the section of the full
+                image covered by ``tilts``; see
+                :func:`~pypeit.slittrace.SlitTraceSet.slit_img`.  If
+                None, ``tilts`` is the full image.
 
         Returns:
             `numpy.ndarray`_: The wavelength image.
@@ -222,7 +225,8 @@ class WaveCalib(datamodel.DataContainer):
         ok_slits = np.logical_not(bpm)
         #
         image = np.zeros_like(tilts)
-        slitmask = slits.slit_img(flexure=spat_flexure, exclude_flag=slits.bitmask.exclude_for_reducing)
+        slitmask = slits.slit_img(flexure=spat_flexure, exclude_flag=slits.bitmask.exclude_for_reducing,
+                                  section=section)
 
         # If this is echelle print out a status message and do some error checking
         if self.par['echelle']:
@@ -236,12 +240,15 @@ class WaveCalib(datamodel.DataContainer):
             slit_spat = slits.spat_id[islit]
             thismask = (slitmask == slit_spat)
             if not np.any(thismask):
+                if section is not None:
+                    # Slit is not in this section of the image
+                    continue
                 msgs.error("Something failed in wavelengths or masking..")
             if self.par['echelle']:
                 # # TODO: Put this in `SlitTraceSet`?
                 # evaluate solution --
-                image[thismask] = self.wv_fit2d.eval(
-                    tilts[thismask] + spec_flex[islit], x2=np.full_like(tilts[thismask], slits.ech_order[islit]))
+                image[thismask] = self.wv_fit2d.eval(tilts[thismask] + spec_flex[islit],
+                                                     x2=slits.ech_order[islit])
                 image[thismask] /= slits.ech_order[islit]
             else:
                 iwv_fits = self.wv_fits[islit]
@@ -413,6 +420,7 @@ class BuildWaveCalib:
             final_fit = {}
             # Manually identify lines
             msgs.info("Initializing the wavelength calibration tool")
+            from IPython import embed
             embed(header='line 222 wavecalib.py')
             for slit_idx in ok_mask_idx:
                 arcfitter = Identify.initialise(arccen, self.slits, slit=slit_idx, par=self.par)
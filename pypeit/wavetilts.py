@@ -12,6 +12,8 @@ import inspect
 import numpy as np
 from matplotlib import pyplot as plt
 
+from scipy import ndimage
+
 from astropy import stats, visualization
 
 from pypeit import msgs, datamodel
@@ -19,8 +21,6 @@ from pypeit.display import display
 from pypeit.core import arc
 from pypeit.core import tracewave
 
-from IPython import embed
-
 
 class WaveTilts(datamodel.DataContainer):
     """
@@ -89,35 +89,62 @@ class WaveTilts(datamodel.DataContainer):
         if not np.array_equal(self.spat_id, slits.spat_id):
             msgs.error("Your tilt solutions are out of sync with your slits.  Remove Masters and start from scratch")
 
-    def fit2tiltimg(self, slitmask, flexure=None):
+    def fit2tiltimg(self, slitmask, flexure=None, shape=None, section=None, dtype=None):
         """
         Generate a tilt image from the fit parameters
 
-        Mainly to allow for flexure
+        Mainly to allow for flexure.  The tilts of each slit are only
+        evaluated within the bounding box of the slit in ``slitmask``.
 
         Args:
             slitmask (`numpy.ndarray`_):
             flexure (float, optional):
                 Spatial shift of the tilt image onto the desired frame
                 (typically a science image)
+            shape (:obj:`tuple`, optional):
+                Shape of the full image.  Only used (and required) if
+                ``section`` is provided.
+            section (:obj:`tuple`, optional):
+                A 2-tuple of slices with the section of the full
+                image covered by ``slitmask``; see
+                :func:`~pypeit.slittrace.SlitTraceSet.slit_img`.  If
+                None, ``slitmask`` is the full image.
+            dtype (`numpy.dtype`_, optional):
+                Data type of the tilt image; see
+                :func:`~pypeit.core.tracewave.fit2tilts`.  If None,
+                the image is double precision.
 
         Returns:
             `numpy.ndarray`_:  New tilt image
 
         """
         _flexure = 0. if flexure is None else flexure
-
-        final_tilts = np.zeros_like(slitmask).astype(float)
-        gdslit_spat = np.unique(slitmask[slitmask >= 0]).astype(int)
+        if section is not None and shape is None:
+            msgs.error('Must provide the shape of the full image to build a tilts section.')
+        _shape = slitmask.shape if section is None else shape
+
+        final_tilts = np.zeros(slitmask.shape, dtype=float if dtype is None else dtype)
+        # Offset of slitmask in the full image
+        spec_off = 0 if section is None or section[0].start is None else section[0].start
+        spat_off = 0 if section is None or section[1].start is None else section[1].start
+        # Bounding box of each slit
+        boxes = ndimage.find_objects(np.where(slitmask >= 0, slitmask + 1, 0).astype(int))
         # Loop
-        for slit_spat in gdslit_spat:
+        for slit_spat, box in enumerate(boxes):
+            if box is None:
+                continue
             slit_idx = self.spatid_to_zero(slit_spat)
             # Calculate
             coeff_out = self.coeffs[:self.spec_order[slit_idx]+1,:self.spat_order[slit_idx]+1,slit_idx]
-            _tilts = tracewave.fit2tilts(final_tilts.shape, coeff_out, self.func2d, spat_shift=-1*_flexure)
+            _tilts = tracewave.fit2tilts(_shape, coeff_out, self.func2d, spat_shift=-1*_flexure,
+                                         section=(slice(box[0].start + spec_off,
+                                                        box[0].stop + spec_off),
+                                                  slice(box[1].start + spat_off,
+                                                        box[1].stop + spat_off)),
+                                         dtype=dtype)
             # Fill
-            thismask_science = slitmask == slit_spat
-            final_tilts[thismask_science] = _tilts[thismask_science]
+            thismask_science = slitmask[box] == slit_spat
+            final_tilts[box][thismask_science] = _tilts[thismask_science]
         # Return
         return final_tilts
 